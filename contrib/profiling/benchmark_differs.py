@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+"""Compare the speed of the classic and fast Myers differ engines.
+
+Usage: benchmark_differs.py [-n ITERATIONS] [old_file new_file]...
+
+With no files, the move detection test data shipped with the diff viewer
+is used. Each pair is diffed with both engines, and the best time of each
+is reported along with whether the resulting opcodes are identical.
+"""
+
+from __future__ import print_function, unicode_literals
+
+import getopt
+import io
+import os
+import sys
+import timeit
+
+scripts_dir = os.path.abspath(os.path.dirname(__file__))
+
+# Source root directory
+sys.path.insert(0, os.path.abspath(os.path.join(scripts_dir, '..', '..')))
+
+import django  # noqa: E402
+
+
+DEFAULT_ITERATIONS = 5
+
+
+def usage():
+    print('usage:  %s [-n ITERATIONS] [old_file new_file]...' % sys.argv[0])
+
+
+def read_lines(filename):
+    with io.open(filename, 'r', encoding='utf-8', errors='replace') as fp:
+        return fp.read().splitlines()
+
+
+def get_default_pairs():
+    import reviewboard.diffviewer
+
+    testdata_dir = os.path.join(
+        os.path.dirname(reviewboard.diffviewer.__file__),
+        'testdata', 'move_detection')
+
+    return [
+        (os.path.join(testdata_dir, 'bug-4371-old.js'),
+         os.path.join(testdata_dir, 'bug-4371-new.js')),
+    ]
+
+
+def benchmark(differ_cls, a, b, iterations):
+    timer = timeit.Timer(lambda: list(differ_cls(a, b).get_opcodes()))
+
+    return min(timer.repeat(repeat=iterations, number=1))
+
+
+def main():
+    os.environ.setdefault(str('DJANGO_SETTINGS_MODULE'),
+                          str('reviewboard.settings'))
+
+    if hasattr(django, 'setup'):
+        # Django >= 1.7
+        django.setup()
+
+    from reviewboard.diffviewer.myersdiff import FastMyersDiffer, MyersDiffer
+
+    iterations = DEFAULT_ITERATIONS
+
+    opts, args = getopt.getopt(sys.argv[1:], 'hn:')
+
+    for opt, arg in opts:
+        if opt == '-h':
+            usage()
+            sys.exit(0)
+        elif opt == '-n':
+            iterations = int(arg)
+
+    if len(args) % 2 != 0:
+        usage()
+        sys.exit(1)
+
+    if args:
+        pairs = list(zip(args[::2], args[1::2]))
+    else:
+        pairs = get_default_pairs()
+
+    for old_filename, new_filename in pairs:
+        a = read_lines(old_filename)
+        b = read_lines(new_filename)
+
+        classic_time = benchmark(MyersDiffer, a, b, iterations)
+        fast_time = benchmark(FastMyersDiffer, a, b, iterations)
+        same = (list(MyersDiffer(a, b).get_opcodes()) ==
+                list(FastMyersDiffer(a, b).get_opcodes()))
+
+        print('%s -> %s (%d -> %d lines)'
+              % (old_filename, new_filename, len(a), len(b)))
+        print('    classic: %.4fs' % classic_time)
+        print('    fast:    %.4fs (%.2fx)'
+              % (fast_time, classic_time / max(fast_time, 1e-9)))
+        print('    identical opcodes: %s' % same)
+
+
+if __name__ == '__main__':
+    main()
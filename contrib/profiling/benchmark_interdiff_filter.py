@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+"""Measure interdiff filtering across many revisions of a diff.
+
+Usage: benchmark_interdiff_filter.py [-n ITERATIONS] [-r REVISIONS]
+                                     [-c CHUNKS]
+
+This simulates paging through every pair of revisions of a file on a review
+request with many diff revisions. Each revision's diff contains CHUNKS
+hunks. For every pair of revisions, the interdiff opcodes are filtered
+twice: once by re-parsing both diffs (the old behavior), and once using
+filter ranges computed up-front for each revision (as stored with the
+diff at upload time).
+"""
+
+from __future__ import print_function, unicode_literals
+
+import getopt
+import os
+import random
+import sys
+import timeit
+
+scripts_dir = os.path.abspath(os.path.dirname(__file__))
+
+# Source root directory
+sys.path.insert(0, os.path.abspath(os.path.join(scripts_dir, '..', '..')))
+
+import django  # noqa: E402
+
+
+DEFAULT_ITERATIONS = 3
+DEFAULT_REVISIONS = 20
+DEFAULT_CHUNKS = 200
+
+
+def usage():
+    print('usage:  %s [-n ITERATIONS] [-r REVISIONS] [-c CHUNKS]'
+          % sys.argv[0])
+
+
+def make_diff(num_chunks, seed):
+    rand = random.Random(seed)
+    parts = []
+    offset = 0
+
+    for i in range(num_chunks):
+        start = i * 40 + 1
+        num_deletes = rand.randint(0, 5)
+        num_inserts = rand.randint(0, 5)
+        orig_len = num_deletes + 6
+        new_len = num_inserts + 6
+
+        parts += [
+            b'@@ -%d,%d +%d,%d @@\n' % (start, orig_len, start + offset,
+                                        new_len),
+            b' context\n' * 3,
+            b'-deleted\n' * num_deletes,
+            b'+inserted\n' * num_inserts,
+            b' context\n' * 3,
+        ]
+        offset += num_inserts - num_deletes
+
+    return b''.join(parts)
+
+
+def make_opcodes(num_lines):
+    opcodes = []
+
+    for i in range(0, num_lines, 20):
+        opcodes += [
+            ('equal', i, i + 10, i, i + 10),
+            ('replace', i + 10, i + 12, i + 10, i + 12),
+            ('equal', i + 12, i + 20, i + 12, i + 20),
+        ]
+
+    return opcodes
+
+
+def main():
+    os.environ.setdefault(str('DJANGO_SETTINGS_MODULE'),
+                          str('reviewboard.settings'))
+
+    if hasattr(django, 'setup'):
+        # Django >= 1.7
+        django.setup()
+
+    from reviewboard.diffviewer.processors import (filter_interdiff_opcodes,
+                                                   get_interdiff_filter_ranges)
+
+    iterations = DEFAULT_ITERATIONS
+    num_revisions = DEFAULT_REVISIONS
+    num_chunks = DEFAULT_CHUNKS
+
+    opts, args = getopt.getopt(sys.argv[1:], 'hn:r:c:')
+
+    for opt, arg in opts:
+        if opt == '-h':
+            usage()
+            sys.exit(0)
+        elif opt == '-n':
+            iterations = int(arg)
+        elif opt == '-r':
+            num_revisions = int(arg)
+        elif opt == '-c':
+            num_chunks = int(arg)
+
+    diffs = [
+        make_diff(num_chunks, seed)
+        for seed in range(num_revisions)
+    ]
+    opcodes = make_opcodes(num_chunks * 40)
+    pairs = [
+        (i, j)
+        for i in range(num_revisions)
+        for j in range(i + 1, num_revisions)
+    ]
+
+    def _filter_parsed():
+        for i, j in pairs:
+            list(filter_interdiff_opcodes(opcodes, diffs[i], diffs[j]))
+
+    def _filter_precomputed():
+        for i, j in pairs:
+            list(filter_interdiff_opcodes(opcodes, diffs[i], diffs[j],
+                                          filediff_ranges=all_ranges[i],
+                                          interfilediff_ranges=all_ranges[j]))
+
+    precompute_time = timeit.timeit(
+        lambda: [get_interdiff_filter_ranges(diff) for diff in diffs],
+        number=1)
+    all_ranges = [
+        get_interdiff_filter_ranges(diff)
+        for diff in diffs
+    ]
+
+    parsed_time = min(timeit.Timer(_filter_parsed).repeat(
+        repeat=iterations, number=1))
+    precomputed_time = min(timeit.Timer(_filter_precomputed).repeat(
+        repeat=iterations, number=1))
+
+    print('%d revisions, %d chunks per diff, %d interdiffs'
+          % (num_revisions, num_chunks, len(pairs)))
+    print('    re-parsing diffs:     %.4fs' % parsed_time)
+    print('    precomputed ranges:   %.4fs (%.2fx)'
+          % (precomputed_time,
+             parsed_time / max(precomputed_time, 1e-9)))
+    print('    one-time computation: %.4fs' % precompute_time)
+
+
+if __name__ == '__main__':
+    main()
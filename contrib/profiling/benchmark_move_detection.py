@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+"""Measure the cost of move detection on large synthetic moves.
+
+Usage: benchmark_move_detection.py [-n ITERATIONS] [NUM_LINES:NUM_MOVED]...
+
+Each case builds a file of NUM_LINES lines containing many repeated lines
+(closing braces, blank lines and common statements), moves the first
+NUM_MOVED lines to the end of the file, and times the opcode generator's
+move detection. The diff itself is computed once up-front so that only the
+opcode generation is measured.
+"""
+
+from __future__ import print_function, unicode_literals
+
+import getopt
+import os
+import random
+import sys
+import timeit
+
+scripts_dir = os.path.abspath(os.path.dirname(__file__))
+
+# Source root directory
+sys.path.insert(0, os.path.abspath(os.path.join(scripts_dir, '..', '..')))
+
+import django  # noqa: E402
+
+
+DEFAULT_ITERATIONS = 3
+DEFAULT_CASES = [
+    (2000, 800),
+    (8000, 3000),
+    (20000, 8000),
+]
+
+
+class ReplayDiffer(object):
+    """A differ that replays opcodes computed ahead of time."""
+
+    def __init__(self, a, b, opcodes):
+        self.a = a
+        self.b = b
+        self.opcodes = opcodes
+
+    def get_opcodes(self):
+        return iter(self.opcodes)
+
+
+def usage():
+    print('usage:  %s [-n ITERATIONS] [NUM_LINES:NUM_MOVED]...'
+          % sys.argv[0])
+
+
+def make_lines(num_lines, seed=1):
+    rand = random.Random(seed)
+    lines = []
+
+    for i in range(num_lines):
+        k = rand.random()
+
+        if k < 0.15:
+            lines.append('    }')
+        elif k < 0.2:
+            lines.append('')
+        elif k < 0.25:
+            lines.append('        return result;')
+        else:
+            lines.append('    value_%d = compute(value_%d, %d);'
+                         % (i, rand.randint(0, num_lines),
+                            rand.randint(0, 99)))
+
+    return lines
+
+
+def main():
+    os.environ.setdefault(str('DJANGO_SETTINGS_MODULE'),
+                          str('reviewboard.settings'))
+
+    if hasattr(django, 'setup'):
+        # Django >= 1.7
+        django.setup()
+
+    from reviewboard.diffviewer.myersdiff import FastMyersDiffer
+    from reviewboard.diffviewer.opcode_generator import DiffOpcodeGenerator
+
+    iterations = DEFAULT_ITERATIONS
+
+    opts, args = getopt.getopt(sys.argv[1:], 'hn:')
+
+    for opt, arg in opts:
+        if opt == '-h':
+            usage()
+            sys.exit(0)
+        elif opt == '-n':
+            iterations = int(arg)
+
+    try:
+        cases = [
+            tuple(int(value) for value in arg.split(':', 1))
+            for arg in args
+        ] or DEFAULT_CASES
+    except ValueError:
+        usage()
+        sys.exit(1)
+
+    for num_lines, num_moved in cases:
+        a = make_lines(num_lines)
+        b = a[num_moved:] + a[:num_moved]
+        opcodes = list(FastMyersDiffer(a, b).get_opcodes())
+
+        def _run():
+            differ = ReplayDiffer(a, b, opcodes)
+
+            return list(DiffOpcodeGenerator(differ))
+
+        timer = timeit.Timer(_run)
+        best = min(timer.repeat(repeat=iterations, number=1))
+        num_move_lines = sum(
+            len(meta.get('moved-from', {}))
+            for tag, i1, i2, j1, j2, meta in _run()
+        )
+
+        print('%d lines, %d moved: %.4fs (%d lines detected as moved)'
+              % (num_lines, num_moved, best, num_move_lines))
+
+
+if __name__ == '__main__':
+    main()
@@ -244,6 +244,17 @@ class GeneralSettingsForm(SiteSettingsForm):
         required=False,
         widget=forms.TextInput(attrs={'size': '30'}))
 
+    reviews_enable_update_streams = forms.BooleanField(
+        label=_('Stream updates to review request pages'),
+        help_text=_('Push new reviews and other updates to open review '
+                    'request pages, instead of having pages poll for them. '
+                    'Each open page holds a server connection, so this '
+                    'requires an asynchronous or threaded web server, and a '
+                    'cache shared between server processes (such as '
+                    'memcached). Pages will poll for updates when this is '
+                    'disabled or no shared cache is configured.'),
+        required=False)
+
     site_media_url = forms.CharField(
         label=_('Media URL'),
         help_text=(_('The URL to the media files. Set to '
@@ -509,7 +520,8 @@ class GeneralSettingsForm(SiteSettingsForm):
                 'fields': ('company', 'server', 'site_media_url',
                            'site_static_url', 'site_admin_name',
                            'site_admin_email', 'locale_timezone',
-                           'site_read_only', 'read_only_message'),
+                           'site_read_only', 'read_only_message',
+                           'reviews_enable_update_streams'),
             },
             {
                 'title': _('Cache Settings'),
@@ -147,10 +147,13 @@ defaults.update({
     'company': '',
     'default_use_rich_text': True,
     'diffviewer_context_num_lines': 5,
+    'diffviewer_diff_compression': 'Z',
+    'diffviewer_differ_engine': 'fast',
     'diffviewer_include_space_patterns': [],
     'diffviewer_max_diff_size': 0,
     'diffviewer_paginate_by': 20,
     'diffviewer_paginate_orphans': 10,
+    'diffviewer_patch_engine': 'builtin',
     'diffviewer_syntax_highlighting': True,
     'diffviewer_syntax_highlighting_threshold': 0,
     'diffviewer_show_trailing_whitespace': True,
@@ -164,6 +167,8 @@ defaults.update({
     'site_domain_method': 'http',
     'site_read_only': False,
 
+    'reviews_enable_update_streams': False,
+
     'privacy_enable_user_consent': False,
     'privacy_info_html': None,
     'privacy_policy_url': None,
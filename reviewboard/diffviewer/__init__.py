@@ -0,0 +1,15 @@
+"""Diff viewer-specific initialization."""
+
+from __future__ import unicode_literals
+
+from reviewboard.signals import initializing
+
+
+def _on_initializing(**kwargs):
+    """Set up signal handlers for the diff viewer."""
+    from reviewboard.diffviewer.models import untouchedcommentfile
+
+    untouchedcommentfile.connect_signals()
+
+
+initializing.connect(_on_initializing)
@@ -3,8 +3,10 @@ from __future__ import unicode_literals
 import fnmatch
 import functools
 import hashlib
+import os
 import re
 
+import pygments
 import pygments.util
 from django.utils import six
 from django.utils.encoding import force_text
@@ -30,6 +32,13 @@ from reviewboard.diffviewer.opcode_generator import (DiffOpcodeGenerator,
                                                      get_diff_opcode_generator)
 
 
+#: The version of the syntax-highlighted lines stored in cache.
+#:
+#: This must be bumped if the generated markup changes for reasons other than
+#: a new version of Pygments.
+HIGHLIGHT_CACHE_VERSION = 1
+
+
 class NoWrapperHtmlFormatter(HtmlFormatter):
     """An HTML Formatter for Pygments that doesn't wrap items in a div."""
     def __init__(self, *args, **kwargs):
@@ -827,18 +836,7 @@ class RawDiffChunkGenerator(object):
         if filename.endswith(self.STYLED_EXT_BLACKLIST):
             return None
 
-        try:
-            lexer = guess_lexer_for_filename(filename,
-                                             data,
-                                             stripnl=False,
-                                             encoding='utf-8')
-        except pygments.util.ClassNotFound:
-            return None
-
-        lexer.add_filter('codetagify')
-
-        return split_line_endings(
-            highlight(data, lexer, NoWrapperHtmlFormatter()))
+        return get_highlighted_lines(data, filename)
 
 
 class DiffChunkGenerator(RawDiffChunkGenerator):
@@ -964,11 +962,22 @@ class DiffChunkGenerator(RawDiffChunkGenerator):
 
         if self.interfilediff:
             interdiff = self.interfilediff.diff
+
+            # Use the filter ranges stored with the diffs, rather than
+            # re-parsing both diffs for every interdiff.
+            diff_filter_ranges = self.filediff.get_interdiff_filter_ranges()
+            interdiff_filter_ranges = \
+                self.interfilediff.get_interdiff_filter_ranges()
         else:
             interdiff = None
+            diff_filter_ranges = None
+            interdiff_filter_ranges = None
 
-        return get_diff_opcode_generator(self.differ, diff, interdiff,
-                                         request=self.request)
+        return get_diff_opcode_generator(
+            self.differ, diff, interdiff,
+            request=self.request,
+            diff_filter_ranges=diff_filter_ranges,
+            interdiff_filter_ranges=interdiff_filter_ranges)
 
     def get_chunks(self):
         """Return the chunks for the given diff information.
@@ -1214,6 +1223,57 @@ def compute_chunk_last_header(lines, numlines, meta, last_header=None):
     return last_header
 
 
+def get_highlighted_lines(data, filename):
+    """Return the syntax-highlighted lines for a file's contents.
+
+    Highlighted lines are cached based on a SHA256 hash of the contents and
+    the file's base name, which together determine the lexer used. Files with
+    the same name and contents are only highlighted once, regardless of which
+    FileDiffs, interdiffs or revisions they appear in. The lexer is only
+    looked up if the lines aren't already cached.
+
+    Version Added:
+        4.0.6
+
+    Args:
+        data (unicode):
+            The data to syntax highlight.
+
+        filename (unicode):
+            The name of the file. This is used to help determine a suitable
+            lexer.
+
+    Returns:
+        list of unicode:
+        A list of lines, all syntax-highlighted, if a lexer is found.
+        If no lexer is available, this will return ``None``.
+    """
+    def _highlight():
+        try:
+            lexer = guess_lexer_for_filename(filename,
+                                             data,
+                                             stripnl=False,
+                                             encoding='utf-8')
+        except pygments.util.ClassNotFound:
+            return []
+
+        lexer.add_filter('codetagify')
+
+        return split_line_endings(
+            highlight(data, lexer, NoWrapperHtmlFormatter()))
+
+    content_hash = hashlib.sha256()
+    content_hash.update(os.path.basename(filename).encode('utf-8'))
+    content_hash.update(b'\0')
+    content_hash.update(data.encode('utf-8'))
+
+    cache_key = 'highlighted-lines-v%s-%s-%s' % (HIGHLIGHT_CACHE_VERSION,
+                                                 pygments.__version__,
+                                                 content_hash.hexdigest())
+
+    return cache_memoize(cache_key, _highlight, large_data=True) or None
+
+
 _generator = DiffChunkGenerator
 
 
@@ -0,0 +1,403 @@
+"""Compression codecs for stored diff data.
+
+Raw diff content stored in
+:py:class:`~reviewboard.diffviewer.models.raw_file_diff_data.RawFileDiffData`
+is compressed using one of the codecs registered here. Each codec is
+identified by a single-character ID, which is stored alongside the data in
+:py:attr:`RawFileDiffData.compression
+<reviewboard.diffviewer.models.raw_file_diff_data.RawFileDiffData.
+compression>`, so that data written by any codec can always be read back.
+
+Extensions can provide additional codecs (for instance, one using a
+dictionary trained on diff content) through
+:py:func:`register_compression_codec`.
+
+Version Added:
+    4.0.6
+"""
+
+from __future__ import unicode_literals
+
+import bz2
+import zlib
+
+from django.utils.six.moves import range
+from django.utils.translation import ugettext_lazy as _
+from djblets.siteconfig.models import SiteConfiguration
+
+try:
+    import lzma
+except ImportError:
+    # lzma is only built in to Python 3.
+    lzma = None
+
+
+#: The default number of compressed bytes to decompress at a time.
+#:
+#: Version Added:
+#:     4.0.6
+DECOMPRESS_CHUNK_SIZE = 64 * 1024
+
+
+class BaseCompressionCodec(object):
+    """Base class for a compression codec for stored diff data.
+
+    Version Added:
+        4.0.6
+    """
+
+    #: The ID of the codec, stored along with compressed data.
+    #:
+    #: This must be a single character, and must never change once data has
+    #: been stored using the codec.
+    #:
+    #: Type:
+    #:     unicode
+    compression_id = None
+
+    #: The displayed name of the codec.
+    #:
+    #: Type:
+    #:     unicode
+    name = None
+
+    def is_available(self):
+        """Return whether the codec can be used.
+
+        Returns:
+            bool:
+            Whether any dependencies for the codec are installed.
+        """
+        return True
+
+    def compress(self, data):
+        """Compress data.
+
+        Args:
+            data (bytes):
+                The data to compress.
+
+        Returns:
+            bytes:
+            The compressed data.
+        """
+        raise NotImplementedError
+
+    def decompress(self, data):
+        """Decompress data.
+
+        Args:
+            data (bytes):
+                The data to decompress.
+
+        Returns:
+            bytes:
+            The decompressed data.
+        """
+        raise NotImplementedError
+
+    def create_decompressor(self):
+        """Return an object for incrementally decompressing data.
+
+        Codecs that support incremental decompression should override this.
+
+        Returns:
+            object:
+            An object with a ``decompress(data)`` method, and optionally a
+            ``flush()`` method, or ``None`` if incremental decompression
+            isn't supported.
+        """
+        return None
+
+    def iter_decompress(self, data, chunk_size=DECOMPRESS_CHUNK_SIZE):
+        """Decompress data incrementally.
+
+        This avoids holding all the decompressed data in memory at once,
+        if the codec supports incremental decompression. Otherwise, all the
+        decompressed data will be yielded at once.
+
+        Args:
+            data (bytes):
+                The data to decompress.
+
+            chunk_size (int, optional):
+                The number of compressed bytes to decompress at a time.
+
+        Yields:
+            bytes:
+            Each chunk of decompressed data.
+        """
+        decompressor = self.create_decompressor()
+
+        if decompressor is None:
+            yield self.decompress(data)
+            return
+
+        for i in range(0, len(data), chunk_size):
+            chunk = decompressor.decompress(data[i:i + chunk_size])
+
+            if chunk:
+                yield chunk
+
+        flush = getattr(decompressor, 'flush', None)
+
+        if flush is not None:
+            chunk = flush()
+
+            if chunk:
+                yield chunk
+
+
+class BZip2CompressionCodec(BaseCompressionCodec):
+    """A compression codec using bzip2.
+
+    This was the only codec used prior to Review Board 4.0.6. It compresses
+    well, but is slow to both compress and decompress.
+    """
+
+    compression_id = 'B'
+    name = _('BZip2-compressed')
+
+    def compress(self, data):
+        """Compress data.
+
+        Args:
+            data (bytes):
+                The data to compress.
+
+        Returns:
+            bytes:
+            The compressed data.
+        """
+        return bz2.compress(data, 9)
+
+    def decompress(self, data):
+        """Decompress data.
+
+        Args:
+            data (bytes):
+                The data to decompress.
+
+        Returns:
+            bytes:
+            The decompressed data.
+        """
+        return bz2.decompress(data)
+
+    def create_decompressor(self):
+        """Return an object for incrementally decompressing data.
+
+        Returns:
+            object:
+            The decompressor.
+        """
+        return bz2.BZ2Decompressor()
+
+
+class ZLibCompressionCodec(BaseCompressionCodec):
+    """A compression codec using zlib.
+
+    This decompresses many times faster than bzip2, at the cost of slightly
+    larger compressed data.
+    """
+
+    compression_id = 'Z'
+    name = _('zlib-compressed')
+
+    #: The compression level to use.
+    level = 6
+
+    def compress(self, data):
+        """Compress data.
+
+        Args:
+            data (bytes):
+                The data to compress.
+
+        Returns:
+            bytes:
+            The compressed data.
+        """
+        return zlib.compress(data, self.level)
+
+    def decompress(self, data):
+        """Decompress data.
+
+        Args:
+            data (bytes):
+                The data to decompress.
+
+        Returns:
+            bytes:
+            The decompressed data.
+        """
+        return zlib.decompress(data)
+
+    def create_decompressor(self):
+        """Return an object for incrementally decompressing data.
+
+        Returns:
+            object:
+            The decompressor.
+        """
+        return zlib.decompressobj()
+
+
+class LZMACompressionCodec(BaseCompressionCodec):
+    """A compression codec using LZMA.
+
+    This compresses better than bzip2 and decompresses faster, but is slow
+    to compress. It's only available on Python 3.
+    """
+
+    compression_id = 'L'
+    name = _('LZMA-compressed')
+
+    #: The compression preset to use.
+    preset = 6
+
+    def is_available(self):
+        """Return whether the codec can be used.
+
+        Returns:
+            bool:
+            Whether the :py:mod:`lzma` module is available.
+        """
+        return lzma is not None
+
+    def compress(self, data):
+        """Compress data.
+
+        Args:
+            data (bytes):
+                The data to compress.
+
+        Returns:
+            bytes:
+            The compressed data.
+        """
+        return lzma.compress(data, preset=self.preset)
+
+    def decompress(self, data):
+        """Decompress data.
+
+        Args:
+            data (bytes):
+                The data to decompress.
+
+        Returns:
+            bytes:
+            The decompressed data.
+        """
+        return lzma.decompress(data)
+
+    def create_decompressor(self):
+        """Return an object for incrementally decompressing data.
+
+        Returns:
+            object:
+            The decompressor.
+        """
+        return lzma.LZMADecompressor()
+
+
+_codecs = {}
+
+
+def register_compression_codec(codec):
+    """Register a compression codec.
+
+    Args:
+        codec (BaseCompressionCodec):
+            The codec to register.
+
+    Raises:
+        KeyError:
+            A codec with the same ID was already registered.
+
+        ValueError:
+            The codec's ID was not a single character.
+    """
+    compression_id = codec.compression_id
+
+    if not compression_id or len(compression_id) != 1:
+        raise ValueError('Compression codec IDs must be a single character, '
+                         'not %r'
+                         % compression_id)
+
+    if compression_id in _codecs:
+        raise KeyError('A compression codec with ID "%s" is already '
+                       'registered'
+                       % compression_id)
+
+    _codecs[compression_id] = codec
+
+
+def unregister_compression_codec(codec):
+    """Unregister a compression codec.
+
+    Any data stored using the codec will no longer be readable.
+
+    Args:
+        codec (BaseCompressionCodec):
+            The codec to unregister.
+
+    Raises:
+        KeyError:
+            The codec was not registered.
+    """
+    if _codecs.get(codec.compression_id) is not codec:
+        raise KeyError('Compression codec "%s" is not registered'
+                       % codec.compression_id)
+
+    del _codecs[codec.compression_id]
+
+
+def get_compression_codec(compression_id):
+    """Return the compression codec with the given ID.
+
+    Args:
+        compression_id (unicode):
+            The ID of the codec.
+
+    Returns:
+        BaseCompressionCodec:
+        The codec, or ``None`` if a codec with that ID isn't registered.
+    """
+    return _codecs.get(compression_id)
+
+
+def get_compression_codecs():
+    """Return all registered compression codecs.
+
+    Returns:
+        list of BaseCompressionCodec:
+        The registered codecs.
+    """
+    return list(_codecs.values())
+
+
+def get_default_compression_codec():
+    """Return the compression codec used for newly-stored diffs.
+
+    This is controlled by the ``diffviewer_diff_compression`` site
+    configuration setting. If that codec isn't registered or available, this
+    falls back to bzip2.
+
+    Returns:
+        BaseCompressionCodec:
+        The codec to use.
+    """
+    siteconfig = SiteConfiguration.objects.get_current()
+    codec = get_compression_codec(
+        siteconfig.get('diffviewer_diff_compression'))
+
+    if codec is None or not codec.is_available():
+        codec = get_compression_codec(BZip2CompressionCodec.compression_id)
+
+    return codec
+
+
+register_compression_codec(BZip2CompressionCodec())
+register_compression_codec(ZLibCompressionCodec())
+register_compression_codec(LZMACompressionCodec())
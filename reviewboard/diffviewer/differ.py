@@ -2,11 +2,26 @@ from __future__ import unicode_literals
 
 import os
 
+from djblets.siteconfig.models import SiteConfiguration
+
 from reviewboard.diffviewer.errors import DiffCompatError
 from reviewboard.diffviewer.filetypes import (HEADER_REGEXES,
                                               HEADER_REGEX_ALIASES)
 
 
+#: The optimized Myers differ engine.
+#:
+#: Version Added:
+#:     4.0.6
+DIFFER_ENGINE_FAST = 'fast'
+
+#: The original Myers differ engine.
+#:
+#: Version Added:
+#:     4.0.6
+DIFFER_ENGINE_CLASSIC = 'classic'
+
+
 # Compatibility versions:
 #
 class DiffCompatVersion(object):
@@ -85,18 +100,64 @@ class Differ(object):
 
 
 def get_differ(a, b, ignore_space=False,
-               compat_version=DiffCompatVersion.DEFAULT):
+               compat_version=DiffCompatVersion.DEFAULT, engine=None):
     """Returns a differ for with the given settings.
 
     By default, this will return the MyersDiffer. Older differs can be used
     by specifying a compat_version, but this is only for *really* ancient
     diffs, currently.
+
+    Myers diffs are computed by the optimized
+    :py:class:`~reviewboard.diffviewer.myersdiff.FastMyersDiffer` by default,
+    which produces the same results as the original
+    :py:class:`~reviewboard.diffviewer.myersdiff.MyersDiffer`. The engine
+    can be chosen through the ``diffviewer_differ_engine`` site
+    configuration setting.
+
+    Version Changed:
+        4.0.6:
+        Added the ``engine`` argument.
+
+    Args:
+        a (list of unicode):
+            The lines of the original file.
+
+        b (list of unicode):
+            The lines of the modified file.
+
+        ignore_space (bool, optional):
+            Whether to ignore leading whitespace on lines.
+
+        compat_version (int, optional):
+            The diff compatibility version, from :py:class:`DiffCompatVersion`.
+
+        engine (unicode, optional):
+            The Myers differ engine to use. This is one of
+            :py:data:`DIFFER_ENGINE_FAST` or :py:data:`DIFFER_ENGINE_CLASSIC`.
+            If not provided, the site configuration will be consulted.
+
+    Returns:
+        Differ:
+        The new differ.
+
+    Raises:
+        reviewboard.diffviewer.errors.DiffCompatError:
+            The compatibility version was invalid.
     """
     cls = None
 
     if compat_version in DiffCompatVersion.MYERS_VERSIONS:
-        from reviewboard.diffviewer.myersdiff import MyersDiffer
-        cls = MyersDiffer
+        if engine is None:
+            siteconfig = SiteConfiguration.objects.get_current()
+            engine = siteconfig.get('diffviewer_differ_engine',
+                                    DIFFER_ENGINE_FAST)
+
+        if engine == DIFFER_ENGINE_FAST:
+            from reviewboard.diffviewer.myersdiff import FastMyersDiffer
+            cls = FastMyersDiffer
+        else:
+            from reviewboard.diffviewer.myersdiff import MyersDiffer
+            cls = MyersDiffer
     elif compat_version == DiffCompatVersion.SMDIFFER:
         from reviewboard.diffviewer.smdiff import SMDiffer
         cls = SMDiffer
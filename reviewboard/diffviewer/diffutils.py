@@ -1,6 +1,7 @@
 from __future__ import unicode_literals
 
 import fnmatch
+import hashlib
 import logging
 import os
 import re
@@ -10,10 +11,14 @@ import tempfile
 from difflib import SequenceMatcher
 from functools import cmp_to_key
 
+from django.core.cache import cache
 from django.core.exceptions import ObjectDoesNotExist
+from django.db.models import Case, IntegerField, Sum, Value, When
 from django.utils import six
+from django.utils.six.moves import range
 from django.utils.encoding import force_text
 from django.utils.translation import ugettext as _
+from djblets.cache.backend import cache_memoize, make_cache_key
 from djblets.log import log_timed
 from djblets.siteconfig.models import SiteConfiguration
 from djblets.util.compat.python.past import cmp
@@ -21,7 +26,9 @@ from djblets.util.contextmanagers import controlled_subprocess
 
 from reviewboard.deprecation import RemovedInReviewBoard50Warning
 from reviewboard.diffviewer.commit_utils import exclude_ancestor_filediffs
-from reviewboard.diffviewer.errors import DiffTooBigError, PatchError
+from reviewboard.diffviewer.errors import (DiffTooBigError, PatchError,
+                                           UnsupportedPatchError)
+from reviewboard.diffviewer.patcher import apply_patch
 from reviewboard.scmtools.core import FileLookupContext, PRE_CREATION, HEAD
 
 
@@ -41,6 +48,18 @@ NEWLINE_UNICODE_RE = re.compile(r'(?:\n|\r(?:\r?\n)?)')
 
 _PATCH_GARBAGE_INPUT = 'patch: **** Only garbage was found in the patch input.'
 
+#: Apply patches in-process, falling back on patch(1) when needed.
+#:
+#: Version Added:
+#:     4.0.6
+PATCH_ENGINE_BUILTIN = 'builtin'
+
+#: Always apply patches by running patch(1).
+#:
+#: Version Added:
+#:     4.0.6
+PATCH_ENGINE_COMMAND = 'patch'
+
 
 def convert_to_unicode(s, encoding_list):
     """Return the passed string as a unicode object.
@@ -207,11 +226,20 @@ def split_line_endings(data):
     return lines
 
 
-def patch(diff, orig_file, filename, request=None):
+def patch(diff, orig_file, filename, request=None, engine=None):
     """Apply a diff to a file.
 
-    This delegates out to ``patch`` because noone except Larry Wall knows how
-    to patch.
+    By default, this applies the diff in-process, which avoids the cost of
+    writing temporary files and spawning ``patch`` for every file. Diffs that
+    the in-process engine can't handle are delegated out to ``patch``,
+    because noone except Larry Wall knows how to patch.
+
+    The engine can be chosen through the ``diffviewer_patch_engine`` site
+    configuration setting.
+
+    Version Changed:
+        4.0.6:
+        Added the ``engine`` argument, and the in-process patch engine.
 
     Args:
         diff (bytes):
@@ -226,6 +254,12 @@ def patch(diff, orig_file, filename, request=None):
         request (django.http.HttpRequest, optional):
             The HTTP request, for use in logging.
 
+        engine (unicode, optional):
+            The patch engine to use. This is one of
+            :py:data:`PATCH_ENGINE_BUILTIN` or
+            :py:data:`PATCH_ENGINE_COMMAND`. If not provided, the site
+            configuration will be consulted.
+
     Returns:
         bytes:
         The contents of the patched file.
@@ -240,13 +274,59 @@ def patch(diff, orig_file, filename, request=None):
         # Someone uploaded an unchanged file. Return the one we're patching.
         return orig_file
 
-    # Prepare the temporary directory if none is available
-    tempdir = tempfile.mkdtemp(prefix='reviewboard.')
+    if engine is None:
+        siteconfig = SiteConfiguration.objects.get_current()
+        engine = siteconfig.get('diffviewer_patch_engine',
+                                PATCH_ENGINE_BUILTIN)
 
     try:
         orig_file = convert_line_endings(orig_file)
         diff = convert_line_endings(diff)
 
+        if engine == PATCH_ENGINE_BUILTIN:
+            try:
+                return apply_patch(diff=diff,
+                                   orig_file=orig_file,
+                                   filename=filename)
+            except UnsupportedPatchError as e:
+                logging.debug('Falling back on patch(1) for %s: %s',
+                              filename, e, request=request)
+
+        return _run_patch_command(diff=diff,
+                                  orig_file=orig_file,
+                                  filename=filename)
+    finally:
+        log_timer.done()
+
+
+def _run_patch_command(diff, orig_file, filename):
+    """Apply a diff to a file using the patch command.
+
+    Version Added:
+        4.0.6
+
+    Args:
+        diff (bytes):
+            The contents of the diff to apply, with normalized line endings.
+
+        orig_file (bytes):
+            The contents of the original file, with normalized line endings.
+
+        filename (unicode):
+            The name of the file being patched.
+
+    Returns:
+        bytes:
+        The contents of the patched file.
+
+    Raises:
+        reviewboard.diffutils.errors.PatchError:
+            An error occurred when trying to apply the patch.
+    """
+    # Prepare the temporary directory if none is available
+    tempdir = tempfile.mkdtemp(prefix='reviewboard.')
+
+    try:
         (fd, oldfile) = tempfile.mkstemp(dir=tempdir)
         f = os.fdopen(fd, 'w+b')
         f.write(orig_file)
@@ -299,7 +379,67 @@ def patch(diff, orig_file, filename, request=None):
         return new_file
     finally:
         shutil.rmtree(tempdir)
-        log_timer.done()
+
+
+def _get_original_file_lookup(filediff, request=None):
+    """Return how to look up a FileDiff's original file in the repository.
+
+    Version Added:
+        4.0.6
+
+    Args:
+        filediff (reviewboard.diffviewer.models.filediff.FileDiff):
+            The FileDiff to look up the original file for.
+
+        request (django.http.HttpRequest, optional):
+            The HTTP request from the client.
+
+    Returns:
+        tuple:
+        A 3-tuple of the path and revision of the file in the repository, and
+        the :py:class:`~reviewboard.scmtools.core.FileLookupContext` used to
+        look it up. The context is ``None`` if the revision is
+        :py:data:`~reviewboard.scmtools.core.PRE_CREATION`.
+    """
+    extra_data = filediff.extra_data or {}
+
+    # If the file has a parent source filename/revision recorded, we're
+    # going to need to fetch that, since that'll be (potentially) the
+    # latest commit in the repository.
+    #
+    # This information was added in Review Board 3.0.19. Prior versions
+    # stored the parent source revision as filediff.source_revision
+    # (rather than leaving that as identifying information for the actual
+    # file being shown in the review). It did not store the parent
+    # filename at all (which impacted diffs that contained a moved/renamed
+    # file on any type of repository that required a filename for lookup,
+    # such as Mercurial -- Git was not affected, since it only needs
+    # blob SHAs).
+    #
+    # If we're not working with a parent diff, or this is a FileDiff
+    # with legacy parent diff information, we just use the FileDiff
+    # FileDiff filename/revision fields as normal.
+    source_filename = extra_data.get('parent_source_filename',
+                                     filediff.source_file)
+    source_revision = extra_data.get('parent_source_revision',
+                                     filediff.source_revision)
+
+    if source_revision == PRE_CREATION:
+        return source_filename, source_revision, None
+
+    if filediff.commit_id is not None:
+        commit_extra_data = filediff.commit.extra_data
+    else:
+        commit_extra_data = {}
+
+    context = FileLookupContext(
+        request=request,
+        base_commit_id=filediff.diffset.base_commit_id,
+        diff_extra_data=filediff.diffset.extra_data,
+        commit_extra_data=commit_extra_data,
+        file_extra_data=extra_data)
+
+    return source_filename, source_revision, context
 
 
 def get_original_file_from_repo(filediff, request=None, encoding_list=None):
@@ -344,44 +484,11 @@ def get_original_file_from_repo(filediff, request=None, encoding_list=None):
             An error occurred while computing the pre-patch file.
     """
     data = b''
-    extra_data = filediff.extra_data or {}
-
-    # If the file has a parent source filename/revision recorded, we're
-    # going to need to fetch that, since that'll be (potentially) the
-    # latest commit in the repository.
-    #
-    # This information was added in Review Board 3.0.19. Prior versions
-    # stored the parent source revision as filediff.source_revision
-    # (rather than leaving that as identifying information for the actual
-    # file being shown in the review). It did not store the parent
-    # filename at all (which impacted diffs that contained a moved/renamed
-    # file on any type of repository that required a filename for lookup,
-    # such as Mercurial -- Git was not affected, since it only needs
-    # blob SHAs).
-    #
-    # If we're not working with a parent diff, or this is a FileDiff
-    # with legacy parent diff information, we just use the FileDiff
-    # FileDiff filename/revision fields as normal.
-    source_filename = extra_data.get('parent_source_filename',
-                                     filediff.source_file)
-    source_revision = extra_data.get('parent_source_revision',
-                                     filediff.source_revision)
+    source_filename, source_revision, context = \
+        _get_original_file_lookup(filediff, request)
 
     if source_revision != PRE_CREATION:
         repository = filediff.get_repository()
-
-        if filediff.commit_id is not None:
-            commit_extra_data = filediff.commit.extra_data
-        else:
-            commit_extra_data = {}
-
-        context = FileLookupContext(
-            request=request,
-            base_commit_id=filediff.diffset.base_commit_id,
-            diff_extra_data=filediff.diffset.extra_data,
-            commit_extra_data=commit_extra_data,
-            file_extra_data=extra_data)
-
         data = repository.get_file(path=source_filename,
                                    revision=source_revision,
                                    context=context)
@@ -487,30 +594,46 @@ def get_original_file(filediff, request=None, encoding_list=None):
     ancestors = filediff.get_ancestors(minimal=True)
 
     if ancestors:
-        oldest_ancestor = ancestors[0]
-
-        # If the file was created outside this history, fetch it from the
-        # repository and apply the parent diff if it exists.
-        if not oldest_ancestor.is_new:
-            data = get_original_file_from_repo(filediff=oldest_ancestor,
-                                               request=request,
-                                               encoding_list=encoding_list)
-
-        if not oldest_ancestor.is_diff_empty:
-            data = patch(diff=oldest_ancestor.diff,
-                         orig_file=data,
-                         filename=oldest_ancestor.source_file,
-                         request=request)
+        # Each FileDiff's original file is the result of applying the
+        # previous ancestor's diff to that ancestor's original file. We
+        # cache each of these intermediate results, so we only need to
+        # replay the ancestors following the newest cached one.
+        #
+        # Custom encoding lists can change the result, so we won't use the
+        # cache in that case.
+        chain = ancestors + [filediff]
+        data = None
+        start = 0
+
+        if not encoding_list:
+            start, data = _get_newest_cached_original_file(chain)
+
+            if start == len(ancestors):
+                return data
+
+        if data is None:
+            oldest_ancestor = ancestors[0]
+            data = b''
+
+            # If the file was created outside this history, fetch it from the
+            # repository and apply the parent diff if it exists.
+            if not oldest_ancestor.is_new:
+                data = get_original_file_from_repo(
+                    filediff=oldest_ancestor,
+                    request=request,
+                    encoding_list=encoding_list)
+
+        for i in range(start, len(ancestors)):
+            ancestor = ancestors[i]
+
+            if i > 0 or not ancestor.is_diff_empty:
+                data = patch(diff=ancestor.diff,
+                             orig_file=data,
+                             filename=ancestor.source_file,
+                             request=request)
 
-        for ancestor in ancestors[1:]:
-            # TODO: Cache these results so that if this ``filediff`` is an
-            # ancestor of another FileDiff, computing that FileDiff's original
-            # file will be cheaper. This will also allow an ancestor filediff's
-            # original file to be computed cheaper.
-            data = patch(diff=ancestor.diff,
-                         orig_file=data,
-                         filename=ancestor.source_file,
-                         request=request)
+            if not encoding_list:
+                _cache_original_file(chain, i + 1, data)
     elif not filediff.is_new:
         data = get_original_file_from_repo(filediff=filediff,
                                            request=request,
@@ -519,6 +642,233 @@ def get_original_file(filediff, request=None, encoding_list=None):
     return data
 
 
+def _make_original_file_cache_keys(filediff, sha256=None):
+    """Return cache keys for a FileDiff's computed original file.
+
+    Original files are stored keyed off of the SHA256 of the file's contents,
+    so that FileDiffs with identical original files share an entry. For
+    FileDiffs where the SHA256 isn't already known (see
+    :py:func:`_get_known_original_file_sha256`), a second key, keyed off of
+    the FileDiff ID, stores the SHA256 so that the content can be found
+    again.
+
+    Version Added:
+        4.0.6
+
+    Args:
+        filediff (reviewboard.diffviewer.models.filediff.FileDiff):
+            The FileDiff the original file is for.
+
+        sha256 (unicode, optional):
+            The SHA256 of the original file, if known.
+
+    Returns:
+        tuple:
+        A 2-tuple containing the cache key for the SHA256, and the cache key
+        for the file contents (or ``None``, if ``sha256`` was not provided).
+    """
+    sha256_key = 'diffviewer-original-file-sha256:%s' % filediff.pk
+
+    if sha256:
+        data_key = 'diffviewer-original-file:%s' % sha256
+    else:
+        data_key = None
+
+    return sha256_key, data_key
+
+
+def _get_known_original_file_sha256(filediffs, index):
+    """Return the stored SHA256 of a FileDiff's original file, if any.
+
+    The oldest FileDiff in a chain records the SHA256 of its original file
+    in :py:attr:`FileDiff.orig_sha256
+    <reviewboard.diffviewer.models.filediff.FileDiff.orig_sha256>` once it's
+    been viewed.
+
+    For later FileDiffs, ``orig_sha256`` records the old side of the diff as
+    it was displayed, which is the original file of the first ancestor
+    rather than of the FileDiff itself. Their original file is the patched
+    file of the previous FileDiff in the chain, so that FileDiff's
+    :py:attr:`~reviewboard.diffviewer.models.filediff.FileDiff.
+    patched_sha256` is used instead.
+
+    Version Added:
+        4.0.6
+
+    Args:
+        filediffs (list of reviewboard.diffviewer.models.filediff.FileDiff):
+            The chain of FileDiffs, from oldest to newest.
+
+        index (int):
+            The index of the FileDiff in ``filediffs``.
+
+    Returns:
+        unicode:
+        The SHA256 of the original file, or ``None`` if it isn't known.
+    """
+    if index == 0:
+        return filediffs[0].orig_sha256
+    else:
+        return filediffs[index - 1].patched_sha256
+
+
+def _get_newest_cached_original_file(filediffs):
+    """Return the newest cached original file in a chain of FileDiffs.
+
+    Cached contents are verified against the SHA256 they were stored under
+    before they're returned.
+
+    Version Added:
+        4.0.6
+
+    Args:
+        filediffs (list of reviewboard.diffviewer.models.filediff.FileDiff):
+            The FileDiffs to check, from oldest to newest.
+
+    Returns:
+        tuple:
+        A 2-tuple containing the index of the FileDiff with a cached original
+        file and the file contents. If there's no cached file, this will be
+        ``(0, None)``.
+    """
+    sha256s = [
+        _get_known_original_file_sha256(filediffs, i)
+        for i in range(len(filediffs))
+    ]
+    sha256_keys = {
+        i: make_cache_key(_make_original_file_cache_keys(filediffs[i])[0])
+        for i, sha256 in enumerate(sha256s)
+        if not sha256
+    }
+
+    if sha256_keys:
+        cached_sha256s = cache.get_many(list(six.itervalues(sha256_keys)))
+
+        for i, sha256_key in six.iteritems(sha256_keys):
+            sha256s[i] = cached_sha256s.get(sha256_key)
+
+    for i in range(len(filediffs) - 1, -1, -1):
+        sha256 = sha256s[i]
+
+        if not sha256:
+            continue
+
+        data_key = _make_original_file_cache_keys(filediffs[i], sha256)[1]
+
+        try:
+            data = cache_memoize(data_key, _raise_cache_miss,
+                                 large_data=True)[0]
+        except _CacheMiss:
+            continue
+
+        if hashlib.sha256(data).hexdigest() == sha256:
+            return i, data
+
+    return 0, None
+
+
+def _cache_original_file(filediffs, index, data):
+    """Cache the computed original file for a FileDiff.
+
+    Version Added:
+        4.0.6
+
+    Args:
+        filediffs (list of reviewboard.diffviewer.models.filediff.FileDiff):
+            The chain of FileDiffs, from oldest to newest.
+
+        index (int):
+            The index of the FileDiff the original file is for.
+
+        data (bytes):
+            The contents of the original file.
+    """
+    filediff = filediffs[index]
+    sha256 = force_text(hashlib.sha256(data).hexdigest())
+    sha256_key, data_key = _make_original_file_cache_keys(filediff, sha256)
+
+    cache_memoize(data_key, lambda: [data], large_data=True,
+                  force_overwrite=True)
+
+    if _get_known_original_file_sha256(filediffs, index) != sha256:
+        cache.set(make_cache_key(sha256_key), sha256)
+
+
+class _CacheMiss(Exception):
+    """An internal exception signaling that a value was not in cache."""
+
+
+def _raise_cache_miss():
+    """Raise a cache miss.
+
+    This is used as a lookup callable for
+    :py:func:`~djblets.cache.backend.cache_memoize` when only checking for an
+    existing value.
+
+    Raises:
+        _CacheMiss:
+            Always raised.
+    """
+    raise _CacheMiss()
+
+
+def prefetch_original_files(filediffs, request=None):
+    """Fetch the repository files needed for FileDiffs' original files.
+
+    This collects the file that :py:func:`get_original_file` will need to
+    fetch from the repository for each FileDiff, and fetches them together
+    using :py:meth:`Repository.prefetch_files
+    <reviewboard.scmtools.models.Repository.prefetch_files>`. The files are
+    stored in the cache, ready for when the original files are computed.
+
+    Version Added:
+        4.0.6
+
+    Args:
+        filediffs (list of reviewboard.diffviewer.models.filediff.FileDiff):
+            The FileDiffs whose original files will be needed.
+
+        request (django.http.HttpRequest, optional):
+            The HTTP request from the client.
+
+    Returns:
+        int:
+        The number of files fetched from repositories.
+    """
+    repositories = {}
+    files_by_repository = {}
+
+    for filediff in filediffs:
+        lookup_filediff = filediff
+
+        # This mirrors get_original_file(), which fetches the oldest
+        # ancestor's original file for FileDiffs in a commit series.
+        if not filediff.parent_diff:
+            ancestors = filediff.get_ancestors(minimal=True)
+
+            if ancestors:
+                lookup_filediff = ancestors[0]
+
+                if lookup_filediff.is_new:
+                    continue
+
+        source_filename, source_revision, context = \
+            _get_original_file_lookup(lookup_filediff, request)
+
+        if source_revision == PRE_CREATION:
+            continue
+
+        repository = lookup_filediff.get_repository()
+        repositories[repository.pk] = repository
+        files_by_repository.setdefault(repository.pk, []).append(
+            (source_filename, source_revision, context))
+
+    return sum(
+        repositories[repository_id].prefetch_files(files, request=request)
+        for repository_id, files in six.iteritems(files_by_repository)
+    )
+
+
 def get_patched_file(source_data, filediff, request=None):
     """Return the patched version of a file.
 
@@ -1246,14 +1596,21 @@ def populate_diff_chunks(files, enable_syntax_highlighting=True,
     """
     from reviewboard.diffviewer.chunk_generator import get_diff_chunk_generator
 
-    for diff_file in files:
-        generator = get_diff_chunk_generator(
+    generators = [
+        get_diff_chunk_generator(
             request,
             diff_file['filediff'],
             diff_file['interfilediff'],
             diff_file['force_interdiff'],
             enable_syntax_highlighting,
             base_filediff=diff_file.get('base_filediff'))
+        for diff_file in files
+    ]
+
+    if len(generators) > 1:
+        _prefetch_chunk_generator_files(generators, request)
+
+    for diff_file, generator in zip(files, generators):
         chunks = list(generator.get_chunks())
 
         diff_file.update({
@@ -1279,6 +1636,53 @@ def populate_diff_chunks(files, enable_syntax_highlighting=True,
         })
 
 
+def _prefetch_chunk_generator_files(generators, request=None):
+    """Prefetch repository files for chunk generators without cached chunks.
+
+    Rather than having each chunk generator fetch its files from the
+    repository one at a time, this fetches all the files needed by any
+    generator whose chunks aren't already cached in one go.
+
+    Errors are logged and otherwise ignored, since the chunk generators will
+    fetch the files themselves (and report any errors) if needed.
+
+    Version Added:
+        4.0.6
+
+    Args:
+        generators (list of
+                    reviewboard.diffviewer.chunk_generator.DiffChunkGenerator):
+            The chunk generators that are about to be used.
+
+        request (django.http.HttpRequest, optional):
+            The HTTP request from the client.
+    """
+    cache_keys = [
+        make_cache_key(generator.make_cache_key())
+        for generator in generators
+    ]
+    cached_keys = cache.get_many(cache_keys)
+    filediffs = []
+
+    for generator, cache_key in zip(generators, cache_keys):
+        filediff = generator.filediff
+
+        if (cache_key not in cached_keys and
+            not filediff.binary and
+            filediff.source_revision != ''):
+            filediffs.append(filediff)
+
+            if generator.interfilediff is not None:
+                filediffs.append(generator.interfilediff)
+
+    if filediffs:
+        try:
+            prefetch_original_files(filediffs, request=request)
+        except Exception as e:
+            logging.exception('Unable to prefetch files for diff: %s', e,
+                              request=request)
+
+
 def get_file_from_filediff(context, filediff, interfilediff):
     """Return the files that corresponds to the filediff/interfilediff.
 
@@ -2035,22 +2439,42 @@ def get_total_line_counts(files_qs):
         :py:class:`FileDiffs
         <reviewboard.diffviewer.models.filediff.FileDiff>`.
     """
+    line_count_fields = files_qs.model.LINE_COUNT_FIELDS
+
+    # Sum up the stored line counts in the database, counting any FileDiffs
+    # that don't yet have line counts stored so that they can be computed
+    # below.
+    aggregates = {
+        'sum_%s' % field_name: Sum(field_name)
+        for field_name in line_count_fields
+    }
+    aggregates['num_missing'] = Sum(Case(
+        When(raw_insert_count__isnull=True, then=Value(1)),
+        default=Value(0),
+        output_field=IntegerField()))
+
+    results = files_qs.order_by().aggregate(**aggregates)
+
     counts = {
-        'raw_insert_count': 0,
-        'raw_delete_count': 0,
-        'insert_count': 0,
-        'delete_count': 0,
-        'replace_count': None,
-        'equal_count': None,
-        'total_line_count': None,
+        field_name: results['sum_%s' % field_name]
+        for field_name in line_count_fields
     }
 
-    for filediff in files_qs:
-        for key, value in six.iteritems(filediff.get_line_counts()):
-            if value is not None:
-                if counts[key] is None:
-                    counts[key] = value
-                else:
-                    counts[key] += value
+    for key in ('raw_insert_count', 'raw_delete_count', 'insert_count',
+                'delete_count'):
+        if counts[key] is None:
+            counts[key] = 0
+
+    if results['num_missing']:
+        # Some FileDiffs predate stored line counts and haven't been
+        # backfilled. Compute those individually. This will store the counts
+        # on the FileDiffs for next time.
+        for filediff in files_qs.filter(raw_insert_count__isnull=True):
+            for key, value in six.iteritems(filediff.get_line_counts()):
+                if value is not None:
+                    if counts[key] is None:
+                        counts[key] = value
+                    else:
+                        counts[key] += value
 
     return counts
@@ -85,3 +85,16 @@ class PatchError(UserVisibleError):
 
         super(PatchError, self).__init__(
             _('The patch to "%s" did not apply cleanly.') % filename)
+
+
+class UnsupportedPatchError(Exception):
+    """A diff could not be applied by the in-process patch engine.
+
+    This is raised when a diff uses a format or feature that the in-process
+    engine doesn't understand, or when the diff doesn't apply exactly
+    (needing an offset or fuzz, or failing to apply). Callers should fall
+    back on :command:`patch`.
+
+    Version Added:
+        4.0.6
+    """
@@ -16,4 +16,6 @@ SEQUENCE = [
     'raw_diff_file_data',
     'diffcommit_relations',
     'delete_file_count_fields',
+    'filediff_line_counts',
+    'fileuntouchedcomment_lookup_hash',
 ]
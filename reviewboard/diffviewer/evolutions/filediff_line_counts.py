@@ -0,0 +1,15 @@
+from __future__ import unicode_literals
+
+from django_evolution.mutations import AddField
+from django.db import models
+
+
+MUTATIONS = [
+    AddField('FileDiff', 'raw_insert_count', models.IntegerField, null=True),
+    AddField('FileDiff', 'raw_delete_count', models.IntegerField, null=True),
+    AddField('FileDiff', 'insert_count', models.IntegerField, null=True),
+    AddField('FileDiff', 'delete_count', models.IntegerField, null=True),
+    AddField('FileDiff', 'replace_count', models.IntegerField, null=True),
+    AddField('FileDiff', 'equal_count', models.IntegerField, null=True),
+    AddField('FileDiff', 'total_line_count', models.IntegerField, null=True),
+]
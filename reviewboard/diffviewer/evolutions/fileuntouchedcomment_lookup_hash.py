@@ -0,0 +1,50 @@
+from __future__ import unicode_literals
+
+import hashlib
+
+from django_evolution.mutations import AddField, SQLMutation
+from django.db import models
+from django.utils.encoding import force_bytes
+
+
+def _populate_lookup_hashes(cursor):
+    """Return SQL to store lookup hashes for existing files.
+
+    The hashes are computed here rather than in SQL, since databases don't
+    agree on how to compute a SHA1. They must match
+    :py:meth:`FileUntouchedComment.make_lookup_hash()
+    <reviewboard.diffviewer.models.untouchedcommentfile.FileUntouchedComment.
+    make_lookup_hash>`.
+
+    Args:
+        cursor (django.db.backends.utils.CursorWrapper):
+            The database cursor.
+
+    Returns:
+        list of tuple:
+        The SQL statements and parameters to execute.
+    """
+    cursor.execute('SELECT id, untouched_file_path, untouched_file_hashcode'
+                   '  FROM fileviewer_untouchedcomment')
+
+    sql = []
+
+    for pk, path, hashcode in cursor.fetchall():
+        lookup_hash = hashlib.sha1(
+            b'%s\0%s' % (force_bytes(path), force_bytes(hashcode))
+        ).hexdigest()
+
+        sql.append(('UPDATE fileviewer_untouchedcomment'
+                    '   SET lookup_hash = %s'
+                    ' WHERE id = %s',
+                    (lookup_hash, pk)))
+
+    return sql
+
+
+MUTATIONS = [
+    AddField('FileUntouchedComment', 'lookup_hash', models.CharField,
+             initial='', max_length=40, db_index=True),
+    SQLMutation('populate_fileuntouchedcomment_lookup_hash',
+                [_populate_lookup_hashes]),
+]
@@ -3,9 +3,12 @@
 from __future__ import unicode_literals
 
 import os
+import threading
 from copy import deepcopy
 from functools import cmp_to_key
+from multiprocessing.pool import ThreadPool
 
+from django.db import connections
 from django.utils.encoding import force_bytes, force_text
 from django.utils.translation import ugettext as _
 from djblets.util.compat.python.past import cmp
@@ -29,6 +32,15 @@ _IMPL_EXTENSIONS = [
 ]
 
 
+# Semaphores capping the number of file existence checks running at once
+# for each repository, shared between all uploads in this process.
+_file_exists_semaphores = {}
+_file_exists_semaphores_lock = threading.Lock()
+
+# The result of a file existence check cancelled after another check failed.
+_CANCELLED = object()
+
+
 def create_filediffs(diff_file_contents, parent_diff_file_contents,
                      repository, basedir, base_commit_id, diffset,
                      request=None, check_existence=True, get_file_exists=None,
@@ -465,6 +477,8 @@ def _process_files(parsed_diff, basedir, repository, base_commit_id,
     basedir = force_bytes(basedir)
 
     parsed_change = parsed_diff.changes[0]
+    files = []
+    checks = []
 
     for f in parsed_change.files:
         # This will either be a Revision or bytes. Either way, convert it
@@ -507,21 +521,161 @@ def _process_files(parsed_diff, basedir, repository, base_commit_id,
                 commit_extra_data=parsed_change.extra_data,
                 file_extra_data=f.extra_data)
 
-            if not get_file_exists(path=force_text(source_filename),
-                                   revision=force_text(source_revision),
-                                   context=context):
-                raise FileNotFoundError(path=force_text(source_filename),
-                                        revision=force_text(source_revision),
-                                        base_commit_id=base_commit_id,
-                                        context=context)
+            checks.append((force_text(source_filename),
+                           force_text(source_revision),
+                           context))
 
         f.orig_filename = source_filename
         f.orig_file_details = source_revision
         f.modified_filename = dest_filename
 
+        files.append(f)
+
+    if checks:
+        _check_files_exist(repository=repository,
+                           base_commit_id=base_commit_id,
+                           get_file_exists=get_file_exists,
+                           checks=checks)
+
+    for f in files:
         yield f
 
 
+def _check_files_exist(repository, base_commit_id, get_file_exists, checks):
+    """Check that files exist in a repository.
+
+    When there's more than one file to check, the checks are run
+    concurrently, so that uploading a diff against a remote repository
+    takes about as long as the slowest check, rather than the sum of all of
+    them. The number of checks running at once for a repository is capped
+    by :py:attr:`Repository.CHECK_FILE_EXISTS_MAX_WORKERS
+    <reviewboard.scmtools.models.Repository.CHECK_FILE_EXISTS_MAX_WORKERS>`.
+
+    As soon as one check fails, any checks that haven't yet started are
+    cancelled.
+
+    Version Added:
+        4.0.6
+
+    Args:
+        repository (reviewboard.scmtools.models.Repository):
+            The repository that the diff was created against.
+
+        base_commit_id (unicode):
+            The ID of the commit that the diff is based upon.
+
+        get_file_exists (callable):
+            A callable to use to determine if a given file exists in the
+            repository.
+
+        checks (list of tuple):
+            A list of ``(path, revision, context)`` tuples for each file to
+            check.
+
+    Raises:
+        reviewboard.scmtools.errors.FileNotFoundError:
+            One of the files was not found. If several files are missing,
+            this is raised for the first one found to be missing.
+
+        Exception:
+            Any error raised by ``get_file_exists``.
+    """
+    def _check_file_exists(check, close_connections=False):
+        path, revision, context = check
+
+        try:
+            with semaphore:
+                if cancelled.is_set():
+                    return _CANCELLED
+
+                result = get_file_exists(path=path,
+                                         revision=revision,
+                                         context=context)
+        except Exception as e:
+            result = e
+        finally:
+            if close_connections:
+                connections.close_all()
+
+        if not result or isinstance(result, Exception):
+            # The upload is going to fail. Stop any remaining checks.
+            cancelled.set()
+
+        return result
+
+    def _handle_result(check, result):
+        if result is _CANCELLED:
+            # Another check has failed, and its result will be handled.
+            return
+
+        if isinstance(result, Exception):
+            raise result
+
+        if not result:
+            path, revision, context = check
+
+            raise FileNotFoundError(path=path,
+                                    revision=revision,
+                                    base_commit_id=base_commit_id,
+                                    context=context)
+
+    max_workers = repository.CHECK_FILE_EXISTS_MAX_WORKERS
+    semaphore = _get_file_exists_semaphore(repository, max_workers)
+    cancelled = threading.Event()
+
+    if len(checks) == 1:
+        _handle_result(checks[0], _check_file_exists(checks[0]))
+        return
+
+    thread_pool = ThreadPool(min(max_workers, len(checks)))
+
+    try:
+        results = thread_pool.imap_unordered(
+            lambda i: (i, _check_file_exists(checks[i],
+                                             close_connections=True)),
+            range(len(checks)))
+
+        for i, result in results:
+            _handle_result(checks[i], result)
+    finally:
+        # Any checks not yet started will return without doing any work.
+        cancelled.set()
+        thread_pool.close()
+        thread_pool.join()
+
+
+def _get_file_exists_semaphore(repository, max_workers):
+    """Return the semaphore capping file existence checks for a repository.
+
+    Version Added:
+        4.0.6
+
+    Args:
+        repository (reviewboard.scmtools.models.Repository):
+            The repository being checked.
+
+        max_workers (int):
+            The maximum number of checks that can run at once.
+
+    Returns:
+        threading.BoundedSemaphore:
+        The semaphore for the repository.
+    """
+    if repository.pk is None:
+        return threading.BoundedSemaphore(max_workers)
+
+    key = (repository.pk, max_workers)
+
+    with _file_exists_semaphores_lock:
+        try:
+            semaphore = _file_exists_semaphores[key]
+        except KeyError:
+            semaphore = threading.BoundedSemaphore(max_workers)
+            _file_exists_semaphores[key] = semaphore
+
+    return semaphore
+
+
 def _compare_files(file1, file2):
     """Compare two files to determine a relative sort order.
 
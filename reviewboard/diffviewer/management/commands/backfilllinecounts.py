@@ -0,0 +1,104 @@
+"""Management command to store line counts on existing FileDiffs."""
+
+from __future__ import unicode_literals
+
+import sys
+
+from django.conf import settings
+from django.utils.translation import ugettext as _
+from djblets.util.compat.django.core.management.base import BaseCommand
+
+from reviewboard.diffviewer.models import FileDiff
+
+
+class Command(BaseCommand):
+    """Management command to store line counts on existing FileDiffs."""
+
+    help = _('Stores line counts on diffs uploaded before they were '
+             'tracked in the database, speeding up diff statistics')
+
+    def add_arguments(self, parser):
+        """Add arguments to the command.
+
+        Args:
+            parser (argparse.ArgumentParser):
+                The argument parser for the command.
+        """
+        parser.add_argument(
+            '--no-progress',
+            action='store_false',
+            dest='show_progress',
+            default=True,
+            help=_("Don't show progress information or totals while "
+                   "processing. You might want to use this if your database "
+                   "is taking too long to generate total counts."))
+        parser.add_argument(
+            '--max-diffs',
+            action='store',
+            dest='max_diffs',
+            type=int,
+            default=None,
+            help=_('The maximum number of diffs to process. This is useful '
+                   'if you have a lot of diffs to process and want to do it '
+                   'over several sessions.'))
+
+    def handle(self, **options):
+        """Handle the command.
+
+        Args:
+            **options (dict, unused):
+                Options parsed on the command line.
+        """
+        self.show_progress = options['show_progress']
+        self.total_count = None
+
+        if self.show_progress:
+            self.total_count = \
+                FileDiff.objects.filter(raw_insert_count__isnull=True).count()
+
+            if self.total_count == 0:
+                self.stdout.write(_('All diffs already have line counts.\n'))
+                return
+
+            self.stdout.write(_('Processing %(count)d diffs...\n')
+                              % {'count': self.total_count})
+        else:
+            self.stdout.write(_('Processing all diffs without line '
+                                'counts...\n'))
+
+        self.stdout.write(_(
+          '\n'
+          'This may take a while. It is safe to continue using '
+          'Review Board while this is\n'
+          'processing, but it may temporarily run slower.\n'
+          '\n'))
+
+        # Don't allow queries to be stored.
+        settings.DEBUG = False
+
+        total_processed = FileDiff.objects.backfill_line_counts(
+            batch_done_cb=self._on_batch_done,
+            max_diffs=options['max_diffs'])
+
+        self.stdout.write(_('\n\nStored line counts for %d diffs.\n')
+                          % total_processed)
+
+    def _on_batch_done(self, total_diffs_processed, **kwargs):
+        """Handler for when a batch of diffs are processed.
+
+        Args:
+            total_diffs_processed (int):
+                The total number of diffs processed so far.
+
+            **kwargs (dict, unused):
+                Unused keyword arguments.
+        """
+        if self.show_progress:
+            # NOTE: We use sys.stdout when writing instead of self.stdout in
+            #       order to control newlines.
+            total_count = max(total_diffs_processed, self.total_count)
+
+            sys.stdout.write('  [%d%%] %s/%s\r'
+                             % (total_diffs_processed * 100 // total_count,
+                                total_diffs_processed, total_count))
+            sys.stdout.flush()
@@ -0,0 +1,147 @@
+"""Management command to recompress stored diffs using a different codec."""
+
+from __future__ import unicode_literals, division
+
+import sys
+
+from django.conf import settings
+from django.contrib.humanize.templatetags.humanize import intcomma
+from django.core.management.base import CommandError
+from django.utils.translation import ugettext as _
+from djblets.util.compat.django.core.management.base import BaseCommand
+
+from reviewboard.diffviewer.compression import (
+    get_compression_codec,
+    get_compression_codecs,
+    get_default_compression_codec)
+from reviewboard.diffviewer.models import RawFileDiffData
+
+
+class Command(BaseCommand):
+    """Management command to recompress stored diffs in the database."""
+
+    help = _('Recompresses the diffs stored in the database using a '
+             'different compression codec, speeding up diff loading')
+
+    def add_arguments(self, parser):
+        """Add arguments to the command.
+
+        Args:
+            parser (argparse.ArgumentParser):
+                The argument parser for the command.
+        """
+        parser.add_argument(
+            '--compression',
+            action='store',
+            dest='compression',
+            default=None,
+            choices=sorted(
+                codec.compression_id
+                for codec in get_compression_codecs()
+            ),
+            help=_('The ID of the compression codec to use. This defaults '
+                   'to the codec used for newly-uploaded diffs.'))
+        parser.add_argument(
+            '--no-progress',
+            action='store_false',
+            dest='show_progress',
+            default=True,
+            help=_("Don't show progress information while recompressing."))
+        parser.add_argument(
+            '--max-diffs',
+            action='store',
+            dest='max_diffs',
+            type=int,
+            default=None,
+            help=_('The maximum number of diffs to recompress. This is '
+                   'useful if you have a lot of diffs to recompress and want '
+                   'to do it over several sessions.'))
+
+    def handle(self, **options):
+        """Handle the command.
+
+        Args:
+            **options (dict, unused):
+                Options parsed on the command line.
+
+        Raises:
+            django.core.management.CommandError:
+                The requested compression codec is not available.
+        """
+        self.show_progress = options['show_progress']
+        compression = options['compression']
+
+        if compression is None:
+            codec = get_default_compression_codec()
+        else:
+            codec = get_compression_codec(compression)
+
+            if codec is None or not codec.is_available():
+                raise CommandError(
+                    _('The "%s" compression codec is not available on this '
+                      'server.')
+                    % compression)
+
+        self.stdout.write(_('Recompressing stored diffs as %s...\n')
+                          % codec.name)
+        self.stdout.write(_(
+          '\n'
+          'This may take a while. It is safe to continue using '
+          'Review Board while this is\n'
+          'processing, but it may temporarily run slower.\n'
+          '\n'))
+
+        # Don't allow queries to be stored.
+        settings.DEBUG = False
+
+        info = RawFileDiffData.objects.recompress_all(
+            compression=codec.compression_id,
+            batch_done_cb=self._on_batch_done,
+            max_diffs=options['max_diffs'])
+
+        if info['diffs_processed'] == 0:
+            self.stdout.write(_('All diffs have already been recompressed.\n'))
+            return
+
+        old_diff_size = info['old_diff_size']
+        new_diff_size = info['new_diff_size']
+        old_decompress_secs = info['old_decompress_secs']
+        new_decompress_secs = info['new_decompress_secs']
+
+        self.stdout.write(
+            _('\n'
+              '\n'
+              'Recompressed %(count)d diffs from %(old_size)s bytes to '
+              '%(new_size)s bytes (%(saved)s bytes saved)\n')
+            % {
+                'count': info['diffs_processed'],
+                'old_size': intcomma(old_diff_size),
+                'new_size': intcomma(new_diff_size),
+                'saved': intcomma(info['bytes_saved']),
+            })
+        self.stdout.write(
+            _('Decompression time went from %(old_secs)0.3fs to '
+              '%(new_secs)0.3fs (%(speedup)0.2fx)\n')
+            % {
+                'old_secs': old_decompress_secs,
+                'new_secs': new_decompress_secs,
+                'speedup': (old_decompress_secs /
+                            max(new_decompress_secs, 1e-6)),
+            })
+
+    def _on_batch_done(self, total_diffs_processed, **kwargs):
+        """Handler for when a batch of diffs are processed.
+
+        Args:
+            total_diffs_processed (int):
+                The total number of diffs processed so far.
+
+            **kwargs (dict, unused):
+                Unused keyword arguments.
+        """
+        if self.show_progress:
+            # NOTE: We use sys.stdout when writing instead of self.stdout in
+            #       order to control newlines.
+            sys.stdout.write(' %s diffs recompressed\r'
+                             % total_diffs_processed)
+            sys.stdout.flush()
@@ -2,20 +2,25 @@
 
 from __future__ import unicode_literals
 
-import bz2
 import gc
 import hashlib
 import logging
+import time
 from functools import partial
 
 from django.conf import settings
+from django.core.cache import cache
 from django.db import models, reset_queries, connection, connections
 from django.db.models import Count, Q
 from django.db.utils import IntegrityError
 from django.utils.encoding import force_text
 from django.utils.translation import ugettext as _
+from djblets.cache.backend import make_cache_key
 
 from reviewboard.diffviewer.commit_utils import get_file_exists_in_history
+from reviewboard.diffviewer.compression import (
+    get_compression_codec,
+    get_default_compression_codec)
 from reviewboard.diffviewer.differ import DiffCompatVersion
 from reviewboard.diffviewer.diffutils import check_diff_size
 from reviewboard.diffviewer.filediff_creator import create_filediffs
@@ -248,6 +253,152 @@ class FileDiffManager(models.Manager):
             'bytes_saved': total_bytes_saved,
         }
 
+    def iter_with_diff_data(self, filediffs, batch_size=10):
+        """Iterate through FileDiffs, loading their diff data in batches.
+
+        The :py:class:`~reviewboard.diffviewer.models.raw_file_diff_data.
+        RawFileDiffData` for each FileDiff is fetched in batches, rather than
+        with one query per FileDiff or one query for all of them. Each batch
+        is released once its FileDiffs have been yielded, keeping memory
+        usage bounded when working with very large diffs.
+
+        FileDiffs that haven't been migrated to
+        :py:class:`~reviewboard.diffviewer.models.raw_file_diff_data.
+        RawFileDiffData` are yielded as-is, and will migrate when their
+        diffs are accessed.
+
+        Version Added:
+            4.0.6
+
+        Args:
+            filediffs (list of reviewboard.diffviewer.models.filediff.
+                       FileDiff):
+                The FileDiffs to iterate through.
+
+            batch_size (int, optional):
+                The number of diffs to fetch per query.
+
+        Yields:
+            reviewboard.diffviewer.models.filediff.FileDiff:
+            Each FileDiff, with its diff data loaded.
+        """
+        from reviewboard.diffviewer.models import RawFileDiffData
+
+        filediffs = list(filediffs)
+        diff_hash_cache_name = self.model.diff_hash.cache_name
+
+        for i in range(0, len(filediffs), batch_size):
+            batch = filediffs[i:i + batch_size]
+            diff_hash_ids = set(
+                filediff.diff_hash_id
+                for filediff in batch
+                if filediff.diff_hash_id is not None
+            )
+
+            if diff_hash_ids:
+                diff_hashes = RawFileDiffData.objects.in_bulk(diff_hash_ids)
+
+                for filediff in batch:
+                    diff_hash = diff_hashes.get(filediff.diff_hash_id)
+
+                    if diff_hash is not None:
+                        filediff.diff_hash = diff_hash
+
+                diff_hashes = None
+
+            for filediff in batch:
+                yield filediff
+
+                # Let the diff data be freed once the caller is done with it.
+                # It will be fetched again if accessed later.
+                try:
+                    delattr(filediff, diff_hash_cache_name)
+                except AttributeError:
+                    pass
+
+    def backfill_line_counts(self, batch_done_cb=None, batch_size=40,
+                             max_diffs=None):
+        """Store line counts on FileDiffs that don't yet have them.
+
+        FileDiffs created prior to Review Board 4.0.6 only store their line
+        counts in ``extra_data``, and may not have line counts computed at
+        all. This will compute and store the line counts on each of these,
+        so that totals can be computed in the database.
+
+        This is safe to run while Review Board is in use.
+
+        Version Added:
+            4.0.6
+
+        Args:
+            batch_done_cb (callable, optional):
+                A function to call after each batch of objects has been
+                processed. This can be used for progress notification.
+
+                This should be in the form of:
+
+                .. code-block:: python
+
+                   def on_batch_done(total_diffs_processed=None, **kwargs):
+                       ...
+
+            batch_size (int, optional):
+                The number of objects to process in each batch.
+
+            max_diffs (int, optional):
+                The maximum number of FileDiffs to process.
+
+        Returns:
+            int:
+            The number of FileDiffs processed.
+        """
+        assert batch_done_cb is None or callable(batch_done_cb)
+
+        queryset = (
+            self.filter(raw_insert_count__isnull=True)
+            .select_related('diff_hash')
+            .order_by('pk')
+        )
+
+        total_diffs_processed = 0
+        last_pk = None
+
+        while max_diffs is None or total_diffs_processed < max_diffs:
+            limit = batch_size
+
+            if max_diffs is not None:
+                limit = min(limit, max_diffs - total_diffs_processed)
+
+            # Page through by primary key, so that any FileDiffs whose line
+            # counts can't be computed aren't processed again.
+            if last_pk is None:
+                batch = list(queryset[:limit])
+            else:
+                batch = list(queryset.filter(pk__gt=last_pk)[:limit])
+
+            if not batch:
+                break
+
+            for filediff in batch:
+                try:
+                    filediff.get_line_counts()
+                except Exception as e:
+                    logging.exception('Unable to compute line counts for '
+                                      'FileDiff %s: %s',
+                                      filediff.pk, e)
+
+            total_diffs_processed += len(batch)
+            last_pk = batch[-1].pk
+
+            if batch_done_cb is not None:
+                batch_done_cb(total_diffs_processed=total_diffs_processed)
+
+            # Limit memory usage, as in _iter_batches().
+            reset_queries()
+            gc.collect()
+
+        return total_diffs_processed
+
     def _migrate_legacy_fdd(self, queryset, batch_size,
                             max_diffs=None):
         """Migrate data from LegacyFileDiffData to RawFileDiffData.
@@ -594,20 +745,217 @@ class RawFileDiffDataManager(models.Manager):
     This provides conveniences for creating an entry based on a
     LegacyFileDiffData object.
     """
-    def process_diff_data(self, data):
+
+    #: The minimum fraction of space compression must save to be used.
+    #:
+    #: Small diffs barely shrink when compressed, so they're stored raw to
+    #: avoid paying the decompression cost every time they're read.
+    #:
+    #: Version Added:
+    #:     4.0.6
+    #:
+    #: Type:
+    #:     float
+    MIN_COMPRESSION_SAVINGS = 0.2
+
+    def process_diff_data(self, data, compression=None):
         """Processes a diff, returning the resulting content and compression.
 
-        If the content would benefit from being compressed, this will
-        return the compressed content and the value for the compression
-        flag. Otherwise, it will return the raw content.
+        If the content would benefit from being compressed (saving at least
+        :py:attr:`MIN_COMPRESSION_SAVINGS` of its size), this will return
+        the compressed content and the value for the compression flag.
+        Otherwise, it will return the raw content.
+
+        Version Changed:
+            4.0.6:
+            Added the ``compression`` argument. By default, data is now
+            compressed using the codec configured in the
+            ``diffviewer_diff_compression`` site configuration setting,
+            rather than always using bzip2.
+
+        Args:
+            data (bytes):
+                The diff data to process.
+
+            compression (unicode, optional):
+                The ID of the compression codec to use. See
+                :py:mod:`reviewboard.diffviewer.compression`.
+
+        Returns:
+            tuple:
+            A 2-tuple containing the data to store and the value for the
+            compression flag.
+
+        Raises:
+            ValueError:
+                The requested compression codec is not registered or not
+                available.
         """
-        compressed_data = bz2.compress(data, 9)
+        if compression is None:
+            codec = get_default_compression_codec()
+        else:
+            codec = get_compression_codec(compression)
+
+            if codec is None or not codec.is_available():
+                raise ValueError('Compression codec "%s" is not available'
+                                 % compression)
 
-        if len(compressed_data) < len(data):
-            return compressed_data, self.model.COMPRESSION_BZIP2
+        compressed_data = codec.compress(data)
+
+        if (len(compressed_data) <=
+            len(data) * (1.0 - self.MIN_COMPRESSION_SAVINGS)):
+            return compressed_data, codec.compression_id
         else:
             return data, None
 
+    def recompress_all(self, compression=None, batch_done_cb=None,
+                       batch_size=40, max_diffs=None):
+        """Recompress stored diff data using a different codec.
+
+        This will go through all compressed diff data not already stored
+        using the target codec, recompressing each in batches. Entries are
+        only updated if they haven't been changed in the meantime, so it's
+        safe to run this while Review Board is in use.
+
+        Version Added:
+            4.0.6
+
+        Args:
+            compression (unicode, optional):
+                The ID of the compression codec to use. This defaults to the
+                codec for newly-stored diffs.
+
+            batch_done_cb (callable, optional):
+                A function to call after each batch of objects has been
+                processed. This can be used for progress notification.
+
+                This should be in the form of:
+
+                .. code-block:: python
+
+                   def on_batch_done(total_diffs_processed=None, **kwargs):
+                       ...
+
+            batch_size (int, optional):
+                The number of objects to process in each batch.
+
+            max_diffs (int, optional):
+                The maximum number of diffs to process.
+
+        Returns:
+            dict:
+            A dictionary with the results of the process, containing the
+            following keys:
+
+            ``diffs_processed`` (:py:class:`int`):
+                The number of diffs processed.
+
+            ``old_diff_size`` (:py:class:`int`):
+                The total size of the processed diffs before recompression.
+
+            ``new_diff_size`` (:py:class:`int`):
+                The total size of the processed diffs after recompression.
+
+            ``bytes_saved`` (:py:class:`int`):
+                The total number of bytes saved.
+
+            ``old_decompress_secs`` (:py:class:`float`):
+                The time spent decompressing the diffs using their original
+                codecs.
+
+            ``new_decompress_secs`` (:py:class:`float`):
+                The time spent decompressing the diffs using the new codec.
+
+        Raises:
+            ValueError:
+                The requested compression codec is not registered or not
+                available.
+        """
+        assert batch_done_cb is None or callable(batch_done_cb)
+
+        if compression is None:
+            codec = get_default_compression_codec()
+        else:
+            codec = get_compression_codec(compression)
+
+            if codec is None or not codec.is_available():
+                raise ValueError('Compression codec "%s" is not available'
+                                 % compression)
+
+        queryset = (
+            self.filter(compression__isnull=False)
+            .exclude(compression=codec.compression_id)
+            .only('pk', 'binary', 'compression')
+            .order_by('pk')
+        )
+
+        total_diffs_processed = 0
+        old_diff_size = 0
+        new_diff_size = 0
+        old_decompress_secs = 0.0
+        new_decompress_secs = 0.0
+        last_pk = None
+
+        while max_diffs is None or total_diffs_processed < max_diffs:
+            limit = batch_size
+
+            if max_diffs is not None:
+                limit = min(limit, max_diffs - total_diffs_processed)
+
+            # Page through by primary key, rather than by offset, so that
+            # entries we've updated (or left alone) are never seen again.
+            if last_pk is None:
+                batch = list(queryset[:limit])
+            else:
+                batch = list(queryset.filter(pk__gt=last_pk)[:limit])
+
+            if not batch:
+                break
+
+            for raw_file_diff_data in batch:
+                old_binary = bytes(raw_file_diff_data.binary)
+                old_compression = raw_file_diff_data.compression
+
+                start = time.time()
+                data = raw_file_diff_data.content
+                old_decompress_secs += time.time() - start
+
+                new_binary, new_compression = self.process_diff_data(
+                    data,
+                    compression=codec.compression_id)
+
+                if new_compression is not None:
+                    start = time.time()
+                    codec.decompress(new_binary)
+                    new_decompress_secs += time.time() - start
+
+                old_diff_size += len(old_binary)
+                new_diff_size += len(new_binary)
+
+                self.filter(pk=raw_file_diff_data.pk,
+                            compression=old_compression).update(
+                    binary=new_binary,
+                    compression=new_compression)
+
+            total_diffs_processed += len(batch)
+            last_pk = batch[-1].pk
+
+            if batch_done_cb is not None:
+                batch_done_cb(total_diffs_processed=total_diffs_processed)
+
+            # Limit memory usage, as in _iter_batches().
+            reset_queries()
+            gc.collect()
+
+        return {
+            'diffs_processed': total_diffs_processed,
+            'old_diff_size': old_diff_size,
+            'new_diff_size': new_diff_size,
+            'bytes_saved': old_diff_size - new_diff_size,
+            'old_decompress_secs': old_decompress_secs,
+            'new_decompress_secs': new_decompress_secs,
+        }
+
     def get_or_create_from_data(self, data):
         """Return or create a new stored entry for diff data.
 
@@ -632,11 +980,18 @@ class RawFileDiffDataManager(models.Manager):
         binary_hash = self._hash_hexdigest(data)
         processed_data, compression = self.process_diff_data(data)
 
+        # Store the interdiff filter ranges up-front, so that they don't
+        # need to be re-parsed from the diff every time an interdiff is
+        # viewed.
         return self.get_or_create(
             binary_hash=binary_hash,
             defaults={
                 'binary': processed_data,
                 'compression': compression,
+                'extra_data': {
+                    'interdiff_filter_ranges':
+                        self.model.build_interdiff_filter_ranges_info(data),
+                },
             })
 
     def create_from_legacy(self, legacy, save=True):
@@ -1106,3 +1461,76 @@ class DiffSetManager(BaseDiffManager):
             repository=repository,
             diffcompat=DiffCompatVersion.DEFAULT,
             **kwargs)
+
+
+class FileUntouchedCommentManager(models.Manager):
+    """A manager for FileUntouchedComment objects.
+
+    This looks up files by their path and blob hash using the indexed
+    :py:attr:`~reviewboard.diffviewer.models.untouchedcommentfile.
+    FileUntouchedComment.lookup_hash` column, rather than comparing the
+    (long, unindexed) path and hash columns directly.
+
+    Lookups are cached, so that the code browser and the comment APIs can
+    resolve the same blob without going back to the database.
+
+    Version Added:
+        4.0.6
+    """
+
+    def get_for_file(self, path, hashcode):
+        """Return the file for a path and blob hash.
+
+        Args:
+            path (unicode):
+                The path of the file.
+
+            hashcode (unicode):
+                The hash of the file's blob.
+
+        Returns:
+            reviewboard.diffviewer.models.untouchedcommentfile.
+            FileUntouchedComment:
+            The file, or ``None`` if there are no comments on the file.
+        """
+        lookup_hash = self.model.make_lookup_hash(path, hashcode)
+        cache_key = make_cache_key(self.model.make_cache_key(lookup_hash))
+        untouched_file = cache.get(cache_key)
+
+        if untouched_file is None:
+            untouched_file = (
+                self.filter(lookup_hash=lookup_hash)
+                .order_by('pk')
+                .first()
+            )
+
+            # Blobs without any comments are cached as well, since they're
+            # the most common case in the code browser. Saving a new file
+            # replaces this, and deleting a file removes it.
+            cache.set(cache_key, untouched_file or False,
+                      self.model.cache_expiration)
+
+        return untouched_file or None
+
+    def get_or_create_for_file(self, path, hashcode):
+        """Return the file for a path and blob hash, creating it if needed.
+
+        Args:
+            path (unicode):
+                The path of the file.
+
+            hashcode (unicode):
+                The hash of the file's blob.
+
+        Returns:
+            reviewboard.diffviewer.models.untouchedcommentfile.
+            FileUntouchedComment:
+            The file.
+        """
+        untouched_file = self.get_for_file(path, hashcode)
+
+        if untouched_file is None:
+            untouched_file = self.create(untouched_file_path=path,
+                                         untouched_file_hashcode=hashcode)
+
+        return untouched_file
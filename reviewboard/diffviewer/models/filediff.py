@@ -45,6 +45,24 @@ class FileDiff(models.Model):
 
     _IS_PARENT_EMPTY_KEY = '__parent_diff_empty'
 
+    #: The names of the line counts stored on a FileDiff.
+    #:
+    #: Each of these is both a key in the results of
+    #: :py:meth:`get_line_counts` and a field on the model, allowing totals
+    #: to be computed in the database.
+    #:
+    #: Version Added:
+    #:     4.0.6
+    LINE_COUNT_FIELDS = (
+        'raw_insert_count',
+        'raw_delete_count',
+        'insert_count',
+        'delete_count',
+        'replace_count',
+        'equal_count',
+        'total_line_count',
+    )
+
     diffset = models.ForeignKey('DiffSet',
                                 related_name='files',
                                 verbose_name=_('diff set'))
@@ -99,6 +117,17 @@ class FileDiff(models.Model):
 
     extra_data = JSONField(null=True)
 
+    # Line counts, mirrored from extra_data so that they can be aggregated
+    # across a DiffSet or DiffCommit in the database. These are None until
+    # the counts are first stored, or until the FileDiff is backfilled.
+    raw_insert_count = models.IntegerField(_('raw insert count'), null=True)
+    raw_delete_count = models.IntegerField(_('raw delete count'), null=True)
+    insert_count = models.IntegerField(_('insert count'), null=True)
+    delete_count = models.IntegerField(_('delete count'), null=True)
+    replace_count = models.IntegerField(_('replace count'), null=True)
+    equal_count = models.IntegerField(_('equal count'), null=True)
+    total_line_count = models.IntegerField(_('total line count'), null=True)
+
     objects = FileDiffManager()
 
     @property
@@ -186,6 +215,45 @@ class FileDiff(models.Model):
 
     diff = property(_get_diff, _set_diff)
 
+    def iter_diff(self):
+        """Iterate through the diff content.
+
+        This decompresses the diff incrementally, so that very large diffs
+        don't need to be held in memory all at once.
+
+        Version Added:
+            4.0.6
+
+        Yields:
+            bytes:
+            Each chunk of the diff.
+        """
+        if self._needs_diff_migration():
+            self._migrate_diff_data()
+
+        for chunk in self.diff_hash.iter_content():
+            yield chunk
+
+    def get_interdiff_filter_ranges(self):
+        """Return the ranges of lines in the diff used to filter interdiffs.
+
+        These are stored along with the diff data, and shared between all
+        FileDiffs with the same diff content.
+
+        Version Added:
+            4.0.6
+
+        Returns:
+            list of tuple:
+            The list of ``(start, end)`` line ranges. See
+            :py:func:`~reviewboard.diffviewer.processors.
+            get_interdiff_filter_ranges` for details.
+        """
+        if self._needs_diff_migration():
+            self._migrate_diff_data()
+
+        return self.diff_hash.get_interdiff_filter_ranges()
+
     @property
     def is_diff_empty(self):
         """Whether or not the diff is empty."""
@@ -332,6 +400,8 @@ class FileDiff(models.Model):
             then ``insert_count`` and ``delete_count`` will be equal to the raw
             versions.
         """
+        update_fields = []
+
         if ('raw_insert_count' not in self.extra_data or
             'raw_delete_count' not in self.extra_data):
             if not self.diff_hash:
@@ -344,24 +414,15 @@ class FileDiff(models.Model):
                 'raw_insert_count': self.diff_hash.insert_count,
                 'raw_delete_count': self.diff_hash.delete_count,
             })
+            update_fields.append('extra_data')
 
-            if self.pk:
-                self.save(update_fields=['extra_data'])
+        line_counts = self._build_line_counts()
+        update_fields += self._update_line_count_fields(line_counts)
 
-        raw_insert_count = self.extra_data['raw_insert_count']
-        raw_delete_count = self.extra_data['raw_delete_count']
+        if update_fields and self.pk:
+            self.save(update_fields=update_fields)
 
-        return {
-            'raw_insert_count': raw_insert_count,
-            'raw_delete_count': raw_delete_count,
-            'insert_count': self.extra_data.get('insert_count',
-                                                raw_insert_count),
-            'delete_count': self.extra_data.get('delete_count',
-                                                raw_delete_count),
-            'replace_count': self.extra_data.get('replace_count'),
-            'equal_count': self.extra_data.get('equal_count'),
-            'total_line_count': self.extra_data.get('total_line_count'),
-        }
+        return line_counts
 
     def set_line_counts(self, raw_insert_count=None, raw_delete_count=None,
                         insert_count=None, delete_count=None,
@@ -459,8 +520,16 @@ class FileDiff(models.Model):
                 self.extra_data[key] = cur_value
                 updated = True
 
-        if updated and self.pk:
-            self.save(update_fields=['extra_data'])
+        if updated:
+            update_fields = ['extra_data']
+
+            if ('raw_insert_count' in self.extra_data and
+                'raw_delete_count' in self.extra_data):
+                update_fields += self._update_line_count_fields(
+                    self._build_line_counts())
+
+            if self.pk:
+                self.save(update_fields=update_fields)
 
     def get_ancestors(self, minimal, filediffs=None, update=True):
         """Return the ancestors of this FileDiff.
@@ -859,6 +928,58 @@ class FileDiff(models.Model):
 
         return diff_hash_is_new, parent_diff_hash_is_new
 
+    def _build_line_counts(self):
+        """Return the line counts stored in extra_data.
+
+        The raw insert and delete counts must already be stored.
+
+        Version Added:
+            4.0.6
+
+        Returns:
+            dict:
+            The line counts. See :py:meth:`get_line_counts` for details.
+        """
+        raw_insert_count = self.extra_data['raw_insert_count']
+        raw_delete_count = self.extra_data['raw_delete_count']
+
+        return {
+            'raw_insert_count': raw_insert_count,
+            'raw_delete_count': raw_delete_count,
+            'insert_count': self.extra_data.get('insert_count',
+                                                raw_insert_count),
+            'delete_count': self.extra_data.get('delete_count',
+                                                raw_delete_count),
+            'replace_count': self.extra_data.get('replace_count'),
+            'equal_count': self.extra_data.get('equal_count'),
+            'total_line_count': self.extra_data.get('total_line_count'),
+        }
+
+    def _update_line_count_fields(self, line_counts):
+        """Update the line count fields to match the given line counts.
+
+        Version Added:
+            4.0.6
+
+        Args:
+            line_counts (dict):
+                The line counts, as returned by :py:meth:`get_line_counts`.
+
+        Returns:
+            list of unicode:
+            The names of the fields that were changed.
+        """
+        changed_fields = []
+
+        for field_name in self.LINE_COUNT_FIELDS:
+            value = line_counts[field_name]
+
+            if getattr(self, field_name) != value:
+                setattr(self, field_name, value)
+                changed_fields.append(field_name)
+
+        return changed_fields
+
     def _recalculate_line_counts(self, diff_hash):
         """Recalculate line counts for the raw data.
 
@@ -2,13 +2,15 @@
 
 from __future__ import unicode_literals
 
-import bz2
 import logging
 
-from django.db import models
+from django.db import models, transaction
+from django.utils.six.moves import range
 from django.utils.translation import ugettext_lazy as _
 from djblets.db.fields import JSONField
 
+from reviewboard.diffviewer.compression import (DECOMPRESS_CHUNK_SIZE,
+                                                get_compression_codec)
 from reviewboard.diffviewer.errors import DiffParserError
 from reviewboard.diffviewer.managers import RawFileDiffDataManager
 
@@ -18,16 +20,35 @@ class RawFileDiffData(models.Model):
 
     This is the class used in Review Board 2.5+ to store diff content.
     Unlike in previous versions, the content is not base64-encoded. Instead,
-    it is stored either as bzip2-compressed data (if the resulting
-    compressed data is smaller than the raw data), or as the raw data itself.
+    it is stored either as compressed data (if compressing saves enough
+    space), or as the raw data itself.
+
+    Data can be compressed using any of the codecs in
+    :py:mod:`reviewboard.diffviewer.compression`. The codec used for new
+    diffs is controlled by the ``diffviewer_diff_compression`` site
+    configuration setting.
     """
 
     COMPRESSION_BZIP2 = 'B'
+    COMPRESSION_ZLIB = 'Z'
+    COMPRESSION_LZMA = 'L'
 
     COMPRESSION_CHOICES = (
         (COMPRESSION_BZIP2, _('BZip2-compressed')),
+        (COMPRESSION_ZLIB, _('zlib-compressed')),
+        (COMPRESSION_LZMA, _('LZMA-compressed')),
     )
 
+    #: The version of the stored interdiff filter ranges.
+    #:
+    #: This should be bumped whenever the logic in
+    #: :py:func:`~reviewboard.diffviewer.processors.
+    #: get_interdiff_filter_ranges` changes, invalidating stored ranges.
+    #:
+    #: Version Added:
+    #:     4.0.6
+    INTERDIFF_FILTER_RANGES_VERSION = 1
+
     binary_hash = models.CharField(_("hash"), max_length=40, unique=True)
     binary = models.BinaryField()
     compression = models.CharField(max_length=1, choices=COMPRESSION_CHOICES,
@@ -43,15 +64,58 @@ class RawFileDiffData(models.Model):
         The content will be uncompressed (if necessary) and returned as the
         raw set of bytes originally uploaded.
         """
-        if self.compression == self.COMPRESSION_BZIP2:
-            return bz2.decompress(self.binary)
-        elif self.compression is None:
+        if self.compression is None:
             return bytes(self.binary)
-        else:
+
+        codec = get_compression_codec(self.compression)
+
+        if codec is None:
+            raise NotImplementedError(
+                'Unsupported compression method %s for RawFileDiffData %s'
+                % (self.compression, self.pk))
+
+        return codec.decompress(self.binary)
+
+    def iter_content(self, chunk_size=DECOMPRESS_CHUNK_SIZE):
+        """Iterate through the uncompressed content of the diff.
+
+        Unlike :py:attr:`content`, this decompresses the content
+        incrementally, so that the full uncompressed diff never needs to be
+        held in memory at once.
+
+        Version Added:
+            4.0.6
+
+        Args:
+            chunk_size (int, optional):
+                The number of stored bytes to process at a time.
+
+        Yields:
+            bytes:
+            Each chunk of the uncompressed diff.
+
+        Raises:
+            NotImplementedError:
+                The compression method for the content isn't supported.
+        """
+        binary = self.binary
+
+        if self.compression is None:
+            for i in range(0, len(binary), chunk_size):
+                yield bytes(binary[i:i + chunk_size])
+
+            return
+
+        codec = get_compression_codec(self.compression)
+
+        if codec is None:
             raise NotImplementedError(
                 'Unsupported compression method %s for RawFileDiffData %s'
                 % (self.compression, self.pk))
 
+        for chunk in codec.iter_decompress(binary, chunk_size=chunk_size):
+            yield chunk
+
     @property
     def insert_count(self):
         return self.extra_data.get('insert_count')
@@ -68,6 +132,109 @@ class RawFileDiffData(models.Model):
     def delete_count(self, value):
         self.extra_data['delete_count'] = value
 
+    def get_interdiff_filter_ranges(self):
+        """Return the ranges of lines used to filter interdiffs.
+
+        These are normally computed when the diff is uploaded. If they're
+        missing or outdated, they'll be computed from the diff and merged
+        into the stored :py:attr:`extra_data`, without overwriting any
+        other keys that may have been written concurrently.
+
+        Version Added:
+            4.0.6
+
+        Returns:
+            list of tuple:
+            The list of ``(start, end)`` line ranges. See
+            :py:func:`~reviewboard.diffviewer.processors.
+            get_interdiff_filter_ranges` for details.
+        """
+        if self.extra_data is None:
+            self.extra_data = {}
+
+        info = self.extra_data.get('interdiff_filter_ranges')
+
+        if (not isinstance(info, dict) or
+            info.get('version') != self.INTERDIFF_FILTER_RANGES_VERSION):
+            logging.debug('Calculating interdiff filter ranges on '
+                          'RawFileDiffData %s',
+                          self.pk)
+
+            info = self.build_interdiff_filter_ranges_info(self.content)
+            self.extra_data['interdiff_filter_ranges'] = info
+
+            if self.pk:
+                self._store_extra_data_key('interdiff_filter_ranges', info)
+
+        return [
+            tuple(line_range)
+            for line_range in info['ranges']
+        ]
+
+    @classmethod
+    def build_interdiff_filter_ranges_info(cls, data):
+        """Build the stored interdiff filter range information for a diff.
+
+        Version Added:
+            4.0.6
+
+        Args:
+            data (bytes):
+                The uncompressed diff content.
+
+        Returns:
+            dict:
+            The information to store in :py:attr:`extra_data` under the
+            ``interdiff_filter_ranges`` key.
+        """
+        from reviewboard.diffviewer.processors import \
+            get_interdiff_filter_ranges
+
+        return {
+            'version': cls.INTERDIFF_FILTER_RANGES_VERSION,
+            'ranges': [
+                list(line_range)
+                for line_range in get_interdiff_filter_ranges(data)
+            ],
+        }
+
+    def _store_extra_data_key(self, key, value):
+        """Atomically store a single key in the saved extra_data.
+
+        The stored row is locked and re-read before the key is set, so that
+        values written to other keys by other processes aren't lost. The
+        in-memory :py:attr:`extra_data` is then refreshed from the stored
+        copy.
+
+        Version Added:
+            4.0.6
+
+        Args:
+            key (unicode):
+                The key in :py:attr:`extra_data` to set.
+
+            value (object):
+                The JSON-serializable value to store.
+        """
+        with transaction.atomic():
+            try:
+                stored = (
+                    RawFileDiffData.objects
+                    .select_for_update()
+                    .only('pk', 'extra_data')
+                    .get(pk=self.pk)
+                )
+            except RawFileDiffData.DoesNotExist:
+                return
+
+            if stored.extra_data is None:
+                stored.extra_data = {}
+
+            stored.extra_data[key] = value
+            stored.save(update_fields=['extra_data'])
+
+        self.extra_data.update(stored.extra_data)
+
     def recalculate_line_counts(self, tool):
         """Recalculates the insert_count and delete_count values.
 
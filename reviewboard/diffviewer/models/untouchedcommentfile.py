@@ -1,19 +1,133 @@
+from __future__ import unicode_literals
 
+import hashlib
+
+from django.core.cache import cache
 from django.db import models
+from django.utils.encoding import force_bytes
+from djblets.cache.backend import make_cache_key
+
+from reviewboard.diffviewer.managers import FileUntouchedCommentManager
 # from reviewboard.reviews.models import ReviewRequest
 # from django.utils.translation import ugettext_lazy as _
 
 class FileUntouchedComment(models.Model):
     untouched_file_path = models.CharField("path",max_length=1024,null=False,default="")
     untouched_file_hashcode = models.CharField("hashcode",max_length=512,null=False,default="")
+
+    #: A SHA1 hash of the path and blob hash, used to look up files.
+    #:
+    #: This is filled in for existing files when upgrading.
+    #:
+    #: Version Added:
+    #:     4.0.6
+    lookup_hash = models.CharField(max_length=40, db_index=True, default='')
+
     # 不是很确定 我先不管这个？
     # review_request_id  = models.PositiveIntegerField(max_length=100),
 
     # review_request_id=models.ForeignKey(ReviewRequest, verbose_name=_('reviewrequest untouchedcomment'),
     #                              related_name="reviewrequest untouchedcomment")
-                                
+
+    #: The number of seconds that lookups are cached for.
+    #:
+    #: Version Added:
+    #:     4.0.6
+    cache_expiration = 60 * 60 * 24
+
+    objects = FileUntouchedCommentManager()
+
+    @staticmethod
+    def make_lookup_hash(path, hashcode):
+        """Return the lookup hash for a path and blob hash.
+
+        Args:
+            path (unicode):
+                The path of the file.
+
+            hashcode (unicode):
+                The hash of the file's blob.
+
+        Returns:
+            unicode:
+            The lookup hash.
+        """
+        return hashlib.sha1(
+            b'%s\0%s' % (force_bytes(path), force_bytes(hashcode))
+        ).hexdigest()
+
+    @staticmethod
+    def make_cache_key(lookup_hash):
+        """Return the cache key for looking up a file.
+
+        Args:
+            lookup_hash (unicode):
+                The lookup hash for the file.
+
+        Returns:
+            unicode:
+            The cache key.
+        """
+        return 'untouched-file-%s' % lookup_hash
+
+    def save(self, *args, **kwargs):
+        """Save the file.
+
+        This will set the lookup hash from the path and blob hash, and
+        store the file in the lookup cache.
+
+        Args:
+            *args (tuple):
+                Positional arguments to pass to the parent method.
+
+            **kwargs (dict):
+                Keyword arguments to pass to the parent method.
+        """
+        old_lookup_hash = self.lookup_hash
+        self.lookup_hash = self.make_lookup_hash(self.untouched_file_path,
+                                                 self.untouched_file_hashcode)
+
+        super(FileUntouchedComment, self).save(*args, **kwargs)
+
+        if old_lookup_hash and old_lookup_hash != self.lookup_hash:
+            cache.delete(make_cache_key(self.make_cache_key(old_lookup_hash)))
+
+        cache.set(make_cache_key(self.make_cache_key(self.lookup_hash)), self,
+                  self.cache_expiration)
 
     class Meta:
         db_table = 'fileviewer_untouchedcomment'
         # verbose_name = _('File Untouchedcomment')
-        # verbose_name_plural = _('File Untouchedcomments')
\ No newline at end of file
+        # verbose_name_plural = _('File Untouchedcomments')
+
+
+def _on_file_untouched_comment_deleted(instance, **kwargs):
+    """Remove a deleted file from the lookup cache.
+
+    This is called for deletions of individual files and for bulk
+    deletions through querysets.
+
+    Version Added:
+        4.0.6
+
+    Args:
+        instance (FileUntouchedComment):
+            The file that was deleted.
+
+        **kwargs (dict):
+            Additional keyword arguments from the signal.
+    """
+    cache.delete(make_cache_key(
+        FileUntouchedComment.make_cache_key(instance.lookup_hash)))
+
+
+def connect_signals():
+    """Connect signal handlers for managing the file lookup cache.
+
+    Version Added:
+        4.0.6
+    """
+    from django.db.models.signals import post_delete
+
+    post_delete.connect(_on_file_untouched_comment_deleted,
+                        sender=FileUntouchedComment)
@@ -710,3 +710,542 @@ class MyersDiffer(Differ):
             result *= 2
 
         return result
+
+
+class FastMyersDiffer(MyersDiffer):
+    """A faster implementation of MyersDiffer.
+
+    This runs the same algorithm as :py:class:`MyersDiffer`, producing
+    identical opcodes for every
+    :py:class:`~reviewboard.diffviewer.differ.DiffCompatVersion`, but is
+    restructured for speed:
+
+    * Lines are interned into integer codes with a single table lookup.
+    * The hot loops work on local references to the code lists and diagonal
+      vectors, rather than looking up attributes on every step.
+    * The diagonal heuristics are inlined instead of going through
+      callbacks.
+    * The divide-and-conquer LCS runs from an explicit stack, rather than
+      recursing.
+    * Square root approximations, which are costly to compute, are
+      memoized.
+
+    Version Added:
+        4.0.6
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(FastMyersDiffer, self).__init__(*args, **kwargs)
+
+        self._sqrt_cache = {}
+
+    def _gen_diff_codes(self, lines, is_modified_file):
+        """Convert all lines of text into integer codes.
+
+        Args:
+            lines (list of unicode):
+                The lines to convert.
+
+            is_modified_file (bool):
+                Whether these are the lines of the modified file.
+
+        Returns:
+            list of int:
+            The code for each line.
+        """
+        code_table = self.code_table
+        interesting_line_table = self.interesting_line_table
+        interesting_line_regexes = self.interesting_line_regexes
+        interesting_lines = self.interesting_lines[int(is_modified_file)]
+        ignore_space = self.ignore_space
+        last_code = self.last_code
+        codes = []
+        append_code = codes.append
+
+        for linenum, raw_line in enumerate(lines):
+            line = raw_line
+
+            if ignore_space:
+                # We still want to show lines that contain only whitespace.
+                stripped_line = raw_line.lstrip()
+
+                if stripped_line:
+                    line = stripped_line
+
+            code = code_table.get(line)
+
+            if code is None:
+                # This is a new, unrecorded line, so mark it and store it.
+                last_code += 1
+                code = last_code
+                code_table[line] = code
+
+                # Check to see if this is an interesting line that the
+                # caller wants recorded.
+                if interesting_line_regexes and raw_line.lstrip():
+                    for name, regex in interesting_line_regexes:
+                        if regex.match(raw_line):
+                            interesting_line_table[code] = name
+                            break
+
+            if interesting_line_table:
+                interesting_line_name = interesting_line_table.get(code)
+
+                if interesting_line_name:
+                    interesting_lines[interesting_line_name].append(
+                        (linenum, raw_line))
+
+            append_code(code)
+
+        self.last_code = last_code
+
+        return codes
+
+    def _find_sms(self, a_lower, a_upper, b_lower, b_upper, find_minimal):
+        """Find the Shortest Middle Snake.
+
+        Args:
+            a_lower (int):
+                The lower bound of the range in the original lines.
+
+            a_upper (int):
+                The upper bound of the range in the original lines.
+
+            b_lower (int):
+                The lower bound of the range in the modified lines.
+
+            b_upper (int):
+                The upper bound of the range in the modified lines.
+
+            find_minimal (bool):
+                Whether to find the minimal diff, rather than use heuristics.
+
+        Returns:
+            tuple:
+            A 4-tuple of the split point in the original and modified lines,
+            and whether each half should be diffed minimally.
+        """
+        a_codes = self.a_data.undiscarded
+        b_codes = self.b_data.undiscarded
+        down_vector = self.fdiag
+        up_vector = self.bdiag
+        downoff = self.downoff
+        upoff = self.upoff
+        max_lines = self.max_lines
+        snake_limit = self.SNAKE_LIMIT
+
+        down_k = a_lower - b_lower
+        up_k = a_upper - b_upper
+        odd_delta = (down_k - up_k) % 2 != 0
+
+        down_vector[downoff + down_k] = a_lower
+        up_vector[upoff + up_k] = a_upper
+
+        dmin = a_lower - b_upper
+        dmax = a_upper - b_lower
+
+        down_min = down_max = down_k
+        up_min = up_max = up_k
+
+        cost = 0
+        max_cost = max(256, self._very_approx_sqrt(max_lines * 4))
+
+        while True:
+            cost += 1
+            big_snake = False
+
+            if down_min > dmin:
+                down_min -= 1
+                down_vector[downoff + down_min - 1] = -1
+            else:
+                down_min += 1
+
+            if down_max < dmax:
+                down_max += 1
+                down_vector[downoff + down_max + 1] = -1
+            else:
+                down_max -= 1
+
+            # Extend the forward path.
+            for i in range(downoff + down_max, downoff + down_min - 1, -2):
+                tlo = down_vector[i - 1]
+                thi = down_vector[i + 1]
+
+                if tlo >= thi:
+                    x = tlo + 1
+                else:
+                    x = thi
+
+                old_x = x
+                y = x - (i - downoff)
+
+                while (x < a_upper and y < b_upper and
+                       a_codes[x] == b_codes[y]):
+                    x += 1
+                    y += 1
+
+                if (odd_delta and up_min <= i - downoff <= up_max and
+                    up_vector[upoff + i - downoff] <= x):
+                    return x, y, True, True
+
+                if x - old_x > snake_limit:
+                    big_snake = True
+
+                down_vector[i] = x
+
+            # Extend the reverse path.
+            if up_min > dmin:
+                up_min -= 1
+                up_vector[upoff + up_min - 1] = max_lines
+            else:
+                up_min += 1
+
+            if up_max < dmax:
+                up_max += 1
+                up_vector[upoff + up_max + 1] = max_lines
+            else:
+                up_max -= 1
+
+            for i in range(upoff + up_max, upoff + up_min - 1, -2):
+                tlo = up_vector[i - 1]
+                thi = up_vector[i + 1]
+
+                if tlo < thi:
+                    x = tlo
+                else:
+                    x = thi - 1
+
+                old_x = x
+                y = x - (i - upoff)
+
+                while (x > a_lower and y > b_lower and
+                       a_codes[x - 1] == b_codes[y - 1]):
+                    x -= 1
+                    y -= 1
+
+                if (not odd_delta and down_min <= i - upoff <= down_max and
+                    x <= down_vector[downoff + i - upoff]):
+                    return x, y, True, True
+
+                if old_x - x > snake_limit:
+                    big_snake = True
+
+                up_vector[i] = x
+
+            if find_minimal:
+                continue
+
+            # These are the same heuristics as in MyersDiffer._find_sms()
+            # and MyersDiffer._find_diagonal(), inlined.
+            if cost > 200 and big_snake:
+                k = down_k
+
+                for d in range(down_max, down_min - 1, -2):
+                    dd = d - k
+                    x = down_vector[downoff + d]
+                    y = x - d
+                    v = (x - a_lower) * 2 + dd
+
+                    if (v > 12 * (cost + abs(dd)) and
+                        v > 0 and
+                        a_lower + snake_limit <= x < a_upper and
+                        b_lower + snake_limit <= y < b_upper):
+                        if a_codes[x - 1] == b_codes[y - 1]:
+                            return x, y, True, False
+
+                        k = 1
+
+                k = up_k
+
+                for d in range(up_max, up_min - 1, -2):
+                    dd = d - k
+                    x = up_vector[upoff + d]
+                    y = x - d
+                    v = (a_upper - x) * 2 + dd
+
+                    if (v > 12 * (cost + abs(dd)) and
+                        v > 0 and
+                        a_lower < x <= a_upper - snake_limit and
+                        b_lower < y <= b_upper - snake_limit):
+                        if a_codes[x] == b_codes[y]:
+                            return x, y, False, True
+
+                        k = 0
+
+            if (cost >= max_cost and
+                self.compat_version >= DiffCompatVersion.MYERS_SMS_COST_BAIL):
+                # We've reached or gone past the max cost. Just give up now
+                # and report the halfway point between our best results.
+                fx_best = bx_best = 0
+
+                # Find the forward diagonal that maximized x + y.
+                fxy_best = -1
+
+                for d in range(down_max, down_min - 1, -2):
+                    x = min(down_vector[downoff + d], a_upper)
+                    y = x - d
+
+                    if b_upper < y:
+                        x = b_upper + d
+                        y = b_upper
+
+                    if fxy_best < x + y:
+                        fxy_best = x + y
+                        fx_best = x
+
+                # Find the backward diagonal that minimizes x + y.
+                bxy_best = max_lines
+
+                for d in range(up_max, up_min - 1, -2):
+                    x = max(a_lower, up_vector[upoff + d])
+                    y = x - d
+
+                    if y < b_lower:
+                        x = b_lower + d
+                        y = b_lower
+
+                    if x + y < bxy_best:
+                        bxy_best = x + y
+                        bx_best = x
+
+                # Use the better of the two diagonals.
+                if (a_upper + b_upper - bxy_best <
+                    fxy_best - (a_lower + b_lower)):
+                    return fx_best, fxy_best - fx_best, True, False
+                else:
+                    return bx_best, bxy_best - bx_best, False, True
+
+    def _lcs(self, a_lower, a_upper, b_lower, b_upper, find_minimal):
+        """Compute the Longest Common Subsequence of a range of lines.
+
+        This works the same way as :py:meth:`MyersDiffer._lcs`, processing
+        ranges in the same order, but uses a stack of pending ranges instead
+        of recursion.
+
+        Args:
+            a_lower (int):
+                The lower bound of the range in the original lines.
+
+            a_upper (int):
+                The upper bound of the range in the original lines.
+
+            b_lower (int):
+                The lower bound of the range in the modified lines.
+
+            b_upper (int):
+                The upper bound of the range in the modified lines.
+
+            find_minimal (bool):
+                Whether to find the minimal diff, rather than use heuristics.
+        """
+        a_codes = self.a_data.undiscarded
+        b_codes = self.b_data.undiscarded
+        a_modified = self.a_data.modified
+        b_modified = self.b_data.modified
+        a_real_indexes = self.a_data.real_indexes
+        b_real_indexes = self.b_data.real_indexes
+        find_sms = self._find_sms
+
+        stack = [(a_lower, a_upper, b_lower, b_upper, find_minimal)]
+        pop = stack.pop
+        push = stack.append
+
+        while stack:
+            a_lower, a_upper, b_lower, b_upper, find_minimal = pop()
+
+            # Fast walkthrough equal lines at the start and end.
+            while (a_lower < a_upper and b_lower < b_upper and
+                   a_codes[a_lower] == b_codes[b_lower]):
+                a_lower += 1
+                b_lower += 1
+
+            while (a_upper > a_lower and b_upper > b_lower and
+                   a_codes[a_upper - 1] == b_codes[b_upper - 1]):
+                a_upper -= 1
+                b_upper -= 1
+
+            if a_lower == a_upper:
+                # Inserted lines.
+                for i in range(b_lower, b_upper):
+                    b_modified[b_real_indexes[i]] = True
+            elif b_lower == b_upper:
+                # Deleted lines.
+                for i in range(a_lower, a_upper):
+                    a_modified[a_real_indexes[i]] = True
+            else:
+                # Find the middle snake and length of an optimal path for A
+                # and B, and then process each half, lower half first.
+                x, y, low_minimal, high_minimal = \
+                    find_sms(a_lower, a_upper, b_lower, b_upper, find_minimal)
+
+                push((x, a_upper, y, b_upper, high_minimal))
+                push((a_lower, x, b_lower, y, low_minimal))
+
+    def _discard_confusing_lines(self):
+        """Discard lines that have no matches in the other file.
+
+        This works the same way as
+        :py:meth:`MyersDiffer._discard_confusing_lines`.
+        """
+        DISCARD_NONE = self.DISCARD_NONE
+        DISCARD_FOUND = self.DISCARD_FOUND
+        DISCARD_CANCEL = self.DISCARD_CANCEL
+        very_approx_sqrt = self._very_approx_sqrt
+        minimal_diff = self.minimal_diff
+
+        a_data = self.a_data
+        b_data = self.b_data
+        a_code_counts = [0] * (1 + self.last_code)
+        b_code_counts = [0] * (1 + self.last_code)
+
+        for code in a_data.data:
+            a_code_counts[code] += 1
+
+        for code in b_data.data:
+            b_code_counts[code] += 1
+
+        for data, counts in ((a_data, b_code_counts),
+                             (b_data, a_code_counts)):
+            codes = data.data
+            length = data.length
+
+            # Build the list of provisional discards.
+            many = 5 * very_approx_sqrt(length / 64)
+            discards = [DISCARD_NONE] * length
+
+            for i, code in enumerate(codes):
+                if code != 0:
+                    num_matches = counts[code]
+
+                    if num_matches == 0:
+                        discards[i] = DISCARD_FOUND
+                    elif num_matches > many:
+                        discards[i] = DISCARD_CANCEL
+
+            # Check the runs of discards.
+            i = 0
+
+            while i < length:
+                discard = discards[i]
+
+                if discard == DISCARD_CANCEL:
+                    # Cancel the provisional discards that are not in the
+                    # middle of a run of discards.
+                    discards[i] = DISCARD_NONE
+                elif discard == DISCARD_FOUND:
+                    # Find the end of this run of discardable lines and count
+                    # how many are provisionally discardable.
+                    provisional = 0
+                    j = i
+
+                    while j < length:
+                        if discards[j] == DISCARD_NONE:
+                            break
+                        elif discards[j] == DISCARD_CANCEL:
+                            provisional += 1
+
+                        j += 1
+
+                    # Cancel the provisional discards at the end and shrink
+                    # the run.
+                    while j > i and discards[j - 1] == DISCARD_CANCEL:
+                        j -= 1
+                        discards[j] = DISCARD_NONE
+                        provisional -= 1
+
+                    run_length = j - i
+
+                    if provisional * 4 > run_length:
+                        # If 1/4 of the lines are provisional, cancel
+                        # discarding all the provisional lines in the run.
+                        while j > i:
+                            j -= 1
+
+                            if discards[j] == DISCARD_CANCEL:
+                                discards[j] = DISCARD_NONE
+                    else:
+                        minimum = 1 + very_approx_sqrt(run_length / 4)
+                        j = 0
+                        consec = 0
+
+                        while j < run_length:
+                            if discards[i + j] != DISCARD_CANCEL:
+                                consec = 0
+                            else:
+                                consec += 1
+
+                                if minimum == consec:
+                                    j -= consec
+                                elif minimum < consec:
+                                    discards[i + j] = DISCARD_NONE
+
+                            j += 1
+
+                        # Scan forward from the start of the run, and then
+                        # back from its end.
+                        for index, step in ((i, 1),
+                                            (i + run_length - 1, -1)):
+                            consec = 0
+
+                            for j in range(run_length):
+                                discard = discards[index]
+
+                                if j >= 8 and discard == DISCARD_FOUND:
+                                    break
+
+                                if discard == DISCARD_FOUND:
+                                    consec += 1
+                                else:
+                                    consec = 0
+
+                                    if discard == DISCARD_CANCEL:
+                                        discards[index] = DISCARD_NONE
+
+                                if consec == 3:
+                                    break
+
+                                index += step
+
+                        i += run_length - 1
+
+                i += 1
+
+            # Discard the lines.
+            undiscarded = [0] * length
+            real_indexes = [0] * length
+            modified = data.modified
+            j = 0
+
+            for i, code in enumerate(codes):
+                if minimal_diff or discards[i] == DISCARD_NONE:
+                    undiscarded[j] = code
+                    real_indexes[j] = i
+                    j += 1
+                else:
+                    modified[i] = True
+
+            data.undiscarded = undiscarded
+            data.real_indexes = real_indexes
+            data.undiscarded_lines = j
+
+    def _very_approx_sqrt(self, i):
+        """Return a very approximate square root of a number.
+
+        Results are memoized, since they're costly to compute and the same
+        values are requested many times.
+
+        Args:
+            i (int):
+                The number to compute the square root of.
+
+        Returns:
+            int:
+            The approximate square root.
+        """
+        try:
+            return self._sqrt_cache[i]
+        except KeyError:
+            result = super(FastMyersDiffer, self)._very_approx_sqrt(i)
+            self._sqrt_cache[i] = result
+
+            return result
@@ -2,6 +2,7 @@ from __future__ import unicode_literals
 
 import os
 import re
+from bisect import bisect_left
 
 from django.utils import six
 from django.utils.six.moves import range
@@ -26,13 +27,109 @@ class MoveRange(object):
         return self.groups[-1]
 
     def add_group(self, group, group_index):
-        if self.groups[-1] != group:
+        if self.groups[-1][1] != group_index:
             self.groups.append((group, group_index))
 
     def __repr__(self):
         return '<MoveRange(%d, %d, %r)>' % (self.start, self.end, self.groups)
 
 
+class RemovedLinesBlock(object):
+    """The removed lines in a group that match a particular line of text.
+
+    This is used to quickly look up candidate lines for a move, without
+    scanning every removed line with the same text.
+
+    Version Added:
+        4.0.6
+    """
+
+    __slots__ = ('group', 'group_index', 'move_key', 'indexes', '_pos')
+
+    def __init__(self, group, group_index):
+        """Initialize the block.
+
+        Args:
+            group (tuple):
+                The ``delete`` or ``replace`` opcode group containing the
+                lines.
+
+            group_index (int):
+                The index of the group.
+        """
+        self.group = group
+        self.group_index = group_index
+        self.move_key = '%s-%s-%s-%s' % group[1:5]
+        self.indexes = []
+        self._pos = 0
+
+    def get_first_unused(self, used):
+        """Return the first line in the block that isn't part of a move.
+
+        Args:
+            used (set of int):
+                The indexes of removed lines already included in a move.
+
+        Returns:
+            int:
+            The index of the line, or ``None`` if all lines are used.
+        """
+        indexes = self.indexes
+        num_indexes = len(indexes)
+        pos = self._pos
+
+        # Lines are never removed from the used set, so there's no need to
+        # check the ones we've skipped past again.
+        while pos < num_indexes and indexes[pos] in used:
+            pos += 1
+
+        self._pos = pos
+
+        if pos < num_indexes:
+            return indexes[pos]
+
+        return None
+
+    def get_next_unused(self, i, used):
+        """Return the next line after a given line that isn't part of a move.
+
+        Args:
+            i (int):
+                The index of the line to start after.
+
+            used (set of int):
+                The indexes of removed lines already included in a move.
+
+        Returns:
+            int:
+            The index of the line, or ``None`` if there are no more unused
+            lines.
+        """
+        for ri in self.indexes[self._pos:]:
+            if ri > i and ri not in used:
+                return ri
+
+        return None
+
+    def __contains__(self, i):
+        """Return whether a removed line is part of this block.
+
+        Args:
+            i (int):
+                The index of the removed line.
+
+        Returns:
+            bool:
+            Whether the line is part of this block.
+        """
+        if not (self.group[1] <= i < self.group[2]):
+            return False
+
+        pos = bisect_left(self.indexes, i)
+
+        return pos < len(self.indexes) and self.indexes[pos] == i
+
+
 class DiffOpcodeGenerator(object):
     ALPHANUM_RE = re.compile(r'\w')
     WHITESPACE_RE = re.compile(r'\s')
@@ -43,9 +140,15 @@ class DiffOpcodeGenerator(object):
     TAB_SIZE = 8
 
     def __init__(self, differ, diff=None, interdiff=None, request=None,
+                 diff_filter_ranges=None, interdiff_filter_ranges=None,
                  **kwargs):
         """Initialize the opcode generator.
 
+        Version Changed:
+            4.0.6:
+            Added the ``diff_filter_ranges`` and ``interdiff_filter_ranges``
+            parameters.
+
         Version Changed:
             3.0.18:
             Added the ``request`` and ``**kwargs`` parameters.
@@ -64,6 +167,16 @@ class DiffOpcodeGenerator(object):
             request (django.http.HttpRequest):
                 The HTTP request from the client.
 
+            diff_filter_ranges (list of tuple, optional):
+                Precomputed interdiff filter ranges for ``diff``. If not
+                provided, they'll be parsed from ``diff`` when filtering an
+                interdiff.
+
+            interdiff_filter_ranges (list of tuple, optional):
+                Precomputed interdiff filter ranges for ``interdiff``. If not
+                provided, they'll be parsed from ``interdiff`` when filtering
+                an interdiff.
+
             **kwargs (dict):
                 Additional keyword arguments, for future expansion.
         """
@@ -71,6 +184,8 @@ class DiffOpcodeGenerator(object):
         self.diff = diff
         self.interdiff = interdiff
         self.request = request
+        self.diff_filter_ranges = diff_filter_ranges
+        self.interdiff_filter_ranges = interdiff_filter_ranges
 
     def __iter__(self):
         """Returns opcodes from the differ with extra metadata.
@@ -119,7 +234,9 @@ class DiffOpcodeGenerator(object):
                 opcodes=opcodes,
                 filediff_data=self.diff,
                 interfilediff_data=self.interdiff,
-                request=self.request)
+                request=self.request,
+                filediff_ranges=self.diff_filter_ranges,
+                interfilediff_ranges=self.interdiff_filter_ranges)
 
         for opcode in opcodes:
             yield opcode
@@ -337,6 +454,23 @@ class DiffOpcodeGenerator(object):
         # We start by looping through all the inserted groups.
         r_move_indexes_used = set()
 
+        # Index the removed lines by group, so that candidates for a move
+        # can be found without scanning every matching removed line.
+        self._removed_blocks = {}
+
+        for line, removes in six.iteritems(self.removes):
+            blocks = []
+            block = None
+
+            for ri, rgroup, rgroup_index in removes:
+                if block is None or block.group_index != rgroup_index:
+                    block = RemovedLinesBlock(rgroup, rgroup_index)
+                    blocks.append(block)
+
+                block.indexes.append(ri)
+
+            self._removed_blocks[line] = blocks
+
         for insert in self.inserts:
             self._compute_move_for_insert(r_move_indexes_used, *insert)
 
@@ -414,48 +548,66 @@ class DiffOpcodeGenerator(object):
                 #
                 # If there isn't any move information for this line, we'll
                 # simply add it to the move ranges.
-                for ri, rgroup, rgroup_index in self.removes[iline]:
+                #
+                # The removed lines are looked at one group at a time. Within
+                # a group that already has a move range, only the line
+                # immediately following the range can extend it, so that's
+                # the only one we need to look for.
+                for block in self._removed_blocks[iline]:
                     # Ignore any lines that have already been processed as
                     # part of a move, so we don't end up with incorrect blocks
                     # of lines being matched.
-                    if ri in r_move_indexes_used:
+                    ri = block.get_first_unused(r_move_indexes_used)
+
+                    if ri is None:
                         continue
 
+                    rgroup = block.group
+                    rgroup_index = block.group_index
                     r_move_range = r_move_ranges.get(move_key)
 
                     if not r_move_range or ri != r_move_range.end + 1:
                         # We either didn't have a previous range, or this
                         # group didn't immediately follow it, so we need
                         # to start a new one.
-                        move_key = '%s-%s-%s-%s' % rgroup[1:5]
+                        move_key = block.move_key
                         r_move_range = r_move_ranges.get(move_key)
 
+                        if r_move_range:
+                            ri = r_move_range.end + 1
+
+                            if (ri in r_move_indexes_used or
+                                ri not in block):
+                                ri = None
+                        elif is_replace and i_move_cur - ij1 == ri - ii1:
+                            # This is a replace line that's just "replacing"
+                            # itself (which would happen if it's just
+                            # changing whitespace). Try the next line
+                            # instead.
+                            ri = block.get_next_unused(ri,
+                                                       r_move_indexes_used)
+
+                    if ri is None:
+                        continue
+
                     if r_move_range:
-                        # If the remove information for the line is next in
-                        # the sequence for this calculated move range...
-                        if ri == r_move_range.end + 1:
-                            # This is part of the current range, so update
-                            # the end of the range to include it.
-                            r_move_range.end = ri
-                            r_move_range.add_group(rgroup, rgroup_index)
-                            updated_range = True
+                        # The remove information for the line is next in
+                        # the sequence for this calculated move range, so
+                        # update the end of the range to include it.
+                        r_move_range.end = ri
+                        r_move_range.add_group(rgroup, rgroup_index)
                     else:
-                        # Check that this isn't a replace line that's just
-                        # "replacing" itself (which would happen if it's just
-                        # changing whitespace).
-                        if not is_replace or i_move_cur - ij1 != ri - ii1:
-                            # We don't have any move ranges yet, or we're done
-                            # with the existing range, so it's time to build
-                            # one based on any removed lines we find that
-                            # match the inserted line.
-                            r_move_ranges[move_key] = \
-                                MoveRange(ri, ri, [(rgroup, rgroup_index)])
-                            updated_range = True
-
-                    if updated_range:
-                        # We found a range we were able to update. Don't
-                        # attempt any more matches for removed lines.
-                        break
+                        # We don't have any move ranges yet, or we're done
+                        # with the existing range, so it's time to build
+                        # one based on any removed lines we find that
+                        # match the inserted line.
+                        r_move_ranges[move_key] = \
+                            MoveRange(ri, ri, [(rgroup, rgroup_index)])
+
+                    # We found a range we were able to update. Don't
+                    # attempt any more matches for removed lines.
+                    updated_range = True
+                    break
 
                 if not updated_range and r_move_ranges:
                     # We didn't find a move range that this line is a part
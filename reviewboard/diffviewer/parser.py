@@ -10,7 +10,7 @@ from django.utils import six
 from django.utils.encoding import force_bytes
 from django.utils.translation import ugettext as _
 from djblets.util.properties import AliasProperty, TypedProperty
-from pydiffx import DiffType, DiffX
+from pydiffx import DiffType, DiffX, DiffXWriter
 from pydiffx.errors import DiffXParseError
 
 from reviewboard.deprecation import RemovedInReviewBoard50Warning
@@ -692,6 +692,57 @@ class BaseDiffParser(object):
         """
         raise NotImplementedError
 
+    def iter_raw_diff(self, diffset_or_commit):
+        """Iterate through the contents of a raw diff.
+
+        This works like :py:meth:`raw_diff`, but yields the diff in pieces,
+        so that it can be streamed to a client without holding the entire
+        diff in memory.
+
+        By default, this yields the result of :py:meth:`raw_diff`.
+        Subclasses can override this to generate the diff incrementally.
+
+        Version Added:
+            4.0.6
+
+        Args:
+            diffset_or_commit (reviewboard.diffviewer.models.diffset.DiffSet or
+                               reviewboard.diffviewer.models.diffcommit
+                               .DiffCommit):
+                The DiffSet or DiffCommit to render.
+
+        Yields:
+            bytes:
+            Each piece of the diff.
+
+        Raises:
+            TypeError:
+                The provided ``diffset_or_commit`` wasn't of a supported type.
+        """
+        yield self.raw_diff(diffset_or_commit)
+
+    def _overrides_raw_diff(self, cls):
+        """Return whether a subclass overrides raw_diff() from a class.
+
+        This is used to ensure that custom implementations of
+        :py:meth:`raw_diff` written before :py:meth:`iter_raw_diff` existed
+        continue to be used.
+
+        Version Added:
+            4.0.6
+
+        Args:
+            cls (type):
+                The class providing the default implementation.
+
+        Returns:
+            bool:
+            Whether :py:meth:`raw_diff` was overridden by a subclass of
+            ``cls``.
+        """
+        return (six.get_unbound_function(type(self).raw_diff) is not
+                six.get_unbound_function(cls.raw_diff))
+
     def normalize_diff_filename(self, filename):
         """Normalize filenames in diffs.
 
@@ -1303,6 +1354,68 @@ class DiffParser(BaseDiffParser):
             TypeError:
                 The provided ``diffset_or_commit`` wasn't of a supported type.
         """
+        return b''.join(self._iter_raw_diff_content(diffset_or_commit))
+
+    def iter_raw_diff(self, diffset_or_commit):
+        """Iterate through the contents of a raw diff.
+
+        This streams the content of each FileDiff in turn, decompressing it
+        incrementally. Diff data is fetched from the database in small
+        batches, so only a few FileDiffs' data is held in memory at a time.
+
+        If a subclass overrides :py:meth:`raw_diff`, that will be used
+        instead.
+
+        Version Added:
+            4.0.6
+
+        Args:
+            diffset_or_commit (reviewboard.diffviewer.models.diffset.DiffSet or
+                               reviewboard.diffviewer.models.diffcommit
+                               .DiffCommit):
+                The DiffSet or DiffCommit to render.
+
+                If passing in a DiffSet, only the cumulative diff's file
+                contents will be returned.
+
+                If passing in a DiffCommit, only that commit's file contents
+                will be returned.
+
+        Yields:
+            bytes:
+            Each piece of the diff.
+
+        Raises:
+            TypeError:
+                The provided ``diffset_or_commit`` wasn't of a supported type.
+        """
+        if self._overrides_raw_diff(DiffParser):
+            return iter([self.raw_diff(diffset_or_commit)])
+
+        return self._iter_raw_diff_content(diffset_or_commit)
+
+    def _iter_raw_diff_content(self, diffset_or_commit):
+        """Iterate through the contents of a raw diff.
+
+        Version Added:
+            4.0.6
+
+        Args:
+            diffset_or_commit (reviewboard.diffviewer.models.diffset.DiffSet or
+                               reviewboard.diffviewer.models.diffcommit
+                               .DiffCommit):
+                The DiffSet or DiffCommit to render.
+
+        Yields:
+            bytes:
+            Each piece of the diff.
+
+        Raises:
+            TypeError:
+                The provided ``diffset_or_commit`` wasn't of a supported type.
+        """
+        from reviewboard.diffviewer.models import FileDiff
+
         if hasattr(diffset_or_commit, 'cumulative_files'):
             # This will be a DiffSet.
             filediffs = diffset_or_commit.cumulative_files
@@ -1314,10 +1427,9 @@ class DiffParser(BaseDiffParser):
                             'or DiffCommit.'
                             % diffset_or_commit)
 
-        return b''.join(
-            filediff.diff
-            for filediff in filediffs
-        )
+        for filediff in FileDiff.objects.iter_with_diff_data(filediffs):
+            for chunk in filediff.iter_diff():
+                yield chunk
 
     def get_orig_commit_id(self):
         """Return the commit ID of the original revision for the diff.
@@ -1364,6 +1476,17 @@ class DiffXParser(BaseDiffParser):
         The API may change during this time.
     """
 
+    # Section option names that are passed to DiffXWriter under a different
+    # name.
+    _DIFFX_WRITER_OPTION_NAMES = {
+        'diff': {
+            'type': 'diff_type',
+        },
+        'meta': {
+            'format': 'meta_format',
+        },
+    }
+
     def parse_diff(self):
         """Parse the diff.
 
@@ -1587,6 +1710,65 @@ class DiffXParser(BaseDiffParser):
                 The provided ``diffset_or_commit`` value wasn't of a
                 supported type.
         """
+        return b''.join(self._iter_raw_diff_content(diffset_or_commit))
+
+    def iter_raw_diff(self, diffset_or_commit):
+        """Iterate through the contents of a raw DiffX file.
+
+        This works like :py:meth:`raw_diff`, but writes the DiffX file one
+        file section at a time. Diff data is fetched from the database in
+        small batches, so only a few FileDiffs' data is held in memory at a
+        time.
+
+        If a subclass overrides :py:meth:`raw_diff`, that will be used
+        instead.
+
+        Version Added:
+            4.0.6
+
+        Args:
+            diffset_or_commit (reviewboard.diffviewer.models.diffset.DiffSet or
+                               reviewboard.diffviewer.models.diffcommit
+                               .DiffCommit):
+                The DiffSet or DiffCommit to render.
+
+        Yields:
+            bytes:
+            Each piece of the DiffX file.
+
+        Raises:
+            TypeError:
+                The provided ``diffset_or_commit`` value wasn't of a
+                supported type.
+        """
+        if self._overrides_raw_diff(DiffXParser):
+            return iter([self.raw_diff(diffset_or_commit)])
+
+        return self._iter_raw_diff_content(diffset_or_commit)
+
+    def _iter_raw_diff_content(self, diffset_or_commit):
+        """Iterate through the contents of a raw DiffX file.
+
+        Version Added:
+            4.0.6
+
+        Args:
+            diffset_or_commit (reviewboard.diffviewer.models.diffset.DiffSet or
+                               reviewboard.diffviewer.models.diffcommit
+                               .DiffCommit):
+                The DiffSet or DiffCommit to render.
+
+        Yields:
+            bytes:
+            Each piece of the DiffX file.
+
+        Raises:
+            TypeError:
+                The provided ``diffset_or_commit`` value wasn't of a
+                supported type.
+        """
+        from reviewboard.diffviewer.models import FileDiff
+
         if hasattr(diffset_or_commit, 'cumulative_files'):
             # This will be a DiffSet.
             #
@@ -1648,11 +1830,23 @@ class DiffXParser(BaseDiffParser):
                             'or DiffCommit.'
                             % diffset_or_commit)
 
+        stream = io.BytesIO()
+
         diffx = DiffX()
         self._load_options(diffx, diffx_main_info)
         self._load_preamble(diffx, diffx_main_info)
         self._load_meta(diffx, diffx_main_info)
 
+        main_options = diffx.options.copy()
+        writer = DiffXWriter(
+            stream,
+            version=main_options.pop('version', DiffXWriter.VERSION),
+            encoding=main_options.pop('encoding', None),
+            **main_options)
+
+        self._write_diffx_content_section(writer, diffx.preamble_section)
+        self._write_diffx_content_section(writer, diffx.meta_section)
+
         for change in changes:
             diffx_change_info = change['extra_data'].get('diffx', {})
 
@@ -1661,20 +1855,94 @@ class DiffXParser(BaseDiffParser):
             self._load_preamble(diffx_change, diffx_change_info)
             self._load_meta(diffx_change, diffx_change_info)
 
-            for filediff in change['files']:
+            writer.new_change(**diffx_change.options)
+            self._write_diffx_content_section(writer,
+                                              diffx_change.preamble_section)
+            self._write_diffx_content_section(writer,
+                                              diffx_change.meta_section)
+
+            for filediff in FileDiff.objects.iter_with_diff_data(
+                    change['files']):
                 diffx_file_info = filediff.extra_data.get('diffx') or {}
 
                 diffx_file = diffx_change.add_file()
                 self._load_options(diffx_file, diffx_file_info)
                 self._load_meta(diffx_file, diffx_file_info)
 
-                if filediff.diff:
-                    diffx_file.diff = filediff.diff
+                diff = filediff.diff
+
+                if diff:
+                    diffx_file.diff = diff
                     self._load_options(diffx_file.diff_section,
                                        diffx_file_info,
                                        key='diff_options')
 
-        return diffx.to_bytes()
+                writer.new_file(**diffx_file.options)
+                self._write_diffx_content_section(writer,
+                                                  diffx_file.meta_section)
+                self._write_diffx_content_section(writer,
+                                                  diffx_file.diff_section)
+
+                # The file has been written, so we no longer need to keep
+                # its diff around.
+                diffx_change.files.remove(diffx_file)
+                diff = None
+
+                yield self._pop_stream_content(stream)
+
+            diffx.changes.remove(diffx_change)
+
+        # Flush anything left over (such as headers for changes without any
+        # files, or for a DiffX without any changes).
+        data = self._pop_stream_content(stream)
+
+        if data:
+            yield data
+
+    def _write_diffx_content_section(self, writer, section):
+        """Write a DiffX content section, if it has content.
+
+        Version Added:
+            4.0.6
+
+        Args:
+            writer (pydiffx.writer.DiffXWriter):
+                The writer to write with.
+
+            section (pydiffx.dom.objects.BaseDiffXContentSection):
+                The section to write.
+        """
+        content = section.content
+
+        if content:
+            section_name = section.section_name
+            option_names = self._DIFFX_WRITER_OPTION_NAMES.get(section_name,
+                                                               {})
+            write_func = getattr(writer, 'write_%s' % section_name)
+            write_func(content, **{
+                option_names.get(key, key): value
+                for key, value in six.iteritems(section.options)
+            })
+
+    def _pop_stream_content(self, stream):
+        """Return and clear the content written to a stream.
+
+        Version Added:
+            4.0.6
+
+        Args:
+            stream (io.BytesIO):
+                The stream to read from.
+
+        Returns:
+            bytes:
+            The content written to the stream since it was last cleared.
+        """
+        data = stream.getvalue()
+        stream.seek(0)
+        stream.truncate()
+
+        return data
 
     def _store_options(self, extra_data, diffx_section, key='options'):
         """Store options for a section in extra_data.
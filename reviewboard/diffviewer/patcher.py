@@ -0,0 +1,393 @@
+"""An in-process applier for unified diffs.
+
+This implements the subset of GNU :command:`patch` behavior that Review Board
+relies upon when reconstructing files from stored diffs, without needing to
+write temporary files or spawn a process for every file.
+
+Version Added:
+    4.0.6
+"""
+
+from __future__ import unicode_literals
+
+import re
+
+from django.utils.six.moves import range
+
+from reviewboard.diffviewer.errors import UnsupportedPatchError
+
+
+HUNK_HEADER_RE = re.compile(
+    br'^@@ -(?P<orig_start>\d+)(,(?P<orig_len>\d+))? '
+    br'\+(?P<new_start>\d+)(,(?P<new_len>\d+))? @@')
+
+# Lines which indicate diff formats we don't understand. When seen, the
+# caller is expected to fall back on the patch(1)-based implementation.
+_UNSUPPORTED_RE = re.compile(
+    br'^(?:\*{15}|GIT binary patch|\d+(?:,\d+)?[acd]\d+(?:,\d+)?$)')
+
+_NO_NEWLINE_MARKER = b'\\'
+
+
+class Hunk(object):
+    """A parsed hunk from a unified diff.
+
+    Attributes:
+        orig_start (int):
+            The 1-based starting line number in the original file.
+
+        orig_len (int):
+            The number of lines from the original file covered by the hunk.
+
+        new_start (int):
+            The 1-based starting line number in the new file.
+
+        new_len (int):
+            The number of lines in the new file covered by the hunk.
+
+        lines (list of list):
+            The lines in the hunk. Each entry is a list in the form of
+            ``[tag, text]``, where ``tag`` is one of ``b' '``, ``b'-'`` or
+            ``b'+'``, and ``text`` is the line including its trailing
+            newline. The newline will be absent if the line was followed by
+            a ``\\ No newline at end of file`` marker.
+
+        raw (list of bytes):
+            The raw lines of the hunk, including the header, for use in
+            reporting rejects.
+    """
+
+    def __init__(self, orig_start, orig_len, new_start, new_len):
+        """Initialize the hunk.
+
+        Args:
+            orig_start (int):
+                The 1-based starting line number in the original file.
+
+            orig_len (int):
+                The number of lines from the original file in the hunk.
+
+            new_start (int):
+                The 1-based starting line number in the new file.
+
+            new_len (int):
+                The number of lines from the new file in the hunk.
+        """
+        self.orig_start = orig_start
+        self.orig_len = orig_len
+        self.new_start = new_start
+        self.new_len = new_len
+        self.lines = []
+        self.raw = []
+
+    def get_context_sizes(self):
+        """Return the amount of leading and trailing context in the hunk.
+
+        Returns:
+            tuple:
+            A 2-tuple of the number of leading and trailing context lines.
+        """
+        lines = self.lines
+        num_lines = len(lines)
+        leading = 0
+
+        while leading < num_lines and lines[leading][0] == b' ':
+            leading += 1
+
+        if leading == num_lines:
+            return leading, 0
+
+        trailing = 0
+
+        while lines[num_lines - trailing - 1][0] == b' ':
+            trailing += 1
+
+        return leading, trailing
+
+
+def parse_hunks(diff):
+    """Parse the hunks from a single-file unified diff.
+
+    Args:
+        diff (bytes):
+            The diff to parse. Line endings must already be normalized to
+            ``\\n``.
+
+    Returns:
+        tuple:
+        A 2-tuple containing:
+
+        1. The list of file header lines (``---`` and ``+++``), for use in
+           reporting rejects.
+        2. The list of :py:class:`Hunk`.
+
+    Raises:
+        reviewboard.diffviewer.errors.UnsupportedPatchError:
+            The diff is in a format that can't be handled in-process.
+
+        ValueError:
+            The diff ended in the middle of a hunk.
+    """
+    lines = diff.split(b'\n')
+
+    if lines and not lines[-1]:
+        lines.pop()
+
+    headers = []
+    hunks = []
+    num_lines = len(lines)
+    i = 0
+
+    while i < num_lines:
+        line = lines[i]
+        m = HUNK_HEADER_RE.match(line)
+
+        if not m:
+            if _UNSUPPORTED_RE.match(line):
+                raise UnsupportedPatchError(
+                    'Unsupported diff content on line %d' % (i + 1))
+
+            if (line.startswith(b'--- ') and i + 1 < num_lines and
+                lines[i + 1].startswith(b'+++ ')):
+                if hunks:
+                    # A second file's worth of changes. patch(1) will
+                    # decide what to do with these.
+                    raise UnsupportedPatchError(
+                        'Diff contains changes for more than one file')
+
+                headers = [line, lines[i + 1]]
+                i += 1
+
+            i += 1
+            continue
+
+        orig_len = m.group('orig_len')
+        new_len = m.group('new_len')
+        hunk = Hunk(orig_start=int(m.group('orig_start')),
+                    orig_len=int(orig_len) if orig_len is not None else 1,
+                    new_start=int(m.group('new_start')),
+                    new_len=int(new_len) if new_len is not None else 1)
+        hunk.raw.append(line)
+        hunk_lines = hunk.lines
+        orig_remaining = hunk.orig_len
+        new_remaining = hunk.new_len
+        i += 1
+
+        while orig_remaining > 0 or new_remaining > 0:
+            if i >= num_lines:
+                if (orig_remaining == new_remaining and
+                    orig_remaining + new_remaining < 4):
+                    # Like patch(1), assume that trailing blank context
+                    # lines got chopped off the end of the diff.
+                    hunk_lines.extend(
+                        [b' ', b'\n']
+                        for j in range(orig_remaining)
+                    )
+                    break
+
+                raise ValueError('unexpected end of file in patch')
+
+            line = lines[i]
+            tag = line[:1]
+
+            if tag == b' ' or not line:
+                # Some tools strip the trailing whitespace from empty
+                # context lines, which patch(1) accepts.
+                orig_remaining -= 1
+                new_remaining -= 1
+                hunk_lines.append([b' ', line[1:] + b'\n'])
+            elif tag == b'-':
+                orig_remaining -= 1
+                hunk_lines.append([b'-', line[1:] + b'\n'])
+            elif tag == b'+':
+                new_remaining -= 1
+                hunk_lines.append([b'+', line[1:] + b'\n'])
+            elif tag == _NO_NEWLINE_MARKER:
+                if hunk_lines:
+                    hunk_lines[-1][1] = hunk_lines[-1][1][:-1]
+            else:
+                raise ValueError('malformed patch at line %d: %s'
+                                 % (i + 1, line))
+
+            if orig_remaining < 0 or new_remaining < 0:
+                raise ValueError('malformed patch at line %d: %s'
+                                 % (i + 1, line))
+
+            hunk.raw.append(line)
+            i += 1
+
+        # A "\ No newline at end of file" marker may follow the final line.
+        if i < num_lines and lines[i][:1] == _NO_NEWLINE_MARKER:
+            if hunk_lines:
+                hunk_lines[-1][1] = hunk_lines[-1][1][:-1]
+
+            hunk.raw.append(lines[i])
+            i += 1
+
+        hunks.append(hunk)
+
+    return headers, hunks
+
+
+def _hunk_matches(file_lines, hunk, pattern, where):
+    """Return whether a hunk matches a file exactly at a position.
+
+    This follows the rules used by patch(1) for its first attempt at
+    applying a hunk, with no offset or fuzz. A hunk with less leading
+    context than trailing context can only match at the start of the file
+    (if it claims to start there), and a hunk with less trailing context
+    than leading context can only match at the end of the file.
+
+    Args:
+        file_lines (list of bytes):
+            The lines in the file, including trailing newlines.
+
+        hunk (Hunk):
+            The hunk to match.
+
+        pattern (list of bytes):
+            The lines from the original side of the hunk.
+
+        where (int):
+            The 0-based line index to match the hunk at.
+
+    Returns:
+        bool:
+        ``True`` if the hunk matches at the position.
+    """
+    input_lines = len(file_lines)
+    pat_lines = len(pattern)
+
+    if where < 0 or where + pat_lines > input_lines:
+        return False
+
+    if pat_lines == 0:
+        # An empty range always matches.
+        return True
+
+    prefix_context, suffix_context = hunk.get_context_sizes()
+
+    if prefix_context < suffix_context and hunk.orig_start <= 1:
+        # This can only match the start of the file.
+        if where != 0:
+            return False
+    elif suffix_context < prefix_context:
+        # This can only match the end of the file.
+        if where != input_lines - pat_lines:
+            return False
+
+    return (file_lines[where] == pattern[0] and
+            file_lines[where:where + pat_lines] == pattern)
+
+
+def apply_patch(diff, orig_file, filename):
+    """Apply a unified diff to the contents of a file.
+
+    Only diffs whose hunks all match the file exactly at their stated
+    positions are applied in-process. This is the case for nearly all
+    stored diffs, which were generated against the very file being patched.
+
+    Anything else (hunks needing an offset or fuzz, hunks that don't apply,
+    reversed patches, or malformed diffs) is left to patch(1), so that the
+    results, messages and rejects always match it exactly. In these cases,
+    :py:class:`~reviewboard.diffviewer.errors.UnsupportedPatchError` is
+    raised.
+
+    Both ``diff`` and ``orig_file`` must have had their line endings
+    normalized by :py:func:`~reviewboard.diffviewer.diffutils.
+    convert_line_endings`.
+
+    Args:
+        diff (bytes):
+            The contents of the diff to apply.
+
+        orig_file (bytes):
+            The contents of the original file.
+
+        filename (unicode):
+            The name of the file being patched.
+
+    Returns:
+        bytes:
+        The contents of the patched file.
+
+    Raises:
+        reviewboard.diffviewer.errors.UnsupportedPatchError:
+            The diff can't be applied in-process. The caller should fall
+            back on patch(1).
+    """
+    try:
+        hunks = parse_hunks(diff)[1]
+    except ValueError as e:
+        raise UnsupportedPatchError('Malformed diff: %s' % e)
+
+    if not hunks:
+        return orig_file
+
+    # Lines keep their newlines, so that a line at the end of a file without
+    # a trailing newline will only match a line in the diff with a
+    # "No newline at end of file" marker, like patch(1).
+    file_lines = orig_file.splitlines(True)
+
+    result = []
+    copied_to = 0
+
+    for hunk_num, hunk in enumerate(hunks, start=1):
+        if hunk.orig_start == 0 and hunk.orig_len == 0 and file_lines:
+            # The diff may be creating a file that already has content.
+            # patch(1) treats this as a possibly-reversed patch.
+            raise UnsupportedPatchError(
+                'Hunk #%d creates a file that already exists' % hunk_num)
+
+        hunk_lines = hunk.lines
+        pattern = [
+            text
+            for tag, text in hunk_lines
+            if tag != b'+'
+        ]
+
+        if hunk.orig_len == 0:
+            # Pure additions are positioned after the stated line.
+            where = hunk.orig_start
+        else:
+            where = hunk.orig_start - 1
+
+        if ((hunk_num > 1 and hunk.orig_start <= 1) or
+            where < copied_to or
+            not _hunk_matches(file_lines, hunk, pattern, where)):
+            # patch(1) would search for the hunk at other offsets, try it
+            # with fuzz, check whether it's reversed, or reject it. Any of
+            # these is rare enough to leave to patch(1) itself.
+            raise UnsupportedPatchError(
+                'Hunk #%d does not match the file exactly' % hunk_num)
+
+        result.extend(file_lines[copied_to:where])
+        file_pos = where
+
+        for tag, text in hunk_lines:
+            if tag == b' ':
+                result.append(file_lines[file_pos])
+                file_pos += 1
+            elif tag == b'-':
+                file_pos += 1
+            elif text:
+                result.append(text)
+            else:
+                # patch(1) fails with a write error when adding an empty
+                # line without a newline, so leave that failure to it.
+                raise UnsupportedPatchError(
+                    'Hunk #%d adds an empty line without a newline'
+                    % hunk_num)
+
+        copied_to = file_pos
+
+    result.extend(file_lines[copied_to:])
+
+    # A line without a trailing newline may no longer be at the end of the
+    # file (for instance, if it was inserted by a hunk before existing
+    # content). Like patch(1), add the newline back in that case.
+    for i in range(len(result) - 1):
+        if not result[i].endswith(b'\n'):
+            result[i] += b'\n'
+
+    return b''.join(result)
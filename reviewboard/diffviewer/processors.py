@@ -4,9 +4,7 @@ from __future__ import unicode_literals
 
 import re
 
-from reviewboard.diffviewer.diffutils import (get_diff_data_chunks_info,
-                                              split_line_endings)
-from reviewboard.diffviewer.features import filter_interdiffs_v2_feature
+from reviewboard.diffviewer.diffutils import get_diff_data_chunks_info
 
 
 #: Regex for matching a diff chunk line.
@@ -22,8 +20,73 @@ CHUNK_RANGE_RE = re.compile(
     re.M)
 
 
+def get_interdiff_filter_ranges(diff):
+    """Return the ranges of lines in a diff used to filter interdiffs.
+
+    This parses the chunk headers and lines of context in a diff, returning
+    the ranges of lines on the modified side of the diff that contain
+    changes. :py:func:`filter_interdiff_opcodes` uses these ranges to
+    determine which lines of an interdiff are relevant.
+
+    The result only depends on the content of the diff, so it can be computed
+    once and stored alongside the diff (see :py:meth:`RawFileDiffData.
+    get_interdiff_filter_ranges() <reviewboard.diffviewer.models.
+    raw_file_diff_data.RawFileDiffData.get_interdiff_filter_ranges>`).
+
+    Version Added:
+        4.0.6
+
+    Args:
+        diff (bytes):
+            The diff data to scan.
+
+    Returns:
+        list of tuple:
+        A list of ``(start, end)`` line ranges, in the order they appear in
+        the diff.
+    """
+    ranges = []
+
+    for range_info in get_diff_data_chunks_info(diff):
+        orig_info = range_info['orig']
+        modified_info = range_info['modified']
+
+        orig_pre_lines_of_context = orig_info['pre_lines_of_context']
+        orig_post_lines_of_context = orig_info['post_lines_of_context']
+        modified_pre_lines_of_context = modified_info['pre_lines_of_context']
+        modified_post_lines_of_context = \
+            modified_info['post_lines_of_context']
+
+        if modified_pre_lines_of_context and orig_pre_lines_of_context:
+            pre_lines_of_context = min(orig_pre_lines_of_context,
+                                       modified_pre_lines_of_context)
+        else:
+            pre_lines_of_context = (modified_pre_lines_of_context or
+                                    orig_pre_lines_of_context)
+
+        if modified_post_lines_of_context and orig_post_lines_of_context:
+            post_lines_of_context = min(orig_post_lines_of_context,
+                                        modified_post_lines_of_context)
+        else:
+            post_lines_of_context = (modified_post_lines_of_context or
+                                     orig_post_lines_of_context)
+
+        start = modified_info['chunk_start'] + pre_lines_of_context
+
+        if pre_lines_of_context > 0:
+            start -= 1
+
+        length = (modified_info['chunk_len'] - pre_lines_of_context -
+                  post_lines_of_context)
+
+        ranges.append((start, start + length))
+
+    return ranges
+
+
 def filter_interdiff_opcodes(opcodes, filediff_data, interfilediff_data,
-                             request=None):
+                             request=None, filediff_ranges=None,
+                             interfilediff_ranges=None):
     """Filter the opcodes for an interdiff to remove unnecessary lines.
 
     An interdiff may contain lines of code that have changed as the result of
@@ -40,6 +103,13 @@ def filter_interdiff_opcodes(opcodes, filediff_data, interfilediff_data,
         algorithm from Review Board 4.0 (through the :py:data:`~reviewboard
         .diffviewer.features.filter_interdiffs_v2_feature` feature).
 
+    Version Changed:
+        4.0.6:
+        Added the ``filediff_ranges`` and ``interfilediff_ranges`` arguments,
+        allowing ranges precomputed through
+        :py:func:`get_interdiff_filter_ranges` to be used instead of
+        re-parsing the diffs.
+
     Args:
         opcodes (list of tuple):
             The list of opcodes to filter.
@@ -47,114 +117,42 @@ def filter_interdiff_opcodes(opcodes, filediff_data, interfilediff_data,
         filediff_data (bytes):
             The data from the filediff to filter.
 
+            This may be ``None`` if ``filediff_ranges`` is provided.
+
         interfilediff_data (bytes):
             The data from the interfilediff to filter.
 
+            This may be ``None`` if ``interfilediff_ranges`` is provided.
+
         request (django.http.HttpRequest, optional):
             The HTTP request from the client.
 
+        filediff_ranges (list of tuple, optional):
+            Precomputed filter ranges for ``filediff_data``.
+
+        interfilediff_ranges (list of tuple, optional):
+            Precomputed filter ranges for ``interfilediff_data``.
+
     Yields:
         tuple:
         An opcode to render for the diff.
     """
-    def _find_range_info_v1(diff):
-        lines = split_line_endings(diff)
-        process_changes = False
-        process_trailing_context = False
-        ranges = []
-
-        for range_info in get_diff_data_chunks_info(diff):
-            orig_info = range_info['orig']
-            modified_info = range_info['modified']
-
-            orig_pre_lines_of_context = orig_info['pre_lines_of_context']
-            orig_post_lines_of_context = orig_info['post_lines_of_context']
-            modified_pre_lines_of_context = \
-                modified_info['pre_lines_of_context']
-            modified_post_lines_of_context = \
-                modified_info['post_lines_of_context']
-
-            if modified_pre_lines_of_context and orig_pre_lines_of_context:
-                pre_lines_of_context = min(orig_pre_lines_of_context,
-                                           modified_pre_lines_of_context)
-            else:
-                pre_lines_of_context = (modified_pre_lines_of_context or
-                                        orig_pre_lines_of_context)
-
-            if modified_post_lines_of_context and orig_post_lines_of_context:
-                post_lines_of_context = min(orig_post_lines_of_context,
-                                            modified_post_lines_of_context)
-            else:
-                post_lines_of_context = (modified_post_lines_of_context or
-                                         orig_post_lines_of_context)
-
-            start = modified_info['chunk_start'] + pre_lines_of_context
-
-            if pre_lines_of_context > 0:
-                start -= 1
-
-            length = (modified_info['chunk_len'] - pre_lines_of_context -
-                      post_lines_of_context)
-
-            ranges.append((start, start + length))
-
-        return ranges
-
-    def _find_range_info_v2(diff):
-        ranges = []
-
-        for range_info in get_diff_data_chunks_info(diff):
-            orig_info = range_info['orig']
-            modified_info = range_info['modified']
-
-            orig_pre_lines_of_context = orig_info['pre_lines_of_context']
-            orig_post_lines_of_context = orig_info['post_lines_of_context']
-            modified_pre_lines_of_context = \
-                modified_info['pre_lines_of_context']
-            modified_post_lines_of_context = \
-                modified_info['post_lines_of_context']
-
-            if modified_pre_lines_of_context and orig_pre_lines_of_context:
-                pre_lines_of_context = min(orig_pre_lines_of_context,
-                                           modified_pre_lines_of_context)
-            else:
-                pre_lines_of_context = (modified_pre_lines_of_context or
-                                        orig_pre_lines_of_context)
-
-            if modified_post_lines_of_context and orig_post_lines_of_context:
-                post_lines_of_context = min(orig_post_lines_of_context,
-                                            modified_post_lines_of_context)
-            else:
-                post_lines_of_context = (modified_post_lines_of_context or
-                                         orig_post_lines_of_context)
-
-            start = modified_info['chunk_start'] + pre_lines_of_context
-
-            if pre_lines_of_context > 0:
-                start -= 1
-
-            length = (modified_info['chunk_len'] - pre_lines_of_context -
-                      post_lines_of_context)
-
-            ranges.append((start, start + length))
-
-        return ranges
-
     def _is_range_valid(line_range, tag, i1, i2):
         return (line_range is not None and
                 i1 >= line_range[0] and
                 (tag == 'delete' or i1 != i2))
 
-    use_v2_algorithm = \
-        filter_interdiffs_v2_feature.is_enabled(request=request)
-
-    if use_v2_algorithm:
-        _find_range_info = _find_range_info_v2
+    # The v1 and v2 filtering algorithms compute the same ranges of lines,
+    # so precomputed ranges apply to both.
+    if filediff_ranges is None:
+        orig_ranges = get_interdiff_filter_ranges(filediff_data)
     else:
-        _find_range_info = _find_range_info_v1
+        orig_ranges = filediff_ranges
 
-    orig_ranges = _find_range_info(filediff_data)
-    new_ranges = _find_range_info(interfilediff_data)
+    if interfilediff_ranges is None:
+        new_ranges = get_interdiff_filter_ranges(interfilediff_data)
+    else:
+        new_ranges = interfilediff_ranges
 
     orig_range_i = 0
     new_range_i = 0
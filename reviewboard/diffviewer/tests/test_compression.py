@@ -0,0 +1,83 @@
+"""Unit tests for reviewboard.diffviewer.compression."""
+
+from __future__ import unicode_literals
+
+from reviewboard.diffviewer.compression import (BaseCompressionCodec,
+                                                get_compression_codec,
+                                                get_compression_codecs,
+                                                register_compression_codec,
+                                                unregister_compression_codec)
+from reviewboard.testing import TestCase
+
+
+class ReverseCompressionCodec(BaseCompressionCodec):
+    compression_id = '!'
+    name = 'Reversed'
+
+    def compress(self, data):
+        return data[::-1]
+
+    def decompress(self, data):
+        return data[::-1]
+
+
+class CompressionCodecTests(TestCase):
+    """Unit tests for compression codecs."""
+
+    data = b''.join(
+        b'+Line %d of a rather long diff\n' % i
+        for i in range(40000)
+    )
+
+    def test_round_trip(self):
+        """Testing compression codecs compress and decompress data"""
+        for codec in get_compression_codecs():
+            if codec.is_available():
+                compressed = codec.compress(self.data)
+
+                self.assertLess(len(compressed), len(self.data))
+                self.assertEqual(codec.decompress(compressed), self.data)
+
+    def test_iter_decompress(self):
+        """Testing compression codecs decompress data incrementally"""
+        for codec in get_compression_codecs():
+            if codec.is_available():
+                compressed = codec.compress(self.data)
+                chunks = list(codec.iter_decompress(compressed,
+                                                    chunk_size=1024))
+
+                self.assertGreater(len(chunks), 1)
+                self.assertEqual(b''.join(chunks), self.data)
+
+    def test_iter_decompress_without_decompressor(self):
+        """Testing BaseCompressionCodec.iter_decompress without incremental
+        decompression support
+        """
+        codec = ReverseCompressionCodec()
+
+        self.assertEqual(list(codec.iter_decompress(b'cba')), [b'abc'])
+
+    def test_register_compression_codec(self):
+        """Testing register_compression_codec"""
+        codec = ReverseCompressionCodec()
+        register_compression_codec(codec)
+
+        try:
+            self.assertIs(get_compression_codec('!'), codec)
+
+            with self.assertRaises(KeyError):
+                register_compression_codec(ReverseCompressionCodec())
+        finally:
+            unregister_compression_codec(codec)
+
+        self.assertIsNone(get_compression_codec('!'))
+
+    def test_register_compression_codec_with_invalid_id(self):
+        """Testing register_compression_codec with an ID longer than one
+        character
+        """
+        codec = ReverseCompressionCodec()
+        codec.compression_id = 'XY'
+
+        with self.assertRaises(ValueError):
+            register_compression_codec(codec)
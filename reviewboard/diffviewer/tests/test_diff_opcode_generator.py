@@ -2,8 +2,11 @@ from __future__ import print_function, unicode_literals
 
 import os
 
+import kgb
+
 from reviewboard.diffviewer.myersdiff import MyersDiffer
-from reviewboard.diffviewer.opcode_generator import get_diff_opcode_generator
+from reviewboard.diffviewer.opcode_generator import (RemovedLinesBlock,
+                                                     get_diff_opcode_generator)
 from reviewboard.testing import TestCase
 
 
@@ -146,7 +149,7 @@ class IndentationTests(TestCase):
             (False, 3, 8))
 
 
-class MoveDetectionTests(TestCase):
+class MoveDetectionTests(kgb.SpyAgency, TestCase):
     """Unit tests for DiffOpcodeGenerator move detection."""
 
     def test_move_detection(self):
@@ -698,6 +701,69 @@ class MoveDetectionTests(TestCase):
             ]
         )
 
+    def test_move_detection_with_large_move(self):
+        """Testing DiffOpcodeGenerator move detection with a large move of
+        repetitive lines
+        """
+        class FakeDiffer(object):
+            def __init__(self, a, b, opcodes):
+                self.a = a
+                self.b = b
+                self.opcodes = opcodes
+
+            def get_opcodes(self):
+                return iter(self.opcodes)
+
+        unmoved = [
+            'unmoved line %d' % i
+            for i in range(100)
+        ]
+        moved = []
+
+        for i in range(1000):
+            moved += [
+                'if value_%d:' % i,
+                '    return value_%d' % i,
+                '}',
+                '',
+            ]
+
+        num_moved = len(moved)
+        num_unmoved = len(unmoved)
+        differ = FakeDiffer(
+            unmoved + moved,
+            moved + unmoved,
+            [
+                ('insert', 0, 0, 0, num_moved),
+                ('equal', 0, num_unmoved, num_moved, num_moved + num_unmoved),
+                ('delete', num_unmoved, num_unmoved + num_moved,
+                 num_moved + num_unmoved, num_moved + num_unmoved),
+            ])
+
+        self.spy_on(RemovedLinesBlock.get_first_unused,
+                    owner=RemovedLinesBlock)
+
+        opcodes = list(get_diff_opcode_generator(differ))
+
+        # The trailing "}" and blank line aren't part of the move.
+        self.assertEqual(
+            opcodes[0][-1]['moved-from'],
+            {
+                i: num_unmoved + i
+                for i in range(1, num_moved - 1)
+            })
+        self.assertEqual(
+            opcodes[2][-1]['moved-to'],
+            {
+                num_unmoved + i: i
+                for i in range(1, num_moved - 1)
+            })
+
+        # Each non-blank inserted line should only need a single lookup,
+        # regardless of how many removed lines share its contents.
+        self.assertSpyCallCount(RemovedLinesBlock.get_first_unused,
+                                num_moved * 3 // 4)
+
     def _test_move_detection(self, a, b, expected_i_moves, expected_r_moves):
         differ = MyersDiffer(a, b)
         opcode_generator = get_diff_opcode_generator(differ)
@@ -291,6 +291,46 @@ class DiffParserTest(TestCase):
         parser = DiffParser(b'')
         self.assertEqual(parser.raw_diff(commit1), commit1_diff)
 
+    @add_fixtures(['test_scmtools'])
+    def test_iter_raw_diff(self):
+        """Testing DiffParser.iter_raw_diff streams each FileDiff"""
+        repository = self.create_repository(tool_name='Test')
+        diffset = self.create_diffset(repository=repository)
+        diffs = [
+            (
+                b'--- README%d\n'
+                b'+++ README%d\n'
+                b'@@ -1,1 +1,1 @@\n'
+                b'-Hello, world!\n'
+                b'+Hi, world!\n'
+                % (i, i)
+            ) + b'+More\n' * (i * 100)
+            for i in range(15)
+        ]
+
+        for diff in diffs:
+            self.create_filediff(diffset, diff=diff)
+
+        parser = DiffParser(b'')
+        chunks = parser.iter_raw_diff(diffset)
+
+        # The FileDiffs are fetched, followed by their diff data in two
+        # batches.
+        with self.assertNumQueries(3):
+            self.assertEqual(b''.join(chunks), b''.join(diffs))
+
+    def test_iter_raw_diff_with_custom_raw_diff(self):
+        """Testing DiffParser.iter_raw_diff with subclass overriding
+        raw_diff
+        """
+        class CustomParser(DiffParser):
+            def raw_diff(self, diffset_or_commit):
+                return b'custom diff'
+
+        parser = CustomParser(b'')
+
+        self.assertEqual(list(parser.iter_raw_diff(None)), [b'custom diff'])
+
     def test_parsed_diff_extra_data(self):
         """Testing custom DiffParser populating a ParsedDiff's extra_data"""
         class CustomParser(DiffParser):
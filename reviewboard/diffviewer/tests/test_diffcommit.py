@@ -120,6 +120,55 @@ class DiffCommitTests(TestCase):
             'total_line_count': 2,
         })
 
+    def test_get_total_line_counts_with_stored_counts(self):
+        """Testing DiffCommit.get_total_line_counts() with line counts stored
+        on FileDiffs computes totals in a single query
+        """
+        for filediff in self.diffset.files.all():
+            filediff.get_line_counts()
+
+        with self.assertNumQueries(1):
+            counts = self.diffset.get_total_line_counts()
+
+        self.assertEqual(counts, {
+            'raw_insert_count': 2,
+            'raw_delete_count': 2,
+            'insert_count': 2,
+            'delete_count': 2,
+            'replace_count': None,
+            'equal_count': None,
+            'total_line_count': None,
+        })
+
+        with self.assertNumQueries(1):
+            counts = self.commits[0].get_total_line_counts()
+
+        self.assertEqual(counts['raw_insert_count'], 1)
+        self.assertEqual(counts['raw_delete_count'], 1)
+
+    def test_get_total_line_counts_with_partial_stored_counts(self):
+        """Testing DiffCommit.get_total_line_counts() with line counts only
+        stored on some FileDiffs
+        """
+        filediff = self.commits[0].files.get()
+        filediff.set_line_counts(replace_count=1,
+                                 equal_count=3,
+                                 total_line_count=5)
+
+        self.assertEqual(self.diffset.get_total_line_counts(), {
+            'raw_insert_count': 2,
+            'raw_delete_count': 2,
+            'insert_count': 2,
+            'delete_count': 2,
+            'replace_count': 1,
+            'equal_count': 3,
+            'total_line_count': 5,
+        })
+
+        # The remaining FileDiff should now have its line counts stored.
+        self.assertFalse(
+            self.diffset.files.filter(raw_insert_count__isnull=True).exists())
+
     def test_ordering(self):
         """Testing DiffCommits are returned in the correct order"""
         commits = list(DiffCommit.objects.all())
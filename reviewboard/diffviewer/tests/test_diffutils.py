@@ -1,10 +1,13 @@
 from __future__ import print_function, unicode_literals
 
+import hashlib
+
 import kgb
 from django.contrib.auth.models import AnonymousUser
 from django.test.client import RequestFactory
 from django.utils import six
 from django.utils.six.moves import zip_longest
+from djblets.cache.backend import cache_memoize
 from djblets.siteconfig.models import SiteConfiguration
 from djblets.testing.decorators import add_fixtures
 
@@ -27,9 +30,14 @@ from reviewboard.diffviewer.diffutils import (
     get_revision_str,
     get_sorted_filediffs,
     patch,
+    prefetch_original_files,
     split_line_endings,
+    PATCH_ENGINE_BUILTIN,
+    PATCH_ENGINE_COMMAND,
     _PATCH_GARBAGE_INPUT,
-    _get_last_header_in_chunks_before_line)
+    _get_last_header_in_chunks_before_line,
+    _make_original_file_cache_keys,
+    _run_patch_command)
 from reviewboard.diffviewer.errors import PatchError
 from reviewboard.diffviewer.models import DiffCommit, FileDiff
 from reviewboard.scmtools.core import PRE_CREATION
@@ -3224,8 +3232,14 @@ class DiffExpansionHeaderTests(TestCase):
                          lines[header['left']['line'] - 1][2])
 
 
-class PatchTests(TestCase):
-    """Unit tests for patch."""
+class PatchTestsMixin(object):
+    """Mixin for unit tests for patch.
+
+    These tests are run against each patch engine.
+    """
+
+    #: The patch engine to test.
+    patch_engine = None
 
     def test_patch(self):
         """Testing patch"""
@@ -3259,7 +3273,8 @@ class PatchTests(TestCase):
 
         patched = patch(diff=diff,
                         orig_file=old,
-                        filename='foo.c')
+                        filename='foo.c',
+                        engine=self.patch_engine)
         self.assertEqual(patched, new)
 
         diff = (b'--- README\t2007-01-24 02:10:28.000000000 -0800\n'
@@ -3276,7 +3291,8 @@ class PatchTests(TestCase):
         with self.assertRaises(Exception):
             patch(diff=diff,
                   orig_file=old,
-                  filename='foo.c')
+                  filename='foo.c',
+                  engine=self.patch_engine)
 
     def test_empty_patch(self):
         """Testing patch with an empty diff"""
@@ -3284,7 +3300,8 @@ class PatchTests(TestCase):
         diff = ''
         patched = patch(diff=diff,
                         orig_file=old,
-                        filename='test.c')
+                        filename='test.c',
+                        engine=self.patch_engine)
         self.assertEqual(patched, old)
 
     def test_patch_crlf_file_crlf_diff(self):
@@ -3317,7 +3334,8 @@ class PatchTests(TestCase):
 
         patched = patch(diff=diff,
                         orig_file=old,
-                        filename='README')
+                        filename='README',
+                        engine=self.patch_engine)
         self.assertEqual(patched, new)
 
     def test_patch_cr_file_crlf_diff(self):
@@ -3350,7 +3368,8 @@ class PatchTests(TestCase):
 
         patched = patch(diff=diff,
                         orig_file=old,
-                        filename='README')
+                        filename='README',
+                        engine=self.patch_engine)
         self.assertEqual(patched, new)
 
     def test_patch_crlf_file_cr_diff(self):
@@ -3383,7 +3402,8 @@ class PatchTests(TestCase):
 
         patched = patch(diff=diff,
                         orig_file=old,
-                        filename='README')
+                        filename='README',
+                        engine=self.patch_engine)
         self.assertEqual(patched, new)
 
     def test_patch_file_with_fake_no_newline(self):
@@ -3462,10 +3482,198 @@ class PatchTests(TestCase):
 
         patched = patch(diff=diff,
                         orig_file=old,
-                        filename='README')
+                        filename='README',
+                        engine=self.patch_engine)
         self.assertEqual(patched, new)
 
 
+class BuiltinPatchTests(PatchTestsMixin, kgb.SpyAgency, TestCase):
+    """Unit tests for patch with the in-process engine."""
+
+    patch_engine = PATCH_ENGINE_BUILTIN
+
+    def test_patch_does_not_run_command(self):
+        """Testing patch with the in-process engine does not run patch(1)"""
+        self.spy_on(_run_patch_command)
+
+        diff = (b'--- README\t2007-01-24 02:10:28.000000000 -0800\n'
+                b'+++ README\t2007-01-24 02:11:01.000000000 -0800\n'
+                b'@@ -1,2 +1,2 @@\n'
+                b' Line 1\n'
+                b'-Line 2\n'
+                b'+Line 2!\n')
+
+        patched = patch(diff=diff,
+                        orig_file=b'Line 1\nLine 2\n',
+                        filename='README',
+                        engine=self.patch_engine)
+        self.assertEqual(patched, b'Line 1\nLine 2!\n')
+        self.assertFalse(_run_patch_command.called)
+
+    def test_patch_with_unsupported_diff(self):
+        """Testing patch with the in-process engine falls back on patch(1)
+        for unsupported diffs
+        """
+        self.spy_on(_run_patch_command)
+
+        diff = (b'*** README\t2007-01-24 02:10:28.000000000 -0800\n'
+                b'--- README\t2007-01-24 02:11:01.000000000 -0800\n'
+                b'***************\n'
+                b'*** 1,2 ****\n'
+                b'  Line 1\n'
+                b'! Line 2\n'
+                b'--- 1,2 ----\n'
+                b'  Line 1\n'
+                b'! Line 2!\n')
+
+        patched = patch(diff=diff,
+                        orig_file=b'Line 1\nLine 2\n',
+                        filename='README',
+                        engine=self.patch_engine)
+        self.assertEqual(patched, b'Line 1\nLine 2!\n')
+        self.assertTrue(_run_patch_command.called)
+
+    def test_patch_with_siteconfig_engine(self):
+        """Testing patch uses the diffviewer_patch_engine setting"""
+        self.spy_on(_run_patch_command)
+
+        diff = (b'--- README\t2007-01-24 02:10:28.000000000 -0800\n'
+                b'+++ README\t2007-01-24 02:11:01.000000000 -0800\n'
+                b'@@ -1,2 +1,2 @@\n'
+                b' Line 1\n'
+                b'-Line 2\n'
+                b'+Line 2!\n')
+
+        with self.siteconfig_settings({'diffviewer_patch_engine':
+                                       PATCH_ENGINE_COMMAND}):
+            patched = patch(diff=diff,
+                            orig_file=b'Line 1\nLine 2\n',
+                            filename='README')
+
+        self.assertEqual(patched, b'Line 1\nLine 2!\n')
+        self.assertTrue(_run_patch_command.called)
+
+    def test_patch_with_overlapping_context(self):
+        """Testing patch with the in-process engine matches patch(1) for
+        hunks sharing context lines with an offset
+        """
+        self._test_matches_command(
+            diff=(b'--- README\n'
+                  b'+++ README\n'
+                  b'@@ -1,4 +1,4 @@\n'
+                  b' Line 1\n'
+                  b'-Line 2\n'
+                  b'+Line two\n'
+                  b' Line 3\n'
+                  b' Line 4\n'
+                  b'@@ -4,3 +4,3 @@\n'
+                  b' Line 4\n'
+                  b'-Line 5\n'
+                  b'+Line five\n'
+                  b' Line 6\n'),
+            orig_file=(b'Line 0\n' +
+                       b''.join(b'Line %d\n' % i for i in range(1, 11))))
+
+    def test_patch_with_only_mismatched_context(self):
+        """Testing patch with the in-process engine matches patch(1) for
+        a hunk whose context doesn't match anywhere
+        """
+        self._test_matches_command(
+            diff=(b'--- README\n'
+                  b'+++ README\n'
+                  b'@@ -3,4 +3,5 @@\n'
+                  b' Line A\n'
+                  b' Line B\n'
+                  b'+Line new\n'
+                  b' Line C\n'
+                  b' Line D\n'),
+            orig_file=b''.join(b'Line %d\n' % i for i in range(1, 11)))
+
+    def test_patch_with_fuzz(self):
+        """Testing patch with the in-process engine matches patch(1) for
+        hunks requiring fuzz
+        """
+        orig_file = b''.join(b'Line %d\n' % i for i in range(1, 21))
+
+        # Fuzz 1 on a hunk with unbalanced context.
+        self._test_matches_command(
+            diff=(b'--- README\n'
+                  b'+++ README\n'
+                  b'@@ -6,6 +6,6 @@\n'
+                  b' Line X\n'
+                  b' Line 7\n'
+                  b' Line 8\n'
+                  b'-Line 9\n'
+                  b'+Line nine\n'
+                  b' Line 10\n'
+                  b' Line 11\n'),
+            orig_file=orig_file)
+
+        # Beyond the fuzz that patch(1) allows.
+        self._test_matches_command(
+            diff=(b'--- README\n'
+                  b'+++ README\n'
+                  b'@@ -6,7 +6,7 @@\n'
+                  b' Line X\n'
+                  b' Line Y\n'
+                  b' Line Z\n'
+                  b'-Line 9\n'
+                  b'+Line nine\n'
+                  b' Line 10\n'
+                  b' Line 11\n'
+                  b' Line 12\n'),
+            orig_file=orig_file)
+
+    def test_patch_with_reversed(self):
+        """Testing patch with the in-process engine matches patch(1) for
+        a reversed patch
+        """
+        self._test_matches_command(
+            diff=(b'--- README\n'
+                  b'+++ README\n'
+                  b'@@ -1,3 +1,3 @@\n'
+                  b' Line 1\n'
+                  b'-Line 2\n'
+                  b'+Line two\n'
+                  b' Line 3\n'),
+            orig_file=b'Line 1\nLine two\nLine 3\n')
+
+    def _test_matches_command(self, diff, orig_file):
+        """Assert that the in-process engine matches patch(1).
+
+        Args:
+            diff (bytes):
+                The diff to apply.
+
+            orig_file (bytes):
+                The original file to apply the diff to.
+
+        Raises:
+            AssertionError:
+                The results differed.
+        """
+        results = []
+
+        for engine in (PATCH_ENGINE_BUILTIN, PATCH_ENGINE_COMMAND):
+            try:
+                result = patch(diff=diff,
+                               orig_file=orig_file,
+                               filename='README',
+                               engine=engine)
+            except PatchError as e:
+                result = (e.error_output, e.new_file, e.rejects)
+
+            results.append(result)
+
+        self.assertEqual(results[0], results[1])
+
+
+class CommandPatchTests(PatchTestsMixin, TestCase):
+    """Unit tests for patch with the patch(1) engine."""
+
+    patch_engine = PATCH_ENGINE_COMMAND
+
+
 class GetFileDiffEncodingsTests(TestCase):
     """Unit tests for get_filediff_encodings."""
 
@@ -3583,7 +3791,7 @@ class GetOriginalFileTests(BaseFileDiffAncestorTests):
         # input" error, but newer versions will handle it just fine. We stub
         # out patch here to always fail so we can test for the case of an older
         # version of patch without requiring it to be installed.
-        def _patch(diff, orig_file, filename, request=None):
+        def _patch(diff, orig_file, filename, request=None, engine=None):
             raise PatchError(
                 filename=filename,
                 error_output=_PATCH_GARBAGE_INPUT,
@@ -3638,7 +3846,7 @@ class GetOriginalFileTests(BaseFileDiffAncestorTests):
         # Newer versions of patch will allow empty patches. We stub out patch
         # here to always fail so we can test for the case of a newer version
         # of patch without requiring it to be installed.
-        def _patch(diff, orig_file, filename, request=None):
+        def _patch(diff, orig_file, filename, request=None, engine=None):
             # This is the only call to patch() that should be made.
             self.assertEqual(diff,
                              b'diff --git a/corge b/corge\n'
@@ -3687,6 +3895,77 @@ class GetOriginalFileTests(BaseFileDiffAncestorTests):
 
         self.assertEqual(orig, b'')
 
+    def test_with_ancestors_cached(self):
+        """Testing get_original_file with ancestors caches the computed
+        original files
+        """
+        self.set_up_filediffs()
+
+        filediff = FileDiff.objects.get(dest_file='qux', dest_detail='03b37a0',
+                                        commit_id=3)
+
+        self.spy_on(patch)
+
+        self.assertEqual(get_original_file(filediff=filediff), b'foo\n')
+        self.assertEqual(len(patch.calls), 1)
+
+        # The result for the FileDiff and its ancestors should now be cached,
+        # so nothing needs to be patched again.
+        self.assertEqual(get_original_file(filediff=filediff), b'foo\n')
+        self.assertEqual(len(patch.calls), 1)
+
+        ancestor = FileDiff.objects.get(dest_file='foo', dest_detail='257cc56',
+                                        commit_id=2)
+        self.assertEqual(get_original_file(filediff=ancestor), b'')
+        self.assertEqual(len(patch.calls), 1)
+
+    def test_with_ancestors_cached_by_known_sha256(self):
+        """Testing get_original_file with ancestors uses original files
+        cached under SHA256s stored on the FileDiffs
+        """
+        self.set_up_filediffs()
+
+        filediff = FileDiff.objects.get(dest_file='qux', dest_detail='03b37a0',
+                                        commit_id=3)
+        sha256 = hashlib.sha256(b'foo\n').hexdigest()
+
+        ancestor = filediff.get_ancestors(minimal=True)[-1]
+        ancestor.extra_data['patched_sha256'] = sha256
+        ancestor.save(update_fields=('extra_data',))
+
+        # Simulate another FileDiff with the same original file having been
+        # computed.
+        cache_memoize(_make_original_file_cache_keys(filediff, sha256)[1],
+                      lambda: [b'foo\n'],
+                      large_data=True)
+
+        self.spy_on(patch)
+
+        self.assertEqual(get_original_file(filediff=filediff), b'foo\n')
+        self.assertFalse(patch.called)
+
+    def test_with_ancestors_cached_mismatch(self):
+        """Testing get_original_file with ancestors ignores cached original
+        files that don't match their SHA256
+        """
+        self.set_up_filediffs()
+
+        filediff = FileDiff.objects.get(dest_file='qux', dest_detail='03b37a0',
+                                        commit_id=3)
+
+        self.assertEqual(get_original_file(filediff=filediff), b'foo\n')
+
+        data_key = _make_original_file_cache_keys(
+            filediff,
+            hashlib.sha256(b'foo\n').hexdigest())[1]
+        cache_memoize(data_key, lambda: [b'bad\n'], large_data=True,
+                      force_overwrite=True)
+
+        self.spy_on(patch)
+
+        self.assertEqual(get_original_file(filediff=filediff), b'foo\n')
+        self.assertEqual(len(patch.calls), 1)
+
     def test_with_encoding_list(self):
         """Testing get_original_file with encoding_list is deprecated"""
         self.set_up_filediffs()
@@ -3861,6 +4140,41 @@ class GetOriginalFileTests(BaseFileDiffAncestorTests):
                          'filediff_value')
 
 
+class PrefetchOriginalFilesTests(BaseFileDiffAncestorTests):
+    """Unit tests for prefetch_original_files."""
+
+    def test_prefetch_original_files(self):
+        """Testing prefetch_original_files"""
+        self.set_up_filediffs()
+
+        self.spy_on(Repository.prefetch_files,
+                    owner=Repository,
+                    op=kgb.SpyOpReturn(1))
+
+        by_details = self.get_filediffs_by_details()
+        filediffs = [
+            by_details[(2, 'foo', 'e69de29', 'foo', '257cc56')],
+            by_details[(2, 'bar', '8e739cc', 'bar', '0000000')],
+            by_details[(3, 'corge', 'e69de29', 'corge', 'f248ba3')],
+        ]
+
+        self.assertEqual(prefetch_original_files(filediffs), 1)
+        self.assertSpyCallCount(Repository.prefetch_files, 1)
+
+        # Only the original file of the oldest ancestor of bar needs to come
+        # from the repository. foo was created in the first commit and corge
+        # was created in a parent diff.
+        files = Repository.prefetch_files.last_call.args[0]
+        self.assertEqual(
+            [
+                (path, revision)
+                for path, revision, context in files
+            ],
+            [('bar', 'e69de29')])
+        self.assertEqual(files[0][2].base_commit_id,
+                         self.diffset.base_commit_id)
+
+
 class SplitLineEndingsTests(TestCase):
     """Unit tests for reviewboard.diffviewer.diffutils.split_line_endings."""
 
@@ -0,0 +1,184 @@
+"""Unit tests for reviewboard.diffviewer.managers.FileUntouchedCommentManager.
+"""
+
+from __future__ import unicode_literals
+
+from importlib import import_module
+
+from django.core.cache import cache
+from django.db import connection
+from kgb import SpyAgency
+
+from reviewboard.diffviewer.models import FileUntouchedComment
+from reviewboard.testing import TestCase
+
+
+class FileUntouchedCommentManagerTests(SpyAgency, TestCase):
+    """Unit tests for FileUntouchedCommentManager."""
+
+    def test_save_sets_lookup_hash(self):
+        """Testing FileUntouchedComment.save sets lookup_hash"""
+        untouched_file = FileUntouchedComment.objects.create(
+            untouched_file_path='README',
+            untouched_file_hashcode='a' * 40)
+
+        self.assertEqual(
+            untouched_file.lookup_hash,
+            FileUntouchedComment.make_lookup_hash('README', 'a' * 40))
+        self.assertEqual(len(untouched_file.lookup_hash), 40)
+
+    def test_make_lookup_hash_distinct(self):
+        """Testing FileUntouchedComment.make_lookup_hash with ambiguous
+        concatenations
+        """
+        self.assertNotEqual(FileUntouchedComment.make_lookup_hash('ab', 'c'),
+                            FileUntouchedComment.make_lookup_hash('a', 'bc'))
+
+    def test_get_for_file(self):
+        """Testing FileUntouchedCommentManager.get_for_file"""
+        untouched_file = FileUntouchedComment.objects.create(
+            untouched_file_path='README',
+            untouched_file_hashcode='a' * 40)
+        FileUntouchedComment.objects.create(
+            untouched_file_path='README',
+            untouched_file_hashcode='b' * 40)
+        cache.clear()
+
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                FileUntouchedComment.objects.get_for_file('README', 'a' * 40),
+                untouched_file)
+
+    def test_get_for_file_not_found(self):
+        """Testing FileUntouchedCommentManager.get_for_file with no
+        matching file
+        """
+        FileUntouchedComment.objects.create(
+            untouched_file_path='README',
+            untouched_file_hashcode='a' * 40)
+
+        self.assertIsNone(
+            FileUntouchedComment.objects.get_for_file('setup.py', 'a' * 40))
+
+    def test_get_for_file_cached(self):
+        """Testing FileUntouchedCommentManager.get_for_file caches results"""
+        untouched_file = FileUntouchedComment.objects.create(
+            untouched_file_path='README',
+            untouched_file_hashcode='a' * 40)
+        cache.clear()
+
+        with self.assertNumQueries(2):
+            self.assertEqual(
+                FileUntouchedComment.objects.get_for_file('README', 'a' * 40),
+                untouched_file)
+            self.assertIsNone(
+                FileUntouchedComment.objects.get_for_file('README', 'b' * 40))
+
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                FileUntouchedComment.objects.get_for_file('README', 'a' * 40),
+                untouched_file)
+            self.assertIsNone(
+                FileUntouchedComment.objects.get_for_file('README', 'b' * 40))
+
+    def test_get_for_file_after_create(self):
+        """Testing FileUntouchedCommentManager.get_for_file after creating
+        a file that was previously looked up
+        """
+        self.assertIsNone(
+            FileUntouchedComment.objects.get_for_file('README', 'a' * 40))
+
+        untouched_file = FileUntouchedComment.objects.create(
+            untouched_file_path='README',
+            untouched_file_hashcode='a' * 40)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                FileUntouchedComment.objects.get_for_file('README', 'a' * 40),
+                untouched_file)
+
+    def test_get_for_file_after_delete(self):
+        """Testing FileUntouchedCommentManager.get_for_file after deleting
+        the file
+        """
+        untouched_file = FileUntouchedComment.objects.create(
+            untouched_file_path='README',
+            untouched_file_hashcode='a' * 40)
+        untouched_file.delete()
+
+        self.assertIsNone(
+            FileUntouchedComment.objects.get_for_file('README', 'a' * 40))
+
+    def test_get_for_file_after_queryset_delete(self):
+        """Testing FileUntouchedCommentManager.get_for_file after deleting
+        the file through a queryset
+        """
+        FileUntouchedComment.objects.create(
+            untouched_file_path='README',
+            untouched_file_hashcode='a' * 40)
+        FileUntouchedComment.objects.filter(
+            untouched_file_path='README').delete()
+
+        self.assertIsNone(
+            FileUntouchedComment.objects.get_for_file('README', 'a' * 40))
+
+    def test_get_for_file_cache_expiration(self):
+        """Testing FileUntouchedCommentManager.get_for_file caches results
+        with an expiration
+        """
+        cache_backend = cache.backend
+        self.spy_on(cache_backend.set)
+
+        FileUntouchedComment.objects.get_for_file('README', 'a' * 40)
+
+        self.assertSpyCalledWith(
+            cache_backend.set,
+            timeout=FileUntouchedComment.cache_expiration)
+
+    def test_lookup_hash_evolution(self):
+        """Testing the fileuntouchedcomment_lookup_hash evolution populates
+        lookup hashes for existing files
+        """
+        untouched_file = FileUntouchedComment.objects.create(
+            untouched_file_path='README',
+            untouched_file_hashcode='a' * 40)
+        FileUntouchedComment.objects.filter(pk=untouched_file.pk).update(
+            lookup_hash='')
+
+        evolution = import_module('reviewboard.diffviewer.evolutions.'
+                                  'fileuntouchedcomment_lookup_hash')
+
+        with connection.cursor() as cursor:
+            for sql, params in evolution._populate_lookup_hashes(cursor):
+                cursor.execute(sql, params)
+
+        untouched_file = FileUntouchedComment.objects.get(
+            pk=untouched_file.pk)
+        self.assertEqual(
+            untouched_file.lookup_hash,
+            FileUntouchedComment.make_lookup_hash('README', 'a' * 40))
+
+    def test_get_or_create_for_file_existing(self):
+        """Testing FileUntouchedCommentManager.get_or_create_for_file with
+        an existing file
+        """
+        untouched_file = FileUntouchedComment.objects.create(
+            untouched_file_path='README',
+            untouched_file_hashcode='a' * 40)
+
+        self.assertEqual(
+            FileUntouchedComment.objects.get_or_create_for_file('README',
+                                                                'a' * 40),
+            untouched_file)
+        self.assertEqual(FileUntouchedComment.objects.count(), 1)
+
+    def test_get_or_create_for_file_new(self):
+        """Testing FileUntouchedCommentManager.get_or_create_for_file with
+        a new file
+        """
+        untouched_file = FileUntouchedComment.objects.get_or_create_for_file(
+            'README', 'a' * 40)
+
+        self.assertIsNotNone(untouched_file.pk)
+        self.assertEqual(untouched_file.untouched_file_path, 'README')
+        self.assertEqual(untouched_file.untouched_file_hashcode, 'a' * 40)
@@ -6,7 +6,7 @@ from itertools import chain
 
 from django.utils import six
 
-from reviewboard.diffviewer.models import DiffSet, FileDiff
+from reviewboard.diffviewer.models import DiffSet, FileDiff, RawFileDiffData
 from reviewboard.diffviewer.tests.test_diffutils import \
     BaseFileDiffAncestorTests
 from reviewboard.testing import TestCase
@@ -88,6 +88,164 @@ class FileDiffTests(TestCase):
         self.assertEqual(diff_hash.insert_count, 1)
         self.assertEqual(diff_hash.delete_count, 2)
 
+    def test_set_line_counts_stores_fields(self):
+        """Testing FileDiff.set_line_counts stores line count fields"""
+        self.filediff.save()
+        self.filediff.set_line_counts(raw_insert_count=1,
+                                      raw_delete_count=2)
+
+        filediff = FileDiff.objects.get(pk=self.filediff.pk)
+        self.assertEqual(filediff.raw_insert_count, 1)
+        self.assertEqual(filediff.raw_delete_count, 2)
+        self.assertEqual(filediff.insert_count, 1)
+        self.assertEqual(filediff.delete_count, 2)
+        self.assertIsNone(filediff.replace_count)
+        self.assertIsNone(filediff.equal_count)
+        self.assertIsNone(filediff.total_line_count)
+
+        filediff.set_line_counts(insert_count=3,
+                                 delete_count=4,
+                                 replace_count=5,
+                                 equal_count=6,
+                                 total_line_count=18)
+
+        filediff = FileDiff.objects.get(pk=self.filediff.pk)
+        self.assertEqual(filediff.raw_insert_count, 1)
+        self.assertEqual(filediff.raw_delete_count, 2)
+        self.assertEqual(filediff.insert_count, 3)
+        self.assertEqual(filediff.delete_count, 4)
+        self.assertEqual(filediff.replace_count, 5)
+        self.assertEqual(filediff.equal_count, 6)
+        self.assertEqual(filediff.total_line_count, 18)
+
+    def test_get_line_counts_stores_fields(self):
+        """Testing FileDiff.get_line_counts stores line count fields for
+        FileDiffs without them
+        """
+        self.filediff.save()
+
+        self.assertIsNone(self.filediff.raw_insert_count)
+        self.filediff.get_line_counts()
+
+        filediff = FileDiff.objects.get(pk=self.filediff.pk)
+        self.assertEqual(filediff.raw_insert_count, 2)
+        self.assertEqual(filediff.raw_delete_count, 1)
+        self.assertEqual(filediff.insert_count, 2)
+        self.assertEqual(filediff.delete_count, 1)
+
+        # Once stored, fetching line counts shouldn't write anything.
+        with self.assertNumQueries(0):
+            filediff.get_line_counts()
+
+    def test_backfill_line_counts(self):
+        """Testing FileDiffManager.backfill_line_counts"""
+        self.filediff.save()
+        filediff2 = self.create_filediff(self.diffset)
+        filediff2.set_line_counts(raw_insert_count=4,
+                                  raw_delete_count=5)
+
+        batches = []
+
+        self.assertEqual(
+            FileDiff.objects.backfill_line_counts(
+                batch_done_cb=lambda **kwargs: batches.append(kwargs)),
+            1)
+        self.assertEqual(batches, [{'total_diffs_processed': 1}])
+
+        filediff = FileDiff.objects.get(pk=self.filediff.pk)
+        self.assertEqual(filediff.raw_insert_count, 2)
+        self.assertEqual(filediff.raw_delete_count, 1)
+
+        self.assertEqual(FileDiff.objects.backfill_line_counts(), 0)
+
+    def test_iter_diff(self):
+        """Testing FileDiff.iter_diff"""
+        diff = b''.join(
+            b'+Line %d\n' % i
+            for i in range(50000)
+        )
+        self.filediff.diff = diff
+
+        self.assertIsNotNone(self.filediff.diff_hash.compression)
+
+        chunks = list(self.filediff.iter_diff())
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(b''.join(chunks), diff)
+
+    def test_get_interdiff_filter_ranges(self):
+        """Testing FileDiff.get_interdiff_filter_ranges"""
+        self.assertEqual(self.filediff.get_interdiff_filter_ranges(),
+                         [(1, 3)])
+
+        diff_hash = self.filediff.diff_hash
+        self.assertEqual(
+            diff_hash.extra_data['interdiff_filter_ranges'],
+            {
+                'version': diff_hash.INTERDIFF_FILTER_RANGES_VERSION,
+                'ranges': [[1, 3]],
+            })
+
+    def test_get_interdiff_filter_ranges_with_outdated_ranges(self):
+        """Testing FileDiff.get_interdiff_filter_ranges with outdated stored
+        ranges
+        """
+        # Migrate the legacy diff, so there's a RawFileDiffData to modify.
+        self.filediff.get_interdiff_filter_ranges()
+        self.filediff.save()
+
+        diff_hash = self.filediff.diff_hash
+        diff_hash.extra_data['interdiff_filter_ranges'] = {
+            'version': 0,
+            'ranges': [[100, 200]],
+        }
+        diff_hash.save(update_fields=('extra_data',))
+
+        filediff = FileDiff.objects.get(pk=self.filediff.pk)
+        self.assertEqual(filediff.get_interdiff_filter_ranges(), [(1, 3)])
+
+        diff_hash = RawFileDiffData.objects.get(pk=diff_hash.pk)
+        self.assertEqual(
+            diff_hash.extra_data['interdiff_filter_ranges'],
+            {
+                'version': diff_hash.INTERDIFF_FILTER_RANGES_VERSION,
+                'ranges': [[1, 3]],
+            })
+
+    def test_get_interdiff_filter_ranges_preserves_concurrent_data(self):
+        """Testing FileDiff.get_interdiff_filter_ranges preserves extra_data
+        keys stored concurrently
+        """
+        # Migrate the legacy diff, so there's a RawFileDiffData to modify.
+        self.filediff.get_interdiff_filter_ranges()
+        self.filediff.save()
+
+        diff_hash = self.filediff.diff_hash
+        diff_hash.extra_data.pop('interdiff_filter_ranges')
+        diff_hash.save(update_fields=('extra_data',))
+
+        # Load a stale copy, and then have another process store line counts.
+        stale_diff_hash = RawFileDiffData.objects.get(pk=diff_hash.pk)
+
+        diff_hash = RawFileDiffData.objects.get(pk=diff_hash.pk)
+        diff_hash.insert_count = 100
+        diff_hash.delete_count = 50
+        diff_hash.save(update_fields=('extra_data',))
+
+        self.assertEqual(stale_diff_hash.insert_count, 2)
+        self.assertEqual(stale_diff_hash.get_interdiff_filter_ranges(),
+                         [(1, 3)])
+        self.assertEqual(stale_diff_hash.insert_count, 100)
+
+        diff_hash = RawFileDiffData.objects.get(pk=diff_hash.pk)
+        self.assertEqual(diff_hash.insert_count, 100)
+        self.assertEqual(diff_hash.delete_count, 50)
+        self.assertEqual(
+            diff_hash.extra_data['interdiff_filter_ranges'],
+            {
+                'version': diff_hash.INTERDIFF_FILTER_RANGES_VERSION,
+                'ranges': [[1, 3]],
+            })
+
     def test_long_filenames(self):
         """Testing FileDiff with long filenames (1024 characters)"""
         long_filename = 'x' * 1024
@@ -2,10 +2,13 @@
 
 from __future__ import unicode_literals
 
+import threading
+
 from django.utils.timezone import now
 
 from reviewboard.diffviewer.filediff_creator import create_filediffs
 from reviewboard.diffviewer.models import DiffCommit, DiffSet
+from reviewboard.scmtools.errors import FileNotFoundError
 from reviewboard.testing import TestCase
 
 
@@ -34,6 +37,26 @@ class FileDiffCreatorTests(TestCase):
 
         self.assertEqual(diffset.files.count(), 1)
 
+    def test_create_filediffs_stores_line_counts(self):
+        """Testing create_filediffs() stores line counts on the FileDiffs"""
+        repository = self.create_repository()
+        diffset = self.create_diffset(repository=repository)
+
+        create_filediffs(
+            self.DEFAULT_GIT_FILEDIFF_DATA_DIFF,
+            None,
+            repository=repository,
+            basedir='/',
+            base_commit_id='0' * 40,
+            diffset=diffset,
+            check_existence=False)
+
+        filediff = diffset.files.get()
+        self.assertEqual(filediff.raw_insert_count, 1)
+        self.assertEqual(filediff.raw_delete_count, 1)
+        self.assertEqual(filediff.insert_count, 1)
+        self.assertEqual(filediff.delete_count, 1)
+
     def test_create_filediffs_commit_file_count(self):
         """Testing create_filediffs() with a DiffSet and a DiffCommit"""
         repository = self.create_repository()
@@ -93,3 +116,128 @@ class FileDiffCreatorTests(TestCase):
 
         self.assertEqual(diffset.files.count(), 2)
         self.assertEqual(commits[1].files.count(), 1)
+
+    def test_create_filediffs_checks_existence_concurrently(self):
+        """Testing create_filediffs() checks file existence concurrently"""
+        repository = self.create_repository()
+        diffset = self.create_diffset(repository=repository)
+        num_files = 4
+
+        lock = threading.Lock()
+        all_started = threading.Event()
+        started = []
+
+        def _get_file_exists(path, revision, context):
+            with lock:
+                started.append(path)
+
+                if len(started) == num_files:
+                    all_started.set()
+
+            # This only succeeds if every check is running at once.
+            return all_started.wait(5)
+
+        create_filediffs(
+            self._build_diff(num_files),
+            None,
+            repository=repository,
+            basedir='/',
+            base_commit_id='0' * 40,
+            diffset=diffset,
+            get_file_exists=_get_file_exists)
+
+        self.assertEqual(sorted(started), [
+            '/file%d' % i
+            for i in range(num_files)
+        ])
+        self.assertEqual(diffset.files.count(), num_files)
+
+    def test_create_filediffs_checks_existence_with_max_workers(self):
+        """Testing create_filediffs() caps concurrent file existence checks
+        at Repository.CHECK_FILE_EXISTS_MAX_WORKERS
+        """
+        repository = self.create_repository()
+        repository.CHECK_FILE_EXISTS_MAX_WORKERS = 2
+        diffset = self.create_diffset(repository=repository)
+
+        lock = threading.Lock()
+        state = {
+            'running': 0,
+            'max_running': 0,
+        }
+
+        def _get_file_exists(path, revision, context):
+            with lock:
+                state['running'] += 1
+                state['max_running'] = max(state['running'],
+                                           state['max_running'])
+
+            threading.Event().wait(0.01)
+
+            with lock:
+                state['running'] -= 1
+
+            return True
+
+        create_filediffs(
+            self._build_diff(10),
+            None,
+            repository=repository,
+            basedir='/',
+            base_commit_id='0' * 40,
+            diffset=diffset,
+            get_file_exists=_get_file_exists)
+
+        self.assertEqual(diffset.files.count(), 10)
+        self.assertLessEqual(state['max_running'], 2)
+
+    def test_create_filediffs_checks_existence_fails_fast(self):
+        """Testing create_filediffs() stops checking file existence after
+        a file is not found
+        """
+        repository = self.create_repository()
+        repository.CHECK_FILE_EXISTS_MAX_WORKERS = 1
+        diffset = self.create_diffset(repository=repository)
+        num_files = 20
+        checked = []
+
+        def _get_file_exists(path, revision, context):
+            checked.append(path)
+
+            return False
+
+        with self.assertRaises(FileNotFoundError):
+            create_filediffs(
+                self._build_diff(num_files),
+                None,
+                repository=repository,
+                basedir='/',
+                base_commit_id='0' * 40,
+                diffset=diffset,
+                get_file_exists=_get_file_exists)
+
+        self.assertLess(len(checked), num_files)
+        self.assertEqual(diffset.files.count(), 0)
+
+    def _build_diff(self, num_files):
+        """Return a Git diff modifying several files.
+
+        Args:
+            num_files (int):
+                The number of files to modify.
+
+        Returns:
+            bytes:
+            The diff content.
+        """
+        return b''.join(
+            b'diff --git a/file%d b/file%d\n'
+            b'index 94bdd3e..197009f 100644\n'
+            b'--- a/file%d\n'
+            b'+++ b/file%d\n'
+            b'@@ -2 +2 @@\n'
+            b'-blah blah\n'
+            b'+blah!\n'
+            % (i, i, i, i)
+            for i in range(num_files)
+        )
@@ -1,11 +1,22 @@
 from __future__ import unicode_literals
 
-from reviewboard.diffviewer.myersdiff import MyersDiffer
+import os
+import random
+import re
+
+from reviewboard.diffviewer.differ import (DIFFER_ENGINE_CLASSIC,
+                                           DIFFER_ENGINE_FAST,
+                                           DiffCompatVersion,
+                                           get_differ)
+from reviewboard.diffviewer.myersdiff import FastMyersDiffer, MyersDiffer
 from reviewboard.testing import TestCase
 
 
-class MyersDifferTest(TestCase):
-    """Unit tests for MyersDiffer."""
+class MyersDifferTestsMixin(object):
+    """Unit tests shared by all Myers differ implementations."""
+
+    #: The differ class being tested.
+    differ_cls = None
 
     def test_equals(self):
         """Testing MyersDiffer with equal chunk"""
@@ -37,5 +48,109 @@ class MyersDifferTest(TestCase):
                          ('equal', 5, 8, 9, 12)])
 
     def _test_diff(self, a, b, expected):
-        opcodes = list(MyersDiffer(a, b).get_opcodes())
+        opcodes = list(self.differ_cls(a, b).get_opcodes())
         self.assertEqual(opcodes, expected)
+
+
+class MyersDifferTest(MyersDifferTestsMixin, TestCase):
+    """Unit tests for MyersDiffer."""
+
+    differ_cls = MyersDiffer
+
+
+class FastMyersDifferTests(MyersDifferTestsMixin, TestCase):
+    """Unit tests for FastMyersDiffer."""
+
+    differ_cls = FastMyersDiffer
+
+    def test_matches_myers_differ_with_testdata(self):
+        """Testing FastMyersDiffer matches MyersDiffer with test data"""
+        testdata_dir = os.path.join(os.path.dirname(__file__), '..',
+                                    'testdata', 'move_detection')
+
+        with open(os.path.join(testdata_dir, 'bug-4371-old.js'), 'rb') as f:
+            a = f.read().decode('utf-8').splitlines()
+
+        with open(os.path.join(testdata_dir, 'bug-4371-new.js'), 'rb') as f:
+            b = f.read().decode('utf-8').splitlines()
+
+        self._test_matches(a, b)
+        self._test_matches(b, a)
+
+    def test_matches_myers_differ_with_generated_data(self):
+        """Testing FastMyersDiffer matches MyersDiffer with generated
+        changes
+        """
+        rand = random.Random(4371)
+
+        for num_lines, num_unique in ((50, 3), (500, 20), (2000, 2000)):
+            vocab = [
+                '%sline %d' % (' ' * rand.randint(0, 4), i)
+                for i in range(num_unique)
+            ] + ['', '  ']
+
+            a = [rand.choice(vocab) for i in range(num_lines)]
+            b = list(a)
+
+            for i in range(num_lines // 10):
+                pos = rand.randrange(len(b))
+                change = rand.randint(0, 2)
+
+                if change == 0:
+                    b.insert(pos, rand.choice(vocab))
+                elif change == 1:
+                    del b[pos]
+                else:
+                    b[pos] = 'changed %d' % i
+
+            self._test_matches(a, b)
+
+    def _test_matches(self, a, b):
+        """Assert that both differs produce the same results.
+
+        Args:
+            a (list of unicode):
+                The original lines.
+
+            b (list of unicode):
+                The modified lines.
+        """
+        for compat_version in DiffCompatVersion.MYERS_VERSIONS:
+            for ignore_space in (False, True):
+                differ = MyersDiffer(a, b, ignore_space=ignore_space,
+                                     compat_version=compat_version)
+                fast_differ = FastMyersDiffer(a, b,
+                                              ignore_space=ignore_space,
+                                              compat_version=compat_version)
+
+                for d in (differ, fast_differ):
+                    d.add_interesting_line_regex('header',
+                                                 re.compile(r'^line 1'))
+
+                self.assertEqual(list(fast_differ.get_opcodes()),
+                                 list(differ.get_opcodes()))
+                self.assertEqual(fast_differ.ratio(), differ.ratio())
+                self.assertEqual(fast_differ.interesting_lines,
+                                 differ.interesting_lines)
+
+
+class GetDifferTests(TestCase):
+    """Unit tests for reviewboard.diffviewer.differ.get_differ."""
+
+    def test_default(self):
+        """Testing get_differ defaults to FastMyersDiffer"""
+        self.assertIs(type(get_differ([], [])), FastMyersDiffer)
+
+    def test_with_engine(self):
+        """Testing get_differ with engine="""
+        self.assertIs(type(get_differ([], [], engine=DIFFER_ENGINE_CLASSIC)),
+                      MyersDiffer)
+        self.assertIs(type(get_differ([], [], engine=DIFFER_ENGINE_FAST)),
+                      FastMyersDiffer)
+
+    def test_with_siteconfig(self):
+        """Testing get_differ with diffviewer_differ_engine setting"""
+        with self.siteconfig_settings({
+                'diffviewer_differ_engine': DIFFER_ENGINE_CLASSIC,
+            }):
+            self.assertIs(type(get_differ([], [])), MyersDiffer)
@@ -0,0 +1,369 @@
+from __future__ import unicode_literals
+
+from reviewboard.diffviewer.errors import UnsupportedPatchError
+from reviewboard.diffviewer.patcher import apply_patch, parse_hunks
+from reviewboard.testing import TestCase
+
+
+class ParseHunksTests(TestCase):
+    """Unit tests for reviewboard.diffviewer.patcher.parse_hunks."""
+
+    def test_parse_hunks(self):
+        """Testing parse_hunks"""
+        headers, hunks = parse_hunks(
+            b'diff --git a/README b/README\n'
+            b'index 94bdd3e..197009f 100644\n'
+            b'--- a/README\n'
+            b'+++ b/README\n'
+            b'@@ -1,2 +1,3 @@\n'
+            b' Line 1\n'
+            b'+Line 1.5\n'
+            b' Line 2\n'
+            b'@@ -10 +11 @@\n'
+            b'-Line 10\n'
+            b'\\ No newline at end of file\n'
+            b'+Line ten\n')
+
+        self.assertEqual(headers, [b'--- a/README', b'+++ b/README'])
+        self.assertEqual(len(hunks), 2)
+
+        hunk = hunks[0]
+        self.assertEqual(hunk.orig_start, 1)
+        self.assertEqual(hunk.orig_len, 2)
+        self.assertEqual(hunk.new_start, 1)
+        self.assertEqual(hunk.new_len, 3)
+        self.assertEqual(hunk.lines, [
+            [b' ', b'Line 1\n'],
+            [b'+', b'Line 1.5\n'],
+            [b' ', b'Line 2\n'],
+        ])
+
+        hunk = hunks[1]
+        self.assertEqual(hunk.orig_start, 10)
+        self.assertEqual(hunk.orig_len, 1)
+        self.assertEqual(hunk.new_start, 11)
+        self.assertEqual(hunk.new_len, 1)
+        self.assertEqual(hunk.lines, [
+            [b'-', b'Line 10'],
+            [b'+', b'Line ten\n'],
+        ])
+
+    def test_parse_hunks_with_context_diff(self):
+        """Testing parse_hunks with a context diff"""
+        with self.assertRaises(UnsupportedPatchError):
+            parse_hunks(
+                b'*** README\n'
+                b'--- README\n'
+                b'***************\n'
+                b'*** 1 ****\n'
+                b'! Line 1\n'
+                b'--- 1 ----\n'
+                b'! Line one\n')
+
+    def test_parse_hunks_with_multiple_files(self):
+        """Testing parse_hunks with changes to multiple files"""
+        with self.assertRaises(UnsupportedPatchError):
+            parse_hunks(
+                b'--- README\n'
+                b'+++ README\n'
+                b'@@ -1 +1 @@\n'
+                b'-Line 1\n'
+                b'+Line one\n'
+                b'--- INSTALL\n'
+                b'+++ INSTALL\n'
+                b'@@ -1 +1 @@\n'
+                b'-Line 1\n'
+                b'+Line one\n')
+
+    def test_parse_hunks_with_chopped_blank_lines(self):
+        """Testing parse_hunks with trailing blank context lines chopped off
+        the end of the diff
+        """
+        headers, hunks = parse_hunks(
+            b'--- README\n'
+            b'+++ README\n'
+            b'@@ -1,2 +1,3 @@\n'
+            b' Line 1\n'
+            b'+Line 2\n')
+
+        self.assertEqual(len(hunks), 1)
+        self.assertEqual(hunks[0].lines, [
+            [b' ', b'Line 1\n'],
+            [b'+', b'Line 2\n'],
+            [b' ', b'\n'],
+        ])
+
+    def test_parse_hunks_with_truncated_hunk(self):
+        """Testing parse_hunks with a truncated hunk"""
+        with self.assertRaises(ValueError):
+            parse_hunks(
+                b'--- README\n'
+                b'+++ README\n'
+                b'@@ -1,3 +1,3 @@\n'
+                b' Line 1\n'
+                b'-Line 2\n')
+
+
+class ApplyPatchTests(TestCase):
+    """Unit tests for reviewboard.diffviewer.patcher.apply_patch."""
+
+    orig_file = b''.join(
+        b'Line %d\n' % i
+        for i in range(1, 21)
+    )
+
+    def test_apply_patch(self):
+        """Testing apply_patch"""
+        diff = (
+            b'--- README\n'
+            b'+++ README\n'
+            b'@@ -1,3 +1,3 @@\n'
+            b' Line 1\n'
+            b'-Line 2\n'
+            b'+Line two\n'
+            b' Line 3\n'
+            b'@@ -8,3 +8,4 @@\n'
+            b' Line 8\n'
+            b'-Line 9\n'
+            b'+Line nine\n'
+            b'+Line nine and a half\n'
+            b' Line 10\n'
+        )
+
+        self.assertEqual(
+            apply_patch(diff=diff,
+                        orig_file=self.orig_file,
+                        filename='README'),
+            self.orig_file
+            .replace(b'Line 2\n', b'Line two\n')
+            .replace(b'Line 9\n', b'Line nine\nLine nine and a half\n'))
+
+    def test_with_offset(self):
+        """Testing apply_patch with a hunk at an offset"""
+        diff = (
+            b'--- README\n'
+            b'+++ README\n'
+            b'@@ -5,3 +5,3 @@\n'
+            b' Line 8\n'
+            b'-Line 9\n'
+            b'+Line nine\n'
+            b' Line 10\n'
+        )
+
+        with self.assertRaises(UnsupportedPatchError):
+            apply_patch(diff=diff,
+                        orig_file=self.orig_file,
+                        filename='README')
+
+    def test_with_fuzz(self):
+        """Testing apply_patch with a hunk requiring fuzz"""
+        diff = (
+            b'--- README\n'
+            b'+++ README\n'
+            b'@@ -7,5 +7,5 @@\n'
+            b' Line 7\n'
+            b' Line X\n'
+            b'-Line 9\n'
+            b'+Line nine\n'
+            b' Line 10\n'
+            b' Line 11\n'
+        )
+
+        with self.assertRaises(UnsupportedPatchError):
+            apply_patch(diff=diff,
+                        orig_file=self.orig_file,
+                        filename='README')
+
+    def test_with_only_mismatched_context(self):
+        """Testing apply_patch with a hunk whose context doesn't match
+        anywhere
+        """
+        diff = (
+            b'--- README\n'
+            b'+++ README\n'
+            b'@@ -5,4 +5,5 @@\n'
+            b' Line A\n'
+            b' Line B\n'
+            b'+Line new\n'
+            b' Line C\n'
+            b' Line D\n'
+        )
+
+        with self.assertRaises(UnsupportedPatchError):
+            apply_patch(diff=diff,
+                        orig_file=self.orig_file,
+                        filename='README')
+
+    def test_with_overlapping_context(self):
+        """Testing apply_patch with hunks sharing context lines"""
+        diff = (
+            b'--- README\n'
+            b'+++ README\n'
+            b'@@ -1,4 +1,4 @@\n'
+            b' Line 1\n'
+            b'-Line 2\n'
+            b'+Line two\n'
+            b' Line 3\n'
+            b' Line 4\n'
+            b'@@ -4,3 +4,3 @@\n'
+            b' Line 4\n'
+            b'-Line 5\n'
+            b'+Line five\n'
+            b' Line 6\n'
+        )
+
+        with self.assertRaises(UnsupportedPatchError):
+            apply_patch(diff=diff,
+                        orig_file=self.orig_file,
+                        filename='README')
+
+    def test_with_context_anchored_to_end(self):
+        """Testing apply_patch with a hunk with less trailing context that
+        isn't at the end of the file
+        """
+        diff = (
+            b'--- README\n'
+            b'+++ README\n'
+            b'@@ -1,3 +1,3 @@\n'
+            b' Line 1\n'
+            b' Line 2\n'
+            b'-Line 3\n'
+            b'+Line three\n'
+        )
+
+        with self.assertRaises(UnsupportedPatchError):
+            apply_patch(diff=diff,
+                        orig_file=self.orig_file,
+                        filename='README')
+
+    def test_with_reversed(self):
+        """Testing apply_patch with a reversed patch"""
+        diff = (
+            b'--- README\n'
+            b'+++ README\n'
+            b'@@ -1,3 +1,3 @@\n'
+            b' Line 1\n'
+            b'-Line two\n'
+            b'+Line 2\n'
+            b' Line 3\n'
+        )
+
+        with self.assertRaises(UnsupportedPatchError):
+            apply_patch(diff=diff,
+                        orig_file=self.orig_file,
+                        filename='README')
+
+    def test_with_malformed_diff(self):
+        """Testing apply_patch with a malformed diff"""
+        diff = (
+            b'--- README\n'
+            b'+++ README\n'
+            b'@@ -1,3 +1,3 @@\n'
+            b' Line 1\n'
+            b'?Line 2\n'
+        )
+
+        with self.assertRaises(UnsupportedPatchError):
+            apply_patch(diff=diff,
+                        orig_file=self.orig_file,
+                        filename='README')
+
+    def test_with_no_newline_added(self):
+        """Testing apply_patch with removing the trailing newline"""
+        diff = (
+            b'--- README\n'
+            b'+++ README\n'
+            b'@@ -19,2 +19,2 @@\n'
+            b' Line 19\n'
+            b'-Line 20\n'
+            b'+Line 20\n'
+            b'\\ No newline at end of file\n'
+        )
+
+        self.assertEqual(
+            apply_patch(diff=diff,
+                        orig_file=self.orig_file,
+                        filename='README'),
+            self.orig_file[:-1])
+
+    def test_with_empty_line_without_newline(self):
+        """Testing apply_patch with adding an empty line without a newline"""
+        diff = (
+            b'--- README\n'
+            b'+++ README\n'
+            b'@@ -19,2 +19,2 @@\n'
+            b' Line 19\n'
+            b'-Line 20\n'
+            b'+\n'
+            b'\\ No newline at end of file\n'
+        )
+
+        with self.assertRaises(UnsupportedPatchError):
+            apply_patch(diff=diff,
+                        orig_file=self.orig_file,
+                        filename='README')
+
+    def test_with_no_newline_mismatch(self):
+        """Testing apply_patch with a "No newline at end of file" marker
+        on a line that is not at the end of the file
+        """
+        diff = (
+            b'--- README\n'
+            b'+++ README\n'
+            b'@@ -1 +1 @@\n'
+            b'-Line 1\n'
+            b'\\ No newline at end of file\n'
+            b'+Line one\n'
+        )
+
+        with self.assertRaises(UnsupportedPatchError):
+            apply_patch(diff=diff,
+                        orig_file=self.orig_file,
+                        filename='README')
+
+    def test_with_new_file(self):
+        """Testing apply_patch with a newly-created file"""
+        diff = (
+            b'--- /dev/null\n'
+            b'+++ README\n'
+            b'@@ -0,0 +1,2 @@\n'
+            b'+Line 1\n'
+            b'+Line 2\n'
+        )
+
+        self.assertEqual(
+            apply_patch(diff=diff,
+                        orig_file=b'',
+                        filename='README'),
+            b'Line 1\nLine 2\n')
+
+    def test_with_new_file_existing(self):
+        """Testing apply_patch with a newly-created file that already has
+        content
+        """
+        diff = (
+            b'--- /dev/null\n'
+            b'+++ README\n'
+            b'@@ -0,0 +1,2 @@\n'
+            b'+Line 1\n'
+            b'+Line 2\n'
+        )
+
+        with self.assertRaises(UnsupportedPatchError):
+            apply_patch(diff=diff,
+                        orig_file=self.orig_file,
+                        filename='README')
+
+    def test_with_no_hunks(self):
+        """Testing apply_patch with a diff containing no hunks"""
+        diff = (
+            b'diff --git a/README b/README\n'
+            b'old mode 100644\n'
+            b'new mode 100755\n'
+        )
+
+        self.assertEqual(
+            apply_patch(diff=diff,
+                        orig_file=self.orig_file,
+                        filename='README'),
+            self.orig_file)
@@ -1,14 +1,17 @@
 from __future__ import unicode_literals
 
+import kgb
 from djblets.features.testing import override_feature_check
 
+from reviewboard.diffviewer.diffutils import get_diff_data_chunks_info
 from reviewboard.diffviewer.features import filter_interdiffs_v2_feature
 from reviewboard.diffviewer.processors import (filter_interdiff_opcodes,
+                                               get_interdiff_filter_ranges,
                                                post_process_filtered_equals)
 from reviewboard.testing import TestCase
 
 
-class FilterInterdiffOpcodesTests(TestCase):
+class FilterInterdiffOpcodesTests(kgb.SpyAgency, TestCase):
     """Unit tests for filter_interdiff_opcodes."""
 
     def test_filter_interdiff_opcodes(self):
@@ -399,6 +402,42 @@ class FilterInterdiffOpcodesTests(TestCase):
             prev_i2 = i2
             prev_j2 = j2
 
+    def test_filter_interdiff_opcodes_with_precomputed_ranges(self):
+        """Testing filter_interdiff_opcodes with precomputed ranges"""
+        opcodes = [
+            ('insert', 0, 0, 0, 1),
+            ('equal', 0, 5, 1, 6),
+            ('delete', 5, 10, 6, 6),
+            ('equal', 10, 25, 6, 21),
+            ('replace', 25, 26, 21, 22),
+            ('equal', 26, 40, 22, 36),
+            ('insert', 40, 40, 36, 46),
+        ]
+        self._sanity_check_opcodes(opcodes)
+
+        orig_diff = self._build_dummy_diff_data(22, 10, 22, 10)
+        new_diff = b''.join([
+            self._build_dummy_diff_data(2, 14, 2, 9),
+            self._build_dummy_diff_data(22, 10, 22, 10),
+        ])
+
+        expected_opcodes = list(filter_interdiff_opcodes(opcodes, orig_diff,
+                                                         new_diff))
+        orig_ranges = get_interdiff_filter_ranges(orig_diff)
+        new_ranges = get_interdiff_filter_ranges(new_diff)
+
+        self.spy_on(get_diff_data_chunks_info)
+
+        new_opcodes = list(filter_interdiff_opcodes(
+            opcodes,
+            filediff_data=None,
+            interfilediff_data=None,
+            filediff_ranges=orig_ranges,
+            interfilediff_ranges=new_ranges))
+
+        self.assertEqual(new_opcodes, expected_opcodes)
+        self.assertSpyNotCalled(get_diff_data_chunks_info)
+
     def _build_dummy_diff_data(self, orig_start, orig_len, new_start, new_len,
                                pre_lines_of_context=3,
                                post_lines_of_context=None):
@@ -463,6 +502,32 @@ class FilterInterdiffOpcodesTests(TestCase):
         ])
 
 
+class GetInterdiffFilterRangesTests(TestCase):
+    """Unit tests for get_interdiff_filter_ranges."""
+
+    def test_get_interdiff_filter_ranges(self):
+        """Testing get_interdiff_filter_ranges"""
+        diff = (
+            b'@@ -2,14 +2,9 @@\n' +
+            b' #\n' * 3 +
+            b'-# deleted\n' * 8 +
+            b'+# inserted\n' * 3 +
+            b' #\n' * 3 +
+            b'@@ -22,10 +22,10 @@\n' +
+            b' #\n' * 3 +
+            b'-# deleted\n' * 4 +
+            b'+# inserted\n' * 4 +
+            b' #\n' * 3
+        )
+
+        self.assertEqual(get_interdiff_filter_ranges(diff),
+                         [(3, 6), (23, 27)])
+
+    def test_get_interdiff_filter_ranges_with_no_chunks(self):
+        """Testing get_interdiff_filter_ranges with no chunks"""
+        self.assertEqual(get_interdiff_filter_ranges(b''), [])
+
+
 class PostProcessFilteredEqualsTests(TestCase):
     """Unit tests for post_process_filtered_equals."""
 
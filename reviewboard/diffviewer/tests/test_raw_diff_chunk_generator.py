@@ -1,10 +1,14 @@
 from __future__ import unicode_literals
 
+import kgb
+import pygments
+from pygments.lexers import guess_lexer_for_filename
+
 from reviewboard.diffviewer.chunk_generator import RawDiffChunkGenerator
 from reviewboard.testing import TestCase
 
 
-class RawDiffChunkGeneratorTests(TestCase):
+class RawDiffChunkGeneratorTests(kgb.SpyAgency, TestCase):
     """Unit tests for RawDiffChunkGenerator."""
 
     @property
@@ -276,6 +280,21 @@ class RawDiffChunkGeneratorTests(TestCase):
             }
         )
 
+    def test_get_chunks_with_cache_key(self):
+        """Testing RawDiffChunkGenerator.get_chunks with cache_key stores
+        chunks in cache
+        """
+        chunks = list(self._create_generator().get_chunks(
+            cache_key='test-chunks'))
+        self.assertEqual(len(chunks), 16)
+
+        generator = self._create_generator()
+        self.spy_on(generator.get_chunks_uncached)
+
+        self.assertEqual(list(generator.get_chunks(cache_key='test-chunks')),
+                         chunks)
+        self.assertSpyNotCalled(generator.get_chunks_uncached)
+
     def test_generate_chunks_with_encodings(self):
         """Testing RawDiffChunkGenerator.generate_chunks with explicit
         encodings for old and new
@@ -421,6 +440,37 @@ class RawDiffChunkGeneratorTests(TestCase):
                                             filename='test.md'),
             ['This is <span class="gs">**bold**</span>'])
 
+    def test_apply_pygments_with_cached_lines(self):
+        """Testing RawDiffChunkGenerator._apply_pygments reuses highlighted
+        lines for the same file name and content
+        """
+        self.spy_on(pygments.highlight)
+        self.spy_on(guess_lexer_for_filename)
+
+        chunk_generator = RawDiffChunkGenerator(old=[],
+                                                new=[],
+                                                orig_filename='file1',
+                                                modified_filename='file2')
+        lines = chunk_generator._apply_pygments(data='This is **bold**\n',
+                                                filename='README.md')
+
+        chunk_generator = RawDiffChunkGenerator(old=[],
+                                                new=[],
+                                                orig_filename='file3',
+                                                modified_filename='file4')
+        self.assertEqual(
+            chunk_generator._apply_pygments(data='This is **bold**\n',
+                                            filename='docs/README.md'),
+            lines)
+        self.assertSpyCallCount(pygments.highlight, 1)
+        self.assertSpyCallCount(guess_lexer_for_filename, 1)
+
+        self.assertEqual(
+            chunk_generator._apply_pygments(data='This is *italic*\n',
+                                            filename='test.md'),
+            ['This is <span class="ge">*italic*</span>'])
+        self.assertSpyCallCount(pygments.highlight, 2)
+
     def test_apply_pygments_without_lexer(self):
         """Testing RawDiffChunkGenerator._apply_pygments without valid lexer"""
         chunk_generator = RawDiffChunkGenerator(old=[],
@@ -705,3 +755,21 @@ class RawDiffChunkGeneratorTests(TestCase):
              '|&lt;&mdash;&mdash;&mdash;&mdash;&mdash;&mdash;'
              '</span>        </span> foo', ''))
 
+    def _create_generator(self):
+        """Return a generator producing 16 chunks of 1 line each.
+
+        Returns:
+            reviewboard.diffviewer.chunk_generator.RawDiffChunkGenerator:
+            The new generator.
+        """
+        return RawDiffChunkGenerator(
+            old=b''.join(
+                b'line %d\n' % i
+                for i in range(8)
+            ),
+            new=b''.join(
+                b'line %d\nnew line %d\n' % (i, i)
+                for i in range(8)
+            ),
+            orig_filename='file1',
+            modified_filename='file2')
@@ -1,6 +1,7 @@
 from __future__ import unicode_literals
 
 import bz2
+import zlib
 
 from reviewboard.diffviewer.models import RawFileDiffData
 from reviewboard.testing import TestCase
@@ -48,10 +49,150 @@ class RawFileDiffDataManagerTests(TestCase):
 
     def test_process_diff_data_large_diff_compressed(self):
         """Testing RawFileDiffDataManager.process_diff_data with large diff
-        results in bzip2-compressed storage
+        results in zlib-compressed storage
         """
         data, compression = \
             RawFileDiffData.objects.process_diff_data(self.large_diff)
 
+        self.assertEqual(data, zlib.compress(self.large_diff, 6))
+        self.assertEqual(compression, RawFileDiffData.COMPRESSION_ZLIB)
+
+    def test_process_diff_data_with_siteconfig_compression(self):
+        """Testing RawFileDiffDataManager.process_diff_data with
+        diffviewer_diff_compression site configuration setting
+        """
+        siteconfig_settings = {
+            'diffviewer_diff_compression': RawFileDiffData.COMPRESSION_BZIP2,
+        }
+
+        with self.siteconfig_settings(siteconfig_settings):
+            data, compression = \
+                RawFileDiffData.objects.process_diff_data(self.large_diff)
+
+        self.assertEqual(data, bz2.compress(self.large_diff, 9))
+        self.assertEqual(compression, RawFileDiffData.COMPRESSION_BZIP2)
+
+    def test_process_diff_data_with_compression(self):
+        """Testing RawFileDiffDataManager.process_diff_data with explicit
+        compression
+        """
+        data, compression = RawFileDiffData.objects.process_diff_data(
+            self.large_diff,
+            compression=RawFileDiffData.COMPRESSION_BZIP2)
+
         self.assertEqual(data, bz2.compress(self.large_diff, 9))
         self.assertEqual(compression, RawFileDiffData.COMPRESSION_BZIP2)
+
+    def test_process_diff_data_with_unknown_compression(self):
+        """Testing RawFileDiffDataManager.process_diff_data with unknown
+        compression
+        """
+        with self.assertRaises(ValueError):
+            RawFileDiffData.objects.process_diff_data(self.large_diff,
+                                                      compression='?')
+
+    def test_recompress_all(self):
+        """Testing RawFileDiffDataManager.recompress_all"""
+        bzip2_data = RawFileDiffData.objects.create(
+            binary=bz2.compress(self.large_diff, 9),
+            binary_hash='1',
+            compression=RawFileDiffData.COMPRESSION_BZIP2)
+        zlib_data = RawFileDiffData.objects.create(
+            binary=zlib.compress(self.large_diff + b'+zlib\n', 6),
+            binary_hash='2',
+            compression=RawFileDiffData.COMPRESSION_ZLIB)
+        raw_data = RawFileDiffData.objects.create(
+            binary=self.small_diff,
+            binary_hash='3',
+            compression=None)
+
+        batches = []
+
+        info = RawFileDiffData.objects.recompress_all(
+            compression=RawFileDiffData.COMPRESSION_ZLIB,
+            batch_done_cb=lambda **kwargs: batches.append(kwargs))
+
+        self.assertEqual(info['diffs_processed'], 1)
+        self.assertEqual(info['old_diff_size'],
+                         len(bz2.compress(self.large_diff, 9)))
+        self.assertEqual(info['new_diff_size'],
+                         len(zlib.compress(self.large_diff, 6)))
+        self.assertEqual(info['bytes_saved'],
+                         info['old_diff_size'] - info['new_diff_size'])
+        self.assertEqual(batches, [{'total_diffs_processed': 1}])
+
+        bzip2_data = RawFileDiffData.objects.get(pk=bzip2_data.pk)
+        self.assertEqual(bzip2_data.compression,
+                         RawFileDiffData.COMPRESSION_ZLIB)
+        self.assertEqual(bytes(bzip2_data.binary),
+                         zlib.compress(self.large_diff, 6))
+        self.assertEqual(bzip2_data.content, self.large_diff)
+
+        zlib_data = RawFileDiffData.objects.get(pk=zlib_data.pk)
+        self.assertEqual(zlib_data.content, self.large_diff + b'+zlib\n')
+
+        raw_data = RawFileDiffData.objects.get(pk=raw_data.pk)
+        self.assertIsNone(raw_data.compression)
+        self.assertEqual(raw_data.content, self.small_diff)
+
+    def test_recompress_all_with_max_diffs(self):
+        """Testing RawFileDiffDataManager.recompress_all with max_diffs"""
+        pks = [
+            RawFileDiffData.objects.create(
+                binary=bz2.compress(self.large_diff + b'+%d\n' % i, 9),
+                binary_hash='%d' % i,
+                compression=RawFileDiffData.COMPRESSION_BZIP2).pk
+            for i in range(5)
+        ]
+
+        info = RawFileDiffData.objects.recompress_all(
+            compression=RawFileDiffData.COMPRESSION_ZLIB,
+            batch_size=2,
+            max_diffs=3)
+
+        self.assertEqual(info['diffs_processed'], 3)
+        self.assertEqual(
+            list(RawFileDiffData.objects.filter(pk__in=pks)
+                 .order_by('pk')
+                 .values_list('compression', flat=True)),
+            ['Z', 'Z', 'Z', 'B', 'B'])
+
+        # A second pass should pick up where the first left off.
+        info = RawFileDiffData.objects.recompress_all(
+            compression=RawFileDiffData.COMPRESSION_ZLIB,
+            batch_size=2)
+
+        self.assertEqual(info['diffs_processed'], 2)
+        self.assertFalse(
+            RawFileDiffData.objects
+            .filter(compression=RawFileDiffData.COMPRESSION_BZIP2)
+            .exists())
+
+    def test_get_or_create_from_data_stores_interdiff_filter_ranges(self):
+        """Testing RawFileDiffDataManager.get_or_create_from_data stores
+        interdiff filter ranges
+        """
+        diff = (
+            b'--- README\n'
+            b'+++ README\n'
+            b'@@ -1,4 +1,4 @@\n'
+            b' line 1\n'
+            b'-line 2\n'
+            b'+line two\n'
+            b' line 3\n'
+            b' line 4\n'
+        )
+
+        raw_file_diff_data, is_new = \
+            RawFileDiffData.objects.get_or_create_from_data(diff)
+
+        self.assertTrue(is_new)
+
+        raw_file_diff_data = RawFileDiffData.objects.get(
+            pk=raw_file_diff_data.pk)
+        self.assertEqual(
+            raw_file_diff_data.extra_data['interdiff_filter_ranges'],
+            {
+                'version': RawFileDiffData.INTERDIFF_FILTER_RANGES_VERSION,
+                'ranges': [[0, 1]],
+            })
@@ -1,8 +1,15 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from kgb import SpyAgency
+
+from reviewboard.diffviewer.models import FileDiff
 from reviewboard.testing import TestCase
 from reviewboard.reviews.models import (BaseComment, GeneralComment,
                                         StatusUpdate)
+from reviewboard.reviews.views import ReviewRequestPrintView
+
 
-class ReviewRequestPrintViewTests(TestCase):
+class ReviewRequestPrintViewTests(SpyAgency, TestCase):
 
     fixtures = ['test_users', 'test_scmtools', 'test_site']
 
@@ -184,4 +191,206 @@ class ReviewRequestPrintViewTests(TestCase):
             {'O': 'Open', 'R': 'Resolved', 'D': 'Dropped', 'A': 'Verifying Resolved', 'B': 'Verifying Dropped'},True)
         self.assertEqual(response.context['issues_exist'],False)
         self._make_comments(review_request)
-        self.assertEqual(len(response.context['files']),3)
\ No newline at end of file
+        self.assertEqual(len(response.context['files']), 3)
+
+    def test_diffs_from_filediffs(self):
+        """Testing ReviewRequestPrintView builds diffs from stored FileDiffs"""
+        response, _ = self._get_response()
+        data = response.context['data']
+
+        self.assertEqual(sorted(data.keys()),
+                         ['/diffutils.py', '/newfile', '/readme'])
+        self.assertEqual(
+            data['/readme'].raw_diff,
+            '@@ -1 +1,3 @@\n'
+            ' Hello there\n'
+            '+----------\n'
+            '+Oh hi!\n')
+
+    def test_diffs_with_non_utf8_diff(self):
+        """Testing ReviewRequestPrintView with a diff that isn't UTF-8"""
+        review_request = self.create_review_request(create_repository=True,
+                                                    publish=True)
+        review_request.repository.encoding = 'iso-8859-15'
+        review_request.repository.save(update_fields=('encoding',))
+
+        diffset = self.create_diffset(review_request)
+        self.create_filediff(
+            diffset,
+            source_file='/readme',
+            dest_file='/readme',
+            diff=(
+                b'--- /readme\n'
+                b'+++ /readme\n'
+                b'@@ -1 +1 @@\n'
+                b'-Caf\xe9\n'
+                b'+Caf\xe9!\n'
+            ))
+
+        response = self.client.get('/r/%d/print/' % review_request.pk)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.context['data']['/readme'].raw_diff,
+            '@@ -1 +1 @@\n'
+            '-Caf\xe9\n'
+            '+Caf\xe9!\n')
+
+    def test_diffs_only_loaded_for_checked_files(self):
+        """Testing ReviewRequestPrintView only loads diffs for checked
+        files
+        """
+        _, review_request = self._get_response()
+
+        response = self.client.get('/r/%d/print/' % review_request.pk, {
+            '/readme': 'on',
+        })
+        self.assertEqual(response.status_code, 200)
+
+        data = response.context['data']
+        self.assertIn('raw_diff', data['/readme'].__dict__)
+        self.assertNotIn('raw_diff', data['/diffutils.py'].__dict__)
+        self.assertNotIn('raw_diff', data['/newfile'].__dict__)
+
+    def test_diffs_loaded_in_batch(self):
+        """Testing ReviewRequestPrintView loads diffs for checked files in
+        a batch
+        """
+        _, review_request = self._get_response()
+
+        self.spy_on(FileDiff.objects.iter_with_diff_data)
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/r/%d/print/' % review_request.pk, {
+                '/readme': 'on',
+                '/diffutils.py': 'on',
+            })
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            len([
+                query
+                for query in ctx.captured_queries
+                if 'diffviewer_rawfilediffdata' in query['sql']
+            ]),
+            1)
+
+        spy = FileDiff.objects.iter_with_diff_data.spy
+        self.assertEqual(len(spy.calls), 1)
+        self.assertEqual(
+            sorted(
+                filediff.dest_file
+                for filediff in spy.last_call.args[0]
+            ),
+            ['/diffutils.py', '/readme'])
+
+    def test_diffs_with_file_comments(self):
+        """Testing ReviewRequestPrintView attaches comments to diffs"""
+        review_request = self.create_review_request(create_repository=True,
+                                                    publish=True)
+        diffset = self.create_diffset(review_request)
+        filediff1 = self.create_filediff(diffset,
+                                         source_file='/readme',
+                                         dest_file='/readme')
+        filediff2 = self.create_filediff(diffset,
+                                         source_file='/other',
+                                         dest_file='/other')
+
+        review = self.create_review(review_request, publish=True)
+        self.create_diff_comment(review, filediff1, text='Comment 1')
+
+        review = self.create_review(review_request, publish=True)
+        self.create_diff_comment(review, filediff2, text='Comment 2')
+
+        response = self.client.get('/r/%d/print/' % review_request.pk, {
+            'with_file': 'with_file',
+            '/readme': 'on',
+            '/other': 'on',
+        })
+        self.assertEqual(response.status_code, 200)
+
+        data = response.context['data']
+        readme_comments = data['/readme'].comments
+        other_comments = data['/other'].comments
+
+        self.assertEqual(len(readme_comments), 1)
+        self.assertEqual(readme_comments[0].text, 'Comment 1')
+        self.assertIn('Comment 1', data['/readme'].raw_diff)
+        self.assertEqual(len(other_comments), 1)
+        self.assertEqual(other_comments[0].text, 'Comment 2')
+
+    def test_get_caches_document(self):
+        """Testing ReviewRequestPrintView caches the print document"""
+        self.spy_on(ReviewRequestPrintView.render_print_document,
+                    owner=ReviewRequestPrintView)
+
+        response, review_request = self._get_response()
+        self.assertEqual(response.status_code, 200)
+
+        response2 = self.client.get('/r/%d/print/' % review_request.pk)
+        self.assertEqual(response2.status_code, 200)
+        self.assertEqual(response2.content, response.content)
+
+        self.assertEqual(
+            len(ReviewRequestPrintView.render_print_document.calls), 1)
+
+    def test_get_caches_document_per_flags(self):
+        """Testing ReviewRequestPrintView caches the print document
+        separately for different filter flags
+        """
+        self.spy_on(ReviewRequestPrintView.render_print_document,
+                    owner=ReviewRequestPrintView)
+
+        _, review_request = self._get_response()
+
+        response = self.client.get('/r/%d/print/' % review_request.pk, {
+            'with_file': 'with_file',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['with_file_flag'])
+
+        self.assertEqual(
+            len(ReviewRequestPrintView.render_print_document.calls), 2)
+
+    def test_get_cache_invalidated_on_review_publish(self):
+        """Testing ReviewRequestPrintView rebuilds the print document after
+        a review is published
+        """
+        self.spy_on(ReviewRequestPrintView.render_print_document,
+                    owner=ReviewRequestPrintView)
+
+        _, review_request = self._get_response()
+
+        review = self.create_review(review_request)
+        self.create_general_comment(review, text='New comment')
+        review.publish()
+
+        response = self.client.get('/r/%d/print/' % review_request.pk)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'New comment', response.content)
+
+        self.assertEqual(
+            len(ReviewRequestPrintView.render_print_document.calls), 2)
+
+    def test_get_with_draft_review_not_cached(self):
+        """Testing ReviewRequestPrintView doesn't cache the print document
+        for users with draft reviews
+        """
+        self.spy_on(ReviewRequestPrintView.render_print_document,
+                    owner=ReviewRequestPrintView)
+
+        # Cache the document as an anonymous user.
+        response, review_request = self._get_response()
+        self.assertEqual(response.status_code, 200)
+
+        user = self.create_user(username='print-user', password='print-user')
+        review = self.create_review(review_request, user=user)
+        self.create_general_comment(review, text='Draft comment')
+
+        self.client.login(username='print-user', password='print-user')
+
+        for i in range(2):
+            response = self.client.get('/r/%d/print/' % review_request.pk)
+            self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(
+            len(ReviewRequestPrintView.render_print_document.calls), 3)
@@ -1,5 +1,6 @@
 from reviewboard.testing import TestCase
-from reviewboard.reviews.treenode import *
+from reviewboard.reviews.treenode import (generate_tree_html,
+                                          generate_tree_structure)
 
 class PrintViewTests(TestCase):
     """Tests for reviewboard.reviews:TreeNode."""
@@ -9,7 +10,7 @@ class PrintViewTests(TestCase):
         num_children = len(child_list)
         self.assertEqual(len(node.children), num_children)
         for child in child_list:
-            self.assertTrue(child in node.children_names)
+            self.assertTrue(child in node.children)
 
     def testing_file_tree_structure(self):
         """Testing tree file structure is generated properly"""
@@ -37,7 +38,43 @@ class PrintViewTests(TestCase):
         self._test_tree_node(node, children_names)
 
         html_out = generate_tree_html(file_tree, False, ["c++/scrambler.cc","python/utils/utils.py"])
-        self.assertEqual(html_out,'<ul><li><label>c++</label><ul><li><label><input id="c++/utils.cc" name="c++/utils.cc" type="checkbox" />utils.cc</label></li></ul><ul><li><label><input id="c++/scrambler.cc" name="c++/scrambler.cc" type="checkbox" value="yes" checked />scrambler.cc</label></li></ul></li></ul><ul><li><label>python</label><ul><li><label><input id="python/scrambler.py" name="python/scrambler.py" type="checkbox" />scrambler.py</label></li></ul><ul><li><label>utils</label><ul><li><label><input id="python/utils/utils.py" name="python/utils/utils.py" type="checkbox" value="yes" checked />utils.py</label></li></ul></li></ul></li></ul><ul><li><label><input id="Makefile" name="Makefile" type="checkbox" />Makefile</label></li></ul>')
-        
+        self.assertEqual(html_out,'<ul><li><label><input id="Makefile" name="Makefile" type="checkbox" />Makefile</label></li></ul><ul><li><label>c++</label><ul><li><label><input id="c++/scrambler.cc" name="c++/scrambler.cc" type="checkbox" value="yes" checked />scrambler.cc</label></li></ul><ul><li><label><input id="c++/utils.cc" name="c++/utils.cc" type="checkbox" />utils.cc</label></li></ul></li></ul><ul><li><label>python</label><ul><li><label><input id="python/scrambler.py" name="python/scrambler.py" type="checkbox" />scrambler.py</label></li></ul><ul><li><label>utils</label><ul><li><label><input id="python/utils/utils.py" name="python/utils/utils.py" type="checkbox" value="yes" checked />utils.py</label></li></ul></li></ul></li></ul>')
+
         html_out = generate_tree_html(file_tree, True, ["c++/scrambler.cc","python/utils/utils.py"])
-        self.assertEqual(html_out,'<ul><li><label>c++</label><ul><li><label><input id="c++/utils.cc" name="c++/utils.cc" type="checkbox" value="yes" checked />utils.cc</label></li></ul><ul><li><label><input id="c++/scrambler.cc" name="c++/scrambler.cc" type="checkbox" value="yes" checked />scrambler.cc</label></li></ul></li></ul><ul><li><label>python</label><ul><li><label><input id="python/scrambler.py" name="python/scrambler.py" type="checkbox" value="yes" checked />scrambler.py</label></li></ul><ul><li><label>utils</label><ul><li><label><input id="python/utils/utils.py" name="python/utils/utils.py" type="checkbox" value="yes" checked />utils.py</label></li></ul></li></ul></li></ul><ul><li><label><input id="Makefile" name="Makefile" type="checkbox" value="yes" checked />Makefile</label></li></ul>')
\ No newline at end of file
+        self.assertEqual(html_out,'<ul><li><label><input id="Makefile" name="Makefile" type="checkbox" value="yes" checked />Makefile</label></li></ul><ul><li><label>c++</label><ul><li><label><input id="c++/scrambler.cc" name="c++/scrambler.cc" type="checkbox" value="yes" checked />scrambler.cc</label></li></ul><ul><li><label><input id="c++/utils.cc" name="c++/utils.cc" type="checkbox" value="yes" checked />utils.cc</label></li></ul></li></ul><ul><li><label>python</label><ul><li><label><input id="python/scrambler.py" name="python/scrambler.py" type="checkbox" value="yes" checked />scrambler.py</label></li></ul><ul><li><label>utils</label><ul><li><label><input id="python/utils/utils.py" name="python/utils/utils.py" type="checkbox" value="yes" checked />utils.py</label></li></ul></li></ul></li></ul>')
+
+    def test_tree_html_escapes_paths(self):
+        """Testing generate_tree_html escapes file names and paths"""
+        file_tree = generate_tree_structure(['a<b>/"c".txt'])
+
+        self.assertEqual(
+            generate_tree_html(file_tree, False, set()),
+            '<ul><li><label>a&lt;b&gt;</label>'
+            '<ul><li><label><input id="a&lt;b&gt;/&quot;c&quot;.txt" '
+            'name="a&lt;b&gt;/&quot;c&quot;.txt" type="checkbox" />'
+            '&quot;c&quot;.txt</label></li></ul>'
+            '</li></ul>')
+
+    def test_tree_html_with_deep_paths(self):
+        """Testing generate_tree_html with deeply-nested paths"""
+        path = '/'.join(['dir'] * 2000 + ['file.txt'])
+        html_out = generate_tree_html(generate_tree_structure([path]),
+                                      True, set())
+
+        self.assertEqual(html_out.count('<ul><li>'), 2001)
+        self.assertEqual(html_out.count('</li></ul>'), 2001)
+
+    def test_contains(self):
+        """Testing TreeNode.__contains__ for files in the tree"""
+        file_tree = generate_tree_structure([
+            'c++/utils.cc',
+            './python/utils/utils.py',
+        ])
+
+        self.assertIn('c++/utils.cc', file_tree)
+        self.assertIn('python/utils/utils.py', file_tree)
+        self.assertIn('python//utils/./utils.py', file_tree)
+        self.assertNotIn('python/utils', file_tree)
+        self.assertNotIn('python/utils.py', file_tree)
+        self.assertNotIn('', file_tree)
+        self.assertIn('utils.py', file_tree.get_node('python/utils'))
@@ -0,0 +1,18 @@
+"""Review request-specific initialization."""
+
+from __future__ import unicode_literals
+
+from reviewboard.signals import initializing
+
+
+def _on_initializing(**kwargs):
+    """Set up signal handlers for review requests."""
+    from reviewboard.reviews import access, update_streams
+    from reviewboard.reviews.models import comment_thread_link
+
+    access.connect_signals()
+    comment_thread_link.connect_signals()
+    update_streams.connect_signals()
+
+
+initializing.connect(_on_initializing)
@@ -0,0 +1,380 @@
+"""Cached lists of the repositories and review groups a user can access.
+
+Checking whether a user can see a review request requires knowing which
+repositories and invite-only review groups they have access to. Computing
+this requires several joins, and it's needed on every dashboard, API and
+search query.
+
+The lists of IDs are cached per-user, and versioned so that they can be
+invalidated when access changes. A global version covers changes that may
+affect any user (such as a repository becoming private), and a per-user
+version covers changes to one user's access lists, review group
+memberships, permissions, or Local Site memberships.
+
+The cache keys also contain whether the user is a superuser and the
+permissions that affect the results, so a change to either can never
+return a list computed for the old access.
+
+Version Added:
+    4.0.6
+"""
+
+from __future__ import unicode_literals
+
+import uuid
+
+from django.core.cache import cache
+from djblets.cache.backend import cache_memoize, make_cache_key
+
+
+#: The number of seconds to cache access versions and lists of IDs.
+ACCESS_CACHE_EXPIRATION = 60 * 60 * 24
+
+
+_GLOBAL_VERSION_KEY = 'accessible-ids-version'
+_USER_VERSION_KEY = 'accessible-ids-version-user-%s'
+
+
+def _make_version():
+    """Return a new, unique access version.
+
+    Versions are random rather than counters, so that a version key that's
+    evicted from the cache and then recreated can never match the version
+    stored in an older cache key.
+
+    Returns:
+        unicode:
+        The new version.
+    """
+    return uuid.uuid4().hex
+
+
+def _get_access_versions(user):
+    """Return the current access versions for a user.
+
+    Args:
+        user (django.contrib.auth.models.User):
+            The user to return versions for.
+
+    Returns:
+        tuple:
+        A 2-tuple of the global version and the user's version.
+    """
+    keys = [
+        make_cache_key(_GLOBAL_VERSION_KEY),
+        make_cache_key(_USER_VERSION_KEY % user.pk),
+    ]
+    versions = cache.get_many(keys)
+    result = []
+
+    for key in keys:
+        version = versions.get(key)
+
+        if version is None:
+            version = _make_version()
+
+            if not cache.add(key, version, ACCESS_CACHE_EXPIRATION):
+                # Another process stored a version first.
+                version = cache.get(key, version)
+
+        result.append(version)
+
+    return tuple(result)
+
+
+def _get_accessible_ids(model, name, user, local_site, perms=()):
+    """Return the cached IDs of objects accessible by a user.
+
+    Args:
+        model (type):
+            The model class, whose manager provides ``accessible_ids()``.
+
+        name (unicode):
+            The name used for the model in cache keys.
+
+        user (django.contrib.auth.models.User):
+            The user to return accessible IDs for.
+
+        local_site (reviewboard.site.models.LocalSite):
+            The Local Site to limit results to, if any.
+
+        perms (tuple of unicode, optional):
+            The permissions that affect which objects are accessible. The
+            user's effective permissions on the Local Site are part of the
+            cache key.
+
+    Returns:
+        list of int:
+        The accessible IDs.
+    """
+    if not user.is_authenticated:
+        return model.objects.accessible_ids(user,
+                                            visible_only=False,
+                                            local_site=local_site)
+
+    global_version, user_version = _get_access_versions(user)
+
+    if local_site is None:
+        local_site_key = 'none'
+    else:
+        local_site_key = local_site.pk
+
+    access_key = ''.join(
+        '1' if has_access else '0'
+        for has_access in [user.is_superuser] + [
+            user.has_perm(perm, local_site)
+            for perm in perms
+        ]
+    )
+
+    return cache_memoize(
+        'accessible-%s-ids-%s-%s-%s-%s-%s'
+        % (name, user.pk, local_site_key, access_key, global_version,
+           user_version),
+        lambda: model.objects.accessible_ids(user,
+                                             visible_only=False,
+                                             local_site=local_site),
+        expiration=ACCESS_CACHE_EXPIRATION)
+
+
+def get_accessible_repository_ids(user, local_site=None):
+    """Return the IDs of repositories accessible by a user.
+
+    This is equivalent to calling
+    :py:meth:`RepositoryManager.accessible_ids()
+    <reviewboard.scmtools.managers.RepositoryManager.accessible_ids>` with
+    ``visible_only=False``, but the result is cached until the user's access
+    changes.
+
+    Args:
+        user (django.contrib.auth.models.User):
+            The user to return accessible IDs for.
+
+        local_site (reviewboard.site.models.LocalSite, optional):
+            The Local Site to limit results to, if any.
+
+    Returns:
+        list of int:
+        The accessible repository IDs.
+    """
+    from reviewboard.scmtools.models import Repository
+
+    return _get_accessible_ids(Repository, 'repository', user, local_site)
+
+
+def get_accessible_group_ids(user, local_site=None):
+    """Return the IDs of review groups accessible by a user.
+
+    This is equivalent to calling
+    :py:meth:`ReviewGroupManager.accessible_ids()
+    <reviewboard.reviews.managers.ReviewGroupManager.accessible_ids>` with
+    ``visible_only=False``, but the result is cached until the user's access
+    changes.
+
+    Args:
+        user (django.contrib.auth.models.User):
+            The user to return accessible IDs for.
+
+        local_site (reviewboard.site.models.LocalSite, optional):
+            The Local Site to limit results to, if any.
+
+    Returns:
+        list of int:
+        The accessible review group IDs.
+    """
+    from reviewboard.reviews.models import Group
+
+    return _get_accessible_ids(Group, 'group', user, local_site,
+                               perms=('reviews.can_view_invite_only_groups',))
+
+
+def invalidate_accessible_ids(user_ids=None):
+    """Invalidate cached lists of accessible IDs.
+
+    Args:
+        user_ids (list of int, optional):
+            The IDs of the users whose access has changed. If not provided,
+            the lists for all users will be invalidated.
+    """
+    if user_ids is None:
+        cache.set(make_cache_key(_GLOBAL_VERSION_KEY),
+                  _make_version(),
+                  ACCESS_CACHE_EXPIRATION)
+    elif user_ids:
+        cache.set_many(
+            {
+                make_cache_key(_USER_VERSION_KEY % user_id): _make_version()
+                for user_id in user_ids
+            },
+            ACCESS_CACHE_EXPIRATION)
+
+
+def _on_access_changed(**kwargs):
+    """Handle a change to a repository or review group.
+
+    Any change to a repository or review group (such as whether it's public
+    or invite-only) may affect the access of any user, so this invalidates
+    the lists for all users.
+
+    Args:
+        **kwargs (dict):
+            Ignored arguments from the signal.
+    """
+    invalidate_accessible_ids()
+
+
+def _on_users_changed(instance, action, pk_set, reverse, **kwargs):
+    """Handle a change to the users of a repository, review group or site.
+
+    This covers the users and admins of a :term:`Local Site`, along with the
+    access lists of repositories and review groups.
+
+    Args:
+        instance (django.db.models.Model):
+            The instance that was updated. If ``reverse`` is ``True``, then
+            this will be a :py:class:`~django.contrib.auth.models.User`.
+            Otherwise, it will be the repository, review group, or Local
+            Site.
+
+        action (unicode):
+            The membership change action.
+
+        pk_set (set of int):
+            The IDs of the objects added or removed. This is ``None`` when
+            clearing.
+
+        reverse (bool):
+            Whether the change was made through the reverse relation on the
+            user.
+
+        **kwargs (dict):
+            Ignored arguments from the signal.
+    """
+    if action in ('post_add', 'post_remove'):
+        if reverse:
+            invalidate_accessible_ids([instance.pk])
+        else:
+            invalidate_accessible_ids(pk_set)
+    elif action == 'post_clear':
+        if reverse:
+            invalidate_accessible_ids([instance.pk])
+        else:
+            # The IDs of the removed users aren't available after clearing.
+            invalidate_accessible_ids()
+
+
+def _on_user_saved(instance, update_fields, **kwargs):
+    """Handle a user being saved.
+
+    The user's superuser or active state may have changed, so their lists
+    are invalidated. Saves that only update the login time are ignored.
+
+    Args:
+        instance (django.contrib.auth.models.User):
+            The user that was saved.
+
+        update_fields (frozenset of unicode):
+            The fields that were saved, if limited.
+
+        **kwargs (dict):
+            Ignored arguments from the signal.
+    """
+    if not update_fields or not update_fields <= {'last_login'}:
+        invalidate_accessible_ids([instance.pk])
+
+
+def _on_user_relations_changed(instance, action, pk_set, reverse,
+                               **kwargs):
+    """Handle a change to a user's permissions or auth groups.
+
+    Args:
+        instance (django.db.models.Model):
+            The instance that was updated. If ``reverse`` is ``False``, then
+            this will be a :py:class:`~django.contrib.auth.models.User`.
+            Otherwise, it will be the permission or auth group.
+
+        action (unicode):
+            The membership change action.
+
+        pk_set (set of int):
+            The IDs of the objects added or removed. This is ``None`` when
+            clearing.
+
+        reverse (bool):
+            Whether the change was made through the reverse relation on the
+            permission or auth group.
+
+        **kwargs (dict):
+            Ignored arguments from the signal.
+    """
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        if not reverse:
+            invalidate_accessible_ids([instance.pk])
+        elif action == 'post_clear':
+            # The IDs of the removed users aren't available after clearing.
+            invalidate_accessible_ids()
+        else:
+            invalidate_accessible_ids(pk_set)
+
+
+def _on_local_site_profile_saved(instance, **kwargs):
+    """Handle a change to a user's Local Site permissions.
+
+    Args:
+        instance (reviewboard.accounts.models.LocalSiteProfile):
+            The profile that was saved.
+
+        **kwargs (dict):
+            Ignored arguments from the signal.
+    """
+    invalidate_accessible_ids([instance.user_id])
+
+
+def _on_relations_changed(action, **kwargs):
+    """Handle a change to relations that may affect any user's access.
+
+    This covers the review groups with access to a repository, and the
+    permissions granted to auth groups.
+
+    Args:
+        action (unicode):
+            The membership change action.
+
+        **kwargs (dict):
+            Ignored arguments from the signal.
+    """
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        invalidate_accessible_ids()
+
+
+def connect_signals():
+    """Connect the signal handlers that invalidate cached access lists."""
+    from django.contrib.auth.models import Group as AuthGroup, User
+    from django.db.models.signals import m2m_changed, post_delete, post_save
+
+    from reviewboard.accounts.models import LocalSiteProfile
+    from reviewboard.reviews.models import Group
+    from reviewboard.scmtools.models import Repository
+    from reviewboard.site.models import LocalSite
+
+    for model in (Group, Repository):
+        post_save.connect(_on_access_changed, sender=model)
+        post_delete.connect(_on_access_changed, sender=model)
+
+    m2m_changed.connect(_on_users_changed, sender=Group.users.through)
+    m2m_changed.connect(_on_users_changed, sender=Repository.users.through)
+    m2m_changed.connect(_on_relations_changed,
+                        sender=Repository.review_groups.through)
+
+    # Changes to a user's superuser state, permissions, or Local Site
+    # admin status affect which invite-only review groups they can see.
+    post_save.connect(_on_user_saved, sender=User)
+    post_save.connect(_on_local_site_profile_saved, sender=LocalSiteProfile)
+    m2m_changed.connect(_on_user_relations_changed,
+                        sender=User.user_permissions.through)
+    m2m_changed.connect(_on_user_relations_changed,
+                        sender=User.groups.through)
+    m2m_changed.connect(_on_relations_changed,
+                        sender=AuthGroup.permissions.through)
+    m2m_changed.connect(_on_users_changed, sender=LocalSite.admins.through)
+    m2m_changed.connect(_on_users_changed, sender=LocalSite.users.through)
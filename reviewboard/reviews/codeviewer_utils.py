@@ -9,7 +9,12 @@ import subprocess
 import tempfile
 
 from django.contrib.sites.models import Site
+from django.db.models import F
+from django.utils import six
+from django.utils.safestring import mark_safe
+from djblets.cache.backend import cache_memoize
 
+from reviewboard.diffviewer.chunk_generator import RawDiffChunkGenerator
 from reviewboard.diffviewer.diffutils import *
 from reviewboard.diffviewer.views import exception_traceback_string
 from reviewboard.scmtools.core import SCMTool
@@ -20,7 +25,6 @@ from djblets.util.compat.django.template.loader import render_to_string
 
 from reviewboard.diffviewer.models import FileUntouchedComment
 from reviewboard.reviews.models import UntouchedComment
-from reviewboard.reviews.models import Review
 from collections import defaultdict
 
 logger = logging.getLogger(__name__)
@@ -82,11 +86,21 @@ def extract_file_path(request, request_args, revision=None):
     pass
 
 
+#: The version of the cached directory listings for the code browser.
+#:
+#: This should be bumped whenever the format of the cached records changes.
+TREE_CACHE_VERSION = 1
+
+#: Sort order for entries in a directory listing. Trees come first.
+TREE_ENTRY_TYPE_ORDER = {
+    'tree': 1,
+}
+
+_IMMUTABLE_COMMIT_RE = re.compile(r'^[0-9a-f]{40}([0-9a-f]{24})?$')
+
+
 def get_file_tree(review_request, path, revision, modified_file_set, commit, absolute_path):
     repository = review_request.repository
-    # type casting
-    git_tool: GitTool = repository.get_scmtool()
-    tree_data = git_tool.get_repo_directory(path, revision, commit)
 
     path_lst = [review_request.repository.name]
     if path:
@@ -97,70 +111,102 @@ def get_file_tree(review_request, path, revision, modified_file_set, commit, abs
         "current_path": path,
         "path_list": path_lst,  # edge cases handling?
         "is_blob": False,
-        "file_list": get_subtree_list(tree_data, path, modified_file_set, absolute_path)
+        "file_list": get_subtree_list(
+            get_tree_entries(repository, path, revision, commit),
+            path, modified_file_set, absolute_path)
     }
     return tree
 
 
-def get_subtree_list(data, path, modified_file_set, absolute_path):
-    data: str = str(data).lstrip("b'").rstrip("'")
-    raw_item_lst = data.split("\\n")
-    tree_lst = []
+def get_tree_entries(repository, path, revision, commit):
+    """Return the sorted entries of a directory in the repository.
+
+    Listings are cached per repository, commit and directory, as compact
+    ``(object_type, sha1, name)`` records already in display order
+    (subtrees first, then everything else, each in the order Git stores
+    them). Each directory is cached as it's first browsed, so a directory
+    page is a single cache lookup no matter how large the repository is.
+
+    Listings are only cached when ``commit`` is a full commit ID, since the
+    contents of a commit can never change. Anything else (such as a branch
+    name) is listed from the repository every time.
+
+    Version Added:
+        4.0.6
+
+    Args:
+        repository (reviewboard.scmtools.models.Repository):
+            The repository to list.
+
+        path (unicode):
+            The path of the directory to list.
+
+        revision (unicode):
+            The revision of the directory.
+
+        commit (unicode):
+            The commit containing the directory.
+
+    Returns:
+        list of tuple:
+        The ``(object_type, sha1, name)`` record for each entry.
+    """
+    def _list_entries():
+        entries = repository.get_scmtool().get_repo_directory_entries(
+            path, revision, commit)
+
+        return sorted(
+            ((entry.object_type, entry.sha1, entry.name)
+             for entry in entries),
+            key=lambda record: TREE_ENTRY_TYPE_ORDER.get(record[0], 2))
+
+    if commit and _IMMUTABLE_COMMIT_RE.match(six.text_type(commit)):
+        return cache_memoize(
+            'code-browser-tree-v%s:%s:%s:%s'
+            % (TREE_CACHE_VERSION, repository.pk, commit, path),
+            _list_entries,
+            large_data=True)
+
+    return _list_entries()
+
+
+def get_subtree_list(entries, path, modified_file_set, absolute_path):
     prev_path = absolute_path.split('code/', 1)[0] + "code/"
-    for item in raw_item_lst:
-        # need to check if it is a valid input
-        if item:
-            tree_lst.append(create_file_item(item, path, modified_file_set, prev_path))
-
-    tree_lst.sort(key = cmp_to_key(
-        lambda x, y: cmp(x['type_num'],
-                         y['type_num'] or cmp(x['name'],
-                                               y['name']))))
-    return tree_lst
-
-
-def create_file_item(item, path, modified_file_set, prev_path):
-    file_item = {"type": "tree", "name": item.split("\\t")[1], "is_touched": False, "hashcode": ""}
-    lst = item.split("\\t")[0].split(" ")
-    if str(lst[1]) == "tree":
+
+    return [
+        create_file_item(entry, path, modified_file_set, prev_path)
+        for entry in entries
+    ]
+
+
+def create_file_item(entry, path, modified_file_set, prev_path):
+    object_type, hashcode, name = entry
+    file_item = {"type": "tree", "name": name, "is_touched": False, "hashcode": ""}
+    full_name = name
+    if path:
+        full_name = path + "/" + name
+    if object_type == "tree":
         file_item["type"] = "tree"
         file_item["type_num"] = 1
-        # file_item["is_touched"] = False
-        full_name = file_item["name"]
-        if path:
-            full_name = path + "/" + file_item["name"]
         file_item["absolute_url"] = prev_path + "tree/" + full_name
     else:
         file_item["type"] = "blob"
         file_item["type_num"] = 2
-        full_name = file_item["name"]
-        if path:
-            full_name = path + "/" + file_item["name"]
-        if full_name in modified_file_set:
-            file_item["is_touched"] = True
-        else:
-            file_item["is_touched"] = False
-        file_item["absolute_url"] = prev_path + "blob/" + full_name + "?hashcode=" + str(lst[2])
+        file_item["is_touched"] = full_name in modified_file_set
+        file_item["absolute_url"] = prev_path + "blob/" + full_name + "?hashcode=" + hashcode
 
-    file_item["hashcode"] = str(lst[2])
+    file_item["hashcode"] = hashcode
     return file_item
 
 
 def get_original_code_file(review_request, path, modified_file_set, hashcode):
-    repository = review_request.repository
-    # type casting
-    git_tool: GitTool = repository.get_scmtool()
-    encoding, original_file = convert_to_unicode(str(git_tool.get_file_by_hashcode(path, hashcode)),
-                                                 repository.get_encoding_list())
-    # original_file = convert_line_endings(original_file)
-
     path_lst = [review_request.repository.name]
     path_lst += path.split("/")
     blob = {
         "current_path": path,
         "path_list": path_lst,
         "is_blob": True,
-        "content": convert_to_line_list(original_file),
+        "content": get_blob_lines(review_request.repository, path, hashcode),
         "is_touched": False,
         "hashcode": hashcode
     }
@@ -171,6 +217,73 @@ def get_original_code_file(review_request, path, modified_file_set, hashcode):
     return blob
 
 
+def get_blob_lines(repository, path, hashcode):
+    """Return the decoded lines of a blob in a repository.
+
+    Blobs are identified by their hash, so their contents never change. The
+    lines are cached for each blob and set of repository encodings, so that
+    each blob is only fetched from the repository and decoded once, no
+    matter how many views or comments need it.
+
+    Version Added:
+        4.0.6
+
+    Args:
+        repository (reviewboard.scmtools.models.Repository):
+            The repository containing the blob.
+
+        path (unicode):
+            The path of the file.
+
+        hashcode (unicode):
+            The hash of the file's blob.
+
+    Returns:
+        list of unicode:
+        The lines of the blob.
+    """
+    encoding_list = repository.get_encoding_list()
+
+    def _get_lines():
+        # type casting
+        git_tool: GitTool = repository.get_scmtool()
+        encoding, original_file = convert_to_unicode(
+            str(git_tool.get_file_by_hashcode(path, hashcode)),
+            encoding_list)
+
+        return convert_to_line_list(original_file)
+
+    # The lines depend on the repository's configured encodings, so changing
+    # those must not return lines decoded with the old ones.
+    return cache_memoize('repository-blob-lines-%s-%s-%s'
+                         % (repository.pk, hashcode, ','.join(encoding_list)),
+                         _get_lines,
+                         large_data=True)
+
+
+def get_blob_data(repository, path, hashcode):
+    """Return the raw contents of a blob in a repository.
+
+    Version Added:
+        4.0.6
+
+    Args:
+        repository (reviewboard.scmtools.models.Repository):
+            The repository containing the blob.
+
+        path (unicode):
+            The path of the file.
+
+        hashcode (unicode):
+            The hash of the file's blob.
+
+    Returns:
+        bytes:
+        The contents of the blob.
+    """
+    return repository.get_scmtool().get_file_by_hashcode(path, hashcode)
+
+
 def convert_to_line_list(data):
     data = str(data).lstrip("b'").rstrip("'")
     lines = data.split("\\n")
@@ -241,8 +354,12 @@ class BlobRenderer(object):
         return context
 
 
-def populate_blob_files(blob_file, request, context):
-    chunk_generator = get_blob_chunk_generator(request=request, blob_file=blob_file, context=context)
+def populate_blob_files(blob_file, request, context, enable_syntax_highlighting=False):
+    chunk_generator = get_blob_chunk_generator(
+        request=request,
+        blob_file=blob_file,
+        context=context,
+        enable_syntax_highlighting=enable_syntax_highlighting)
     chunks = chunk_generator.get_chunks_blob()
     context.update({
         'chunks': chunks,
@@ -266,13 +383,56 @@ class BlobChunkGenerator(object):
         # self.review_request = self.extra_context["review_request"]
         # self.repository = self.review_request.get_repository()
         # self.tool = self.repository.get_scmtool()
+        self.enable_syntax_highlighting = enable_syntax_highlighting
         self._chunk_index = 0
 
     def get_chunks_blob(self):
         content = self.blob["content"]
-        num_lines = len(content)
 
-        return [self._new_chunk(content) for _ in range(num_lines)]
+        if self.enable_syntax_highlighting:
+            content = self._get_highlighted_content() or content
+
+        return [self._new_chunk(content) for _ in range(len(content))]
+
+    def _get_highlighted_content(self):
+        """Return the syntax-highlighted lines of the blob.
+
+        The blob's contents are decoded and normalized by the diff viewer's
+        chunk generator, and highlighted with the same limits, so the
+        highlighted lines are shared with diffs of the same file.
+
+        Returns:
+            list of unicode:
+            The highlighted lines, or ``None`` if the blob can't or shouldn't
+            be highlighted.
+        """
+        repository = self.extra_context['review_request'].repository
+        path = self.blob["current_path"]
+        data = get_blob_data(repository, path, self.blob["hashcode"])
+
+        chunk_generator = RawDiffChunkGenerator(
+            old=data,
+            new=data,
+            orig_filename=path,
+            modified_filename=path,
+            encoding_list=repository.get_encoding_list())
+        text, lines = chunk_generator.normalize_source_string(
+            data, chunk_generator.encoding_list)
+
+        if not chunk_generator._get_enable_syntax_highlighting(
+                text, text, lines, lines):
+            return None
+
+        markup = chunk_generator._apply_pygments(
+            text, chunk_generator.normalize_path_for_display(path))
+
+        if not markup:
+            return None
+
+        return [
+            mark_safe(line)
+            for line in markup[:len(lines)]
+        ]
 
     def _new_chunk(self, content):
         chunk = {
@@ -308,18 +468,8 @@ def enrich_untouched_in_comments_context_by_review_request(review_request, ancho
 
     diff_context = context['diff_context']
 
-    review_list = Review.objects.filter(review_request_id=review_request.display_id)
-
-    total_file_list = []
-    total_untouched_comment_mp = defaultdict(list)
-    for review in review_list:
-        sub_untouched_comment_mp, file_lst = get_untouched_comments_by_review(review.id, review_request)
-        for file in file_lst:
-            if file not in total_file_list:
-                total_file_list.append(file)
-
-        for key in sub_untouched_comment_mp:
-            total_untouched_comment_mp[key] += sub_untouched_comment_mp[key]
+    total_untouched_comment_mp, total_file_list = \
+        get_untouched_comments_by_review_request(review_request)
 
     file_lst = []
     for file_tuple in total_file_list:
@@ -338,70 +488,77 @@ def enrich_untouched_in_comments_context_by_review_request(review_request, ancho
     diff_context['untouched_comments'] = total_untouched_comment_mp
 
 
-def get_untouched_comment_file(comment):
-    file_id = comment.untouchedfile_id
-    return FileUntouchedComment.objects.get(id=file_id)
+def get_untouched_comments_by_review_request(review_request):
+    """Return all untouched comments on a review request, grouped by file.
 
+    The comments, their files, and the IDs of the reviews containing them are
+    all loaded in a single query, no matter how many reviews or comments
+    there are.
 
-def get_untouched_comments_by_review(review_id, review_request):
-    def tuplefy_file(file):
-        return str(file.untouched_file_path), str(file.untouched_file_hashcode)
+    Version Added:
+        4.0.6
 
-    def convert_comment(comment, file, reviewid=None):
-        untouched_file_comment = {
-            "review_id": reviewid,
-            "review_request_id": comment.get_review_request().id,
-            "file_path": file.untouched_file_path,
-            "file_hashcode": file.untouched_file_hashcode,
-            "content": comment.text,
-            "timestamp": comment.timestamp,
-            "firstline": comment.first_line,
-            "num_lines": comment.num_lines,
-            "extra_data": comment.extra_data,
-            "comment_type": "untouched_comments",
-            "issue_opened": comment.issue_opened,
-            "issue_status": comment.issue_status,
-            "reply_to_id": comment.reply_to_id,
-            "rich_text": False if comment.rich_text == 1 else True,
-            "replies": None,  # tentatively
-            "url": review_request.get_absolute_url()
-        }
-        return untouched_file_comment
+    Args:
+        review_request (reviewboard.reviews.models.review_request.
+                        ReviewRequest):
+            The review request to load comments for.
+
+    Returns:
+        tuple:
+        A 2-tuple containing:
 
-    review = Review.objects.get(id=review_id)
-    untouched_comments = review.untouched_comments.all()
+        1. A dictionary mapping file paths to lists of serialized comments.
+        2. A list of ``(path, hashcode)`` tuples for each file with comments,
+           in the order they were first commented on.
+    """
+    untouched_comments = (
+        UntouchedComment.objects
+        .filter(review__review_request=review_request)
+        .select_related('untouchedfile')
+        .annotate(review_pk=F('review__pk'))
+        .order_by('review__timestamp', 'review__pk', 'timestamp', 'pk')
+    )
+
+    review_request_id = review_request.pk
+    url = review_request.get_absolute_url()
     untouched_comments_mp = defaultdict(list)
     untouched_file_tuple_lst = []
+    seen_file_tuples = set()
+
     for untouched_comment in untouched_comments:
-        untouched_file = get_untouched_comment_file(untouched_comment)
-        if not untouched_file or tuplefy_file(untouched_file) not in untouched_file_tuple_lst:
-            untouched_file_tuple_lst.append(tuplefy_file(untouched_file))
-        untouched_comments_mp[untouched_file.untouched_file_path].append(
-            convert_comment(untouched_comment, untouched_file, review_id))
+        untouched_file = untouched_comment.untouchedfile
+        file_tuple = (str(untouched_file.untouched_file_path),
+                      str(untouched_file.untouched_file_hashcode))
+
+        if file_tuple not in seen_file_tuples:
+            seen_file_tuples.add(file_tuple)
+            untouched_file_tuple_lst.append(file_tuple)
+
+        untouched_comments_mp[untouched_file.untouched_file_path].append({
+            "review_id": untouched_comment.review_pk,
+            "review_request_id": review_request_id,
+            "file_path": untouched_file.untouched_file_path,
+            "file_hashcode": untouched_file.untouched_file_hashcode,
+            "content": untouched_comment.text,
+            "timestamp": untouched_comment.timestamp,
+            "firstline": untouched_comment.first_line,
+            "num_lines": untouched_comment.num_lines,
+            "extra_data": untouched_comment.extra_data,
+            "comment_type": "untouched_comments",
+            "issue_opened": untouched_comment.issue_opened,
+            "issue_status": untouched_comment.issue_status,
+            "reply_to_id": untouched_comment.reply_to_id,
+            "rich_text": False if untouched_comment.rich_text == 1 else True,
+            "replies": None,  # tentatively
+            "url": url,
+        })
+
     return untouched_comments_mp, untouched_file_tuple_lst
 
 
-# def get_untouched_comments_by_review_request(review_request_id):
-#     """
-#         obtain review list by review request
-#         obtain comments by reivew
-#         obtain files by comments
-#     """
-#
-#     untouched_comments = {
-#         "review_request_id": review_request_id
-#     }
-#     comments = []
-#     review_list = Review.objects.filter(review_request_id=review_request_id)
-#     for review in review_list:
-#         untouched_comment = get_untouched_comments_by_review(review.id)
-#         comments.append(untouched_comment)
-#     untouched_comments.update({
-#         "comments": comments
-#     })
-#     return untouched_comments
 def add_blob_comments(filepath, hashcode, context, review_request):
-    comments_by_file_mp = get_untouched_comments_by_file(filepath, hashcode, review_request)
+    comments_by_file_mp = get_untouched_comments_by_file(
+        filepath, hashcode, review_request)
     context['untouched_comments'] = comments_by_file_mp
     context['blob_context'] = {}
     blob_context = context['blob_context']
@@ -409,38 +566,63 @@ def add_blob_comments(filepath, hashcode, context, review_request):
     pass
 
 
-def get_untouched_comments_by_file(filepath, hashcode, review_request):
-    def convert_comment(path, file_hashcode, comment):
-        untouched_comment_object = {
-            "review_id": comment.get_review().id,
-            "review_request_id": comment.get_review_request().id,
-            "file_path": path,
-            "file_hashcode": file_hashcode,
-            "content": comment.text,
-            "timestamp": comment.timestamp,
-            "firstline": comment.first_line,
-            "num_lines": comment.num_lines,
-            "extra_data": comment.extra_data,
-            "comment_type": "untouched_comments",
-            "issue_opened": comment.issue_opened,
-            "issue_status": comment.issue_status,
-            "reply_to_id": comment.reply_to_id,
-            "rich_text": False if comment.rich_text == 1 else True,
-            "replies": None,  # tentatively
-            "url": review_request.get_absolute_url()
-        }
-        return untouched_comment_object
+def get_untouched_file(filepath, hashcode):
+    """Return the file that untouched comments for a blob are attached to.
+
+    Lookups are cached across requests, so the blob view and the comment
+    APIs can resolve a blob without going back to the database.
+
+    Version Added:
+        4.0.6
+
+    Args:
+        filepath (unicode):
+            The path of the file.
 
-    untouched_file = FileUntouchedComment.objects.filter(untouched_file_path=filepath,
-                                                         untouched_file_hashcode=hashcode)
+        hashcode (unicode):
+            The hash of the file's blob.
+
+    Returns:
+        reviewboard.diffviewer.models.untouchedcommentfile.FileUntouchedComment:
+        The file, or ``None`` if there are no comments on the blob.
+    """
+    return FileUntouchedComment.objects.get_for_file(filepath, hashcode)
+
+
+def get_untouched_comments_by_file(filepath, hashcode, review_request):
+    untouched_file = get_untouched_file(filepath, hashcode)
 
-    if not untouched_file:
+    if untouched_file is None:
         return []
-    untouched_file = untouched_file[0]
-    untouched_comments = UntouchedComment.objects.filter(untouchedfile=untouched_file)
+
+    untouched_comments = (
+        UntouchedComment.objects
+        .filter(untouchedfile=untouched_file)
+        .annotate(review_pk=F('review__pk'),
+                  review_request_pk=F('review__review_request__pk'))
+    )
+    url = review_request.get_absolute_url()
     comments_by_file_mp = defaultdict(list)
+
     for untouched_comment in untouched_comments:
-        comments_by_file_mp[filepath].append(convert_comment(filepath, hashcode, untouched_comment))
+        comments_by_file_mp[filepath].append({
+            "review_id": untouched_comment.review_pk,
+            "review_request_id": untouched_comment.review_request_pk,
+            "file_path": filepath,
+            "file_hashcode": hashcode,
+            "content": untouched_comment.text,
+            "timestamp": untouched_comment.timestamp,
+            "firstline": untouched_comment.first_line,
+            "num_lines": untouched_comment.num_lines,
+            "extra_data": untouched_comment.extra_data,
+            "comment_type": "untouched_comments",
+            "issue_opened": untouched_comment.issue_opened,
+            "issue_status": untouched_comment.issue_status,
+            "reply_to_id": untouched_comment.reply_to_id,
+            "rich_text": False if untouched_comment.rich_text == 1 else True,
+            "replies": None,  # tentatively
+            "url": url,
+        })
 
     for key in comments_by_file_mp:
         comments_by_file_mp[key].sort(key=cmp_to_key(
@@ -473,16 +655,33 @@ def build_untouched_comment_fragments(
     comment_entries = []
     had_error = False
     siteconfig = SiteConfiguration.objects.get_current()
+    domain = Site.objects.get_current().domain
+    domain_method = siteconfig.get('site_domain_method')
+    repository = review_request.repository
+
+    # Comments are often grouped on a handful of blobs. Each blob's lines
+    # (or the error from fetching them) are looked up once and shared by
+    # all comments on it.
+    lines_by_blob = {}
 
     for untouched_comment in untouched_comments:
+        untouched_file = untouched_comment.untouchedfile
+        blob_key = (untouched_file.untouched_file_path,
+                    untouched_file.untouched_file_hashcode)
+
         try:
-            repository = review_request.repository
-            git_tool = repository.get_scmtool()
-            _, original_file = convert_to_unicode(
-                str(git_tool.get_file_by_hashcode(untouched_comment.untouchedfile.untouched_file_path,
-                                                  untouched_comment.untouchedfile.untouched_file_hashcode)),
-                repository.get_encoding_list())
-            code = convert_to_line_list(original_file)
+            try:
+                code = lines_by_blob[blob_key]
+            except KeyError:
+                try:
+                    code = get_blob_lines(repository, *blob_key)
+                except Exception as e:
+                    code = e
+
+                lines_by_blob[blob_key] = code
+
+            if isinstance(code, Exception):
+                raise code
 
             first_line = max(1, untouched_comment.first_line)
             # last_line = min(untouched_comment.last_line + lines_of_context[1], max_line)
@@ -494,8 +693,8 @@ def build_untouched_comment_fragments(
             comment_context = {
                 'comment': untouched_comment,
                 'chunks': chunks,
-                'domain': Site.objects.get_current().domain,
-                'domain_method': siteconfig.get('site_domain_method'),
+                'domain': domain,
+                'domain_method': domain_method,
                 'first_line': first_line,
             }
             comment_context.update(context)
@@ -507,10 +706,10 @@ def build_untouched_comment_fragments(
                 None, e, error_template_name, {
                     'comment': untouched_comment,
                     'file': {
-                        'depot_filename': untouched_comment.untouchedfile.untouched_file_path,
+                        'depot_filename': untouched_file.untouched_file_path,
                     },
-                    'domain': Site.objects.get_current().domain,
-                    'domain_method': siteconfig.get("site_domain_method"),
+                    'domain': domain,
+                    'domain_method': domain_method,
                 })
 
             # It's bad that we failed, and we'll return a 500, but we'll
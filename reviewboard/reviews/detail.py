@@ -4,15 +4,17 @@ from __future__ import unicode_literals
 
 import hashlib
 import logging
-import json
 from collections import Counter, defaultdict
 from datetime import datetime
 from itertools import chain
 
+from django.conf import settings
 from django.db.models import Q
 from django.utils import six
-from django.utils.timezone import utc
-from django.utils.translation import ugettext as _
+from django.utils.safestring import mark_safe
+from django.utils.timezone import get_current_timezone_name, utc
+from django.utils.translation import get_language, ugettext as _
+from djblets.cache.backend import cache_memoize
 from djblets.registries.registry import (ALREADY_REGISTERED,
                                          ATTRIBUTE_REGISTERED,
                                          NOT_REGISTERED)
@@ -21,6 +23,7 @@ from djblets.util.compat.django.template.loader import render_to_string
 from djblets.util.dates import get_latest_timestamp
 from djblets.util.decorators import cached_property
 
+from reviewboard.admin.read_only import is_site_read_only_for
 from reviewboard.diffviewer.models import DiffCommit
 from reviewboard.registries.registry import OrderedRegistry
 from reviewboard.reviews.builtin_fields import (CommitListField,
@@ -29,6 +32,7 @@ from reviewboard.reviews.features import status_updates_feature
 from reviewboard.reviews.fields import get_review_request_fieldsets
 from reviewboard.reviews.models import (BaseComment,
                                         Comment,
+                                        CommentThreadLink,
                                         CommitMessageComment,
                                         FileAttachmentComment,
                                         GeneralComment,
@@ -42,6 +46,13 @@ from reviewboard.reviews.models import (BaseComment,
 logger = logging.getLogger(__name__)
 
 
+#: The number of seconds to cache the rendered HTML for page entries.
+#:
+#: Version Added:
+#:     4.0.6
+ENTRY_RENDER_CACHE_EXPIRATION = 60 * 60 * 24
+
+
 class ReviewRequestPageData(object):
     """Data for the review request page.
 
@@ -104,6 +115,12 @@ class ReviewRequestPageData(object):
         draft (reviewboard.reviews.models.ReviewRequestDraft):
             The active draft of the review request, if any. May be ``None``.
 
+        entry_render_cache_hits (int):
+            The number of entries whose HTML was loaded from the cache.
+
+        entry_render_cache_misses (int):
+            The number of entries whose HTML had to be rendered and cached.
+
         active file_attachments (list of reviewboard.attachments.models.
                                  FileAttachment):
             All the active file attachments associated with the review request.
@@ -251,6 +268,8 @@ class ReviewRequestPageData(object):
             'verifying': 0,
         }
         self.child_comments = {}
+        self.entry_render_cache_hits = 0
+        self.entry_render_cache_misses = 0
 
         self.status_updates_enabled = status_updates_feature.is_enabled(
             local_site=review_request.local_site)
@@ -558,21 +577,31 @@ class ReviewRequestPageData(object):
                         self.issue_counts['total'] += 1
                         self.issues.append(comment)
 
-            for comment_list in self.review_comments.values():          
-                for comment in comment_list:
-                    if 'parentComments' in comment.extra_data:
-                        check = comment.extra_data['parentComments']
-                    else:
-                        check = f'{{}}'
-
-                    if (check != f'{{}}' and comment.get_review().public):
-                        parent_dict = json.loads(check)
-                        for parent in parent_dict.values():
-                            parent_id = parent['id'] 
-                            if (parent_id in self.child_comments.keys()):
-                                self.child_comments[parent_id].append(comment) 
-                            else:
-                                self.child_comments[parent_id] = [comment]
+            # Thread the comments under the comments they're linked to. The
+            # links are stored when comments are saved, and are loaded here
+            # in one query. Comments linked before the links were stored
+            # will have them stored the first time they're seen.
+            threaded_comments = [
+                comment
+                for comment_list in six.itervalues(self.review_comments)
+                for comment in comment_list
+                if comment._review.public and comment.has_parent_comments()
+            ]
+            parent_ids_by_comment = \
+                CommentThreadLink.objects.get_parent_ids_by_comment(
+                    threaded_comments)
+
+            for comment in threaded_comments:
+                try:
+                    parent_ids = parent_ids_by_comment[
+                        (comment._meta.model_name, comment.pk)]
+                except KeyError:
+                    parent_ids = \
+                        CommentThreadLink.objects.update_for_comment(comment)
+
+                for parent_id in parent_ids:
+                    self.child_comments.setdefault(parent_id, []).append(
+                        comment)
 
         if self.review_request.created_with_history:
             pks = [diffset.pk for diffset in self.diffsets]
@@ -760,6 +789,16 @@ class BaseReviewRequestPageEntry(object):
     #: the entry, or disabled altogether.
     has_content = True
 
+    #: Whether the rendered HTML for this entry can be cached.
+    #:
+    #: This should only be enabled for entries whose
+    #: :py:meth:`build_etag_data` changes whenever the content of a specific
+    #: entry changes.
+    #:
+    #: Version Added:
+    #:     4.0.6
+    render_cache_enabled = False
+
     @classmethod
     def build_entries(cls, data):
         """Generate entry instances from review request page data.
@@ -970,6 +1009,71 @@ class BaseReviewRequestPageEntry(object):
         """
         return {}
 
+    def get_render_cache_key(self, request, context):
+        """Return the cache key for the entry's rendered HTML.
+
+        The key is built from the entry's :py:meth:`build_etag_data`, along
+        with the state of the page that affects how the entry is shown to
+        the user viewing it.
+
+        Entries are shown differently to each logged-in user (for instance,
+        issue controls, draft replies, and "new" markers), so the HTML is
+        cached per-user. Anonymous users all share the same HTML.
+
+        Version Added:
+            4.0.6
+
+        Args:
+            request (django.http.HttpRequest):
+                The HTTP request from the client.
+
+            context (dict):
+                The template context for the entry.
+
+        Returns:
+            unicode:
+            The cache key, or ``None`` if the HTML can't be cached.
+        """
+        if not self.render_cache_enabled:
+            return None
+
+        user = request.user
+        last_visited = context.get('last_visited')
+
+        if user.is_authenticated:
+            user_key = user.pk
+
+            # Replies and other activity newer than the last visit are
+            # marked as new. If there's been none, the exact time of the
+            # last visit doesn't affect the HTML.
+            if (last_visited is not None and
+                self.updated_timestamp is not None and
+                last_visited < self.updated_timestamp):
+                last_visited_key = last_visited.isoformat()
+            else:
+                last_visited_key = ''
+        else:
+            user_key = 'anonymous'
+            last_visited_key = ''
+
+        key = ':'.join(six.text_type(value) for value in (
+            self.entry_type_id,
+            self.entry_id,
+            self.data.review_request.pk,
+            self.build_etag_data(self.data, entry=self),
+            user_key,
+            last_visited_key,
+            context['entry_is_new'],
+            self.collapsed,
+            is_site_read_only_for(user),
+            get_language(),
+            get_current_timezone_name(),
+            settings.AJAX_SERIAL,
+        ))
+
+        return 'review-request-page-entry-html-%s' % (
+            hashlib.sha1(key.encode('utf-8')).hexdigest())
+
     def render_to_string(self, request, context):
         """Render the entry to a string.
 
@@ -977,6 +1081,13 @@ class BaseReviewRequestPageEntry(object):
         any content (as determined by :py:attr:`has_content`), then this
         will return an empty string.
 
+        If :py:attr:`render_cache_enabled` is set, the HTML will be cached,
+        and only rendered again when the entry changes.
+
+        Version Changed:
+            4.0.6:
+            Added caching of the rendered HTML.
+
         Args:
             request (django.http.HttpRequest):
                 The HTTP request from the client.
@@ -1009,21 +1120,45 @@ class BaseReviewRequestPageEntry(object):
                     BaseReviewRequestPageEntry.ENTRY_POS_INITIAL),
             })
             new_context.update(self.get_extra_context(request, context))
+            cache_key = self.get_render_cache_key(request, new_context)
         except Exception as e:
             logger.exception('Error generating template context for %s '
                              '(ID=%s): %s',
                              self.__class__.__name__, self.entry_id, e)
             return ''
 
-        try:
+        def _render():
             return render_to_string(template_name=self.template_name,
                                     context=new_context,
                                     request=request)
+
+        try:
+            if cache_key is None:
+                return _render()
+
+            rendered = []
+
+            def _render_for_cache():
+                rendered.append(True)
+
+                return _render()
+
+            html = cache_memoize(cache_key,
+                                 _render_for_cache,
+                                 large_data=True,
+                                 expiration=ENTRY_RENDER_CACHE_EXPIRATION)
         except Exception as e:
             logger.exception('Error rendering template for %s (ID=%s): %s',
                              self.__class__.__name__, self.entry_id, e)
             return ''
 
+        if rendered:
+            self.data.entry_render_cache_misses += 1
+        else:
+            self.data.entry_render_cache_hits += 1
+
+        return mark_safe(html)
+
     def finalize(self):
         """Perform final computations after all comments have been added."""
         pass
@@ -1081,6 +1216,49 @@ class ReviewEntryMixin(object):
             )
         )
 
+    def get_review_etag_data(self, review):
+        """Return ETag data for a review shown in the entry.
+
+        This covers the review, its comments (including their issue states
+        and threads), and the latest reply to the review.
+
+        Version Added:
+            4.0.6
+
+        Args:
+            review (reviewboard.reviews.models.review.Review):
+                The review to build ETag data for.
+
+        Returns:
+            unicode:
+            The ETag data for the review.
+        """
+        data = self.data
+
+        comments_etag = ':'.join(
+            '%s:%s:%s:%s:%s:%s' % (
+                comment._meta.model_name,
+                comment.pk,
+                comment.timestamp,
+                comment.issue_opened,
+                comment.issue_status,
+                ','.join(
+                    six.text_type(child_comment.pk)
+                    for child_comment in data.child_comments.get(comment.pk,
+                                                                 [])
+                ),
+            )
+            for comment in data.review_comments.get(review.pk, [])
+        )
+
+        return '%s:%s:%s:%s:%s' % (
+            review.pk,
+            review.timestamp,
+            review.ship_it,
+            data.latest_timestamps_by_review_id.get(review.pk),
+            comments_etag,
+        )
+
     def serialize_review_js_model_data(self, review):
         """Serialize information on a review for JavaScript models.
 
@@ -1166,6 +1344,8 @@ class StatusUpdatesEntryMixin(DiffCommentsSerializerMixin, ReviewEntryMixin):
     needs_reviews = True
     needs_status_updates = True
 
+    render_cache_enabled = True
+
     @classmethod
     def build_etag_data(cls, data, entry=None, **kwargs):
         """Build ETag data for the entry.
@@ -1174,10 +1354,15 @@ class StatusUpdatesEntryMixin(DiffCommentsSerializerMixin, ReviewEntryMixin):
         page updates.
 
         ETags are influenced by a status update's service ID, state,
-        timestamp, and description.
+        timestamp, and description. ETags for a specific entry are also
+        influenced by the reviews on its status updates.
 
         The result will be encoded as a SHA1 hash.
 
+        Version Changed:
+            4.0.6:
+            ETags for a specific entry now include the status update reviews.
+
         Args:
             data (ReviewRequestPageData):
                 The computed data (pre-ETag) for the page.
@@ -1193,7 +1378,7 @@ class StatusUpdatesEntryMixin(DiffCommentsSerializerMixin, ReviewEntryMixin):
             The ETag data for the entry.
         """
         if entry is not None:
-            status_updates = entry.status_updates
+            status_updates = getattr(entry, 'status_updates', [])
         elif data.status_updates_enabled:
             status_updates = data.all_status_updates
         else:
@@ -1212,6 +1397,13 @@ class StatusUpdatesEntryMixin(DiffCommentsSerializerMixin, ReviewEntryMixin):
         else:
             etag = ''
 
+        if entry is not None:
+            etag = ':'.join([etag] + [
+                entry.get_review_etag_data(status_update.review)
+                for status_update in status_updates
+                if status_update.review_id is not None
+            ])
+
         etag = '%s:%s' % (
             super(StatusUpdatesEntryMixin, cls).build_etag_data(data),
             etag,
@@ -1626,6 +1818,42 @@ class ReviewEntry(ReviewEntryMixin, DiffCommentsSerializerMixin,
     js_model_class = 'RB.ReviewRequestPage.ReviewEntry'
     js_view_class = 'RB.ReviewRequestPage.ReviewEntryView'
 
+    render_cache_enabled = True
+
+    @classmethod
+    def build_etag_data(cls, data, entry=None, **kwargs):
+        """Build ETag data for the entry.
+
+        ETags for a specific entry are influenced by the review, its
+        comments, and the latest reply to it. The result will be encoded as
+        a SHA1 hash.
+
+        Version Added:
+            4.0.6
+
+        Args:
+            data (ReviewRequestPageData):
+                The computed data (pre-ETag) for the page.
+
+            entry (ReviewEntry):
+                A specific entry to build ETags for.
+
+            **kwargs (dict, unused):
+                Additional keyword arguments for future expansion.
+
+        Returns:
+            unicode:
+            The ETag data for the entry.
+        """
+        etag = super(ReviewEntry, cls).build_etag_data(data, entry=entry,
+                                                       **kwargs)
+
+        if entry is not None:
+            etag = '%s:%s' % (etag, entry.get_review_etag_data(entry.review))
+            etag = hashlib.sha1(etag.encode('utf-8')).hexdigest()
+
+        return etag
+
     @classmethod
     def build_entries(cls, data):
         """Generate review entry instances from review request page data.
@@ -1649,12 +1877,7 @@ class ReviewEntry(ReviewEntryMixin, DiffCommentsSerializerMixin,
                         review=review)
 
             for comment in data.review_comments.get(review.pk, []):
-                if 'parentComments' in comment.extra_data:
-                    check = comment.extra_data['parentComments']
-                else:
-                    check = f'{{}}'
-
-                if (check == f'{{}}'): 
+                if not comment.has_parent_comments():
                     entry.add_comment(comment._type, comment)
                     if (comment.pk in data.child_comments.keys() and 
                         comment.comment_type != 'general'):
@@ -1821,6 +2044,55 @@ class ChangeEntry(StatusUpdatesEntryMixin, BaseReviewRequestPageEntry):
     js_model_class = 'RB.ReviewRequestPage.ChangeEntry'
     js_view_class = 'RB.ReviewRequestPage.ChangeEntryView'
 
+    @classmethod
+    def build_etag_data(cls, data, entry=None, **kwargs):
+        """Build ETag data for the entry.
+
+        ETags for a specific entry are also influenced by the change
+        description's text and the rendered field changes. The result will
+        be encoded as a SHA1 hash.
+
+        Version Added:
+            4.0.6
+
+        Args:
+            data (ReviewRequestPageData):
+                The computed data (pre-ETag) for the page.
+
+            entry (ChangeEntry):
+                A specific entry to build ETags for.
+
+            **kwargs (dict, unused):
+                Additional keyword arguments for future expansion.
+
+        Returns:
+            unicode:
+            The ETag data for the entry.
+        """
+        etag = super(ChangeEntry, cls).build_etag_data(data, entry=entry,
+                                                       **kwargs)
+
+        if entry is not None:
+            changedesc = entry.changedesc
+            fields_etag = ':'.join(
+                '%s:%s' % (section.get('title'),
+                           section.get('rendered_html'))
+                for group in entry.fields_changed_groups
+                for section in group['fields']
+            )
+
+            etag = '%s:%s:%s:%s:%s:%s' % (
+                etag,
+                changedesc.pk,
+                changedesc.rich_text,
+                changedesc.text,
+                entry.new_status,
+                fields_etag,
+            )
+            etag = hashlib.sha1(etag.encode('utf-8')).hexdigest()
+
+        return etag
+
     @classmethod
     def build_entries(cls, data):
         """Generate change entry instances from review request page data.
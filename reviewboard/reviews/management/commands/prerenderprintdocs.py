@@ -0,0 +1,223 @@
+"""Management command to pre-render print documents for review requests."""
+
+from __future__ import unicode_literals
+
+import os
+import sys
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.messages.middleware import MessageMiddleware
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.middleware.locale import LocaleMiddleware
+from django.core.management.base import CommandError
+from django.core.urlresolvers import ResolverMatch
+from django.http import Http404
+from django.test.client import RequestFactory
+from django.utils.translation import ugettext as _
+from djblets.util.compat.django.core.management.base import BaseCommand
+
+from reviewboard.accounts.middleware import TimezoneMiddleware
+from reviewboard.reviews.models import ReviewRequest
+from reviewboard.reviews.views import ReviewRequestPrintView
+from reviewboard.site.models import LocalSite
+from reviewboard.site.urlresolvers import local_site_reverse
+
+
+class Command(BaseCommand):
+    """Management command to pre-render print documents."""
+
+    help = _('Renders the print view for review requests, caching the '
+             'results so that the print view loads quickly, and optionally '
+             'saving them to files for exporting')
+
+    def add_arguments(self, parser):
+        """Add arguments to the command.
+
+        Args:
+            parser (argparse.ArgumentParser):
+                The argument parser for the command.
+        """
+        parser.add_argument(
+            'review_request_ids',
+            metavar='REVIEW_REQUEST_ID',
+            nargs='*',
+            type=int,
+            help=_('The IDs of the review requests to render. If not '
+                   'provided, all public review requests will be rendered.'))
+        parser.add_argument(
+            '--user',
+            action='store',
+            dest='username',
+            default=None,
+            help=_('The username of the user to render the print view as. '
+                   'Only review requests accessible by this user will be '
+                   'rendered.'))
+        parser.add_argument(
+            '--local-site',
+            action='store',
+            dest='local_site_name',
+            default=None,
+            help=_('The name of the Local Site containing the review '
+                   'requests.'))
+        parser.add_argument(
+            '--output-dir',
+            action='store',
+            dest='output_dir',
+            default=None,
+            help=_('A directory to save each print document to, as '
+                   '<ID>.html.'))
+        parser.add_argument(
+            '--no-progress',
+            action='store_false',
+            dest='show_progress',
+            default=True,
+            help=_("Don't show progress information while rendering."))
+
+    def handle(self, **options):
+        """Handle the command.
+
+        Args:
+            **options (dict):
+                Options parsed on the command line.
+
+        Raises:
+            django.core.management.CommandError:
+                One of the options was invalid.
+        """
+        username = options['username']
+        local_site_name = options['local_site_name']
+        output_dir = options['output_dir']
+
+        if not username:
+            raise CommandError(_('--user must be provided.'))
+
+        try:
+            user = User.objects.get(username=username)
+        except User.DoesNotExist:
+            raise CommandError(_('The user "%s" does not exist.') % username)
+
+        if local_site_name:
+            try:
+                local_site = LocalSite.objects.get(name=local_site_name)
+            except LocalSite.DoesNotExist:
+                raise CommandError(_('The Local Site "%s" does not exist.')
+                                   % local_site_name)
+        else:
+            local_site = None
+
+        if output_dir and not os.path.isdir(output_dir):
+            raise CommandError(_('The output directory "%s" does not '
+                                 'exist.')
+                               % output_dir)
+
+        # Don't allow queries to be stored.
+        settings.DEBUG = False
+
+        review_requests = ReviewRequest.objects.filter(local_site=local_site)
+
+        if options['review_request_ids']:
+            if local_site:
+                review_requests = review_requests.filter(
+                    local_id__in=options['review_request_ids'])
+            else:
+                review_requests = review_requests.filter(
+                    pk__in=options['review_request_ids'])
+        else:
+            review_requests = review_requests.filter(public=True)
+
+        # Exporting documents shouldn't count as the user visiting the
+        # review requests.
+        view = ReviewRequestPrintView.as_view(track_visits=False)
+        num_rendered = 0
+        num_failed = 0
+
+        for review_request in review_requests.order_by('pk').iterator():
+            display_id = review_request.display_id
+            request = self._create_request(user=user,
+                                           review_request=review_request,
+                                           local_site=local_site,
+                                           view=view)
+
+            try:
+                response = view(request,
+                                review_request_id=display_id,
+                                local_site_name=local_site_name)
+            except Http404:
+                response = None
+
+            if response is None or response.status_code != 200:
+                self.stderr.write(_('Unable to render review request %s as '
+                                    'user "%s".\n')
+                                  % (display_id, username))
+                num_failed += 1
+                continue
+
+            if output_dir:
+                filename = os.path.join(output_dir, '%s.html' % display_id)
+
+                with open(filename, 'wb') as fp:
+                    fp.write(response.content)
+
+            num_rendered += 1
+
+            if options['show_progress']:
+                # NOTE: We use sys.stdout when writing instead of self.stdout
+                #       in order to control newlines.
+                sys.stdout.write(' %s review requests rendered\r'
+                                 % num_rendered)
+                sys.stdout.flush()
+
+        self.stdout.write(
+            _('\nRendered %(rendered)d review requests '
+              '(%(failed)d failed).\n')
+            % {
+                'rendered': num_rendered,
+                'failed': num_failed,
+            })
+
+    def _create_request(self, user, review_request, local_site, view):
+        """Return an HTTP request for rendering a review request's print view.
+
+        This sets the attributes on the request that would normally be set
+        by middleware.
+
+        Args:
+            user (django.contrib.auth.models.User):
+                The user to render the print view as.
+
+            review_request (reviewboard.reviews.models.review_request.
+                            ReviewRequest):
+                The review request being rendered.
+
+            local_site (reviewboard.site.models.LocalSite):
+                The Local Site containing the review request, if any.
+
+            view (callable):
+                The view function being called.
+
+        Returns:
+            django.http.HttpRequest:
+            The HTTP request.
+        """
+        request = RequestFactory().get(local_site_reverse(
+            'print',
+            local_site=local_site,
+            kwargs={
+                'review_request_id': review_request.display_id,
+            }))
+        request.user = user
+        request.local_site = local_site
+        request.resolver_match = ResolverMatch(func=view,
+                                               args=[],
+                                               kwargs={})
+
+        # The language and timezone are part of the cache key for the print
+        # document, so they need to match what the user would get when
+        # viewing the page.
+        LocaleMiddleware().process_request(request)
+        SessionMiddleware().process_request(request)
+        MessageMiddleware().process_request(request)
+        TimezoneMiddleware().process_request(request)
+
+        return request
@@ -11,8 +11,9 @@ from django.utils import six
 from djblets.db.managers import ConcurrencyManager
 
 from reviewboard.diffviewer.models import DiffSetHistory
+from reviewboard.reviews.access import (get_accessible_group_ids,
+                                        get_accessible_repository_ids)
 from reviewboard.scmtools.errors import ChangeNumberInUseError
-from reviewboard.scmtools.models import Repository
 
 
 logger = logging.getLogger(__name__)
@@ -523,8 +524,6 @@ class ReviewRequestManager(ConcurrencyManager):
                extra_query=None, local_site=None, filter_private=False,
                show_inactive=False, show_all_unpublished=False,
                show_all_local_sites=False):
-        from reviewboard.reviews.models import Group
-
         is_authenticated = (user is not None and user.is_authenticated)
 
         if show_all_unpublished:
@@ -555,12 +554,10 @@ class ReviewRequestManager(ConcurrencyManager):
             group_query = Q(target_groups=None)
 
             if is_authenticated:
-                accessible_repo_ids = \
-                    Repository.objects.accessible_ids(user, visible_only=False,
-                                                      local_site=local_site)
-                accessible_group_ids = \
-                    Group.objects.accessible_ids(user, visible_only=False,
-                                                 local_site=local_site)
+                accessible_repo_ids = get_accessible_repository_ids(
+                    user, local_site=local_site)
+                accessible_group_ids = get_accessible_group_ids(
+                    user, local_site=local_site)
 
                 repo_query = repo_query | Q(repository__in=accessible_repo_ids)
                 group_query = (group_query |
@@ -724,8 +721,6 @@ class ReviewManager(ConcurrencyManager):
             django.db.models.query.QuerySet:
             A queryset for the given conditions.
         """
-        from reviewboard.reviews.models import Group
-
         query = Q(public=public) & Q(base_reply_to=base_reply_to)
 
         if status:
@@ -742,14 +737,10 @@ class ReviewManager(ConcurrencyManager):
 
             # TODO: should be consolidated with queries in ReviewRequestManager
             if user and user.is_authenticated:
-                accessible_repo_ids = Repository.objects.accessible_ids(
-                    user=user,
-                    visible_only=False,
-                    local_site=local_site)
-                accessible_group_ids = Group.objects.accessible_ids(
-                    user=user,
-                    visible_only=False,
-                    local_site=local_site)
+                accessible_repo_ids = get_accessible_repository_ids(
+                    user, local_site=local_site)
+                accessible_group_ids = get_accessible_group_ids(
+                    user, local_site=local_site)
 
                 repo_query |= \
                     Q(review_request__repository__in=accessible_repo_ids)
@@ -798,4 +789,110 @@ class ReadStatusManager(Manager):
                 'file_name': data['file_name'],
                 'status': data['status'],
                 'timestamp': data['timestamp']
-            })
\ No newline at end of file
+            })
+
+
+class CommentThreadLinkManager(Manager):
+    """Manages CommentThreadLink models.
+
+    Version Added:
+        4.0.6
+    """
+
+    def update_for_comment(self, comment):
+        """Update the stored links for a comment's parent comments.
+
+        This replaces any existing links for the comment with those from its
+        ``parentComments``.
+
+        If the comment has ``parentComments`` that don't contain any parent
+        IDs, a single link to :py:attr:`CommentThreadLink.NO_PARENT
+        <reviewboard.reviews.models.comment_thread_link.CommentThreadLink.
+        NO_PARENT>` is stored, so that it won't need to be decoded again.
+
+        Args:
+            comment (reviewboard.reviews.models.base_comment.BaseComment):
+                The comment to update links for. This must be saved.
+
+        Returns:
+            list of int:
+            The IDs of the comment's parent comments.
+        """
+        comment_type = comment._meta.model_name
+        parent_ids = comment.get_parent_comment_ids()
+
+        self.filter(comment_type=comment_type,
+                    comment_id=comment.pk).delete()
+
+        if parent_ids:
+            link_parent_ids = parent_ids
+        elif comment.has_parent_comments():
+            link_parent_ids = [self.model.NO_PARENT]
+        else:
+            link_parent_ids = []
+
+        if link_parent_ids:
+            self.bulk_create(
+                self.model(comment_type=comment_type,
+                           comment_id=comment.pk,
+                           parent_comment_id=parent_id)
+                for parent_id in link_parent_ids
+            )
+
+        return parent_ids
+
+    def delete_for_comment(self, comment):
+        """Delete the stored links for a comment.
+
+        Args:
+            comment (reviewboard.reviews.models.base_comment.BaseComment):
+                The comment to delete links for.
+        """
+        self.filter(comment_type=comment._meta.model_name,
+                    comment_id=comment.pk).delete()
+
+    def get_parent_ids_by_comment(self, comments):
+        """Return the stored parent comment IDs for a list of comments.
+
+        This performs a single query for all the comments.
+
+        Args:
+            comments (list of reviewboard.reviews.models.base_comment.
+                      BaseComment):
+                The comments to return parent IDs for.
+
+        Returns:
+            dict:
+            A dictionary mapping ``(model_name, comment_id)`` tuples to lists
+            of parent comment IDs. Comments without any stored links are not
+            included. Comments whose links were stored but had no parents
+            map to empty lists.
+        """
+        comment_ids_by_type = {}
+
+        for comment in comments:
+            comment_ids_by_type.setdefault(comment._meta.model_name,
+                                           set()).add(comment.pk)
+
+        if not comment_ids_by_type:
+            return {}
+
+        q = Q()
+
+        for comment_type, comment_ids in six.iteritems(comment_ids_by_type):
+            q |= Q(comment_type=comment_type, comment_id__in=comment_ids)
+
+        parent_ids = {}
+
+        for comment_type, comment_id, parent_id in (
+                self.filter(q)
+                .order_by('pk')
+                .values_list('comment_type', 'comment_id',
+                             'parent_comment_id')):
+            comment_parent_ids = parent_ids.setdefault(
+                (comment_type, comment_id), [])
+
+            if parent_id != self.model.NO_PARENT:
+                comment_parent_ids.append(parent_id)
+
+        return parent_ids
@@ -3,6 +3,7 @@ from __future__ import unicode_literals
 from reviewboard.reviews.models.base_comment import BaseComment
 from reviewboard.reviews.models.default_reviewer import DefaultReviewer
 from reviewboard.reviews.models.diff_comment import Comment
+from reviewboard.reviews.models.comment_thread_link import CommentThreadLink
 from reviewboard.reviews.models.commit_message_comment import CommitMessageComment
 from reviewboard.reviews.models.file_attachment_comment import \
     FileAttachmentComment
@@ -21,6 +22,7 @@ from reviewboard.reviews.models.untouched_comment import UntouchedComment
 __all__ = [
     'BaseComment',
     'Comment',
+    'CommentThreadLink',
     'CommitMessageComment',
     'DefaultReviewer',
     'FileAttachmentComment',
@@ -1,9 +1,11 @@
 from __future__ import unicode_literals
 
+import json
+
 from django.core.exceptions import ObjectDoesNotExist
 from django.db import models
 from django.db.models import Q
-from django.utils import timezone
+from django.utils import six, timezone
 from django.utils.encoding import python_2_unicode_compatible
 from django.utils.translation import ugettext_lazy as _
 from djblets.db.fields import CounterField, JSONField
@@ -124,6 +126,56 @@ class BaseComment(models.Model):
         _get_parentComments, _set_parentComments,
         doc='This comment\'s parent comments.')
 
+    def has_parent_comments(self):
+        """Return whether this comment is threaded under other comments.
+
+        This only checks the stored ``parentComments``, and does not decode
+        it.
+
+        Version Added:
+            4.0.6
+
+        Returns:
+            bool:
+            Whether this comment has parent comments.
+        """
+        return (self.extra_data is not None and
+                self.extra_data.get('parentComments') not in (None, '{}'))
+
+    def get_parent_comment_ids(self):
+        """Return the IDs of the comments this comment is threaded under.
+
+        This decodes the ``parentComments`` JSON. Callers wanting the IDs for
+        many comments should use :py:meth:`CommentThreadLinkManager.
+        get_parent_ids_by_comment() <reviewboard.reviews.managers.
+        CommentThreadLinkManager.get_parent_ids_by_comment>` instead.
+
+        Version Added:
+            4.0.6
+
+        Returns:
+            list of int:
+            The IDs of the parent comments.
+        """
+        if not self.has_parent_comments():
+            return []
+
+        parent_comments = self.extra_data['parentComments']
+
+        if isinstance(parent_comments, six.string_types):
+            try:
+                parent_comments = json.loads(parent_comments, strict=False)
+            except ValueError:
+                return []
+
+        try:
+            return [
+                int(parent['id'])
+                for parent in six.itervalues(parent_comments)
+            ]
+        except (AttributeError, KeyError, TypeError, ValueError):
+            return []
+
     def __init__(self, *args, **kwargs):
         """Initialize the comment.
 
@@ -139,8 +191,22 @@ class BaseComment(models.Model):
         super(BaseComment, self).__init__(*args, **kwargs)
 
         self._loaded_issue_status = self.issue_status
+        self._loaded_parent_comments = self._get_loaded_parent_comments()
         self.children = []
 
+    def _get_loaded_parent_comments(self):
+        """Return the parent comments stored for a loaded comment.
+
+        Returns:
+            object:
+            The stored ``parentComments`` value, or ``None`` for new
+            comments.
+        """
+        if self.pk is None or self.extra_data is None:
+            return None
+
+        return self.extra_data.get('parentComments')
+
     def get_review_request(self):
         """Return this comment's review request.
 
@@ -287,12 +353,31 @@ class BaseComment(models.Model):
             **kwargs (dict):
                 Keyword arguments passed to the method (unused).
         """
+        from reviewboard.reviews.models.comment_thread_link import \
+            CommentThreadLink
         from reviewboard.reviews.models.review_request import ReviewRequest
 
         self.timestamp = timezone.now()
 
+        is_new = self.pk is None
+
         super(BaseComment, self).save()
 
+        # Keep the stored thread links in sync with the parent comments, but
+        # only when they've changed, to avoid extra queries on every save.
+        parent_comments = self._get_loaded_parent_comments()
+
+        if is_new:
+            parent_comments_changed = self.has_parent_comments()
+        else:
+            parent_comments_changed = \
+                (parent_comments != self._loaded_parent_comments)
+
+        if parent_comments_changed:
+            CommentThreadLink.objects.update_for_comment(self)
+
+        self._loaded_parent_comments = parent_comments
+
         try:
             # Update the review timestamp, but only if it's a draft.
             # Otherwise, resolving an issue will change the timestamp of
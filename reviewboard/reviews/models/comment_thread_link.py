@@ -0,0 +1,73 @@
+"""Links between comments and the comments they're threaded under."""
+
+from __future__ import unicode_literals
+
+from django.db import models
+from django.utils.translation import ugettext_lazy as _
+
+from reviewboard.reviews.managers import CommentThreadLinkManager
+
+
+class CommentThreadLink(models.Model):
+    """A link from a comment to a parent comment it's threaded under.
+
+    Comments can be linked to other comments on the review request through
+    the ``parentComments`` JSON stored in their ``extra_data``. That JSON is
+    decoded when the comment is saved, and stored as one of these links for
+    each parent, so that threads can be loaded without decoding it again.
+
+    Version Added:
+        4.0.6
+    """
+
+    #: The parent ID stored for comments without any parents.
+    #:
+    #: This is stored for comments whose ``parentComments`` don't contain any
+    #: parent IDs, so that they're not decoded on every page load.
+    NO_PARENT = 0
+
+    #: The model name of the child comment's class.
+    comment_type = models.CharField(_('comment type'), max_length=32)
+
+    #: The ID of the child comment.
+    comment_id = models.PositiveIntegerField(_('comment ID'))
+
+    #: The ID of the parent comment.
+    parent_comment_id = models.PositiveIntegerField(_('parent comment ID'))
+
+    objects = CommentThreadLinkManager()
+
+    class Meta:
+        app_label = 'reviews'
+        db_table = 'reviews_commentthreadlink'
+        index_together = [('comment_type', 'comment_id')]
+        ordering = ['pk']
+        verbose_name = _('Comment Thread Link')
+        verbose_name_plural = _('Comment Thread Links')
+
+
+def _on_comment_deleted(instance, **kwargs):
+    """Delete the thread links for a deleted comment.
+
+    Args:
+        instance (reviewboard.reviews.models.base_comment.BaseComment):
+            The comment that was deleted.
+
+        **kwargs (dict):
+            Ignored arguments from the signal.
+    """
+    CommentThreadLink.objects.delete_for_comment(instance)
+
+
+def connect_signals():
+    """Connect the signal handlers that keep thread links up to date.
+
+    Version Added:
+        4.0.6
+    """
+    from django.db.models.signals import post_delete
+
+    from reviewboard.reviews.models.base_comment import BaseComment
+
+    for comment_cls in BaseComment.__subclasses__():
+        post_delete.connect(_on_comment_deleted, sender=comment_cls)
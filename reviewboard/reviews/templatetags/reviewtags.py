@@ -33,6 +33,7 @@ from reviewboard.reviews.models import (BaseComment, Group,
                                         FileAttachmentComment,
                                         GeneralComment)
 from reviewboard.reviews.ui.base import FileAttachmentReviewUI
+from reviewboard.reviews.update_streams import is_update_streaming_enabled
 from reviewboard.site.urlresolvers import local_site_reverse
 
 
@@ -1095,7 +1096,46 @@ def render_review_request_entries(context, entries):
     """
     request = context['request']
 
-    return mark_safe(''.join(
+    if not entries:
+        return ''
+
+    data = entries[0].data
+    old_hits = data.entry_render_cache_hits
+    old_misses = data.entry_render_cache_misses
+
+    html = ''.join(
         entry.render_to_string(request, context)
         for entry in entries
-    ))
+    )
+
+    logger.debug('Rendered %d entries for review request %s (%d from '
+                 'cache, %d rendered)',
+                 len(entries), data.review_request.pk,
+                 data.entry_render_cache_hits - old_hits,
+                 data.entry_render_cache_misses - old_misses,
+                 request=request)
+
+    return mark_safe(html)
+
+
+@register.simple_tag
+def update_streams_enabled():
+    """Return whether updates can be streamed to review request pages.
+
+    This is meant to be used with ``as``, for conditionally providing the
+    URL for streaming updates to the page.
+
+    Example:
+        .. code-block:: html+django
+
+           {% update_streams_enabled as streaming %}
+           {% if streaming %}...{% endif %}
+
+    Version Added:
+        4.0.6
+
+    Returns:
+        bool:
+        Whether updates can be streamed.
+    """
+    return is_update_streaming_enabled()
@@ -0,0 +1,373 @@
+"""Unit tests for reviewboard.reviews.access."""
+
+from __future__ import unicode_literals
+
+from django.contrib.auth.models import Group as AuthGroup, Permission, User
+from django.core.cache import cache
+from djblets.cache.backend import make_cache_key
+
+from reviewboard.reviews.access import (_USER_VERSION_KEY,
+                                        get_accessible_group_ids,
+                                        get_accessible_repository_ids,
+                                        invalidate_accessible_ids)
+from reviewboard.reviews.models import Group, ReviewRequest
+from reviewboard.site.models import LocalSite
+from reviewboard.testing import TestCase
+
+
+class AccessibleIDsTests(TestCase):
+    """Unit tests for the cached lists of accessible IDs."""
+
+    fixtures = ['test_users', 'test_scmtools', 'test_site']
+
+    def setUp(self):
+        super(AccessibleIDsTests, self).setUp()
+
+        self.user = User.objects.get(username='doc')
+
+    def test_get_accessible_repository_ids(self):
+        """Testing get_accessible_repository_ids"""
+        public_repo = self.create_repository(name='public')
+        private_repo = self.create_repository(name='private', public=False)
+        member_repo = self.create_repository(name='member', public=False)
+        member_repo.users.add(self.user)
+
+        self.assertEqual(
+            set(get_accessible_repository_ids(self.user)),
+            {public_repo.pk, member_repo.pk})
+        self.assertNotIn(private_repo.pk,
+                         get_accessible_repository_ids(self.user))
+
+    def test_get_accessible_repository_ids_cached(self):
+        """Testing get_accessible_repository_ids caches results"""
+        self.create_repository(name='public')
+
+        get_accessible_repository_ids(self.user)
+
+        with self.assertNumQueries(0):
+            get_accessible_repository_ids(self.user)
+
+    def test_get_accessible_group_ids(self):
+        """Testing get_accessible_group_ids"""
+        public_group = self.create_review_group(name='public')
+        invite_group = self.create_review_group(name='invite',
+                                                invite_only=True)
+        member_group = self.create_review_group(name='member',
+                                                invite_only=True)
+        member_group.users.add(self.user)
+
+        ids = get_accessible_group_ids(self.user)
+
+        self.assertEqual(set(ids), {public_group.pk, member_group.pk})
+        self.assertNotIn(invite_group.pk, ids)
+
+    def test_invalidated_on_group_membership(self):
+        """Testing get_accessible_group_ids invalidated when group
+        membership changes
+        """
+        group = self.create_review_group(invite_only=True)
+
+        self.assertEqual(get_accessible_group_ids(self.user), [])
+
+        group.users.add(self.user)
+        self.assertEqual(get_accessible_group_ids(self.user), [group.pk])
+
+        self.user.review_groups.remove(group)
+        self.assertEqual(get_accessible_group_ids(self.user), [])
+
+        group.users.add(self.user)
+        self.assertEqual(get_accessible_group_ids(self.user), [group.pk])
+
+        group.users.clear()
+        self.assertEqual(get_accessible_group_ids(self.user), [])
+
+    def test_group_membership_only_invalidates_members(self):
+        """Testing group membership changes only invalidate the changed
+        users
+        """
+        other_user = User.objects.get(username='grumpy')
+        group = self.create_review_group(invite_only=True)
+
+        get_accessible_group_ids(self.user)
+        get_accessible_group_ids(other_user)
+
+        group.users.add(self.user)
+
+        with self.assertNumQueries(0):
+            get_accessible_group_ids(other_user)
+
+    def test_invalidated_on_repository_change(self):
+        """Testing get_accessible_repository_ids invalidated when a
+        repository changes
+        """
+        repository = self.create_repository()
+
+        self.assertEqual(get_accessible_repository_ids(self.user),
+                         [repository.pk])
+
+        repository.public = False
+        repository.save(update_fields=('public',))
+        self.assertEqual(get_accessible_repository_ids(self.user), [])
+
+        repository.users.add(self.user)
+        self.assertEqual(get_accessible_repository_ids(self.user),
+                         [repository.pk])
+
+        repository.users.remove(self.user)
+        self.assertEqual(get_accessible_repository_ids(self.user), [])
+
+        group = self.create_review_group()
+        group.users.add(self.user)
+        repository.review_groups.add(group)
+        self.assertEqual(get_accessible_repository_ids(self.user),
+                         [repository.pk])
+
+        repository.delete()
+        self.assertEqual(get_accessible_repository_ids(self.user), [])
+
+    def test_invalidate_accessible_ids(self):
+        """Testing invalidate_accessible_ids"""
+        self.create_repository()
+
+        get_accessible_repository_ids(self.user)
+
+        invalidate_accessible_ids([self.user.pk])
+
+        with self.assertNumQueries(1):
+            get_accessible_repository_ids(self.user)
+
+        invalidate_accessible_ids()
+
+        with self.assertNumQueries(1):
+            get_accessible_repository_ids(self.user)
+
+    def test_per_local_site(self):
+        """Testing get_accessible_repository_ids caches per Local Site"""
+        repository = self.create_repository()
+        local_site_repository = self.create_repository(
+            name='local-site', with_local_site=True)
+
+        self.assertEqual(get_accessible_repository_ids(self.user),
+                         [repository.pk])
+        self.assertEqual(
+            get_accessible_repository_ids(
+                self.user,
+                local_site=local_site_repository.local_site),
+            [local_site_repository.pk])
+
+    def test_review_request_query(self):
+        """Testing ReviewRequest.objects.public reflects access changes"""
+        user = User.objects.get(username='grumpy')
+        repository = self.create_repository(public=False)
+        review_request = self.create_review_request(repository=repository,
+                                                    publish=True)
+
+        self.assertNotIn(review_request,
+                         ReviewRequest.objects.public(user=user))
+
+        repository.users.add(user)
+
+        self.assertIn(review_request,
+                      ReviewRequest.objects.public(user=user))
+
+
+class AccessRevocationTests(TestCase):
+    """Unit tests for invalidating accessible IDs when access is revoked."""
+
+    fixtures = ['test_users']
+
+    def setUp(self):
+        super(AccessRevocationTests, self).setUp()
+
+        self.user = User.objects.get(username='doc')
+        self.group = self.create_review_group(invite_only=True)
+        self.create_review_group(name='public')
+        self.permission = Permission.objects.get(
+            content_type__app_label='reviews',
+            codename='can_view_invite_only_groups')
+
+    def test_superuser_revoked(self):
+        """Testing get_accessible_group_ids when superuser status is
+        revoked
+        """
+        self.user.is_superuser = True
+        self.user.save(update_fields=('is_superuser',))
+        self.assertIn(self.group.pk, self._get_group_ids())
+
+        version = self._get_user_version()
+        self.user.is_superuser = False
+        self.user.save(update_fields=('is_superuser',))
+
+        self.assertNotEqual(self._get_user_version(), version)
+        self.assertNotIn(self.group.pk, self._get_group_ids())
+
+    def test_login_does_not_invalidate(self):
+        """Testing saving a user's login time doesn't invalidate
+        accessible IDs
+        """
+        self._get_group_ids()
+        version = self._get_user_version()
+
+        self.user.save(update_fields=('last_login',))
+
+        self.assertEqual(self._get_user_version(), version)
+
+    def test_user_permission_revoked(self):
+        """Testing get_accessible_group_ids when a user permission is
+        revoked
+        """
+        self.user.user_permissions.add(self.permission)
+        self.assertGroupIDsCurrent()
+
+        version = self._get_user_version()
+        self.user.user_permissions.remove(self.permission)
+
+        self.assertNotEqual(self._get_user_version(), version)
+        self.assertGroupIDsCurrent()
+
+    def test_user_permission_revoked_reverse(self):
+        """Testing get_accessible_group_ids when a user permission is
+        revoked through the permission
+        """
+        self.permission.user_set.add(self.user)
+        self.assertGroupIDsCurrent()
+
+        version = self._get_user_version()
+        self.permission.user_set.remove(self.user)
+
+        self.assertNotEqual(self._get_user_version(), version)
+        self.assertGroupIDsCurrent()
+
+    def test_auth_group_removed(self):
+        """Testing get_accessible_group_ids when a user is removed from an
+        auth group with the permission
+        """
+        auth_group = AuthGroup.objects.create(name='viewers')
+        auth_group.permissions.add(self.permission)
+        self.user.groups.add(auth_group)
+        self.assertGroupIDsCurrent()
+
+        version = self._get_user_version()
+        self.user.groups.remove(auth_group)
+
+        self.assertNotEqual(self._get_user_version(), version)
+        self.assertGroupIDsCurrent()
+
+    def test_auth_group_permission_revoked(self):
+        """Testing get_accessible_group_ids when a permission is revoked
+        from an auth group
+        """
+        auth_group = AuthGroup.objects.create(name='viewers')
+        auth_group.permissions.add(self.permission)
+        self.user.groups.add(auth_group)
+        self.assertGroupIDsCurrent()
+
+        auth_group.permissions.remove(self.permission)
+
+        self.assertGroupIDsCurrent()
+
+    def test_local_site_admin_revoked(self):
+        """Testing get_accessible_group_ids when Local Site admin status is
+        revoked
+        """
+        local_site = LocalSite.objects.create(name='test-site')
+        local_site.users.add(self.user)
+        local_site.admins.add(self.user)
+        self.create_review_group(name='site-group',
+                                 local_site=local_site,
+                                 invite_only=True)
+        self.create_review_group(name='site-public',
+                                 local_site=local_site)
+        self.assertGroupIDsCurrent(local_site)
+
+        version = self._get_user_version()
+        local_site.admins.remove(self.user)
+
+        self.assertNotEqual(self._get_user_version(), version)
+        self.assertGroupIDsCurrent(local_site)
+
+    def test_local_site_user_removed(self):
+        """Testing get_accessible_group_ids invalidated when a user is
+        removed from a Local Site
+        """
+        local_site = LocalSite.objects.create(name='test-site')
+        local_site.users.add(self.user)
+        self._get_group_ids(local_site)
+
+        version = self._get_user_version()
+        local_site.users.remove(self.user)
+
+        self.assertNotEqual(self._get_user_version(), version)
+
+    def test_local_site_permission_revoked(self):
+        """Testing get_accessible_group_ids when a Local Site permission is
+        revoked
+        """
+        local_site = LocalSite.objects.create(name='test-site')
+        local_site.users.add(self.user)
+        self.create_review_group(name='site-group',
+                                 local_site=local_site,
+                                 invite_only=True)
+        self.create_review_group(name='site-public',
+                                 local_site=local_site)
+
+        site_profile = self.user.get_site_profile(local_site)
+        site_profile.permissions = {
+            'reviews.can_view_invite_only_groups': True,
+        }
+        site_profile.save(update_fields=('permissions',))
+        self.assertGroupIDsCurrent(local_site)
+
+        version = self._get_user_version()
+        site_profile.permissions = {
+            'reviews.can_view_invite_only_groups': False,
+        }
+        site_profile.save(update_fields=('permissions',))
+
+        self.assertNotEqual(self._get_user_version(), version)
+        self.assertGroupIDsCurrent(local_site)
+
+    def assertGroupIDsCurrent(self, local_site=None):
+        """Assert that the cached group IDs match the user's current access.
+
+        Args:
+            local_site (reviewboard.site.models.LocalSite, optional):
+                The Local Site to check groups for.
+
+        Raises:
+            AssertionError:
+                The cached IDs are out of date.
+        """
+        user = User.objects.get(pk=self.user.pk)
+
+        self.assertEqual(
+            sorted(self._get_group_ids(local_site)),
+            sorted(Group.objects.accessible_ids(user,
+                                                visible_only=False,
+                                                local_site=local_site)))
+
+    def _get_group_ids(self, local_site=None):
+        """Return the accessible group IDs for a freshly-loaded user.
+
+        Django caches permissions on user objects, so this loads the user
+        the way a new HTTP request would.
+
+        Args:
+            local_site (reviewboard.site.models.LocalSite, optional):
+                The Local Site to return groups for.
+
+        Returns:
+            list of int:
+            The accessible group IDs.
+        """
+        return get_accessible_group_ids(User.objects.get(pk=self.user.pk),
+                                        local_site=local_site)
+
+    def _get_user_version(self):
+        """Return the user's current access version.
+
+        Returns:
+            unicode:
+            The access version.
+        """
+        return cache.get(make_cache_key(_USER_VERSION_KEY % self.user.pk))
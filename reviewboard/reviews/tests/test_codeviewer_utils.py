@@ -0,0 +1,556 @@
+"""Unit tests for reviewboard.reviews.codeviewer_utils."""
+
+from __future__ import unicode_literals
+
+import kgb
+import pygments
+
+from reviewboard.diffviewer.chunk_generator import RawDiffChunkGenerator
+from reviewboard.diffviewer.models import FileUntouchedComment
+from reviewboard.reviews.codeviewer_utils import (
+    BlobChunkGenerator,
+    build_untouched_comment_fragments,
+    get_blob_lines,
+    get_original_code_file,
+    get_subtree_list,
+    get_tree_entries,
+    get_untouched_comments_by_file,
+    get_untouched_comments_by_review_request,
+    get_untouched_file,
+    populate_blob_files)
+from reviewboard.reviews.models import UntouchedComment
+from reviewboard.scmtools.git import GitTool, GitTreeEntry
+from reviewboard.testing import TestCase
+
+
+class BlobChunkGeneratorTests(kgb.SpyAgency, TestCase):
+    """Unit tests for reviewboard.reviews.codeviewer_utils.BlobChunkGenerator.
+    """
+
+    fixtures = ['test_users', 'test_scmtools']
+
+    blob_data = b'def foo():\n\treturn "a\\\\b"\n'
+
+    def setUp(self):
+        super(BlobChunkGeneratorTests, self).setUp()
+
+        self.spy_on(GitTool.get_file_by_hashcode,
+                    owner=GitTool,
+                    call_fake=lambda *args, **kwargs: self.blob_data)
+
+        self.review_request = self.create_review_request(
+            create_repository=True)
+        self.blob = get_original_code_file(self.review_request,
+                                           'src/foo.py',
+                                           set(),
+                                           'a' * 40)
+
+    def test_get_chunks_blob(self):
+        """Testing BlobChunkGenerator.get_chunks_blob"""
+        generator = self._create_generator(enable_syntax_highlighting=False)
+
+        self.assertEqual(
+            generator.get_chunks_blob(),
+            [
+                {
+                    'index': i,
+                    'lines': line,
+                }
+                for i, line in enumerate(self.blob['content'])
+            ])
+
+    def test_get_chunks_blob_with_syntax_highlighting(self):
+        """Testing BlobChunkGenerator.get_chunks_blob with syntax
+        highlighting uses the blob's raw contents
+        """
+        chunks = self._create_generator(
+            enable_syntax_highlighting=True).get_chunks_blob()
+
+        self.assertEqual(len(chunks), 2)
+        self.assertIn('<span class="k">def</span>', chunks[0]['lines'])
+        self.assertTrue(chunks[1]['lines'].startswith(
+            '\t<span class="k">return</span>'))
+        self.assertIn('a</span><span class="se">\\\\</span>',
+                      chunks[1]['lines'])
+
+    def test_get_chunks_blob_with_highlighted_diff(self):
+        """Testing BlobChunkGenerator.get_chunks_blob reuses lines
+        highlighted for a diff of the same file
+        """
+        list(RawDiffChunkGenerator(old=self.blob_data,
+                                   new=self.blob_data,
+                                   orig_filename='src/foo.py',
+                                   modified_filename='src/foo.py')
+             .get_chunks())
+
+        self.spy_on(pygments.highlight)
+
+        chunks = self._create_generator(
+            enable_syntax_highlighting=True).get_chunks_blob()
+
+        self.assertSpyNotCalled(pygments.highlight)
+        self.assertTrue(chunks[1]['lines'].startswith(
+            '\t<span class="k">return</span>'))
+
+    def test_populate_blob_files(self):
+        """Testing populate_blob_files doesn't syntax highlight by default"""
+        self.spy_on(pygments.highlight)
+
+        context = {
+            'review_request': self.review_request,
+        }
+        populate_blob_files(self.blob, request=None, context=context)
+
+        self.assertEqual(context['num_chunks'], 2)
+        self.assertSpyNotCalled(pygments.highlight)
+
+    def _create_generator(self, enable_syntax_highlighting):
+        """Return a generator for the blob.
+
+        Args:
+            enable_syntax_highlighting (bool):
+                Whether to enable syntax highlighting.
+
+        Returns:
+            reviewboard.reviews.codeviewer_utils.BlobChunkGenerator:
+            The new generator.
+        """
+        return BlobChunkGenerator(
+            request=None,
+            blob_file=self.blob,
+            context={
+                'review_request': self.review_request,
+            },
+            enable_syntax_highlighting=enable_syntax_highlighting)
+
+
+class BuildUntouchedCommentFragmentsTests(kgb.SpyAgency, TestCase):
+    """Unit tests for
+    reviewboard.reviews.codeviewer_utils.build_untouched_comment_fragments.
+    """
+
+    fixtures = ['test_users', 'test_scmtools']
+
+    def setUp(self):
+        super(BuildUntouchedCommentFragmentsTests, self).setUp()
+
+        self.spy_on(GitTool.get_file_by_hashcode,
+                    owner=GitTool,
+                    call_fake=lambda self, path, hashcode: (
+                        b''.join(b'%s line %d\n' % (hashcode.encode('utf-8'),
+                                                    i)
+                                 for i in range(20))))
+
+        self.review_request = self.create_review_request(
+            create_repository=True,
+            publish=True)
+        self.review = self.create_review(self.review_request, publish=True)
+
+    def test_fetches_each_blob_once(self):
+        """Testing build_untouched_comment_fragments fetches each blob once
+        """
+        readme = FileUntouchedComment.objects.create(
+            untouched_file_path='README',
+            untouched_file_hashcode='a' * 40)
+        setup_py = FileUntouchedComment.objects.create(
+            untouched_file_path='setup.py',
+            untouched_file_hashcode='b' * 40)
+
+        comments = [
+            self._create_untouched_comment(readme, first_line=1, num_lines=2),
+            self._create_untouched_comment(setup_py, first_line=3,
+                                           num_lines=1),
+            self._create_untouched_comment(readme, first_line=5, num_lines=3),
+        ]
+
+        had_error, entries = build_untouched_comment_fragments(
+            untouched_comments=comments,
+            context={},
+            review_request=self.review_request)
+
+        self.assertFalse(had_error)
+        self.assertSpyCallCount(GitTool.get_file_by_hashcode, 2)
+        self.assertEqual([entry['comment'] for entry in entries], comments)
+        self.assertEqual(
+            [
+                [chunk['index'] for chunk in entry['chunks']]
+                for entry in entries
+            ],
+            [[1, 2], [3], [5, 6, 7]])
+        self.assertEqual(entries[1]['chunks'][0]['lines'],
+                         '%s line 3' % ('b' * 40))
+
+        # The blobs should now be cached.
+        build_untouched_comment_fragments(
+            untouched_comments=comments,
+            context={},
+            review_request=self.review_request)
+
+        self.assertSpyCallCount(GitTool.get_file_by_hashcode, 2)
+
+    def test_with_error(self):
+        """Testing build_untouched_comment_fragments with an error fetching
+        a blob
+        """
+        self.spy_on(get_blob_lines,
+                    op=kgb.SpyOpRaise(Exception('Oh no')))
+
+        readme = FileUntouchedComment.objects.create(
+            untouched_file_path='README',
+            untouched_file_hashcode='a' * 40)
+        comments = [
+            self._create_untouched_comment(readme, first_line=1, num_lines=1),
+            self._create_untouched_comment(readme, first_line=2, num_lines=1),
+        ]
+
+        had_error, entries = build_untouched_comment_fragments(
+            untouched_comments=comments,
+            context={},
+            review_request=self.review_request)
+
+        self.assertTrue(had_error)
+        self.assertEqual(len(entries), 2)
+        self.assertEqual(entries[0]['chunks'], [])
+        self.assertIn('Oh no', entries[1]['html'])
+        self.assertSpyCallCount(get_blob_lines, 1)
+
+    def _create_untouched_comment(self, untouched_file, first_line,
+                                  num_lines):
+        """Create an untouched comment for a test.
+
+        Args:
+            untouched_file (reviewboard.diffviewer.models.
+                            FileUntouchedComment):
+                The file being commented on.
+
+            first_line (int):
+                The first line of the comment.
+
+            num_lines (int):
+                The number of lines in the comment.
+
+        Returns:
+            reviewboard.reviews.models.untouched_comment.UntouchedComment:
+            The new comment.
+        """
+        comment = UntouchedComment.objects.create(
+            untouchedfile=untouched_file,
+            text='Comment',
+            first_line=first_line,
+            num_lines=num_lines)
+        self.review.untouched_comments.add(comment)
+
+        return comment
+
+
+class GetBlobLinesTests(kgb.SpyAgency, TestCase):
+    """Unit tests for reviewboard.reviews.codeviewer_utils.get_blob_lines."""
+
+    fixtures = ['test_scmtools']
+
+    def setUp(self):
+        super(GetBlobLinesTests, self).setUp()
+
+        self.spy_on(GitTool.get_file_by_hashcode,
+                    owner=GitTool,
+                    call_fake=lambda *args, **kwargs: b'Line 1\nLine 2\n')
+
+        self.repository = self.create_repository()
+
+    def test_get_blob_lines(self):
+        """Testing get_blob_lines"""
+        self.assertEqual(
+            get_blob_lines(self.repository, 'README', 'a' * 40),
+            ['Line 1', 'Line 2'])
+        self.assertEqual(
+            get_blob_lines(self.repository, 'README', 'a' * 40),
+            ['Line 1', 'Line 2'])
+
+        self.assertSpyCallCount(GitTool.get_file_by_hashcode, 1)
+
+    def test_get_blob_lines_with_changed_encodings(self):
+        """Testing get_blob_lines after changing the repository's encodings
+        """
+        get_blob_lines(self.repository, 'README', 'a' * 40)
+
+        self.repository.encoding = 'utf-8'
+        get_blob_lines(self.repository, 'README', 'a' * 40)
+
+        self.assertSpyCallCount(GitTool.get_file_by_hashcode, 2)
+
+
+class GetTreeEntriesTests(kgb.SpyAgency, TestCase):
+    """Unit tests for reviewboard.reviews.codeviewer_utils.get_tree_entries.
+    """
+
+    fixtures = ['test_scmtools']
+
+    commit_id = '224589cf334e9baafeac1165be5e5c04991fd65e'
+
+    def setUp(self):
+        super(GetTreeEntriesTests, self).setUp()
+
+        self.repository = self.create_repository(tool_name='Git')
+
+    def test_get_tree_entries(self):
+        """Testing get_tree_entries"""
+        self.assertEqual(
+            get_tree_entries(self.repository, '', None, self.commit_id),
+            [
+                ('blob', '6bba27836b8b3194ab9838126033557a500f5dc3',
+                 'diffutils.py'),
+                ('blob', '05ab61f5d4d0fa3082bd068b4742de599cc2315b',
+                 'models.py'),
+                ('blob', 'd6613f5f8b58eb6a88ee386ea140364c8645005c',
+                 'readme'),
+                ('blob', 'ac9859760eae52cb2dedd80658f92a06eef428a5',
+                 'resources.py'),
+                ('blob', 'a4fc53e08863f5341effb5204b77504c120166ae',
+                 'tests.py'),
+            ])
+
+    def test_get_tree_entries_sorts_trees_first(self):
+        """Testing get_tree_entries lists trees before other entries"""
+        self.spy_on(
+            GitTool.get_repo_directory_entries,
+            owner=GitTool,
+            op=kgb.SpyOpReturn([
+                GitTreeEntry(0o100644, 'blob', 'a' * 40, 'README'),
+                GitTreeEntry(0o040000, 'tree', 'b' * 40, 'docs'),
+                GitTreeEntry(0o160000, 'commit', 'c' * 40, 'module'),
+                GitTreeEntry(0o040000, 'tree', 'd' * 40, 'src'),
+            ]))
+
+        self.assertEqual(
+            get_tree_entries(self.repository, '', None, 'HEAD'),
+            [
+                ('tree', 'b' * 40, 'docs'),
+                ('tree', 'd' * 40, 'src'),
+                ('blob', 'a' * 40, 'README'),
+                ('commit', 'c' * 40, 'module'),
+            ])
+
+    def test_get_tree_entries_with_commit_id_cached(self):
+        """Testing get_tree_entries caches listings for commit IDs"""
+        self.spy_on(GitTool.get_repo_directory_entries, owner=GitTool)
+
+        entries = get_tree_entries(self.repository, '', None, self.commit_id)
+
+        self.assertEqual(
+            get_tree_entries(self.repository, '', None, self.commit_id),
+            entries)
+        self.assertSpyCallCount(GitTool.get_repo_directory_entries, 1)
+
+    def test_get_tree_entries_with_branch_not_cached(self):
+        """Testing get_tree_entries doesn't cache listings for branch names"""
+        self.spy_on(GitTool.get_repo_directory_entries, owner=GitTool)
+
+        entries = get_tree_entries(self.repository, '', None, 'master')
+
+        self.assertEqual(
+            get_tree_entries(self.repository, '', None, 'master'),
+            entries)
+        self.assertSpyCallCount(GitTool.get_repo_directory_entries, 2)
+
+    def test_get_subtree_list(self):
+        """Testing get_subtree_list"""
+        file_list = get_subtree_list(
+            [
+                ('tree', 'b' * 40, 'docs'),
+                ('blob', 'a' * 40, 'my file\twith tabs'),
+            ],
+            path='src',
+            modified_file_set={'src/my file\twith tabs'},
+            absolute_path='/r/1/code/tree/src')
+
+        self.assertEqual(
+            file_list,
+            [
+                {
+                    'type': 'tree',
+                    'type_num': 1,
+                    'name': 'docs',
+                    'is_touched': False,
+                    'hashcode': 'b' * 40,
+                    'absolute_url': '/r/1/code/tree/src/docs',
+                },
+                {
+                    'type': 'blob',
+                    'type_num': 2,
+                    'name': 'my file\twith tabs',
+                    'is_touched': True,
+                    'hashcode': 'a' * 40,
+                    'absolute_url': ('/r/1/code/blob/src/my file\twith tabs'
+                                     '?hashcode=%s' % ('a' * 40)),
+                },
+            ])
+
+
+class GetUntouchedFileTests(TestCase):
+    """Unit tests for reviewboard.reviews.codeviewer_utils.get_untouched_file.
+    """
+
+    def test_get_untouched_file(self):
+        """Testing get_untouched_file"""
+        untouched_file = FileUntouchedComment.objects.create(
+            untouched_file_path='README',
+            untouched_file_hashcode='a' * 40)
+
+        self.assertEqual(get_untouched_file('README', 'a' * 40),
+                         untouched_file)
+        self.assertIsNone(get_untouched_file('README', 'b' * 40))
+
+
+class GetUntouchedCommentsByFileTests(TestCase):
+    """Unit tests for
+    reviewboard.reviews.codeviewer_utils.get_untouched_comments_by_file.
+    """
+
+    fixtures = ['test_users']
+
+    def test_get_untouched_comments(self):
+        """Testing get_untouched_comments_by_file"""
+        review_request = self.create_review_request(publish=True)
+        untouched_file = FileUntouchedComment.objects.create(
+            untouched_file_path='README',
+            untouched_file_hashcode='a' * 40)
+
+        for i in range(3):
+            review = self.create_review(review_request, publish=True)
+            comment = UntouchedComment.objects.create(
+                untouchedfile=untouched_file,
+                text='Comment %d' % i,
+                first_line=i + 1,
+                num_lines=1)
+            review.untouched_comments.add(comment)
+
+        with self.assertNumQueries(1):
+            comments_by_path = get_untouched_comments_by_file(
+                'README', 'a' * 40, review_request)
+
+        comments = comments_by_path['README']
+        self.assertEqual([comment['firstline'] for comment in comments],
+                         [1, 2, 3])
+        self.assertEqual(comments[0]['review_request_id'], review_request.pk)
+        self.assertEqual(comments[0]['file_hashcode'], 'a' * 40)
+
+    def test_no_comments(self):
+        """Testing get_untouched_comments_by_file with no comments on the
+        file
+        """
+        review_request = self.create_review_request(publish=True)
+
+        self.assertEqual(
+            get_untouched_comments_by_file('README', 'a' * 40,
+                                           review_request),
+            [])
+
+
+class GetUntouchedCommentsByReviewRequestTests(TestCase):
+    """Unit tests for
+    reviewboard.reviews.codeviewer_utils.
+    get_untouched_comments_by_review_request.
+    """
+
+    fixtures = ['test_users']
+
+    def test_get_untouched_comments(self):
+        """Testing get_untouched_comments_by_review_request"""
+        review_request = self.create_review_request(publish=True)
+        readme = FileUntouchedComment.objects.create(
+            untouched_file_path='README',
+            untouched_file_hashcode='a' * 40)
+        setup_py = FileUntouchedComment.objects.create(
+            untouched_file_path='setup.py',
+            untouched_file_hashcode='b' * 40)
+
+        review1 = self.create_review(review_request, publish=True)
+        comment1 = self._create_untouched_comment(review1, setup_py, 10)
+        comment2 = self._create_untouched_comment(review1, readme, 1)
+
+        review2 = self.create_review(review_request, publish=True)
+        comment3 = self._create_untouched_comment(review2, readme, 5)
+
+        # Comments on other review requests shouldn't be included.
+        other_review = self.create_review(
+            self.create_review_request(publish=True),
+            publish=True)
+        self._create_untouched_comment(other_review, readme, 1)
+
+        with self.assertNumQueries(1):
+            comments_by_path, files = \
+                get_untouched_comments_by_review_request(review_request)
+
+        self.assertEqual(files, [
+            ('setup.py', 'b' * 40),
+            ('README', 'a' * 40),
+        ])
+        self.assertEqual(set(comments_by_path), {'README', 'setup.py'})
+
+        self.assertEqual(
+            [
+                (comment['review_id'], comment['firstline'])
+                for comment in comments_by_path['README']
+            ],
+            [
+                (review1.pk, comment2.first_line),
+                (review2.pk, comment3.first_line),
+            ])
+
+        comment = comments_by_path['setup.py'][0]
+        self.assertEqual(comment['review_id'], review1.pk)
+        self.assertEqual(comment['review_request_id'], review_request.pk)
+        self.assertEqual(comment['file_hashcode'], 'b' * 40)
+        self.assertEqual(comment['content'], comment1.text)
+        self.assertEqual(comment['url'], review_request.get_absolute_url())
+
+    def test_get_untouched_comments_query_count(self):
+        """Testing get_untouched_comments_by_review_request uses a constant
+        number of queries
+        """
+        review_request = self.create_review_request(publish=True)
+
+        for i in range(5):
+            review = self.create_review(review_request, publish=True)
+
+            for j in range(3):
+                untouched_file = FileUntouchedComment.objects.create(
+                    untouched_file_path='file%d' % j,
+                    untouched_file_hashcode='%d' % j)
+                self._create_untouched_comment(review, untouched_file, i)
+
+        with self.assertNumQueries(1):
+            comments_by_path, files = \
+                get_untouched_comments_by_review_request(review_request)
+
+        self.assertEqual(len(files), 3)
+        self.assertEqual(
+            sum(len(comments) for comments in comments_by_path.values()),
+            15)
+
+    def _create_untouched_comment(self, review, untouched_file, first_line):
+        """Create an untouched comment for a test.
+
+        Args:
+            review (reviewboard.reviews.models.review.Review):
+                The review to add the comment to.
+
+            untouched_file (reviewboard.diffviewer.models.
+                            FileUntouchedComment):
+                The file being commented on.
+
+            first_line (int):
+                The first line of the comment.
+
+        Returns:
+            reviewboard.reviews.models.untouched_comment.UntouchedComment:
+            The new comment.
+        """
+        comment = UntouchedComment.objects.create(
+            untouchedfile=untouched_file,
+            text='Comment on line %d' % first_line,
+            first_line=first_line,
+            num_lines=1)
+        review.untouched_comments.add(comment)
+
+        return comment
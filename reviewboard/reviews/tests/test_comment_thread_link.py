@@ -0,0 +1,270 @@
+"""Unit tests for reviewboard.reviews.models.CommentThreadLink."""
+
+from __future__ import unicode_literals
+
+import json
+
+import kgb
+from django.test.client import RequestFactory
+
+from reviewboard.reviews.detail import ReviewRequestPageData
+from reviewboard.reviews.models import BaseComment, CommentThreadLink
+from reviewboard.testing import TestCase
+
+
+class CommentThreadLinkTests(kgb.SpyAgency, TestCase):
+    """Unit tests for CommentThreadLink and its manager."""
+
+    fixtures = ['test_users', 'test_scmtools']
+
+    def setUp(self):
+        super(CommentThreadLinkTests, self).setUp()
+
+        self.review_request = self.create_review_request(
+            create_repository=True,
+            publish=True)
+        diffset = self.create_diffset(self.review_request)
+        self.filediff = self.create_filediff(diffset)
+        self.review = self.create_review(self.review_request, publish=True)
+
+        self.parent1 = self.create_diff_comment(self.review, self.filediff)
+        self.parent2 = self.create_general_comment(self.review)
+
+    def test_save_new_comment_with_parents(self):
+        """Testing BaseComment.save stores thread links for new comments"""
+        comment = self._create_child_comment([self.parent1, self.parent2])
+
+        self.assertEqual(
+            list(CommentThreadLink.objects.values_list(
+                'comment_type', 'comment_id', 'parent_comment_id')),
+            [
+                ('comment', comment.pk, self.parent1.pk),
+                ('comment', comment.pk, self.parent2.pk),
+            ])
+
+    def test_save_new_comment_without_parents(self):
+        """Testing BaseComment.save without parent comments doesn't store
+        thread links
+        """
+        self.spy_on(CommentThreadLink.objects.update_for_comment)
+
+        self.create_diff_comment(self.review, self.filediff)
+
+        self.assertFalse(CommentThreadLink.objects.exists())
+        self.assertFalse(
+            CommentThreadLink.objects.update_for_comment.called)
+
+    def test_save_with_changed_parents(self):
+        """Testing BaseComment.save with changed parent comments replaces
+        thread links
+        """
+        comment = self._create_child_comment([self.parent1])
+        comment.extra_data['parentComments'] = \
+            self._build_parent_comments([self.parent2])
+        comment.save()
+
+        self.assertEqual(
+            list(CommentThreadLink.objects.values_list(
+                'comment_id', 'parent_comment_id')),
+            [(comment.pk, self.parent2.pk)])
+
+    def test_save_with_unchanged_parents(self):
+        """Testing BaseComment.save with unchanged parent comments doesn't
+        update thread links
+        """
+        comment = self._create_child_comment([self.parent1])
+
+        self.spy_on(CommentThreadLink.objects.update_for_comment)
+
+        comment.text = 'Updated text'
+        comment.issue_status = BaseComment.RESOLVED
+        comment.save()
+
+        self.assertFalse(
+            CommentThreadLink.objects.update_for_comment.called)
+        self.assertEqual(CommentThreadLink.objects.count(), 1)
+
+    def test_get_parent_ids_by_comment(self):
+        """Testing CommentThreadLinkManager.get_parent_ids_by_comment"""
+        comment1 = self._create_child_comment([self.parent1, self.parent2])
+        comment2 = self.create_general_comment(
+            self.review,
+            extra_fields={
+                'parentComments': self._build_parent_comments(
+                    [self.parent1]),
+            })
+        comment3 = self.create_diff_comment(self.review, self.filediff)
+
+        with self.assertNumQueries(1):
+            parent_ids = CommentThreadLink.objects.get_parent_ids_by_comment(
+                [comment1, comment2, comment3])
+
+        self.assertEqual(
+            parent_ids,
+            {
+                ('comment', comment1.pk): [self.parent1.pk, self.parent2.pk],
+                ('generalcomment', comment2.pk): [self.parent1.pk],
+            })
+
+    def test_save_new_comment_with_no_parent_ids(self):
+        """Testing BaseComment.save with parent comments containing no IDs
+        stores a placeholder thread link
+        """
+        comment = self.create_diff_comment(
+            self.review,
+            self.filediff,
+            extra_fields={
+                'parentComments': '{"0": {"text": "No ID"}}',
+            })
+
+        self.assertEqual(
+            list(CommentThreadLink.objects.values_list(
+                'comment_id', 'parent_comment_id')),
+            [(comment.pk, CommentThreadLink.NO_PARENT)])
+        self.assertEqual(
+            CommentThreadLink.objects.get_parent_ids_by_comment([comment]),
+            {
+                ('comment', comment.pk): [],
+            })
+
+    def test_delete_comment(self):
+        """Testing deleting a comment deletes its thread links"""
+        comment1 = self._create_child_comment([self.parent1])
+        comment2 = self.create_general_comment(
+            self.review,
+            extra_fields={
+                'parentComments': self._build_parent_comments(
+                    [self.parent1]),
+            })
+
+        comment1.delete()
+
+        self.assertEqual(
+            list(CommentThreadLink.objects.values_list(
+                'comment_type', 'comment_id')),
+            [('generalcomment', comment2.pk)])
+
+    def test_get_parent_ids_by_comment_with_empty_list(self):
+        """Testing CommentThreadLinkManager.get_parent_ids_by_comment with
+        no comments
+        """
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                CommentThreadLink.objects.get_parent_ids_by_comment([]),
+                {})
+
+    def test_query_data_post_etag_uses_links(self):
+        """Testing ReviewRequestPageData.query_data_post_etag threads
+        comments without decoding parent comments
+        """
+        comment = self._create_child_comment([self.parent1])
+
+        self.spy_on(BaseComment.get_parent_comment_ids,
+                    owner=BaseComment)
+
+        data = self._query_data()
+
+        self.assertFalse(BaseComment.get_parent_comment_ids.called)
+        self.assertEqual(data.child_comments, {
+            self.parent1.pk: [comment],
+        })
+
+    def test_query_data_post_etag_with_legacy_comment(self):
+        """Testing ReviewRequestPageData.query_data_post_etag stores thread
+        links for comments without them
+        """
+        comment = self._create_child_comment([self.parent1])
+        CommentThreadLink.objects.all().delete()
+
+        data = self._query_data()
+
+        self.assertEqual(data.child_comments, {
+            self.parent1.pk: [comment],
+        })
+        self.assertEqual(
+            list(CommentThreadLink.objects.values_list(
+                'comment_id', 'parent_comment_id')),
+            [(comment.pk, self.parent1.pk)])
+
+    def test_query_data_post_etag_with_no_parent_ids(self):
+        """Testing ReviewRequestPageData.query_data_post_etag with a legacy
+        comment whose parent comments contain no IDs only stores thread
+        links once
+        """
+        comment = self.create_diff_comment(
+            self.review,
+            self.filediff,
+            extra_fields={
+                'parentComments': '{"0": {"text": "No ID"}}',
+            })
+        CommentThreadLink.objects.all().delete()
+
+        self.spy_on(CommentThreadLink.objects.update_for_comment)
+
+        self.assertEqual(self._query_data().child_comments, {})
+        self.assertEqual(
+            len(CommentThreadLink.objects.update_for_comment.calls), 1)
+
+        self.assertEqual(self._query_data().child_comments, {})
+        self.assertEqual(
+            len(CommentThreadLink.objects.update_for_comment.calls), 1)
+        self.assertEqual(
+            list(CommentThreadLink.objects.values_list(
+                'comment_id', 'parent_comment_id')),
+            [(comment.pk, CommentThreadLink.NO_PARENT)])
+
+    def _build_parent_comments(self, parents):
+        """Return serialized parent comments for a comment.
+
+        Args:
+            parents (list of reviewboard.reviews.models.base_comment.
+                     BaseComment):
+                The parent comments.
+
+        Returns:
+            unicode:
+            The JSON-encoded parent comments.
+        """
+        return json.dumps({
+            '%s' % i: {
+                'id': parent.pk,
+                'text': parent.text,
+            }
+            for i, parent in enumerate(parents)
+        })
+
+    def _create_child_comment(self, parents):
+        """Create a diff comment threaded under other comments.
+
+        Args:
+            parents (list of reviewboard.reviews.models.base_comment.
+                     BaseComment):
+                The parent comments.
+
+        Returns:
+            reviewboard.reviews.models.diff_comment.Comment:
+            The new comment.
+        """
+        return self.create_diff_comment(
+            self.review,
+            self.filediff,
+            extra_fields={
+                'parentComments': self._build_parent_comments(parents),
+            })
+
+    def _query_data(self):
+        """Return loaded page data for the review request.
+
+        Returns:
+            reviewboard.reviews.detail.ReviewRequestPageData:
+            The page data.
+        """
+        request = RequestFactory().get('/r/1/')
+        request.user = self.review_request.submitter
+
+        data = ReviewRequestPageData(review_request=self.review_request,
+                                     request=request)
+        data.query_data_pre_etag()
+        data.query_data_post_etag()
+
+        return data
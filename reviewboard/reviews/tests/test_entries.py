@@ -11,7 +11,7 @@ from django.test.client import RequestFactory
 from django.utils import six, timezone
 from django.utils.timezone import utc
 from djblets.testing.decorators import add_fixtures
-from kgb import SpyAgency
+from kgb import SpyAgency, SpyOpReturnInOrder
 
 from reviewboard.changedescs.models import ChangeDescription
 from reviewboard.reviews.detail import (BaseReviewRequestPageEntry,
@@ -205,6 +205,102 @@ class BaseReviewRequestPageEntryTests(SpyAgency, TestCase):
         self.assertEqual(logger.exception.spy.calls[0].args[0],
                          'Error rendering template for %s (ID=%s): %s')
 
+    def test_render_to_string_with_render_cache(self):
+        """Testing BaseReviewRequestPageEntry.render_to_string with
+        render_cache_enabled=True
+        """
+        from reviewboard.reviews import detail
+
+        entry = BaseReviewRequestPageEntry(data=self.data,
+                                           entry_id='test',
+                                           added_timestamp=None)
+        entry.template_name = 'reviews/entries/base.html'
+        entry.render_cache_enabled = True
+
+        self.spy_on(detail.render_to_string)
+
+        context = RequestContext(self.request, {
+            'last_visited': timezone.now(),
+        })
+        html1 = entry.render_to_string(self.request, context)
+        html2 = entry.render_to_string(self.request, context)
+
+        self.assertNotEqual(html1, '')
+        self.assertEqual(html1, html2)
+        self.assertEqual(len(detail.render_to_string.spy.calls), 1)
+        self.assertEqual(self.data.entry_render_cache_hits, 1)
+        self.assertEqual(self.data.entry_render_cache_misses, 1)
+
+    def test_render_to_string_with_render_cache_and_etag_changed(self):
+        """Testing BaseReviewRequestPageEntry.render_to_string with
+        render_cache_enabled=True and changed ETag data
+        """
+        entry = BaseReviewRequestPageEntry(data=self.data,
+                                           entry_id='test',
+                                           added_timestamp=None)
+        entry.template_name = 'reviews/entries/base.html'
+        entry.render_cache_enabled = True
+
+        context = RequestContext(self.request, {
+            'last_visited': timezone.now(),
+        })
+
+        self.spy_on(BaseReviewRequestPageEntry.build_etag_data,
+                    owner=BaseReviewRequestPageEntry,
+                    op=SpyOpReturnInOrder(['etag1', 'etag2']))
+
+        entry.render_to_string(self.request, context)
+        entry.render_to_string(self.request, context)
+
+        self.assertEqual(self.data.entry_render_cache_hits, 0)
+        self.assertEqual(self.data.entry_render_cache_misses, 2)
+
+    def test_render_to_string_with_render_cache_per_user(self):
+        """Testing BaseReviewRequestPageEntry.render_to_string with
+        render_cache_enabled=True caches separately for each user
+        """
+        entry = BaseReviewRequestPageEntry(data=self.data,
+                                           entry_id='test',
+                                           added_timestamp=None)
+        entry.template_name = 'reviews/entries/base.html'
+        entry.render_cache_enabled = True
+
+        context = RequestContext(self.request, {
+            'last_visited': timezone.now(),
+        })
+
+        entry.render_to_string(self.request, context)
+        entry.render_to_string(self.request, context)
+
+        self.request.user = User.objects.get(username='doc')
+        entry.render_to_string(self.request, context)
+
+        self.assertEqual(self.data.entry_render_cache_hits, 1)
+        self.assertEqual(self.data.entry_render_cache_misses, 2)
+
+    def test_render_to_string_with_render_cache_and_exception(self):
+        """Testing BaseReviewRequestPageEntry.render_to_string with
+        render_cache_enabled=True doesn't cache errors
+        """
+        entry = BaseReviewRequestPageEntry(data=self.data,
+                                           entry_id='test',
+                                           added_timestamp=None)
+        entry.template_name = 'reviews/entries/NOT_FOUND.html'
+        entry.render_cache_enabled = True
+
+        context = RequestContext(self.request, {
+            'last_visited': timezone.now(),
+        })
+
+        self.assertEqual(entry.render_to_string(self.request, context), '')
+
+        entry.template_name = 'reviews/entries/base.html'
+
+        self.assertNotEqual(entry.render_to_string(self.request, context),
+                            '')
+        self.assertEqual(self.data.entry_render_cache_hits, 0)
+        self.assertEqual(self.data.entry_render_cache_misses, 1)
+
     def test_is_entry_new_with_timestamp(self):
         """Testing BaseReviewRequestPageEntry.is_entry_new with timestamp"""
         entry = BaseReviewRequestPageEntry(
@@ -1144,6 +1240,35 @@ class ReviewEntryTests(TestCase):
         self.assertEqual(entry.updated_timestamp,
                          datetime(2017, 9, 14, 15, 40, 0, tzinfo=utc))
 
+    def test_build_etag_data(self):
+        """Testing ReviewEntry.build_etag_data without an entry"""
+        self.data.query_data_pre_etag()
+
+        self.assertEqual(ReviewEntry.build_etag_data(self.data), '')
+
+    def test_build_etag_data_with_entry(self):
+        """Testing ReviewEntry.build_etag_data with an entry changes when
+        comments change
+        """
+        comment = self.create_general_comment(self.review,
+                                              issue_opened=True)
+        etag1 = self._build_entry_etag()
+
+        self.assertEqual(etag1, self._build_entry_etag())
+
+        comment.issue_status = BaseComment.RESOLVED
+        comment.save()
+        etag2 = self._build_entry_etag()
+
+        self.assertNotEqual(etag1, etag2)
+
+        self.create_reply(self.review,
+                          timestamp=datetime(2017, 9, 14, 15, 40, 0,
+                                             tzinfo=utc),
+                          publish=True)
+
+        self.assertNotEqual(etag2, self._build_entry_etag())
+
     def test_get_dom_element_id(self):
         """Testing ReviewEntry.get_dom_element_id"""
         entry = ReviewEntry(data=self.data,
@@ -1509,6 +1634,23 @@ class ReviewEntryTests(TestCase):
                 'general_comments': [comment],
             })
 
+    def _build_entry_etag(self):
+        """Return the ETag for an entry for the review, from fresh data.
+
+        Returns:
+            unicode:
+            The ETag for the entry.
+        """
+        data = ReviewRequestPageData(review_request=self.review_request,
+                                     request=self.request)
+        data.query_data_pre_etag()
+        data.query_data_post_etag()
+
+        entry = ReviewEntry(data=data,
+                            review=self.review)
+
+        return ReviewEntry.build_etag_data(data, entry=entry)
+
 
 class ChangeEntryTests(TestCase):
     """Unit tests for ChangeEntry."""
@@ -0,0 +1,94 @@
+"""Unit tests for the prerenderprintdocs management command."""
+
+from __future__ import unicode_literals
+
+import os
+import shutil
+import tempfile
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.utils.six.moves import cStringIO as StringIO
+from kgb import SpyAgency
+
+from reviewboard.accounts.models import ReviewRequestVisit
+from reviewboard.reviews.views import ReviewRequestPrintView
+from reviewboard.testing import TestCase
+
+
+class PrerenderPrintDocsCommandTests(SpyAgency, TestCase):
+    """Unit tests for the prerenderprintdocs management command."""
+
+    fixtures = ['test_users', 'test_scmtools']
+
+    def setUp(self):
+        super(PrerenderPrintDocsCommandTests, self).setUp()
+
+        self.review_request = self.create_review_request(
+            create_repository=True,
+            publish=True)
+        diffset = self.create_diffset(self.review_request)
+        self.create_filediff(diffset)
+
+        self.user = User.objects.get(username='doc')
+
+    def test_warms_cache(self):
+        """Testing prerenderprintdocs caches the print document"""
+        self.spy_on(ReviewRequestPrintView.render_print_document)
+
+        self._run_command(str(self.review_request.pk))
+        self.assertEqual(
+            len(ReviewRequestPrintView.render_print_document.spy.calls),
+            1)
+
+        self.client.login(username='doc', password='doc')
+        response = self.client.get('/r/%d/print/' % self.review_request.pk)
+        self.assertEqual(response.status_code, 200)
+
+        # The document should have come from the cache.
+        self.assertEqual(
+            len(ReviewRequestPrintView.render_print_document.spy.calls),
+            1)
+
+    def test_with_output_dir(self):
+        """Testing prerenderprintdocs with --output-dir writes <ID>.html"""
+        output_dir = tempfile.mkdtemp(prefix='rb-tests-')
+        self.addCleanup(shutil.rmtree, output_dir)
+
+        self._run_command(str(self.review_request.pk),
+                          output_dir=output_dir)
+
+        filename = os.path.join(output_dir,
+                                '%s.html' % self.review_request.pk)
+        self.assertEqual(os.listdir(output_dir),
+                         ['%s.html' % self.review_request.pk])
+
+        with open(filename, 'rb') as fp:
+            content = fp.read()
+
+        self.assertIn(self.review_request.summary.encode('utf-8'), content)
+
+    def test_does_not_track_visits(self):
+        """Testing prerenderprintdocs doesn't record review request visits"""
+        self._run_command(str(self.review_request.pk))
+
+        self.assertFalse(ReviewRequestVisit.objects.filter(
+            user=self.user,
+            review_request=self.review_request).exists())
+
+    def _run_command(self, *args, **kwargs):
+        """Run the command as the "doc" user.
+
+        Args:
+            *args (tuple):
+                Positional arguments for the command.
+
+            **kwargs (dict):
+                Options for the command.
+        """
+        call_command('prerenderprintdocs', *args,
+                     username='doc',
+                     show_progress=False,
+                     stdout=StringIO(),
+                     stderr=StringIO(),
+                     **kwargs)
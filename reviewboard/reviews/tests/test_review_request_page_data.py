@@ -73,7 +73,7 @@ class ReviewRequestPageDataTests(TestCase):
     def test_query_data_post_etag(self):
         """Testing ReviewRequestPageData.query_data_post_etag"""
         self._test_query_data_post_etag_with(
-            expected_num_queries=19,
+            expected_num_queries=21,
             expect_reviews=True,
             expect_file_attachments=True,
             expect_screenshots=True,
@@ -87,7 +87,7 @@ class ReviewRequestPageDataTests(TestCase):
         """
         self._test_query_data_post_etag_with(
             entry_classes=[ReviewRequestEntry],
-            expected_num_queries=19,
+            expected_num_queries=21,
             expect_draft=True,
             expect_reviews=True,
             expect_file_attachments=True,
@@ -101,7 +101,7 @@ class ReviewRequestPageDataTests(TestCase):
         """
         self._test_query_data_post_etag_with(
             entry_classes=[InitialStatusUpdatesEntry],
-            expected_num_queries=19,
+            expected_num_queries=21,
             expect_reviews=True,
             expect_file_attachments=True,
             expect_screenshots=True,
@@ -114,7 +114,7 @@ class ReviewRequestPageDataTests(TestCase):
         """
         self._test_query_data_post_etag_with(
             entry_classes=[ReviewEntry],
-            expected_num_queries=19,
+            expected_num_queries=21,
             expect_reviews=True,
             expect_file_attachments=True,
             expect_screenshots=True,
@@ -127,7 +127,7 @@ class ReviewRequestPageDataTests(TestCase):
         """
         self._test_query_data_post_etag_with(
             entry_classes=[ReviewEntry],
-            expected_num_queries=18,
+            expected_num_queries=21,
             expect_reviews=True,
             expect_file_attachments=True,
             expect_screenshots=True,
@@ -141,7 +141,7 @@ class ReviewRequestPageDataTests(TestCase):
         """
         self._test_query_data_post_etag_with(
             entry_classes=[ChangeEntry],
-            expected_num_queries=19,
+            expected_num_queries=21,
             expect_reviews=True,
             expect_file_attachments=True,
             expect_screenshots=True,
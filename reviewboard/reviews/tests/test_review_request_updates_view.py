@@ -7,9 +7,12 @@ import json
 import struct
 from datetime import datetime, timedelta
 
+from django.contrib.auth.models import AnonymousUser
 from django.core.urlresolvers import reverse
+from django.test.client import RequestFactory
 from django.utils.timezone import utc
 
+from reviewboard.reviews.detail import ReviewEntry, ReviewRequestPageData
 from reviewboard.reviews.views import ReviewRequestUpdatesView
 from reviewboard.testing import TestCase
 
@@ -65,7 +68,7 @@ class ReviewRequestUpdatesViewTests(TestCase):
                 'addedTimestamp': '2017-09-17T17:00:00Z',
                 'entryID': '1',
                 'entryType': 'review',
-                'etag': '',
+                'etag': self._get_review_entry_etag(self.review1),
                 'modelData': {
                     'reviewData': {
                         'id': self.review1.pk,
@@ -89,7 +92,7 @@ class ReviewRequestUpdatesViewTests(TestCase):
                 'addedTimestamp': '2017-09-27T17:00:00Z',
                 'entryID': '2',
                 'entryType': 'review',
-                'etag': '',
+                'etag': self._get_review_entry_etag(self.review2),
                 'modelData': {
                     'reviewData': {
                         'id': self.review2.pk,
@@ -155,7 +158,7 @@ class ReviewRequestUpdatesViewTests(TestCase):
                 'addedTimestamp': '2017-09-17T17:00:00Z',
                 'entryID': '1',
                 'entryType': 'review',
-                'etag': '',
+                'etag': self._get_review_entry_etag(self.review1),
                 'modelData': {
                     'reviewData': {
                         'id': self.review1.pk,
@@ -180,7 +183,7 @@ class ReviewRequestUpdatesViewTests(TestCase):
                 'addedTimestamp': '2017-09-27T17:00:00Z',
                 'entryID': '2',
                 'entryType': 'review',
-                'etag': '',
+                'etag': self._get_review_entry_etag(self.review2),
                 'modelData': {
                     'reviewData': {
                         'id': self.review2.pk,
@@ -240,7 +243,7 @@ class ReviewRequestUpdatesViewTests(TestCase):
                 'addedTimestamp': '2017-09-27T17:00:00Z',
                 'entryID': '2',
                 'entryType': 'review',
-                'etag': '',
+                'etag': self._get_review_entry_etag(self.review2),
                 'modelData': {
                     'reviewData': {
                         'id': self.review2.pk,
@@ -301,7 +304,7 @@ class ReviewRequestUpdatesViewTests(TestCase):
                 'addedTimestamp': '2017-09-27T17:00:00Z',
                 'entryID': '2',
                 'entryType': 'review',
-                'etag': '',
+                'etag': self._get_review_entry_etag(self.review2),
                 'modelData': {
                     'reviewData': {
                         'id': self.review2.pk,
@@ -351,7 +354,7 @@ class ReviewRequestUpdatesViewTests(TestCase):
                 'addedTimestamp': '2017-09-27T17:00:00Z',
                 'entryID': '2',
                 'entryType': 'review',
-                'etag': '',
+                'etag': self._get_review_entry_etag(self.review2),
                 'modelData': {
                     'reviewData': {
                         'id': self.review2.pk,
@@ -405,6 +408,34 @@ class ReviewRequestUpdatesViewTests(TestCase):
         return reverse('review-request-updates',
                        args=[self.review_request.display_id])
 
+    def _get_review_entry_etag(self, review):
+        """Return the ETag expected for a review's entry.
+
+        Args:
+            review (reviewboard.reviews.models.review.Review):
+                The review shown in the entry.
+
+        Returns:
+            unicode:
+            The ETag for the entry.
+        """
+        request = RequestFactory().get('/')
+        request.user = AnonymousUser()
+
+        data = ReviewRequestPageData(review_request=self.review_request,
+                                     request=request)
+        data.query_data_pre_etag()
+        data.query_data_post_etag()
+
+        for entry in data.get_entries()['main']:
+            if isinstance(entry, ReviewEntry) and entry.review == review:
+                etag = ReviewEntry.build_etag_data(data, entry=entry)
+                self.assertNotEqual(etag, '')
+
+                return etag
+
+        self.fail('No entry was found for review %s' % review.pk)
+
     def _get_updates(self, query={}):
         response = self.client.get(self._build_url(), query)
         self.assertEqual(response.status_code, 200)
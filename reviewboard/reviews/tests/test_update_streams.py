@@ -0,0 +1,391 @@
+"""Unit tests for reviewboard.reviews.update_streams."""
+
+from __future__ import unicode_literals
+
+import base64
+import threading
+
+import kgb
+from django.core.cache import DEFAULT_CACHE_ALIAS, caches
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.urlresolvers import reverse
+from django.db import transaction
+
+from reviewboard.reviews.models import ReviewRequest
+from reviewboard.reviews.update_streams import (CacheUpdatesBroker,
+                                                LocalUpdatesBroker,
+                                                get_updates_broker,
+                                                is_update_streaming_enabled,
+                                                set_updates_broker)
+from reviewboard.reviews.views import ReviewRequestUpdatesStreamView
+from reviewboard.testing import TestCase
+
+
+class UpdateStreamsTestMixin(object):
+    """Mixin for tests that need update streaming enabled."""
+
+    def setUp(self):
+        super(UpdateStreamsTestMixin, self).setUp()
+
+        self.broker = LocalUpdatesBroker()
+        set_updates_broker(self.broker)
+        self.addCleanup(set_updates_broker, None)
+
+        settings_ctx = self.siteconfig_settings(
+            {'reviews_enable_update_streams': True},
+            reload_settings=False)
+        settings_ctx.__enter__()
+        self.addCleanup(settings_ctx.__exit__, None, None, None)
+
+
+class UpdateStreamsTests(TestCase):
+    """Unit tests for selecting and enabling update streams."""
+
+    def tearDown(self):
+        set_updates_broker(None)
+
+        super(UpdateStreamsTests, self).tearDown()
+
+    def test_get_updates_broker_with_local_cache(self):
+        """Testing get_updates_broker with a cache local to the process"""
+        self.assertIsNone(get_updates_broker())
+
+    def test_get_updates_broker_with_shared_cache(self):
+        """Testing get_updates_broker with a cache shared between processes
+        """
+        cache_backend = caches[DEFAULT_CACHE_ALIAS]
+        self.addCleanup(setattr, cache_backend, '_backend',
+                        cache_backend._backend)
+        cache_backend._backend = FileBasedCache('/tmp/rb-tests-cache', {})
+
+        self.assertIsInstance(get_updates_broker(), CacheUpdatesBroker)
+
+    def test_get_updates_broker_with_broker_set(self):
+        """Testing get_updates_broker with a broker set"""
+        broker = LocalUpdatesBroker()
+        set_updates_broker(broker)
+
+        self.assertIs(get_updates_broker(), broker)
+
+    def test_is_update_streaming_enabled_by_default(self):
+        """Testing is_update_streaming_enabled by default"""
+        set_updates_broker(LocalUpdatesBroker())
+
+        self.assertFalse(is_update_streaming_enabled())
+
+    def test_is_update_streaming_enabled_with_setting(self):
+        """Testing is_update_streaming_enabled with
+        reviews_enable_update_streams enabled
+        """
+        set_updates_broker(LocalUpdatesBroker())
+
+        with self.siteconfig_settings({'reviews_enable_update_streams': True},
+                                      reload_settings=False):
+            self.assertTrue(is_update_streaming_enabled())
+
+    def test_is_update_streaming_enabled_without_broker(self):
+        """Testing is_update_streaming_enabled with
+        reviews_enable_update_streams enabled and no shared cache
+        """
+        with self.siteconfig_settings({'reviews_enable_update_streams': True},
+                                      reload_settings=False):
+            self.assertFalse(is_update_streaming_enabled())
+
+
+class LocalUpdatesBrokerTests(TestCase):
+    """Unit tests for LocalUpdatesBroker."""
+
+    broker_cls = LocalUpdatesBroker
+
+    def setUp(self):
+        super(LocalUpdatesBrokerTests, self).setUp()
+
+        self.broker = self.broker_cls()
+
+    def test_get_serial_without_updates(self):
+        """Testing get_serial without any updates"""
+        self.assertEqual(self.broker.get_serial(1), 0)
+
+    def test_publish(self):
+        """Testing publish increments the serial"""
+        self.assertEqual(self.broker.publish(1), 1)
+        self.assertEqual(self.broker.publish(1), 2)
+
+        self.assertEqual(self.broker.get_serial(1), 2)
+        self.assertEqual(self.broker.get_serial(2), 0)
+
+    def test_wait_with_changed_serial(self):
+        """Testing wait with a serial that's already out of date"""
+        self.broker.publish(1)
+
+        self.assertEqual(self.broker.wait(1, 0, 10), 1)
+
+    def test_wait_with_timeout(self):
+        """Testing wait with no updates times out"""
+        self.broker.publish(2)
+
+        self.assertEqual(self.broker.wait(1, 0, 0.01), 0)
+
+    def test_wait_with_publish_from_thread(self):
+        """Testing wait wakes up when an update is published"""
+        timer = threading.Timer(0.05, lambda: self.broker.publish(1))
+        timer.start()
+
+        try:
+            self.assertEqual(self.broker.wait(1, 0, 10), 1)
+        finally:
+            timer.cancel()
+
+
+class CacheUpdatesBrokerTests(LocalUpdatesBrokerTests):
+    """Unit tests for CacheUpdatesBroker."""
+
+    broker_cls = CacheUpdatesBroker
+
+    def test_wait_with_publish_from_other_process(self):
+        """Testing wait notices updates published by other processes"""
+        self.broker.poll_interval = 0.01
+
+        # A separate broker shares the cache, but not the in-process
+        # notifications.
+        timer = threading.Timer(0.05,
+                                lambda: CacheUpdatesBroker().publish(1))
+        timer.start()
+
+        try:
+            self.assertEqual(self.broker.wait(1, 0, 10), 1)
+        finally:
+            timer.cancel()
+
+
+class UpdateStreamSignalTests(UpdateStreamsTestMixin, kgb.SpyAgency,
+                              TestCase):
+    """Unit tests for the signal handlers announcing updates."""
+
+    fixtures = ['test_users']
+
+    def setUp(self):
+        super(UpdateStreamSignalTests, self).setUp()
+
+        # Callbacks are never run inside the test's transaction, so run
+        # them immediately instead.
+        self.spy_on(transaction.on_commit,
+                    call_fake=lambda func, using=None: func())
+
+        self.review_request = self.create_review_request(publish=True)
+        self.serial = self.broker.get_serial(self.review_request.pk)
+
+    def test_review_published(self):
+        """Testing update notifications when publishing a review"""
+        review = self.create_review(self.review_request)
+        review.publish()
+
+        self.assertUpdated()
+
+    def test_reply_published(self):
+        """Testing update notifications when publishing a reply"""
+        review = self.create_review(self.review_request, publish=True)
+        self.serial = self.broker.get_serial(self.review_request.pk)
+
+        reply = self.create_reply(review)
+        reply.publish()
+
+        self.assertUpdated()
+
+    def test_review_request_published(self):
+        """Testing update notifications when publishing a review request
+        draft
+        """
+        draft = self.create_review_request_draft(self.review_request)
+        draft.summary = 'New summary'
+        draft.target_people.add(self.review_request.submitter)
+        draft.save()
+
+        self.review_request.publish(self.review_request.submitter)
+
+        self.assertUpdated()
+
+    def test_review_request_closed(self):
+        """Testing update notifications when closing a review request"""
+        self.review_request.close(ReviewRequest.SUBMITTED)
+
+        self.assertUpdated()
+
+    def test_status_update_saved(self):
+        """Testing update notifications when saving a status update"""
+        self.create_status_update(self.review_request)
+
+        self.assertUpdated()
+
+    def test_unpublished_review_saved(self):
+        """Testing no update notifications when saving an unpublished
+        review
+        """
+        self.create_review(self.review_request)
+
+        self.assertEqual(self.broker.get_serial(self.review_request.pk),
+                         self.serial)
+
+    def test_review_published_with_streaming_disabled(self):
+        """Testing no update notifications when publishing a review with
+        update streams disabled
+        """
+        review = self.create_review(self.review_request)
+
+        with self.siteconfig_settings({'reviews_enable_update_streams': False},
+                                      reload_settings=False):
+            review.publish()
+
+        self.assertEqual(self.broker.get_serial(self.review_request.pk),
+                         self.serial)
+
+    def assertUpdated(self):
+        """Assert that an update was announced for the review request.
+
+        Raises:
+            AssertionError:
+                No update was announced.
+        """
+        self.assertGreater(self.broker.get_serial(self.review_request.pk),
+                           self.serial)
+
+
+class ReviewRequestUpdatesStreamViewTests(UpdateStreamsTestMixin,
+                                          TestCase):
+    """Unit tests for ReviewRequestUpdatesStreamView."""
+
+    fixtures = ['test_users']
+
+    def setUp(self):
+        super(ReviewRequestUpdatesStreamViewTests, self).setUp()
+
+        self.review_request = self.create_review_request(publish=True)
+
+    def test_get(self):
+        """Testing ReviewRequestUpdatesStreamView GET"""
+        response = self.client.get(self._build_url())
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+
+        stream = iter(response.streaming_content)
+        self.assertEqual(next(stream), b'retry: 3000\n\n')
+
+        review = self.create_review(self.review_request)
+        self.create_general_comment(review)
+        review.publish()
+        self.broker.publish(self.review_request.pk)
+
+        lines = next(stream).split(b'\n')
+        self.assertEqual(lines[0], b'id: 1')
+        self.assertEqual(lines[1], b'event: updates')
+        self.assertTrue(lines[2].startswith(b'data: '))
+        self.assertEqual(lines[3:], [b'', b''])
+
+        payload = base64.b64decode(lines[2][len(b'data: '):])
+        self.assertIn(('<div id="review%s"' % review.pk).encode('utf-8'),
+                      payload)
+
+        response.close()
+
+    def test_get_with_last_event_id(self):
+        """Testing ReviewRequestUpdatesStreamView GET with Last-Event-ID
+        sends updates announced while disconnected
+        """
+        self.broker.publish(self.review_request.pk)
+
+        response = self.client.get(self._build_url(),
+                                   HTTP_LAST_EVENT_ID='0')
+        self.assertEqual(response.status_code, 200)
+
+        stream = iter(response.streaming_content)
+        next(stream)
+
+        self.assertTrue(next(stream).startswith(b'id: 1\nevent: updates\n'))
+
+        response.close()
+
+    def test_get_with_keepalive(self):
+        """Testing ReviewRequestUpdatesStreamView GET sends keep-alives and
+        ends after the maximum duration
+        """
+        self._set_view_attrs(max_stream_secs=0.05,
+                             keepalive_secs=0.01)
+
+        response = self.client.get(self._build_url())
+        self.assertEqual(response.status_code, 200)
+
+        chunks = list(response.streaming_content)
+        self.assertEqual(chunks[0], b'retry: 3000\n\n')
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(set(chunks[1:]), {b': keepalive\n\n'})
+
+    def test_get_without_access(self):
+        """Testing ReviewRequestUpdatesStreamView GET without access to
+        the review request
+        """
+        review_request = self.create_review_request()
+        self.client.login(username='grumpy', password='grumpy')
+
+        response = self.client.get(
+            reverse('review-request-updates-stream',
+                    args=[review_request.display_id]))
+        self.assertEqual(response.status_code, 403)
+
+    def test_get_with_streaming_disabled(self):
+        """Testing ReviewRequestUpdatesStreamView GET with update streams
+        disabled
+        """
+        with self.siteconfig_settings({'reviews_enable_update_streams': False},
+                                      reload_settings=False):
+            response = self.client.get(self._build_url())
+
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(response.streaming)
+
+    def test_get_without_shared_cache(self):
+        """Testing ReviewRequestUpdatesStreamView GET without a cache shared
+        between processes
+        """
+        set_updates_broker(None)
+
+        response = self.client.get(self._build_url())
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(response.streaming)
+
+    def test_review_request_page_with_streaming_enabled(self):
+        """Testing review request page provides the updates stream URL with
+        update streams enabled
+        """
+        response = self.client.get(self.review_request.get_absolute_url())
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'updatesStreamURL', response.content)
+
+    def test_review_request_page_with_streaming_disabled(self):
+        """Testing review request page omits the updates stream URL with
+        update streams disabled
+        """
+        with self.siteconfig_settings({'reviews_enable_update_streams': False},
+                                      reload_settings=False):
+            response = self.client.get(
+                self.review_request.get_absolute_url())
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn(b'updatesStreamURL', response.content)
+
+    def _set_view_attrs(self, **attrs):
+        """Temporarily override attributes on the view class.
+
+        Args:
+            **attrs (dict):
+                The attributes to set.
+        """
+        for name, value in attrs.items():
+            self.addCleanup(setattr, ReviewRequestUpdatesStreamView, name,
+                            getattr(ReviewRequestUpdatesStreamView, name))
+            setattr(ReviewRequestUpdatesStreamView, name, value)
+
+    def _build_url(self):
+        return reverse('review-request-updates-stream',
+                       args=[self.review_request.display_id])
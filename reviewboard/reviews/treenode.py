@@ -1,61 +1,229 @@
-import os
-class TreeNode:
-    def __init__(self, name, path):
-        self.name = name
-        self.children = []
-        self.children_names = set()
-        self.counter = 0
-        self.children_idx_map = {}
-        self.path = path
-    def add_child(self, node):
-        self.children.append(node)
-        self.children_names.add(node.name)
-        self.children_idx_map[node.name] = self.counter 
-        self.counter += 1
-    def get_child(self, node_name):
-        idx = self.children_idx_map[node_name]
-        return self.children[idx]
-
-
-def generate_tree_structure(filepath_list):
-    node = head = TreeNode('root','/root')
-    for filename in filepath_list:
-        node = head
-        filename = os.path.normpath(filename)
-        split_list = filename.split(os.sep)
-        for s in split_list:   
-            if s not in node.children_names:
-                child_node = TreeNode(s,filename)
-                node.add_child(child_node)
-            else:
-                child_node = node.get_child(s)
-            node = child_node
-            
-    return head
-
-
-
-def prefix_traversal(root, issues_flag_default, checked_files):
-    res = "<li>"
-    if root.children:
-        
-        res += '<label>' + root.name +'</label>'
-    else:
-        if issues_flag_default or root.path in checked_files:
-            res += '<label><input id="'+root.path+'" name="'+root.path+'" type="checkbox" value="yes" checked />' + root.name +'</label>'
-        else:
-            res += '<label><input id="'+root.path+'" name="'+root.path+'" type="checkbox" />' + root.name +'</label>'
-    i=0
-    for child in root.children:
-        if i==0:
-            res += '<ul>'
-        res += prefix_traversal(child, issues_flag_default, checked_files)
-    res += "</li></ul>"
-    return res
-
-def generate_tree_html(head, issues_flag_default, checked_files):
-    res = ""
-    for child in head.children:
-        res += '<ul>'
-        res += prefix_traversal(child, issues_flag_default, checked_files)
-    return res
+"""File trees for the print view's file picker and the code browser.
+
+A tree is built once from a list of file paths, in a single pass over the
+sorted paths, and can then be rendered as the nested checkbox list used by
+the print view, or queried for whether a path is one of the files in it.
+"""
+
+from __future__ import unicode_literals
+
+import posixpath
+
+from django.utils import six
+from django.utils.html import escape
+
+
+class TreeNode(object):
+    """A directory or file in a file tree.
+
+    A node with children is a directory. A node without children is a file.
+
+    Nodes are kept small, since a tree may contain many thousands of files.
+    Each node holds only its name, path, and a dictionary of children.
+    """
+
+    __slots__ = ('name', 'path', 'children')
+
+    def __init__(self, name, path):
+        """Initialize the node.
+
+        Args:
+            name (unicode):
+                The name of the file or directory.
+
+            path (unicode):
+                The full path of the file or directory.
+        """
+        self.name = name
+        self.path = path
+        self.children = {}
+
+    def __contains__(self, path):
+        """Return whether a file is in the tree under this node.
+
+        Args:
+            path (unicode):
+                The path of the file, relative to this node.
+
+        Returns:
+            bool:
+            ``True`` if the path is a file in the tree. ``False`` if it's a
+            directory or isn't in the tree.
+        """
+        node = self.get_node(path)
+
+        return node is not None and node is not self and not node.children
+
+    def get_child(self, name):
+        """Return the child with the given name.
+
+        Args:
+            name (unicode):
+                The name of the child.
+
+        Returns:
+            TreeNode:
+            The child node.
+
+        Raises:
+            KeyError:
+                There is no child with that name.
+        """
+        return self.children[name]
+
+    def get_node(self, path):
+        """Return the node for a path under this node.
+
+        Args:
+            path (unicode):
+                The path of the file or directory, relative to this node. An
+                empty path refers to this node.
+
+        Returns:
+            TreeNode:
+            The node for the path, or ``None`` if it's not in the tree.
+        """
+        node = self
+
+        if path:
+            for name in _split_path(path):
+                node = node.children.get(name)
+
+                if node is None:
+                    break
+
+        return node
+
+    def iter_sorted_children(self):
+        """Iterate through the children of this node, sorted by name.
+
+        Yields:
+            TreeNode:
+            Each child node.
+        """
+        children = self.children
+
+        for name in sorted(six.iterkeys(children)):
+            yield children[name]
+
+
+def _split_path(path):
+    """Return the components of a path.
+
+    Args:
+        path (unicode):
+            The path to split.
+
+    Returns:
+        list of unicode:
+        The components of the normalized path.
+    """
+    return posixpath.normpath(path).split('/')
+
+
+def generate_tree_structure(filepath_list):
+    """Return a tree of files for a list of file paths.
+
+    The paths are sorted by their components and then added in a single
+    pass. Each path only looks up one child per component.
+
+    Args:
+        filepath_list (list of unicode):
+            The paths of the files to add to the tree.
+
+    Returns:
+        TreeNode:
+        The root of the tree.
+    """
+    head = TreeNode('root', '/root')
+    split_paths = sorted(
+        (_split_path(filename), posixpath.normpath(filename))
+        for filename in filepath_list
+    )
+
+    for names, filename in split_paths:
+        node = head
+
+        for name in names:
+            child_node = node.children.get(name)
+
+            if child_node is None:
+                child_node = TreeNode(name, filename)
+                node.children[name] = child_node
+
+            node = child_node
+
+    return head
+
+
+def iter_tree_html(head, issues_flag_default, checked_files):
+    """Iterate through the HTML for a file tree's checkbox list.
+
+    Each directory is rendered as a label, and each file as a checkbox
+    named after the file's path. The tree is walked iteratively, so the
+    time taken is linear in the size of the output.
+
+    Args:
+        head (TreeNode):
+            The root of the tree.
+
+        issues_flag_default (bool):
+            Whether all files should be checked.
+
+        checked_files (set of unicode):
+            The paths of the files that should be checked.
+
+    Yields:
+        unicode:
+        Each piece of HTML.
+    """
+    # The stack holds nodes still to be rendered, and None for each node
+    # that needs to be closed once its children are rendered.
+    stack = list(reversed(list(head.iter_sorted_children())))
+
+    while stack:
+        node = stack.pop()
+
+        if node is None:
+            yield '</li></ul>'
+            continue
+
+        name = escape(node.name)
+
+        if node.children:
+            yield '<ul><li><label>%s</label>' % name
+
+            stack.append(None)
+            stack += reversed(list(node.iter_sorted_children()))
+        else:
+            path = escape(node.path)
+
+            if issues_flag_default or node.path in checked_files:
+                yield ('<ul><li><label><input id="%s" name="%s" '
+                       'type="checkbox" value="yes" checked />%s</label>'
+                       '</li></ul>'
+                       % (path, path, name))
+            else:
+                yield ('<ul><li><label><input id="%s" name="%s" '
+                       'type="checkbox" />%s</label></li></ul>'
+                       % (path, path, name))
+
+
+def generate_tree_html(head, issues_flag_default, checked_files):
+    """Return the HTML for a file tree's checkbox list.
+
+    Args:
+        head (TreeNode):
+            The root of the tree.
+
+        issues_flag_default (bool):
+            Whether all files should be checked.
+
+        checked_files (set of unicode):
+            The paths of the files that should be checked.
+
+    Returns:
+        unicode:
+        The HTML for the tree.
+    """
+    return ''.join(iter_tree_html(head, issues_flag_default, checked_files))
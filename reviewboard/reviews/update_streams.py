@@ -0,0 +1,447 @@
+"""Push notifications for updates to the review request page.
+
+Open review request pages used to poll for updates, each poll computing
+an ETag from the database. Pages can instead hold open a stream of
+updates (see :py:class:`~reviewboard.reviews.views.
+ReviewRequestUpdatesStreamView`), which only touches the database when a
+review request has actually changed.
+
+Changes are announced through a broker. Each review request has a serial
+number, which is incremented whenever a review, reply, change description
+or status update is published. Streams wait for the serial to change and
+then send any updates.
+
+Streaming is off by default, and is enabled through the
+``reviews_enable_update_streams`` site configuration setting. Each open
+stream occupies a server worker (or thread) for up to
+:py:attr:`~reviewboard.reviews.views.ReviewRequestUpdatesStreamView.
+max_stream_secs` seconds, so this should only be enabled when Review Board
+is served by an asynchronous or threaded web server. Pages fall back on
+polling whenever streaming isn't available.
+
+Two brokers are provided:
+
+:py:class:`LocalUpdatesBroker`:
+    Delivers notifications to streams in the same process. This is never
+    chosen automatically, since updates made in other processes would be
+    lost, but can be set through :py:func:`set_updates_broker` for
+    single-process servers.
+
+:py:class:`CacheUpdatesBroker`:
+    Shares serials between processes through the cache, in the manner of
+    a Redis publish/subscribe channel. Streams in the same process are
+    woken immediately, and streams in other processes notice the change
+    within :py:attr:`~CacheUpdatesBroker.poll_interval` seconds, without
+    querying the database.
+
+Version Added:
+    4.0.6
+"""
+
+from __future__ import unicode_literals
+
+import threading
+import time
+
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from djblets.cache.backend import make_cache_key
+from djblets.cache.forwarding_backend import ForwardingCacheBackend
+from djblets.siteconfig.models import SiteConfiguration
+
+
+class BaseUpdatesBroker(object):
+    """Base class for a broker for review request update notifications.
+
+    Version Added:
+        4.0.6
+    """
+
+    def get_serial(self, review_request_id):
+        """Return the current update serial for a review request.
+
+        Args:
+            review_request_id (int):
+                The ID of the review request.
+
+        Returns:
+            int:
+            The current serial.
+        """
+        raise NotImplementedError
+
+    def publish(self, review_request_id):
+        """Announce that a review request has been updated.
+
+        Args:
+            review_request_id (int):
+                The ID of the review request.
+
+        Returns:
+            int:
+            The new serial.
+        """
+        raise NotImplementedError
+
+    def wait(self, review_request_id, serial, timeout):
+        """Wait for a review request to be updated.
+
+        Args:
+            review_request_id (int):
+                The ID of the review request.
+
+            serial (int):
+                The last serial seen by the caller.
+
+            timeout (float):
+                The maximum number of seconds to wait.
+
+        Returns:
+            int:
+            The current serial. This will be the same as ``serial`` if the
+            wait timed out.
+        """
+        raise NotImplementedError
+
+
+class LocalUpdatesBroker(BaseUpdatesBroker):
+    """A broker delivering update notifications within a process.
+
+    Version Added:
+        4.0.6
+    """
+
+    def __init__(self):
+        """Initialize the broker."""
+        self._condition = threading.Condition()
+        self._serials = {}
+
+    def get_serial(self, review_request_id):
+        """Return the current update serial for a review request.
+
+        Args:
+            review_request_id (int):
+                The ID of the review request.
+
+        Returns:
+            int:
+            The current serial.
+        """
+        with self._condition:
+            return self._serials.get(review_request_id, 0)
+
+    def publish(self, review_request_id):
+        """Announce that a review request has been updated.
+
+        Args:
+            review_request_id (int):
+                The ID of the review request.
+
+        Returns:
+            int:
+            The new serial.
+        """
+        with self._condition:
+            serial = self._serials.get(review_request_id, 0) + 1
+            self._serials[review_request_id] = serial
+            self._condition.notify_all()
+
+        return serial
+
+    def wait(self, review_request_id, serial, timeout):
+        """Wait for a review request to be updated.
+
+        Args:
+            review_request_id (int):
+                The ID of the review request.
+
+            serial (int):
+                The last serial seen by the caller.
+
+            timeout (float):
+                The maximum number of seconds to wait.
+
+        Returns:
+            int:
+            The current serial. This will be the same as ``serial`` if the
+            wait timed out.
+        """
+        deadline = time.time() + timeout
+
+        with self._condition:
+            while True:
+                new_serial = self._serials.get(review_request_id, 0)
+                remaining = deadline - time.time()
+
+                if new_serial != serial or remaining <= 0:
+                    return new_serial
+
+                self._condition.wait(remaining)
+
+
+class CacheUpdatesBroker(BaseUpdatesBroker):
+    """A broker sharing update notifications between processes.
+
+    Serials are stored in the cache, so that every process using the same
+    cache server sees them.
+
+    Version Added:
+        4.0.6
+    """
+
+    #: The number of seconds between checks of the cache while waiting.
+    poll_interval = 2
+
+    #: The number of seconds to keep serials in the cache.
+    #:
+    #: If a serial expires, it starts again from 0. Streams will see this as
+    #: a change and send updates, so this only results in extra work.
+    serial_expiration = 60 * 60 * 24
+
+    _SERIAL_KEY = 'review-request-updates-serial-%s'
+
+    def __init__(self):
+        """Initialize the broker."""
+        self._condition = threading.Condition()
+        self._generation = 0
+
+    def get_serial(self, review_request_id):
+        """Return the current update serial for a review request.
+
+        Args:
+            review_request_id (int):
+                The ID of the review request.
+
+        Returns:
+            int:
+            The current serial.
+        """
+        return cache.get(make_cache_key(self._SERIAL_KEY % review_request_id),
+                         0)
+
+    def publish(self, review_request_id):
+        """Announce that a review request has been updated.
+
+        Args:
+            review_request_id (int):
+                The ID of the review request.
+
+        Returns:
+            int:
+            The new serial.
+        """
+        key = make_cache_key(self._SERIAL_KEY % review_request_id)
+        cache.add(key, 0, self.serial_expiration)
+
+        try:
+            serial = cache.incr(key)
+        except ValueError:
+            # The key was evicted after being added.
+            serial = 1
+            cache.set(key, serial, self.serial_expiration)
+
+        # Wake any streams in this process, so they don't need to wait for
+        # their next check of the cache.
+        with self._condition:
+            self._generation += 1
+            self._condition.notify_all()
+
+        return serial
+
+    def wait(self, review_request_id, serial, timeout):
+        """Wait for a review request to be updated.
+
+        Args:
+            review_request_id (int):
+                The ID of the review request.
+
+            serial (int):
+                The last serial seen by the caller.
+
+            timeout (float):
+                The maximum number of seconds to wait.
+
+        Returns:
+            int:
+            The current serial. This will be the same as ``serial`` if the
+            wait timed out.
+        """
+        deadline = time.time() + timeout
+
+        while True:
+            with self._condition:
+                generation = self._generation
+
+            new_serial = self.get_serial(review_request_id)
+            remaining = deadline - time.time()
+
+            if new_serial != serial or remaining <= 0:
+                return new_serial
+
+            with self._condition:
+                if self._generation == generation:
+                    self._condition.wait(min(remaining, self.poll_interval))
+
+
+_broker = None
+_default_broker = CacheUpdatesBroker()
+
+
+def get_updates_broker():
+    """Return the broker used for review request update notifications.
+
+    Unless another broker has been set, this will be a
+    :py:class:`CacheUpdatesBroker` if the cache is shared between processes.
+    If the cache is local to each process, there's no way to announce updates
+    to other processes, so no broker will be available.
+
+    Version Added:
+        4.0.6
+
+    Returns:
+        BaseUpdatesBroker:
+        The broker, or ``None`` if updates can't be streamed.
+    """
+    if _broker is not None:
+        return _broker
+
+    cache_backend = caches[DEFAULT_CACHE_ALIAS]
+
+    if isinstance(cache_backend, ForwardingCacheBackend):
+        cache_backend = cache_backend.backend
+
+    if isinstance(cache_backend, (DummyCache, LocMemCache)):
+        return None
+
+    return _default_broker
+
+
+def is_update_streaming_enabled():
+    """Return whether review request updates can be streamed to pages.
+
+    This requires the ``reviews_enable_update_streams`` site configuration
+    setting to be enabled, and a broker to be available.
+
+    Version Added:
+        4.0.6
+
+    Returns:
+        bool:
+        Whether updates can be streamed.
+    """
+    siteconfig = SiteConfiguration.objects.get_current()
+
+    return (bool(siteconfig.get('reviews_enable_update_streams')) and
+            get_updates_broker() is not None)
+
+
+def set_updates_broker(broker):
+    """Set the broker used for review request update notifications.
+
+    Version Added:
+        4.0.6
+
+    Args:
+        broker (BaseUpdatesBroker):
+            The broker to use, or ``None`` to choose one based on the
+            cache.
+    """
+    global _broker
+
+    _broker = broker
+
+
+def notify_review_request_updated(review_request_id):
+    """Notify update streams that a review request has been updated.
+
+    The notification is sent once the current transaction (if any) is
+    committed, so that streams will see the new data.
+
+    Version Added:
+        4.0.6
+
+    Args:
+        review_request_id (int):
+            The ID of the review request.
+    """
+    if is_update_streaming_enabled():
+        transaction.on_commit(
+            lambda: get_updates_broker().publish(review_request_id))
+
+
+def _on_review_request_changed(review_request, **kwargs):
+    """Handle a review request being published, closed, or reopened.
+
+    Args:
+        review_request (reviewboard.reviews.models.review_request.
+                        ReviewRequest):
+            The review request.
+
+        **kwargs (dict):
+            Ignored arguments from the signal.
+    """
+    notify_review_request_updated(review_request.pk)
+
+
+def _on_review_changed(review, **kwargs):
+    """Handle a review being published or having its Ship It revoked.
+
+    Args:
+        review (reviewboard.reviews.models.review.Review):
+            The review.
+
+        **kwargs (dict):
+            Ignored arguments from the signal.
+    """
+    notify_review_request_updated(review.review_request_id)
+
+
+def _on_reply_published(reply, **kwargs):
+    """Handle a reply being published.
+
+    Args:
+        reply (reviewboard.reviews.models.review.Review):
+            The reply.
+
+        **kwargs (dict):
+            Ignored arguments from the signal.
+    """
+    notify_review_request_updated(reply.review_request_id)
+
+
+def _on_status_update_saved(instance, **kwargs):
+    """Handle a status update being saved.
+
+    Args:
+        instance (reviewboard.reviews.models.status_update.StatusUpdate):
+            The status update.
+
+        **kwargs (dict):
+            Ignored arguments from the signal.
+    """
+    notify_review_request_updated(instance.review_request_id)
+
+
+def connect_signals():
+    """Connect the signal handlers that send update notifications."""
+    from django.db.models.signals import post_save
+
+    from reviewboard.reviews.models import StatusUpdate
+    from reviewboard.reviews.signals import (reply_published,
+                                             review_published,
+                                             review_request_closed,
+                                             review_request_published,
+                                             review_request_reopened,
+                                             review_ship_it_revoked)
+
+    for signal in (review_request_published,
+                   review_request_closed,
+                   review_request_reopened):
+        signal.connect(_on_review_request_changed)
+
+    review_published.connect(_on_review_changed)
+    review_ship_it_revoked.connect(_on_review_changed)
+    reply_published.connect(_on_reply_published)
+    post_save.connect(_on_status_update_saved, sender=StatusUpdate)
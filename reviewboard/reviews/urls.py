@@ -104,6 +104,10 @@ review_request_urls = [
         views.ReviewRequestUpdatesView.as_view(),
         name='review-request-updates'),
 
+    url(r'^_updates/stream/$',
+        views.ReviewRequestUpdatesStreamView.as_view(),
+        name='review-request-updates-stream'),
+
     # Review request diffs
     url(r'^diff/', include(diffviewer_urls)),
 
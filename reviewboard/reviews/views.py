@@ -1,31 +1,40 @@
 from __future__ import unicode_literals
 
+import base64
+import hashlib
 import io
 import json
 import logging
 import re
 import struct
-import os
+import time
+from collections import defaultdict
 
 import dateutil.parser
 from django.conf import settings
 from django.contrib.sites.models import Site
 from django.core.exceptions import MultipleObjectsReturned, ObjectDoesNotExist
+from django.db import close_old_connections, connection
 from django.db.models import Q
 from django.http import (Http404,
                          HttpResponse,
                          HttpResponseBadRequest,
-                         HttpResponseNotFound)
+                         HttpResponseNotFound,
+                         StreamingHttpResponse)
 from django.shortcuts import get_object_or_404, get_list_or_404, render
 from django.template.defaultfilters import date
 from django.utils import six, timezone
 from django.utils.formats import localize
+from django.utils.functional import cached_property
 from django.utils.html import escape, format_html, strip_tags
 from django.utils.safestring import mark_safe
 from django.utils.timezone import is_aware, localtime, make_aware, utc
-from django.utils.translation import ugettext_lazy as _, ugettext
+from django.utils.translation import (get_language,
+                                      ugettext_lazy as _,
+                                      ugettext)
 from django.views.generic.base import (ContextMixin, RedirectView,
                                        TemplateView, View)
+from djblets.cache.backend import cache_memoize
 from djblets.conditions import values
 from djblets.siteconfig.models import SiteConfiguration
 from djblets.util.compat.django.template.loader import render_to_string
@@ -53,7 +62,7 @@ from reviewboard.diffviewer.diffutils import (convert_to_unicode,
                                               get_original_file,
                                               get_patched_file,
                                               get_enable_highlighting)
-from reviewboard.diffviewer.models import DiffSet
+from reviewboard.diffviewer.models import DiffSet, FileDiff
 from reviewboard.diffviewer.views import (DiffFragmentView,
                                           DiffViewerView,
                                           DownloadPatchErrorBundleView,
@@ -84,6 +93,8 @@ from reviewboard.reviews.models import (Comment,
                                         ReadStatus,
                                         Screenshot, UntouchedComment)
 from reviewboard.reviews.ui.base import FileAttachmentReviewUI
+from reviewboard.reviews.update_streams import (get_updates_broker,
+                                                is_update_streaming_enabled)
 from reviewboard.scmtools.errors import FileNotFoundError
 from reviewboard.scmtools.models import Repository
 from reviewboard.site.mixins import CheckLocalSiteAccessViewMixin
@@ -93,7 +104,8 @@ from django.views.decorators.cache import never_cache
 from reviewboard.reviews.managers import ReadStatusManager
 from django.http import HttpResponseNotModified
 from djblets.util.http import encode_etag, set_etag, etag_if_none_match
-from reviewboard.reviews.treenode import *
+from reviewboard.reviews.treenode import (generate_tree_html,
+                                          generate_tree_structure)
 from reviewboard.print.views import PrintView
 
 from reviewboard.reviews.codeviewer_utils import get_file_tree, extract_file_path, get_original_code_file, \
@@ -1020,7 +1032,9 @@ class ReviewRequestDetailView(ReviewRequestViewMixin,
 
         context = \
             super(ReviewRequestDetailView, self).get_context_data(**kwargs)
-        context.update(make_review_request_context(request, review_request))
+        context.update(make_review_request_context(request, review_request, {
+            'review_request_visit': self.visited,
+        }))
         context.update({
             'blocks': self.blocks,
             'draft': data.draft,
@@ -1110,8 +1124,11 @@ class ReviewRequestUpdatesView(ReviewRequestViewMixin, ETagViewMixin,
             django.http.HttpResponse:
             The HTTP response containin the updates payload.
         """
-        super(ReviewRequestUpdatesView, self).pre_dispatch(request, *args,
-                                                           **kwargs)
+        response = super(ReviewRequestUpdatesView, self).pre_dispatch(
+            request, *args, **kwargs)
+
+        if response is not None:
+            return response
 
         # Find out which entries and IDs (if any) that the caller is most
         # interested in.
@@ -1205,6 +1222,20 @@ class ReviewRequestUpdatesView(ReviewRequestViewMixin, ETagViewMixin,
             The HTTP response to send to the client. This will contain the
             custom update payload content.
         """
+        return HttpResponse(self._build_payload(**kwargs),
+                            content_type='text/plain; charset=utf-8')
+
+    def _build_payload(self, **kwargs):
+        """Build the payload of updates for the client.
+
+        Args:
+            **kwargs (dict):
+                Keyword arguments passed to the handler.
+
+        Returns:
+            bytes:
+            The updates payload.
+        """
         request = self.request
         review_request = self.review_request
         data = self.data
@@ -1315,7 +1346,7 @@ class ReviewRequestUpdatesView(ReviewRequestViewMixin, ETagViewMixin,
         result = payload.getvalue()
         payload.close()
 
-        return HttpResponse(result, content_type='text/plain; charset=utf-8')
+        return result
 
     def _write_update(self, payload, metadata, html):
         """Write an update to the payload.
@@ -1346,6 +1377,179 @@ class ReviewRequestUpdatesView(ReviewRequestViewMixin, ETagViewMixin,
         payload.write(html)
 
 
+class ReviewRequestUpdatesStreamView(ReviewRequestUpdatesView):
+    """Internal view for streaming updates to the review request page.
+
+    This sends the same updates as :py:class:`ReviewRequestUpdatesView`, as
+    server-sent events, whenever the review request is updated. It accepts
+    the same query arguments.
+
+    While the stream is idle, no database queries are made. The view waits
+    for an update to be announced through
+    :py:mod:`reviewboard.reviews.update_streams`, and only then builds the
+    updates payload.
+
+    Each event has a type of ``updates``, the updates payload encoded as
+    base64 as its data, and the update serial as its ID. Clients that
+    reconnect will receive any updates announced while they were
+    disconnected.
+
+    If streaming isn't enabled (see :py:func:`~reviewboard.reviews.
+    update_streams.is_update_streaming_enabled`), this responds with
+    :http:`204`, which tells clients to stop reconnecting and poll
+    :py:class:`ReviewRequestUpdatesView` instead.
+
+    Version Added:
+        4.0.6
+    """
+
+    #: The maximum number of seconds to keep a stream open.
+    #:
+    #: This bounds how long a server worker is used by one stream. Clients
+    #: reconnect automatically once the stream ends.
+    max_stream_secs = 5 * 60
+
+    #: The number of seconds between keep-alive comments on idle streams.
+    keepalive_secs = 30
+
+    #: The number of milliseconds clients should wait before reconnecting.
+    reconnect_ms = 3000
+
+    def pre_dispatch(self, request, *args, **kwargs):
+        """Look up objects and permissions before dispatching the request.
+
+        Args:
+            request (django.http.HttpRequest):
+                The HTTP request from the client.
+
+            *args (tuple):
+                Positional arguments passed to the view.
+
+            **kwargs (dict):
+                Keyword arguments passed to the view.
+
+        Returns:
+            django.http.HttpResponse:
+            The HTTP response telling the client to poll for updates, if
+            streaming isn't enabled, or the response from the parent class.
+        """
+        if not is_update_streaming_enabled():
+            return HttpResponse(status=204)
+
+        return super(ReviewRequestUpdatesStreamView, self).pre_dispatch(
+            request, *args, **kwargs)
+
+    def get_etag_data(self, request, *args, **kwargs):
+        """Return an ETag for the view.
+
+        Streams are never cached, so this doesn't compute an ETag.
+
+        Args:
+            request (django.http.HttpRequest, unused):
+                The HTTP request from the client.
+
+            *args (tuple, unused):
+                Positional arguments passsed to the handler.
+
+            **kwargs (dict, unused):
+                Keyword arguments passed to the handler.
+
+        Returns:
+            unicode:
+            ``None``, always.
+        """
+        return None
+
+    def get(self, request, **kwargs):
+        """Handle HTTP GET requests for this view.
+
+        Args:
+            request (django.http.HttpRequest):
+                The HTTP request from the client.
+
+            **kwargs (dict):
+                Keyword arguments passed to the handler.
+
+        Returns:
+            django.http.StreamingHttpResponse:
+            The HTTP response streaming the updates to the client.
+        """
+        broker = get_updates_broker()
+
+        try:
+            serial = int(request.META['HTTP_LAST_EVENT_ID'])
+        except (KeyError, ValueError):
+            serial = broker.get_serial(self.review_request.pk)
+
+        response = StreamingHttpResponse(
+            self._iter_events(broker, serial, **kwargs),
+            content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+
+        # Prevent nginx from buffering the stream.
+        response['X-Accel-Buffering'] = 'no'
+
+        return response
+
+    def _iter_events(self, broker, serial, **kwargs):
+        """Iterate through the server-sent events for the stream.
+
+        Args:
+            broker (reviewboard.reviews.update_streams.BaseUpdatesBroker):
+                The broker announcing updates.
+
+            serial (int):
+                The last update serial seen by the client.
+
+            **kwargs (dict):
+                Keyword arguments passed to the handler.
+
+        Yields:
+            bytes:
+            Each event or comment to send to the client.
+        """
+        review_request = self.review_request
+        deadline = time.time() + self.max_stream_secs
+
+        yield ('retry: %d\n\n' % self.reconnect_ms).encode('utf-8')
+
+        while True:
+            remaining = deadline - time.time()
+
+            if remaining <= 0:
+                break
+
+            # Don't hold on to a database connection while idle.
+            if not connection.in_atomic_block:
+                close_old_connections()
+
+            new_serial = broker.wait(review_request.pk, serial,
+                                     min(self.keepalive_secs, remaining))
+
+            if new_serial == serial:
+                yield b': keepalive\n\n'
+                continue
+
+            serial = new_serial
+
+            review_request.refresh_from_db()
+            self.data = ReviewRequestPageData(
+                review_request,
+                self.request,
+                entry_classes=self.data.entry_classes)
+            self.data.query_data_pre_etag()
+            payload = self._build_payload(**kwargs)
+
+            if payload:
+                yield (
+                    'id: %d\n'
+                    'event: updates\n'
+                    'data: %s\n'
+                    '\n'
+                    % (serial, base64.b64encode(payload).decode('ascii'))
+                ).encode('utf-8')
+
+
 class ReviewsDiffViewerView(ReviewRequestViewMixin,
                             UserProfileRequiredViewMixin,
                             DiffViewerView):
@@ -1544,8 +1748,16 @@ class ReviewsDiffViewerView(ReviewRequestViewMixin,
                        review_request_details.summary)
             ),
         })
+        extra_context = {}
+
+        # Views that have already tracked the user's visit (such as the
+        # print view) don't need it to be looked up again.
+        if getattr(self, 'visited', None) is not None:
+            extra_context['review_request_visit'] = self.visited
+
         context.update(make_review_request_context(self.request,
                                                    self.review_request,
+                                                   extra_context,
                                                    is_diff_view=True))
 
         diffset_pair = context['diffset_pair']
@@ -1930,24 +2142,26 @@ class ReviewsCodeBrowserView(ReviewRequestViewMixin,
         return context
 
     def enrich_context(self, context, kwargs_dict, latest_diffset):
-        modified_files = []
-
         # what if latest_diffset == None?
         if latest_diffset:
-            for filediff in latest_diffset.cumulative_files:
-                modified_files.append(filediff.source_file)
+            modified_files = generate_tree_structure(
+                filediff.source_file
+                for filediff in latest_diffset.cumulative_files
+            )
+        else:
+            modified_files = generate_tree_structure([])
 
         if not kwargs_dict['is_blob']:
             repo_data = get_file_tree(self.review_request,
                                       kwargs_dict['code_path'],
                                       kwargs_dict['revision'],
-                                      set(modified_files), latest_diffset.base_commit_id,
+                                      modified_files, latest_diffset.base_commit_id,
                                       self.request.path)
         else:
             path_lst = [self.review_request.repository.name]
             path_lst += kwargs_dict['code_path'].split("/")
             is_touched = False
-            if kwargs_dict['code_path'] in set(modified_files):
+            if kwargs_dict['code_path'] in modified_files:
                 is_touched = True
             repo_data = {
                 "is_blob": kwargs_dict['is_blob'],
@@ -1980,6 +2194,9 @@ class DownloadRawDiffView(ReviewRequestViewMixin, View):
 
     This will generate a single raw diff file spanning all the FileDiffs
     in a diffset for the revision specified in the URL.
+
+    The diff is streamed to the client as it's generated, so that very large
+    diffs don't need to be held in memory.
     """
 
     def get(self, request, revision=None, *args, **kwargs):
@@ -2002,7 +2219,7 @@ class DownloadRawDiffView(ReviewRequestViewMixin, View):
                 Keyword arguments passed to the handler.
 
         Returns:
-            django.http.HttpResponse:
+            django.http.StreamingHttpResponse:
             The HTTP response to send to the client.
         """
         review_request = self.review_request
@@ -2011,9 +2228,9 @@ class DownloadRawDiffView(ReviewRequestViewMixin, View):
         diffset = self.get_diff(revision, draft)
 
         tool = review_request.repository.get_scmtool()
-        data = tool.get_parser(b'').raw_diff(diffset)
+        data = tool.get_parser(b'').iter_raw_diff(diffset)
 
-        resp = HttpResponse(data, content_type='text/x-patch')
+        resp = StreamingHttpResponse(data, content_type='text/x-patch')
 
         if diffset.name == 'diff':
             filename = 'rb%d.patch' % review_request.display_id
@@ -2206,7 +2423,8 @@ class UntouchedCommentFragmentsView(ReviewRequestViewMixin, ETagViewMixin,
         else:
             q &= Q(review__public=True)
 
-        self.untouched_comments = get_list_or_404(UntouchedComment, q)
+        self.untouched_comments = get_list_or_404(
+            UntouchedComment.objects.select_related('untouchedfile'), q)
 
         latest_timestamp = get_latest_timestamp(
             [untouched_comment.timestamp for untouched_comment in self.untouched_comments]
@@ -2224,7 +2442,6 @@ class UntouchedCommentFragmentsView(ReviewRequestViewMixin, ETagViewMixin,
             'user': request.user,
         })
 
-        payload = io.BytesIO()
         comment_entries = build_untouched_comment_fragments(
             untouched_comments=self.untouched_comments,
             context=context,
@@ -2232,14 +2449,10 @@ class UntouchedCommentFragmentsView(ReviewRequestViewMixin, ETagViewMixin,
             comment_template_name=self.comment_template_name,
             error_template_name=self.error_template_name)[1]
 
-        for entry in comment_entries:
-            html = entry['html'].strip().encode('utf-8')
-
-            # payload.write(struct.pack(b'<LL', entry['comment'].pk, len(html)))
-            payload.write(html)
-
-        result = payload.getvalue()
-        payload.close()
+        result = b''.join(
+            entry['html'].strip().encode('utf-8')
+            for entry in comment_entries
+        )
 
         return HttpResponse(result, content_type='text/plain; charset=utf-8')
 
@@ -3158,6 +3371,74 @@ class DownloadDiffFileView(ReviewRequestViewMixin, View):
         return HttpResponse(data, content_type='text/plain; charset=utf-8')
 
 
+class PrintDiffFile(object):
+    """A file shown in the print view.
+
+    The diff content is loaded from the file's stored
+    :py:class:`~reviewboard.diffviewer.models.filediff.FileDiff` and decoded
+    only when first accessed, so that files the user didn't select to print
+    are never loaded.
+
+    Version Added:
+        4.0.6
+    """
+
+    def __init__(self, filediff, filename, encoding_list, comments):
+        """Initialize the file.
+
+        Args:
+            filediff (reviewboard.diffviewer.models.filediff.FileDiff):
+                The FileDiff for the file.
+
+            filename (unicode):
+                The displayed filename.
+
+            encoding_list (list of unicode):
+                The repository's list of encodings to try when decoding the
+                diff.
+
+            comments (list of reviewboard.reviews.models.diff_comment.
+                      Comment):
+                The comments to show along with the diff.
+        """
+        self.filediff = filediff
+        self.filename = filename
+        self.encoding_list = encoding_list
+        self.comments = comments
+
+    @cached_property
+    def raw_diff(self):
+        """The text of the diff's hunks, followed by any comments.
+
+        Type:
+            unicode
+        """
+        diff = self.filediff.diff
+
+        # Skip past the file headers to the first hunk.
+        if diff.startswith(b'@@'):
+            start = 0
+        else:
+            start = diff.find(b'\n@@')
+
+            if start != -1:
+                start += 1
+
+        if start == -1:
+            text = ''
+        else:
+            text = convert_to_unicode(
+                diff[start:],
+                get_filediff_encodings(self.filediff,
+                                       encoding_list=self.encoding_list))[1]
+
+        return text + ''.join(
+            '\n Comment from {0}: \n ({1}) {2} \n'.format(
+                comment.review_obj.user, comment.timestamp, comment.text)
+            for comment in self.comments
+        )
+
+
 # TEAM 12- PaperTrails
 class ReviewRequestPrintView(ReviewRequestDetailView,
                              ReviewsDiffViewerView,
@@ -3166,6 +3447,15 @@ class ReviewRequestPrintView(ReviewRequestDetailView,
 
     template_name = 'reviews/print.html'
 
+    #: Whether to record the user's visit to the review request.
+    #:
+    #: This is turned off when pre-rendering print documents, so that
+    #: exporting them doesn't show up as a visit.
+    #:
+    #: Version Added:
+    #:     4.0.6
+    track_visits = True
+
     def __init__(self, **kwargs):
         """Initialize a view for the request.
 
@@ -3214,64 +3504,249 @@ class ReviewRequestPrintView(ReviewRequestDetailView,
         '''
         return [key for key, value in request.GET.items() if value == 'yes' or value == 'on']
 
-    
-    def get_diff_dict(self, data, context):
-        '''Creates dictionary of file diffs
+    def _load_print_diffs(self, print_files):
+        """Load the diffs for the files that will be printed.
+
+        The diff data for all the files is fetched in batches, rather than
+        with a query per file when the template renders each diff.
+
+        Version Added:
+            4.0.6
 
         Args:
-            data (bytes):
-                The diff data as bytes.
+            print_files (list of PrintDiffFile):
+                The files whose diffs will be shown.
+        """
+        print_files_by_id = {
+            print_file.filediff.pk: print_file
+            for print_file in print_files
+        }
+        filediffs = [
+            print_file.filediff
+            for print_file in print_files
+        ]
 
-        Returns:
-            dictionary:
-                Key is the file name of the file that was changed
-                Value is the diff file as a string 
-        '''
-        slider_end = context["slider_end"]
-        comments = context['comments_code']
-        split_data = data.split(b'diff --git')
-        parsed_diffs = {}
+        # The diff data for each batch is released once iterated over, so
+        # the diffs need to be read during iteration.
+        for filediff in FileDiff.objects.iter_with_diff_data(filediffs):
+            print_files_by_id[filediff.pk].raw_diff
 
-        for data in split_data:
-            str_data = data.decode("utf-8") 
+    def get_diff_dict(self, context):
+        """Return the files in the diff to show in the print view.
 
-            # Get filename of diff
-            head = str_data.partition("\n")[0]
-            file_name = head.split(" ")[-1][2:]
+        This is built from the stored FileDiffs in the diffset being viewed.
+        Diff content is only loaded when the template renders a file.
 
-            # Get diff
-            str_data = str_data.split("@@")[-1]
-            str_data += "\n"
+        Args:
+            context (dict):
+                The template context, containing the diff comments and
+                file comment flag.
 
-            if file_name != '':
-                parsed_diffs[file_name] = { "filename": file_name, "raw_diff": str_data}
-        
-        for comment in comments:
-            filename = comment.filediff.dest_file_display
-            file = parsed_diffs.get(filename)
-            flag = context["with_file_flag"]
-            same_revision = comment.filediff.diffset.revision == int(slider_end)
+        Returns:
+            dict:
+            A dictionary mapping displayed filenames to
+            :py:class:`PrintDiffFile` instances.
+        """
+        comments_by_filediff_id = defaultdict(list)
+
+        if context['with_file_flag']:
+            for comment in context['comments_code']:
+                comments_by_filediff_id[comment.filediff_id].append(comment)
 
-            if (file is not None) and flag and same_revision:
-                parsed_diffs[filename]["raw_diff"] += "\n Comment from {0}: \n ({1}) {2} \n".format(comment.review_obj._user_cache, comment.timestamp, comment.text)
+        encoding_list = self.review_request.repository.get_encoding_list()
+        parsed_diffs = {}
+
+        for filediff in self.diffset.cumulative_files:
+            filename = filediff.dest_file_display
+            parsed_diffs[filename] = PrintDiffFile(
+                filediff=filediff,
+                filename=filename,
+                encoding_list=encoding_list,
+                comments=comments_by_filediff_id.get(filediff.pk, []))
 
         return parsed_diffs
 
     def get(self, request, *args, **kwargs):
-        '''Handle HTTP GET requests for this view.
+        """Handle HTTP GET requests for this view.
+
+        The print document is cached for all users who can see the same
+        content, so it only has to be built once for each revision range,
+        set of filter flags, and update to the review request. Users who
+        have drafts on the review request always get a freshly-built
+        document.
 
         Args:
             request (django.http.HttpRequest):
                 The HTTP request from the client.
 
+            *args (tuple):
+                Positional arguments passed to the handler.
+
             **kwargs (dict):
                 Keyword arguments passed to the handler.
-                
+
         Returns:
             django.http.HttpResponse:
-            The HTTP response to send to the client. This will contain the
-            custom update payload content.
-        '''
+            The HTTP response containing the print view.
+        """
+        if self.can_cache_print_document():
+            print_document = cache_memoize(
+                self.get_print_cache_key(request),
+                lambda: self.render_print_document(request, **kwargs),
+                large_data=True)
+        else:
+            print_document = self.render_print_document(request, **kwargs)
+
+        return render(request, self.template_name,
+                      self.get_page_context_data(print_document))
+
+    def track_review_request_visit(self):
+        """Track a visit to the review request.
+
+        If :py:attr:`track_visits` is turned off, any existing visit is
+        returned without being updated, and no new visit is saved.
+
+        Returns:
+            tuple:
+            A 2-tuple containing the
+            :py:class:`~reviewboard.accounts.models.ReviewRequestVisit`, if
+            the user is authenticated, and the timestamp when the user had
+            last visited the site, if any.
+        """
+        user = self.request.user
+
+        if self.track_visits or not user.is_authenticated:
+            return super(ReviewRequestPrintView,
+                         self).track_review_request_visit()
+
+        review_request = self.review_request
+
+        try:
+            visited = ReviewRequestVisit.objects.get(
+                user=user,
+                review_request=review_request)
+            last_visited = visited.timestamp.replace(tzinfo=utc)
+        except ReviewRequestVisit.DoesNotExist:
+            visited = ReviewRequestVisit(user=user,
+                                         review_request=review_request)
+            last_visited = None
+
+        return visited, last_visited
+
+    def get_page_context_data(self, print_document):
+        """Return data for the page surrounding the print document.
+
+        This only contains the state needed by the page's header and
+        scripts, all of which is cheap to compute for each request.
+
+        Args:
+            print_document (unicode):
+                The rendered print document.
+
+        Returns:
+            dict:
+            Context data for the template.
+        """
+        review_request = self.review_request
+        request = self.request
+        draft = self.data.draft
+        close_info = review_request.get_close_info()
+
+        context = make_review_request_context(request, review_request, {
+            'blocks': self.blocks,
+            'review_request_visit': self.visited,
+        })
+        context.update({
+            'draft': draft,
+            'review_request_details': draft or review_request,
+            'last_activity_time': self.last_activity_time,
+            'last_visited': self.last_visited,
+            'review': review_request.get_pending_review(request.user),
+            'request': request,
+            'close_description': close_info['close_description'],
+            'close_description_rich_text': close_info['is_rich_text'],
+            'close_timestamp': close_info['timestamp'],
+            'print_document': mark_safe(print_document),
+            'social_page_title': (
+                'Review Request #%s: %s'
+                % (review_request.display_id, review_request.summary)
+            ),
+        })
+
+        return context
+
+    def can_cache_print_document(self):
+        """Return whether the print document can be cached for this user.
+
+        The document includes any draft of the review request and any
+        unpublished reviews owned by the user, which must never be shown to
+        anyone else.
+
+        Returns:
+            bool:
+            Whether the document can be cached and shared with other users.
+        """
+        data = self.data
+
+        return (data.draft is None and
+                all(review.public for review in data.reviews))
+
+    def get_print_cache_key(self, request):
+        """Return the cache key for the print document.
+
+        The key covers the revision range and filter flags requested, along
+        with the timestamps that change whenever a review, reply, draft, or
+        status update is published. Publishing any of these will result in
+        a new key, and old documents will expire from the cache on their
+        own.
+
+        Args:
+            request (django.http.HttpRequest):
+                The HTTP request from the client.
+
+        Returns:
+            unicode:
+            The cache key.
+        """
+        review_request = self.review_request
+        data = self.data
+
+        entry_etags = ':'.join(
+            entry_cls.build_etag_data(data)
+            for entry_cls in entry_registry
+        )
+
+        key_data = ':'.join(six.text_type(value) for value in (
+            review_request.last_updated,
+            review_request.last_review_activity_timestamp,
+            self.last_activity_time,
+            data.latest_changedesc_timestamp,
+            data.latest_review_timestamp,
+            entry_etags,
+            sorted(request.GET.lists()),
+            get_language(),
+            timezone.get_current_timezone_name(),
+            settings.AJAX_SERIAL,
+        ))
+
+        return 'review-request-print-%s-%s' % (
+            review_request.pk,
+            hashlib.sha256(key_data.encode('utf-8')).hexdigest())
+
+    def render_print_document(self, request, **kwargs):
+        """Render the print document for the review request.
+
+        Args:
+            request (django.http.HttpRequest):
+                The HTTP request from the client.
+
+            **kwargs (dict):
+                Keyword arguments passed to the handler.
+
+        Returns:
+            django.utils.safestring.SafeText:
+            The rendered print document.
+        """
         # Get values of revision slider via text box
         if (len([(key, value) for key, value in request.GET.items()])):
             self.issues_flag_default = False
@@ -3322,10 +3797,8 @@ class ReviewRequestPrintView(ReviewRequestDetailView,
         })
         
         context['diffset_pair'] = (self.diffset, self.interdiffset)
-        tool = self.review_request.repository.get_scmtool()
-        data = tool.get_parser(b'').raw_diff(self.diffset)
-        parsed_diffs = self.get_diff_dict(data, context)
-        
+        parsed_diffs = self.get_diff_dict(context)
+
         context.update({"data": parsed_diffs})
 
         # Issues flags
@@ -3342,13 +3815,22 @@ class ReviewRequestPrintView(ReviewRequestDetailView,
         checked_files = self.checked_files(request)  
         num_files = len(checked_files)          
 
-        filepath_list = [parsed_diffs[file_name]["filename"] for file_name in parsed_diffs]
+        filepath_list = list(parsed_diffs)
         node = generate_tree_structure(filepath_list)
         file_form_html = generate_tree_html(node, self.issues_flag_default, set(checked_files))
 
         if self.issues_flag_default and num_files == 0:
             num_files = len(filepath_list)
 
+        self._load_print_diffs(
+            print_files=[
+                print_file
+                for print_file in six.itervalues(parsed_diffs)
+                if (self.issues_flag_default or
+                    (print_file.filename in file_dests and
+                     print_file.filename in checked_files))
+            ])
+
         context.update({
             'file_dests': file_dests,
             'checked_files' : checked_files,
@@ -3363,9 +3845,9 @@ class ReviewRequestPrintView(ReviewRequestDetailView,
             'file_form_html': file_form_html
         })
 
-        filename = os.path.join(settings.REVIEWBOARD_ROOT, 'templates/reviews/print.html')
-        response  = render(request, filename, context)
-        return response 
+        return render_to_string(template_name='reviews/print_document.html',
+                                context=context,
+                                request=request)
 
     def get_context_data(self, **kwargs):
         '''Populates the context dictionary with comments
@@ -617,6 +617,18 @@ class SCMTool(object):
     #: the repository. It's up to the SCMTool to make use of it.
     supports_ticket_auth = False
 
+    #: Whether multiple files can be fetched more efficiently in one batch.
+    #:
+    #: If ``True``, :py:meth:`get_files` will be used to fetch several files
+    #: at once when prefetching files for a diff. Otherwise, Review Board will
+    #: fetch the files concurrently using :py:meth:`get_file`.
+    #:
+    #: Subclasses that set this must override :py:meth:`get_files`.
+    #:
+    #: Version Added:
+    #:     4.0.6
+    supports_batch_get_files = False
+
     #: Whether filenames in diffs are stored using absolute paths.
     #:
     #: This is used when uploading and validating diffs to determine if the
@@ -830,6 +842,48 @@ class SCMTool(object):
         """
         raise NotImplementedError
 
+    def get_files(self, files, **kwargs):
+        """Return the contents of multiple files from a repository.
+
+        This is used when prefetching files, if
+        :py:attr:`supports_batch_get_files` is set. Subclasses can override
+        this to fetch all the files over a single connection or process.
+
+        By default, this fetches each file in turn using :py:meth:`get_file`.
+
+        Version Added:
+            4.0.6
+
+        Args:
+            files (list of tuple):
+                The files to fetch. Each is a 3-tuple of the path
+                (:py:class:`unicode`), revision (:py:class:`Revision` or
+                :py:class:`unicode`), and :py:class:`FileLookupContext`.
+
+            **kwargs (dict):
+                Additional keyword arguments. This is not currently used, but
+                is available for future expansion.
+
+        Returns:
+            list:
+            A list with an entry for each file, in the order requested. Each
+            entry is either the file's contents (:py:class:`bytes`) or the
+            exception raised when fetching it.
+        """
+        results = []
+
+        for path, revision, context in files:
+            try:
+                results.append(self.get_file(
+                    path,
+                    revision,
+                    base_commit_id=context.base_commit_id,
+                    context=context))
+            except Exception as e:
+                results.append(e)
+
+        return results
+
     def file_exists(self, path, revision=HEAD, base_commit_id=None,
                     context=None, **kwargs):
         """Return whether a particular file exists in a repository.
@@ -1,11 +1,15 @@
 from __future__ import unicode_literals
 
+import binascii
 import io
 import logging
 import os
 import platform
 import re
 import stat
+import subprocess
+import threading
+import time
 
 from django.utils import six
 from django.utils.encoding import force_bytes
@@ -27,6 +31,18 @@ from reviewboard.ssh import utils as sshutils
 
 GIT_DIFF_EMPTY_CHANGESET_SIZE = 3
 
+#: The maximum number of cat-file processes kept for each repository.
+#:
+#: Version Added:
+#:     4.0.6
+GIT_CAT_FILE_MAX_PROCESSES = 4
+
+#: The number of seconds a cat-file process can be idle before it's stopped.
+#:
+#: Version Added:
+#:     4.0.6
+GIT_CAT_FILE_IDLE_TIMEOUT = 300
+
 try:
     import urlparse
 
@@ -93,17 +109,90 @@ class GitTool(SCMTool):
                                 credentials['password'],
                                 repository.encoding, local_site_name)
 
+        # Only local repositories can look up several files in one batch.
+        self.supports_batch_get_files = (self.client.git_dir is not None and
+                                         not self.client.raw_file_url)
+
     def get_file(self, path, revision=HEAD, **kwargs):
         if revision == PRE_CREATION:
             return b''
 
         return self.client.get_file(path, revision)
 
+    def get_files(self, files, **kwargs):
+        """Return the contents of multiple files from the repository.
+
+        For local repositories, all the files are read through a shared
+        :command:`git cat-file --batch` process.
+
+        Version Added:
+            4.0.6
+
+        Args:
+            files (list of tuple):
+                The files to fetch. Each is a 3-tuple of the path, revision,
+                and :py:class:`~reviewboard.scmtools.core.FileLookupContext`.
+
+            **kwargs (dict):
+                Unused keyword arguments.
+
+        Returns:
+            list:
+            A list with an entry for each file, in the order requested. Each
+            entry is either the file's contents (:py:class:`bytes`) or the
+            exception raised when fetching it.
+        """
+        if not self.supports_batch_get_files:
+            return super(GitTool, self).get_files(files, **kwargs)
+
+        results = [b''] * len(files)
+        indexes = []
+        lookups = []
+
+        for i, (path, revision, context) in enumerate(files):
+            if revision != PRE_CREATION:
+                indexes.append(i)
+                lookups.append((path, revision))
+
+        for i, result in zip(indexes, self.client.get_files(lookups)):
+            results[i] = result
+
+        return results
+
     def get_repo_directory(self, path, revision, commit):
         # needs to validate if the path exists?
         content = self.client.get_directory(path, revision, commit)
         return content if content else b''
 
+    def get_repo_directory_entries(self, path, revision, commit):
+        """Return the parsed entries of a directory in the repository.
+
+        Version Added:
+            4.0.6
+
+        Args:
+            path (unicode):
+                The path of the directory to list.
+
+            revision (unicode):
+                The revision of the directory.
+
+            commit (unicode):
+                The commit containing the directory.
+
+        Returns:
+            list of GitTreeEntry:
+            The entries in the directory.
+
+        Raises:
+            reviewboard.scmtools.errors.FileNotFoundError:
+                The directory could not be found.
+
+            reviewboard.scmtools.errors.SCMError:
+                The directory could not be listed.
+        """
+        return self.client.get_directory_entries(path, revision, commit) or []
+
     def get_file_by_hashcode(self, path, hash):
         data = self.client.get_file_by_hash(path, hash, 'blob')
         return data if data else b''
@@ -619,6 +708,664 @@ class GitDiffParser(DiffParser):
                 setattr(file_info, attr, b'')
 
 
+class GitObject(object):
+    """Information on an object read from a Git repository.
+
+    Version Added:
+        4.0.6
+
+    Attributes:
+        sha1 (bytes):
+            The full object ID.
+
+        object_type (bytes):
+            The type of the object (``blob``, ``tree``, ``commit`` or
+            ``tag``).
+
+        size (int):
+            The size of the object's contents.
+
+        data (bytes):
+            The contents of the object, or ``None`` if only the object
+            information was requested.
+    """
+
+    def __init__(self, sha1, object_type, size, data=None):
+        """Initialize the object.
+
+        Args:
+            sha1 (bytes):
+                The full object ID.
+
+            object_type (bytes):
+                The type of the object.
+
+            size (int):
+                The size of the object's contents.
+
+            data (bytes, optional):
+                The contents of the object.
+        """
+        self.sha1 = sha1
+        self.object_type = object_type
+        self.size = size
+        self.data = data
+
+
+class GitTreeEntry(object):
+    """An entry in a Git tree.
+
+    Version Added:
+        4.0.6
+
+    Attributes:
+        mode (int):
+            The file mode of the entry.
+
+        object_type (unicode):
+            The type of the object (``blob``, ``tree`` or ``commit``).
+
+        sha1 (unicode):
+            The full object ID.
+
+        name (unicode):
+            The name of the entry within the tree.
+    """
+
+    __slots__ = ('mode', 'object_type', 'sha1', 'name')
+
+    def __init__(self, mode, object_type, sha1, name):
+        """Initialize the entry.
+
+        Args:
+            mode (int):
+                The file mode of the entry.
+
+            object_type (unicode):
+                The type of the object.
+
+            sha1 (unicode):
+                The full object ID.
+
+            name (unicode):
+                The name of the entry within the tree.
+        """
+        self.mode = mode
+        self.object_type = object_type
+        self.sha1 = sha1
+        self.name = name
+
+    def __eq__(self, other):
+        return (isinstance(other, GitTreeEntry) and
+                self.mode == other.mode and
+                self.object_type == other.object_type and
+                self.sha1 == other.sha1 and
+                self.name == other.name)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return ('<GitTreeEntry(mode=%06o, object_type=%s, sha1=%s, '
+                'name=%r)>'
+                % (self.mode, self.object_type, self.sha1, self.name))
+
+
+class GitCatFileProcess(object):
+    """A long-lived :command:`git cat-file --batch` process.
+
+    This keeps a single :command:`git cat-file` process running for a
+    repository, sending object names to it over a pipe and reading back
+    object information and contents. This avoids spawning a new process for
+    every object being looked up.
+
+    Requests are pipelined: up to :py:attr:`PIPELINE_SIZE` object names are
+    written before any responses are read. The batch size is kept small
+    enough that the object names always fit in the pipe's buffer, so Git
+    can never block on its output while we're blocked on its input.
+
+    If the process dies or stops responding as expected, it will be
+    restarted and the request retried once.
+
+    This class is not thread-safe. Callers should use a
+    :py:class:`GitCatFilePool` to share processes between threads.
+
+    Version Added:
+        4.0.6
+    """
+
+    #: The maximum number of object names written before reading responses.
+    PIPELINE_SIZE = 64
+
+    def __init__(self, git_dir, batch_check=False, local_site_name=None):
+        """Initialize the process.
+
+        The process won't be started until it's first needed.
+
+        Args:
+            git_dir (unicode):
+                The path to the Git repository.
+
+            batch_check (bool, optional):
+                Whether to only request object information, and not
+                contents (using :command:`git cat-file --batch-check`).
+
+            local_site_name (unicode, optional):
+                The name of the Local Site owning the repository, if any.
+        """
+        self.git_dir = git_dir
+        self.batch_check = batch_check
+        self.local_site_name = local_site_name
+        self.last_used = None
+
+        self._process = None
+        self._devnull = None
+
+    @property
+    def is_running(self):
+        """Whether the process is currently running.
+
+        Type:
+            bool
+        """
+        return self._process is not None and self._process.poll() is None
+
+    def start(self):
+        """Start the process.
+
+        Any existing process will be stopped first.
+
+        Raises:
+            OSError:
+                The process could not be started.
+        """
+        self.close()
+
+        if self.batch_check:
+            batch_arg = '--batch-check'
+        else:
+            batch_arg = '--batch'
+
+        # Errors aren't reported on stderr for individual objects, but we
+        # don't want a chatty process to ever fill up a pipe we're not
+        # reading from.
+        self._devnull = open(os.devnull, 'wb')
+        self._process = SCMTool.popen(
+            ['git', '--git-dir=%s' % self.git_dir, 'cat-file', batch_arg],
+            local_site_name=self.local_site_name,
+            stdin=subprocess.PIPE,
+            stderr=self._devnull)
+
+    def close(self):
+        """Stop the process, if it's running."""
+        process = self._process
+
+        if process is not None:
+            self._process = None
+
+            for f in (process.stdin, process.stdout):
+                try:
+                    f.close()
+                except (IOError, OSError):
+                    pass
+
+            try:
+                # Closing stdin makes git exit on its own. Only kill it if
+                # it's stuck.
+                for i in range(10):
+                    if process.poll() is not None:
+                        break
+
+                    time.sleep(0.01)
+                else:
+                    process.kill()
+                    process.wait()
+            except OSError:
+                pass
+
+        if self._devnull is not None:
+            self._devnull.close()
+            self._devnull = None
+
+    def get_objects(self, object_names):
+        """Return information on a list of objects.
+
+        Args:
+            object_names (list of unicode):
+                The names of the objects to look up. These can be anything
+                :command:`git cat-file` understands, such as object IDs or
+                ``<commit>:<path>`` expressions. Names cannot contain
+                newlines.
+
+        Returns:
+            list of GitObject:
+            The objects, in the order requested. Objects that could not be
+            found (or had ambiguous names) will be ``None``.
+
+        Raises:
+            reviewboard.scmtools.errors.SCMError:
+                The process could not be started, or failed twice in a row.
+        """
+        if not object_names:
+            return []
+
+        object_names = [
+            force_bytes(object_name)
+            for object_name in object_names
+        ]
+
+        for attempt in range(2):
+            try:
+                if not self.is_running:
+                    self.start()
+
+                objects = self._get_objects(object_names)
+                self.last_used = time.time()
+
+                return objects
+            except (IOError, OSError, ValueError) as e:
+                logging.warning('Git: cat-file process for %s failed '
+                                '(attempt %d): %s',
+                                self.git_dir, attempt + 1, e)
+                self.close()
+
+        raise SCMError(
+            _('Unable to read objects from local Git repository %s')
+            % self.git_dir)
+
+    def _get_objects(self, object_names):
+        """Send object names to the process and read the responses.
+
+        Args:
+            object_names (list of bytes):
+                The names of the objects to look up.
+
+        Returns:
+            list of GitObject:
+            The objects, in the order requested.
+
+        Raises:
+            IOError:
+                The process exited or could not be communicated with.
+
+            ValueError:
+                The process returned unexpected output.
+        """
+        stdin = self._process.stdin
+        stdout = self._process.stdout
+        batch_check = self.batch_check
+        pipeline_size = self.PIPELINE_SIZE
+        objects = []
+
+        for i in range(0, len(object_names), pipeline_size):
+            names = object_names[i:i + pipeline_size]
+
+            stdin.write(b''.join(
+                b'%s\n' % name
+                for name in names
+            ))
+            stdin.flush()
+
+            for name in names:
+                line = stdout.readline()
+
+                if not line.endswith(b'\n'):
+                    raise IOError('Unexpected end of output from git '
+                                  'cat-file')
+
+                line = line[:-1]
+
+                if line in (name + b' missing', name + b' ambiguous'):
+                    objects.append(None)
+                    continue
+
+                parts = line.split(b' ')
+
+                if len(parts) != 3 or not parts[2].isdigit():
+                    raise ValueError('Unexpected output from git cat-file: '
+                                     '%r' % line)
+
+                sha1, object_type, size = parts
+                size = int(size)
+
+                if batch_check:
+                    data = None
+                else:
+                    data = stdout.read(size)
+
+                    if len(data) != size or stdout.read(1) != b'\n':
+                        raise IOError('Unexpected end of output from git '
+                                      'cat-file')
+
+                objects.append(GitObject(sha1=sha1,
+                                         object_type=object_type,
+                                         size=size,
+                                         data=data))
+
+        return objects
+
+
+class GitCatFilePool(object):
+    """A pool of :command:`git cat-file` processes for a repository.
+
+    This hands out :py:class:`GitCatFileProcess` instances to threads,
+    starting up to :py:data:`GIT_CAT_FILE_MAX_PROCESSES` processes when
+    there are concurrent requests. Processes that haven't been used for
+    :py:data:`GIT_CAT_FILE_IDLE_TIMEOUT` seconds are stopped by a
+    background thread.
+
+    Pools should be retrieved through :py:meth:`get_for_repository`, so that
+    they're shared for all users of a repository.
+
+    Version Added:
+        4.0.6
+    """
+
+    _pools = {}
+    _pools_lock = threading.Lock()
+    _reaper_thread = None
+
+    @classmethod
+    def get_for_repository(cls, git_dir, batch_check=False,
+                           local_site_name=None):
+        """Return the shared pool for a repository.
+
+        Args:
+            git_dir (unicode):
+                The path to the Git repository.
+
+            batch_check (bool, optional):
+                Whether the pool's processes should only return object
+                information, and not contents.
+
+            local_site_name (unicode, optional):
+                The name of the Local Site owning the repository, if any.
+
+        Returns:
+            GitCatFilePool:
+            The pool for the repository.
+        """
+        key = (git_dir, batch_check, local_site_name)
+
+        with cls._pools_lock:
+            try:
+                pool = cls._pools[key]
+            except KeyError:
+                pool = cls(git_dir=git_dir,
+                           batch_check=batch_check,
+                           local_site_name=local_site_name)
+                cls._pools[key] = pool
+
+            if cls._reaper_thread is None:
+                thread = threading.Thread(target=cls._reap_idle_processes,
+                                          name='git-cat-file-reaper')
+                thread.daemon = True
+                thread.start()
+
+                cls._reaper_thread = thread
+
+        return pool
+
+    @classmethod
+    def close_all(cls):
+        """Stop all processes in all pools.
+
+        Processes in use will be stopped when they're released.
+        """
+        with cls._pools_lock:
+            pools = list(six.itervalues(cls._pools))
+            cls._pools.clear()
+
+        for pool in pools:
+            pool.close()
+
+    @classmethod
+    def _reap_idle_processes(cls):
+        """Periodically stop idle processes in all pools.
+
+        This runs in a daemon thread, exiting once there are no more
+        processes left running.
+        """
+        while True:
+            time.sleep(max(GIT_CAT_FILE_IDLE_TIMEOUT / 4.0, 1))
+
+            with cls._pools_lock:
+                pools = list(six.itervalues(cls._pools))
+
+            running = False
+
+            for pool in pools:
+                running = pool.close_idle() or running
+
+            with cls._pools_lock:
+                if not running and not any(
+                        pool.has_processes
+                        for pool in six.itervalues(cls._pools)):
+                    cls._reaper_thread = None
+                    return
+
+    def __init__(self, git_dir, batch_check=False, local_site_name=None,
+                 max_processes=None):
+        """Initialize the pool.
+
+        Args:
+            git_dir (unicode):
+                The path to the Git repository.
+
+            batch_check (bool, optional):
+                Whether the pool's processes should only return object
+                information, and not contents.
+
+            local_site_name (unicode, optional):
+                The name of the Local Site owning the repository, if any.
+
+            max_processes (int, optional):
+                The maximum number of processes to run at once. This
+                defaults to :py:data:`GIT_CAT_FILE_MAX_PROCESSES`.
+        """
+        self.git_dir = git_dir
+        self.batch_check = batch_check
+        self.local_site_name = local_site_name
+        self.max_processes = max_processes or GIT_CAT_FILE_MAX_PROCESSES
+
+        self._idle = []
+        self._num_processes = 0
+        self._closed = False
+        self._cond = threading.Condition(threading.Lock())
+
+    @property
+    def has_processes(self):
+        """Whether the pool has any processes.
+
+        Type:
+            bool
+        """
+        return self._num_processes > 0
+
+    def get_objects(self, object_names):
+        """Return information on a list of objects.
+
+        Args:
+            object_names (list of unicode):
+                The names of the objects to look up.
+
+        Returns:
+            list of GitObject:
+            The objects, in the order requested. Objects that could not be
+            found will be ``None``.
+
+        Raises:
+            reviewboard.scmtools.errors.SCMError:
+                The objects could not be read.
+        """
+        process = self._acquire()
+
+        try:
+            return process.get_objects(object_names)
+        finally:
+            self._release(process)
+
+    def get_object(self, object_name):
+        """Return information on an object.
+
+        Args:
+            object_name (unicode):
+                The name of the object to look up.
+
+        Returns:
+            GitObject:
+            The object, or ``None`` if it could not be found.
+
+        Raises:
+            reviewboard.scmtools.errors.SCMError:
+                The object could not be read.
+        """
+        return self.get_objects([object_name])[0]
+
+    def close_idle(self, timeout=None):
+        """Stop any processes that have been idle for too long.
+
+        Args:
+            timeout (float, optional):
+                The number of seconds a process must have been idle. This
+                defaults to :py:data:`GIT_CAT_FILE_IDLE_TIMEOUT`.
+
+        Returns:
+            bool:
+            Whether there are any processes still running.
+        """
+        if timeout is None:
+            timeout = GIT_CAT_FILE_IDLE_TIMEOUT
+
+        cutoff = time.time() - timeout
+
+        with self._cond:
+            expired = [
+                process
+                for process in self._idle
+                if process.last_used is None or process.last_used <= cutoff
+            ]
+
+            for process in expired:
+                self._idle.remove(process)
+
+            self._num_processes -= len(expired)
+            self._cond.notify_all()
+
+            running = self._num_processes > 0
+
+        for process in expired:
+            process.close()
+
+        return running
+
+    def close(self):
+        """Stop all processes in the pool.
+
+        Idle processes are stopped immediately. Processes in use will be
+        stopped when they're released, as will any processes started by
+        the pool after this.
+        """
+        with self._cond:
+            self._closed = True
+
+        self.close_idle(timeout=-1)
+
+    def _acquire(self):
+        """Acquire a process for the current thread.
+
+        This will return an idle process, start a new one if the pool has
+        room, or wait until another thread releases one.
+
+        Returns:
+            GitCatFileProcess:
+            The process to use.
+        """
+        with self._cond:
+            while not self._idle:
+                if self._num_processes < self.max_processes:
+                    self._num_processes += 1
+
+                    return GitCatFileProcess(
+                        git_dir=self.git_dir,
+                        batch_check=self.batch_check,
+                        local_site_name=self.local_site_name)
+
+                self._cond.wait()
+
+            # Reuse the most recently used process, leaving the rest to
+            # idle out.
+            return self._idle.pop()
+
+    def _release(self, process):
+        """Return a process to the pool.
+
+        If the pool has been closed, the process will be stopped instead.
+
+        Args:
+            process (GitCatFileProcess):
+                The process to return.
+        """
+        with self._cond:
+            closed = self._closed
+
+            if closed:
+                self._num_processes -= 1
+            else:
+                self._idle.append(process)
+
+            self._cond.notify()
+
+        if closed:
+            process.close()
+
+
+def _quote_git_path(path):
+    """Quote a path the way Git does in command output.
+
+    This matches the quoting :command:`git ls-tree` applies to filenames
+    when ``core.quotePath`` is enabled (the default).
+
+    Args:
+        path (bytes):
+            The path to quote.
+
+    Returns:
+        bytes:
+        The path, quoted if needed.
+    """
+    result = []
+    needs_quoting = False
+
+    for c in six.iterbytes(path):
+        if c in _GIT_PATH_ESCAPES:
+            result.append(_GIT_PATH_ESCAPES[c])
+            needs_quoting = True
+        elif c < 0x20 or c >= 0x7f:
+            result.append(b'\\%03o' % c)
+            needs_quoting = True
+        else:
+            result.append(six.int2byte(c))
+
+    if needs_quoting:
+        return b'"%s"' % b''.join(result)
+
+    return path
+
+
+_GIT_PATH_ESCAPES = {
+    0x07: b'\\a',
+    0x08: b'\\b',
+    0x09: b'\\t',
+    0x0A: b'\\n',
+    0x0B: b'\\v',
+    0x0C: b'\\f',
+    0x0D: b'\\r',
+    0x22: b'\\"',
+    0x5C: b'\\\\',
+}
+
+
 class GitClient(SCMClient):
     FULL_SHA1_LENGTH = 40
 
@@ -714,6 +1461,76 @@ class GitClient(SCMClient):
             # revision = None -> pointing to HEAD
             return self._get_directory(path, revision, commit)
 
+    def get_directory_entries(self, path, revision, commit=HEAD):
+        """Return the parsed entries of a directory in the repository.
+
+        This is like :py:meth:`get_directory`, but returns
+        :py:class:`GitTreeEntry` instances instead of the textual
+        :command:`git ls-tree` output. Filenames are never quoted, and
+        may safely contain newlines or tabs.
+
+        Version Added:
+            4.0.6
+
+        Args:
+            path (unicode):
+                The path of the directory to list.
+
+            revision (unicode):
+                The revision of the directory.
+
+            commit (unicode, optional):
+                The commit containing the directory.
+
+        Returns:
+            list of GitTreeEntry:
+            The entries in the directory, in the order Git stores them.
+
+        Raises:
+            reviewboard.scmtools.errors.FileNotFoundError:
+                The directory could not be found.
+
+            reviewboard.scmtools.errors.SCMError:
+                The directory could not be listed.
+        """
+        if self.raw_file_url:
+            self.validate_sha1_format(path, revision)
+
+            return None
+
+        object_name = six.text_type(commit) + ':' + path
+
+        if self._can_use_cat_file_batch(object_name):
+            return list(self._iter_batch_tree_entries(path, object_name))
+
+        p = self._run_git(['--git-dir=%s' % self.git_dir, 'ls-tree', '-z',
+                           '--full-tree', object_name])
+
+        contents = force_bytes(p.stdout.read())
+        errmsg = p.stderr.read()
+        failure = p.wait()
+
+        if failure:
+            if errmsg.startswith(b'fatal: Not a valid object name'):
+                raise FileNotFoundError(path, revision='HEAD')
+            else:
+                raise SCMError(errmsg.decode('utf-8'))
+
+        # Each entry is "<mode> <type> <object ID>\t<name>\0".
+        entries = []
+
+        for item in contents.split(b'\0'):
+            if item:
+                info, name = item.split(b'\t', 1)
+                mode, object_type, sha1 = info.split(b' ')
+                entries.append(GitTreeEntry(
+                    mode=int(mode, 8),
+                    object_type=object_type.decode('ascii'),
+                    sha1=sha1.decode('ascii'),
+                    name=name.decode('utf-8', 'replace')))
+
+        return entries
+
     def get_file(self, path, revision):
         if self.raw_file_url:
             self.validate_sha1_format(path, revision)
@@ -723,10 +1540,70 @@ class GitClient(SCMClient):
         else:
             return self._cat_file(path, revision, "blob")
 
+    def get_files(self, files):
+        """Return the contents of multiple files from a local repository.
+
+        Files are looked up through a shared :command:`git cat-file --batch`
+        process, with all lookups pipelined together.
+
+        Version Added:
+            4.0.6
+
+        Args:
+            files (list of tuple):
+                The files to fetch. Each is a 2-tuple of the path and
+                revision.
+
+        Returns:
+            list:
+            A list with an entry for each file, in the order requested. Each
+            entry is either the file's contents (:py:class:`bytes`) or the
+            exception raised when fetching it.
+        """
+        results = [None] * len(files)
+        batch_indexes = []
+        batch_names = []
+
+        for i, (path, revision) in enumerate(files):
+            try:
+                object_name = self._resolve_head(revision, path)
+
+                if self._can_use_cat_file_batch(object_name):
+                    batch_indexes.append(i)
+                    batch_names.append(object_name)
+                else:
+                    results[i] = self._cat_file(path, revision, 'blob')
+            except Exception as e:
+                results[i] = e
+
+        if batch_names:
+            try:
+                git_objects = self._get_cat_file_pool().get_objects(
+                    batch_names)
+            except SCMError as e:
+                git_objects = [e] * len(batch_names)
+
+            for i, object_name, git_object in zip(batch_indexes, batch_names,
+                                                  git_objects):
+                if isinstance(git_object, Exception):
+                    results[i] = git_object
+                else:
+                    try:
+                        results[i] = self._get_blob_data(files[i][0],
+                                                         object_name,
+                                                         git_object)
+                    except SCMError as e:
+                        results[i] = e
+
+        return results
+
     def get_file_by_hash(self, path, hash, option):
         if not hash:
             hash = HEAD
 
+        if option == 'blob' and self._can_use_cat_file_batch(hash):
+            return self._batch_cat_file(path, six.text_type(hash), option)
+
         p = self._run_git(['--git-dir=%s' % self.git_dir, 'cat-file',
                            option, hash])
         contents = force_bytes(p.stdout.read())
@@ -786,6 +1663,9 @@ class GitClient(SCMClient):
         """
         commit = self._resolve_head(revision, path)
 
+        if option in ('blob', '-t') and self._can_use_cat_file_batch(commit):
+            return self._batch_cat_file(path, commit, option)
+
         p = self._run_git(['--git-dir=%s' % self.git_dir, 'cat-file',
                            option, commit])
         contents = force_bytes(p.stdout.read())
@@ -801,6 +1681,10 @@ class GitClient(SCMClient):
         return contents
 
     def _get_directory(self, path, revision=None, commit=HEAD):
+        object_name = six.text_type(commit) + ':' + path
+
+        if self._can_use_cat_file_batch(object_name):
+            return self._batch_get_directory(path, object_name)
 
         repo_directory = self._run_git(['--git-dir=%s' % self.git_dir, 'ls-tree',
                                         "--full-tree", str(commit) + ":" + path])
@@ -819,6 +1703,250 @@ class GitClient(SCMClient):
 
         return contents
 
+    def _can_use_cat_file_batch(self, object_name):
+        """Return whether an object can be looked up using cat-file --batch.
+
+        Version Added:
+            4.0.6
+
+        Args:
+            object_name (unicode):
+                The name of the object to look up.
+
+        Returns:
+            bool:
+            ``True`` if the object can be looked up through a
+            :py:class:`GitCatFilePool`. ``False`` if a new
+            :command:`git cat-file` process must be used.
+        """
+        # The batch protocol is line-based, so names containing newlines
+        # (or ending in a carriage return, which Git strips) can't be sent.
+        object_name = six.text_type(object_name)
+
+        return (self.git_dir is not None and
+                '\n' not in object_name and
+                not object_name.endswith('\r'))
+
+    def _get_cat_file_pool(self, batch_check=False):
+        """Return the shared cat-file pool for this repository.
+
+        Version Added:
+            4.0.6
+
+        Args:
+            batch_check (bool, optional):
+                Whether to return the pool used for looking up object
+                information without contents.
+
+        Returns:
+            GitCatFilePool:
+            The pool for this repository.
+        """
+        return GitCatFilePool.get_for_repository(
+            git_dir=self.git_dir,
+            batch_check=batch_check,
+            local_site_name=self.local_site_name)
+
+    def _batch_cat_file(self, path, object_name, option):
+        """Look up an object using a shared cat-file process.
+
+        This is equivalent to running :command:`git cat-file blob` or
+        :command:`git cat-file -t`, without spawning a new process.
+
+        Version Added:
+            4.0.6
+
+        Args:
+            path (unicode):
+                The path of the file being looked up.
+
+            object_name (unicode):
+                The name of the object to look up.
+
+            option (unicode):
+                Either ``blob`` to return the contents of a blob, or ``-t``
+                to return the type of the object.
+
+        Returns:
+            bytes:
+            The contents or type of the object.
+
+        Raises:
+            reviewboard.scmtools.errors.FileNotFoundError:
+                The object could not be found.
+
+            reviewboard.scmtools.errors.SCMError:
+                The object was not a blob, or could not be read.
+        """
+        git_object = self._get_cat_file_pool(batch_check=(option == '-t')) \
+            .get_object(object_name)
+
+        if option == '-t':
+            if git_object is None:
+                raise FileNotFoundError(path, revision=object_name)
+
+            return git_object.object_type + b'\n'
+
+        return self._get_blob_data(path, object_name, git_object)
+
+    def _get_blob_data(self, path, object_name, git_object):
+        """Return the contents of a blob read from a cat-file process.
+
+        Version Added:
+            4.0.6
+
+        Args:
+            path (unicode):
+                The path of the file being looked up.
+
+            object_name (unicode):
+                The name the object was looked up by.
+
+            git_object (GitObject):
+                The object that was read, or ``None`` if it wasn't found.
+
+        Returns:
+            bytes:
+            The contents of the blob.
+
+        Raises:
+            reviewboard.scmtools.errors.FileNotFoundError:
+                The object could not be found.
+
+            reviewboard.scmtools.errors.SCMError:
+                The object was not a blob.
+        """
+        if git_object is None:
+            raise FileNotFoundError(path, revision=object_name)
+
+        if git_object.object_type != b'blob':
+            raise SCMError('fatal: git cat-file %s: bad file' % object_name)
+
+        return git_object.data
+
+    def _batch_get_directory(self, path, object_name):
+        """List a tree using a shared cat-file process.
+
+        This reads the tree object directly and formats it the same way
+        :command:`git ls-tree --full-tree` would.
+
+        Version Added:
+            4.0.6
+
+        Args:
+            path (unicode):
+                The path of the directory being listed.
+
+            object_name (unicode):
+                The name of the tree to list.
+
+        Returns:
+            bytes:
+            The listing of the tree.
+
+        Raises:
+            reviewboard.scmtools.errors.FileNotFoundError:
+                The tree could not be found.
+
+            reviewboard.scmtools.errors.SCMError:
+                The object was not a tree, or could not be read.
+        """
+        return b''.join(
+            b'%06o %s %s\t%s\n'
+            % (mode, object_type, sha1, _quote_git_path(name))
+            for mode, object_type, sha1, name in
+            self._iter_batch_raw_tree_entries(path, object_name)
+        )
+
+    def _iter_batch_tree_entries(self, path, object_name):
+        """Iterate through the entries of a tree using a cat-file process.
+
+        Version Added:
+            4.0.6
+
+        Args:
+            path (unicode):
+                The path of the directory being listed.
+
+            object_name (unicode):
+                The name of the tree to list.
+
+        Yields:
+            GitTreeEntry:
+            Each entry in the tree.
+
+        Raises:
+            reviewboard.scmtools.errors.FileNotFoundError:
+                The tree could not be found.
+
+            reviewboard.scmtools.errors.SCMError:
+                The object was not a tree, or could not be read.
+        """
+        for mode, object_type, sha1, name in \
+                self._iter_batch_raw_tree_entries(path, object_name):
+            yield GitTreeEntry(mode=mode,
+                               object_type=object_type.decode('ascii'),
+                               sha1=sha1.decode('ascii'),
+                               name=name.decode('utf-8', 'replace'))
+
+    def _iter_batch_raw_tree_entries(self, path, object_name):
+        """Iterate through the raw entries of a tree using a cat-file process.
+
+        Version Added:
+            4.0.6
+
+        Args:
+            path (unicode):
+                The path of the directory being listed.
+
+            object_name (unicode):
+                The name of the tree to list.
+
+        Yields:
+            tuple:
+            A 4-tuple for each entry, containing the mode (:py:class:`int`),
+            and the object type, hex object ID and name (all
+            :py:class:`bytes`).
+
+        Raises:
+            reviewboard.scmtools.errors.FileNotFoundError:
+                The tree could not be found.
+
+            reviewboard.scmtools.errors.SCMError:
+                The object was not a tree, or could not be read.
+        """
+        git_object = self._get_cat_file_pool().get_object(object_name)
+
+        if git_object is None:
+            raise FileNotFoundError(path, revision='HEAD')
+
+        if git_object.object_type != b'tree':
+            raise SCMError('fatal: not a tree object')
+
+        # Tree entries are stored as "<octal mode> <name>\0<raw object ID>".
+        # The object ID length depends on the repository's hash algorithm,
+        # which we can tell from the tree's own ID.
+        data = git_object.data
+        sha_len = len(git_object.sha1) // 2
+        i = 0
+
+        while i < len(data):
+            space = data.index(b' ', i)
+            nul = data.index(b'\0', space)
+            mode = int(data[i:space], 8)
+            name = data[space + 1:nul]
+            sha1 = binascii.hexlify(data[nul + 1:nul + 1 + sha_len])
+            i = nul + 1 + sha_len
+
+            if stat.S_ISDIR(mode):
+                object_type = b'tree'
+            elif mode & 0o170000 == 0o160000:
+                object_type = b'commit'
+            else:
+                object_type = b'blob'
+
+            yield mode, object_type, sha1, name
+
     def _resolve_head(self, revision, path):
         if revision == HEAD:
             if path == "":
@@ -4,12 +4,13 @@ import logging
 import uuid
 import warnings
 from importlib import import_module
+from multiprocessing.pool import ThreadPool
 from time import time
 
 from django.contrib.auth.models import User
 from django.core.cache import cache
 from django.core.exceptions import ImproperlyConfigured, ValidationError
-from django.db import IntegrityError, models
+from django.db import IntegrityError, connections, models
 from django.db.models import Q
 from django.utils import six, timezone
 from django.utils.encoding import python_2_unicode_compatible
@@ -194,6 +195,21 @@ class Repository(models.Model):
     #: doesn't specify a list of encodings.
     FALLBACK_ENCODING = 'iso-8859-15'
 
+    #: The maximum number of files fetched at once when prefetching files.
+    #:
+    #: Version Added:
+    #:     4.0.6
+    PREFETCH_FILES_MAX_WORKERS = 4
+
+    #: The maximum number of file existence checks run at once.
+    #:
+    #: This applies across all diffs being uploaded to the repository by
+    #: this process at the same time.
+    #:
+    #: Version Added:
+    #:     4.0.6
+    CHECK_FILE_EXISTS_MAX_WORKERS = 8
+
     #: The error message used to indicate that a repository name conflicts.
     NAME_CONFLICT_ERROR = _('A repository with this name already exists')
 
@@ -728,6 +744,136 @@ class Repository(models.Model):
 
         return exists
 
+    def prefetch_files(self, files, request=None, max_workers=None):
+        """Fetch multiple files from the repository into the cache.
+
+        This is used to populate the cache for all the files needed for a
+        diff before they're needed, rather than fetching them one at a time.
+        Files already in the cache are skipped. Later calls to
+        :py:meth:`get_file` will then find the files in the cache.
+
+        If the repository's SCMTool supports batch fetching (see
+        :py:attr:`SCMTool.supports_batch_get_files
+        <reviewboard.scmtools.core.SCMTool.supports_batch_get_files>`), the
+        files will be fetched in one batch. Otherwise, they'll be fetched
+        concurrently, using up to ``max_workers`` threads.
+
+        Errors fetching individual files are logged, and otherwise ignored.
+        They'll be raised again when the file is fetched with
+        :py:meth:`get_file`.
+
+        Version Added:
+            4.0.6
+
+        Args:
+            files (list of tuple):
+                The files to fetch. Each is a 3-tuple of the path
+                (:py:class:`unicode`), revision (:py:class:`unicode`), and
+                an optional
+                :py:class:`~reviewboard.scmtools.core.FileLookupContext`.
+
+            request (django.http.HttpRequest, optional):
+                The current HTTP request from the client. This is used for
+                any files without a lookup context.
+
+            max_workers (int, optional):
+                The maximum number of files to fetch at once. This defaults
+                to :py:attr:`PREFETCH_FILES_MAX_WORKERS`.
+
+        Returns:
+            int:
+            The number of files that were fetched and stored in the cache.
+
+        Raises:
+            TypeError:
+                One or more of the provided arguments is an invalid type.
+                Details are contained in the error message.
+        """
+        pending = []
+        seen_keys = set()
+
+        for path, revision, context in files:
+            if not isinstance(path, six.text_type):
+                raise TypeError('"path" must be a Unicode string, not %s'
+                                % type(path))
+
+            if not isinstance(revision, six.text_type):
+                raise TypeError('"revision" must be a Unicode string, not %s'
+                                % type(revision))
+
+            if context is None:
+                context = FileLookupContext(request=request)
+
+            key = self._make_file_cache_key(
+                path=path,
+                revision=revision,
+                base_commit_id=context.base_commit_id)
+
+            if key not in seen_keys:
+                seen_keys.add(key)
+                pending.append((key, path, revision, context))
+
+        if not pending:
+            return 0
+
+        cached_keys = cache.get_many([
+            make_cache_key(key)
+            for key, path, revision, context in pending
+        ])
+        pending = [
+            item
+            for item in pending
+            if make_cache_key(item[0]) not in cached_keys
+        ]
+
+        if not pending:
+            return 0
+
+        tool = None
+
+        if self.hosting_service is None:
+            tool = self.get_scmtool()
+
+        if tool is not None and tool.supports_batch_get_files:
+            results = self._get_files_uncached(
+                tool=tool,
+                files=[
+                    (path, revision, context)
+                    for key, path, revision, context in pending
+                ])
+        elif len(pending) == 1:
+            results = [self._prefetch_file_uncached(pending[0])]
+        else:
+            thread_pool = ThreadPool(min(
+                max_workers or self.PREFETCH_FILES_MAX_WORKERS,
+                len(pending)))
+
+            try:
+                results = thread_pool.map(
+                    lambda item: self._prefetch_file_uncached(
+                        item, close_connections=True),
+                    pending)
+            finally:
+                thread_pool.close()
+                thread_pool.join()
+
+        num_fetched = 0
+
+        for (key, path, revision, context), result in zip(pending, results):
+            if isinstance(result, Exception):
+                logging.warning('Unable to prefetch file "%s" (revision %s) '
+                                'from repository %s: %s',
+                                path, revision, self.pk, result,
+                                request=context.request)
+            else:
+                cache_memoize(key,
+                              lambda data=result: [data],
+                              large_data=True,
+                              force_overwrite=True)
+                num_fetched += 1
+
+        return num_fetched
+
     def get_branches(self):
         """Return a list of all branches on the repository.
 
@@ -1188,6 +1334,107 @@ class Repository(models.Model):
 
         return data
 
+    def _prefetch_file_uncached(self, item, close_connections=False):
+        """Fetch a single file for prefetch_files, bypassing cache.
+
+        Version Added:
+            4.0.6
+
+        Args:
+            item (tuple):
+                A 4-tuple of the cache key, path, revision, and
+                :py:class:`~reviewboard.scmtools.core.FileLookupContext` for
+                the file.
+
+            close_connections (bool, optional):
+                Whether to close any database connections opened by the
+                current thread once the file is fetched. This must be set
+                when called from a worker thread, so connections aren't
+                leaked.
+
+        Returns:
+            object:
+            The contents of the file (:py:class:`bytes`), or the exception
+            raised when fetching it.
+        """
+        key, path, revision, context = item
+
+        try:
+            return self._get_file_uncached(path=path,
+                                           revision=revision,
+                                           context=context)
+        except Exception as e:
+            return e
+        finally:
+            if close_connections:
+                connections.close_all()
+
+    def _get_files_uncached(self, tool, files):
+        """Return multiple files from the SCMTool in a batch, bypassing cache.
+
+        This is called internally by :py:meth:`prefetch_files` for SCMTools
+        supporting batch fetching.
+
+        This will send the
+        :py:data:`~reviewboard.scmtools.signals.fetching_file` signal for each
+        file before beginning the fetch, and the
+        :py:data:`~reviewboard.scmtools.signals.fetched_file` signal for each
+        file successfully fetched.
+
+        Version Added:
+            4.0.6
+
+        Args:
+            tool (reviewboard.scmtools.core.SCMTool):
+                The SCMTool used to fetch the files.
+
+            files (list of tuple):
+                The files to fetch. Each is a 3-tuple of the path, revision,
+                and :py:class:`~reviewboard.scmtools.core.FileLookupContext`.
+
+        Returns:
+            list:
+            A list with an entry for each file, in the order requested. Each
+            entry is either the file's contents (:py:class:`bytes`) or the
+            exception raised when fetching it.
+        """
+        for path, revision, context in files:
+            fetching_file.send(sender=self,
+                               path=path,
+                               revision=revision,
+                               base_commit_id=context.base_commit_id,
+                               request=context.request,
+                               context=context)
+
+        log_timer = log_timed('Fetching %d files from %s'
+                              % (len(files), self))
+
+        results = tool.get_files(files)
+
+        log_timer.done()
+
+        assert len(results) == len(files), (
+            '%s.get_files() must return one result per file'
+            % type(tool).__name__)
+
+        for (path, revision, context), data in zip(files, results):
+            if isinstance(data, Exception):
+                continue
+
+            assert isinstance(data, bytes), (
+                '%s.get_files() must return byte strings, not %s'
+                % (type(tool).__name__, type(data)))
+
+            fetched_file.send(sender=self,
+                              path=path,
+                              revision=revision,
+                              base_commit_id=context.base_commit_id,
+                              request=context.request,
+                              context=context,
+                              data=data)
+
+        return results
+
     def _get_file_exists_uncached(self, path, revision, context):
         """Check for file existence, bypassing cache.
 
@@ -563,31 +563,92 @@ class PerforceClient(object):
         if revision == PRE_CREATION:
             return b''
 
+        with self.run_worker():
+            return self._print_file(path, revision)
+
+    def get_files(self, files):
+        """Return the contents of multiple files.
+
+        All the files are fetched over a single Perforce connection.
+
+        Version Added:
+            4.0.6
+
+        Args:
+            files (list of tuple):
+                The files to fetch. Each is a 2-tuple of the depot path
+                (without a revision) and the revision.
+
+        Returns:
+            list:
+            A list with an entry for each file, in the order requested. Each
+            entry is either the file's contents (:py:class:`bytes`) or the
+            exception raised when fetching it.
+
+        Raises:
+            reviewboard.scmtools.errors.SCMError:
+                There was an error connecting to the repository.
+        """
+        from P4 import P4Exception
+
+        results = []
+
+        with self.run_worker():
+            for path, revision in files:
+                if revision == PRE_CREATION:
+                    results.append(b'')
+                    continue
+
+                try:
+                    results.append(self._print_file(path, revision))
+                except P4Exception as e:
+                    results.append(SCMError(six.text_type(e)))
+                except Exception as e:
+                    results.append(e)
+
+        return results
+
+    def _print_file(self, path, revision):
+        """Return the contents of a file using an open connection.
+
+        This must be called within :py:meth:`run_worker`.
+
+        Version Added:
+            4.0.6
+
+        Args:
+            path (unicode):
+                The Perforce depot path, without a revision.
+
+            revision (unicode):
+                The revision for the path.
+
+        Returns:
+            bytes:
+            The contents of the file.
+        """
         if revision == HEAD:
             depot_path = path
         else:
             depot_path = '%s#%s' % (path, revision)
 
-        with self.run_worker():
-            fd, filename = tempfile.mkstemp(prefix='reviewboard.')
-
-            try:
-                os.close(fd)
-                self.p4.run_print('-q', '-o', filename, depot_path)
+        fd, filename = tempfile.mkstemp(prefix='reviewboard.')
 
-                if os.path.islink(filename):
-                    return b''
-                else:
-                    # p4 print will change the permissions on the file to be
-                    # read-only, which will break the unlink unless we fix it.
-                    os.chmod(filename, stat.S_IREAD | stat.S_IWRITE)
+        try:
+            os.close(fd)
+            self.p4.run_print('-q', '-o', filename, depot_path)
 
-                    with open(filename, 'rb') as f:
-                        return f.read()
-            finally:
-                os.unlink(filename)
+            if os.path.islink(filename):
+                return b''
+            else:
+                # p4 print will change the permissions on the file to be
+                # read-only, which will break the unlink unless we fix it.
+                os.chmod(filename, stat.S_IREAD | stat.S_IWRITE)
 
-        return b''
+                with open(filename, 'rb') as f:
+                    return f.read()
+        finally:
+            os.unlink(filename)
 
     def get_file_stat(self, path, revision):
         """Return status information about a file in the repository.
@@ -641,6 +702,7 @@ class PerforceTool(SCMTool):
     diffs_use_absolute_paths = True
     supports_ticket_auth = True
     supports_pending_changesets = True
+    supports_batch_get_files = True
     prefers_mirror_path = True
 
     field_help_text = {
@@ -806,6 +868,37 @@ class PerforceTool(SCMTool):
         """
         return self.client.get_file(path, revision)
 
+    def get_files(self, files, **kwargs):
+        """Return the contents of multiple files in the repository.
+
+        All the files are fetched over a single Perforce connection.
+
+        Version Added:
+            4.0.6
+
+        Args:
+            files (list of tuple):
+                The files to fetch. Each is a 3-tuple of the depot path,
+                revision, and
+                :py:class:`~reviewboard.scmtools.core.FileLookupContext`.
+
+            **kwargs (dict):
+                Unused keyword arguments.
+
+        Returns:
+            list:
+            A list with an entry for each file, in the order requested. Each
+            entry is either the file's contents (:py:class:`bytes`) or the
+            exception raised when fetching it.
+        """
+        try:
+            return self.client.get_files([
+                (path, revision)
+                for path, revision, context in files
+            ])
+        except Exception as e:
+            return [e] * len(files)
+
     def file_exists(self, path, revision=HEAD, **kwargs):
         """Return whether a particular file exists in a repository.
 
@@ -11,7 +11,9 @@ from djblets.testing.decorators import add_fixtures
 from reviewboard.diffviewer.parser import DiffParserError
 from reviewboard.scmtools.core import PRE_CREATION
 from reviewboard.scmtools.errors import SCMError, FileNotFoundError
-from reviewboard.scmtools.git import ShortSHA1Error, GitClient, GitTool
+from reviewboard.scmtools.git import (GitCatFilePool, GitCatFileProcess,
+                                      GitClient, GitTool, GitTreeEntry,
+                                      ShortSHA1Error)
 from reviewboard.scmtools.models import Repository, Tool
 from reviewboard.scmtools.tests.testcases import SCMTestCase
 from reviewboard.testing.testcase import TestCase
@@ -49,6 +51,11 @@ class GitTests(kgb.SpyAgency, SCMTestCase):
         except ImportError:
             raise nose.SkipTest('git binary not found')
 
+    def tearDown(self):
+        super(GitTests, self).tearDown()
+
+        GitCatFilePool.close_all()
+
     def _read_fixture(self, filename):
         filename = os.path.join(os.path.dirname(__file__),
                                 '..', 'testdata', filename)
@@ -1109,6 +1116,90 @@ class GitTests(kgb.SpyAgency, SCMTestCase):
         with self.assertRaises(FileNotFoundError):
             tool.get_file('readme', '0000000')
 
+    def test_get_file_reuses_cat_file_process(self):
+        """Testing GitTool.get_file reuses a git cat-file process"""
+        tool = self.tool
+
+        self.spy_on(GitCatFileProcess.start)
+
+        self.assertEqual(tool.get_file('readme', 'e965047'), b'Hello\n')
+        self.assertEqual(tool.get_file('readme', 'd6613f5'),
+                         b'Hello there\n')
+        self.assertEqual(tool.get_file('readme'), b'Hello there\n')
+
+        self.assertSpyCallCount(GitCatFileProcess.start, 1)
+
+    def test_get_file_after_cat_file_process_exits(self):
+        """Testing GitTool.get_file restarts a git cat-file process that
+        exited
+        """
+        tool = self.tool
+
+        self.assertEqual(tool.get_file('readme', 'e965047'), b'Hello\n')
+
+        pool = tool.client._get_cat_file_pool()
+        self.assertEqual(len(pool._idle), 1)
+
+        process = pool._idle[0]
+        process._process.kill()
+        process._process.wait()
+
+        self.assertEqual(tool.get_file('readme', 'd6613f5'),
+                         b'Hello there\n')
+        self.assertTrue(process.is_running)
+
+    def test_get_file_with_non_blob(self):
+        """Testing GitTool.get_file with a commit object"""
+        with self.assertRaises(SCMError):
+            self.tool.get_file('readme', 'a62df6c')
+
+    def test_get_repo_directory(self):
+        """Testing GitTool.get_repo_directory matches git ls-tree"""
+        tool = self.tool
+        client = tool.client
+
+        content = tool.get_repo_directory('', None, 'HEAD')
+        self.assertIsInstance(content, bytes)
+        self.assertIn(b'\treadme\n', content)
+
+        self.spy_on(client._can_use_cat_file_batch,
+                    op=kgb.SpyOpReturn(False))
+
+        self.assertEqual(tool.get_repo_directory('', None, 'HEAD'), content)
+
+    def test_get_repo_directory_with_missing_path(self):
+        """Testing GitTool.get_repo_directory with a missing path"""
+        with self.assertRaises(FileNotFoundError):
+            self.tool.get_repo_directory('missing', None, 'HEAD')
+
+    def test_get_repo_directory_entries(self):
+        """Testing GitTool.get_repo_directory_entries"""
+        tool = self.tool
+        client = tool.client
+
+        entries = tool.get_repo_directory_entries('', None, 'HEAD')
+        self.assertEqual(
+            [entry.name for entry in entries],
+            ['diffutils.py', 'models.py', 'readme', 'resources.py',
+             'tests.py'])
+        self.assertEqual(
+            entries[2],
+            GitTreeEntry(mode=0o100644,
+                         object_type='blob',
+                         sha1='d6613f5f8b58eb6a88ee386ea140364c8645005c',
+                         name='readme'))
+
+        self.spy_on(client._can_use_cat_file_batch,
+                    op=kgb.SpyOpReturn(False))
+
+        self.assertEqual(tool.get_repo_directory_entries('', None, 'HEAD'),
+                         entries)
+
+    def test_get_repo_directory_entries_with_missing_path(self):
+        """Testing GitTool.get_repo_directory_entries with a missing path"""
+        with self.assertRaises(FileNotFoundError):
+            self.tool.get_repo_directory_entries('missing', None, 'HEAD')
+
     def test_parse_diff_revision_with_remote_and_short_SHA1_error(self):
         """Testing GitTool.parse_diff_revision with remote files and short
         SHA1 error
@@ -1189,6 +1280,132 @@ class GitTests(kgb.SpyAgency, SCMTestCase):
         self.assertFalse(repository.get_file_exists('PATH', 'd7e96b3'))
 
 
+class GitCatFilePoolTests(TestCase):
+    """Unit tests for reviewboard.scmtools.git.GitCatFilePool."""
+
+    def setUp(self):
+        super(GitCatFilePoolTests, self).setUp()
+
+        self.git_dir = os.path.join(os.path.dirname(__file__),
+                                    '..', 'testdata', 'git_repo')
+        self.pool = GitCatFilePool(self.git_dir)
+
+    def tearDown(self):
+        super(GitCatFilePoolTests, self).tearDown()
+
+        self.pool.close()
+
+    def test_get_objects(self):
+        """Testing GitCatFilePool.get_objects"""
+        objects = self.pool.get_objects(['e965047', 'HEAD:readme', 'fffffff',
+                                         'HEAD:missing', 'HEAD'])
+
+        self.assertEqual(len(objects), 5)
+
+        self.assertEqual(objects[0].object_type, b'blob')
+        self.assertEqual(objects[0].data, b'Hello\n')
+        self.assertEqual(objects[0].size, 6)
+        self.assertEqual(objects[1].sha1,
+                         b'd6613f5f8b58eb6a88ee386ea140364c8645005c')
+        self.assertEqual(objects[1].data, b'Hello there\n')
+        self.assertIsNone(objects[2])
+        self.assertIsNone(objects[3])
+        self.assertEqual(objects[4].object_type, b'commit')
+
+    def test_get_objects_pipelined(self):
+        """Testing GitCatFilePool.get_objects with more objects than the
+        pipeline size
+        """
+        num_objects = GitCatFileProcess.PIPELINE_SIZE * 3 + 1
+        objects = self.pool.get_objects(['HEAD:readme'] * num_objects)
+
+        self.assertEqual(len(objects), num_objects)
+        self.assertEqual({obj.data for obj in objects}, {b'Hello there\n'})
+
+    def test_get_objects_with_batch_check(self):
+        """Testing GitCatFilePool.get_objects with batch_check=True"""
+        pool = GitCatFilePool(self.git_dir, batch_check=True)
+
+        try:
+            git_object = pool.get_object('HEAD:readme')
+        finally:
+            pool.close()
+
+        self.assertEqual(git_object.object_type, b'blob')
+        self.assertEqual(git_object.size, 12)
+        self.assertIsNone(git_object.data)
+
+    def test_close_idle(self):
+        """Testing GitCatFilePool.close_idle"""
+        pool = self.pool
+        pool.get_object('HEAD:readme')
+
+        process = pool._idle[0]
+        self.assertTrue(process.is_running)
+
+        self.assertTrue(pool.close_idle(timeout=60))
+        self.assertTrue(process.is_running)
+
+        process.last_used -= 120
+
+        self.assertFalse(pool.close_idle(timeout=60))
+        self.assertFalse(process.is_running)
+        self.assertFalse(pool.has_processes)
+
+    def test_close_with_process_in_use(self):
+        """Testing GitCatFilePool.close stops processes in use when they're
+        released
+        """
+        pool = self.pool
+        process = pool._acquire()
+        process.start()
+
+        pool.close()
+        self.assertTrue(process.is_running)
+        self.assertTrue(pool.has_processes)
+
+        pool._release(process)
+        self.assertFalse(process.is_running)
+        self.assertFalse(pool.has_processes)
+        self.assertEqual(pool._idle, [])
+
+    def test_close_all_with_process_in_use(self):
+        """Testing GitCatFilePool.close_all stops processes in use when
+        they're released
+        """
+        try:
+            pool = GitCatFilePool.get_for_repository(self.git_dir)
+            process = pool._acquire()
+            process.start()
+        finally:
+            GitCatFilePool.close_all()
+
+        self.assertTrue(process.is_running)
+
+        pool._release(process)
+        self.assertFalse(process.is_running)
+        self.assertFalse(pool.has_processes)
+
+        # A new pool is created for later requests.
+        self.assertIsNot(GitCatFilePool.get_for_repository(self.git_dir),
+                         pool)
+        GitCatFilePool.close_all()
+
+    def test_get_for_repository(self):
+        """Testing GitCatFilePool.get_for_repository shares pools"""
+        try:
+            pool = GitCatFilePool.get_for_repository(self.git_dir)
+
+            self.assertIs(GitCatFilePool.get_for_repository(self.git_dir),
+                          pool)
+            self.assertIsNot(
+                GitCatFilePool.get_for_repository(self.git_dir,
+                                                  batch_check=True),
+                pool)
+        finally:
+            GitCatFilePool.close_all()
+
+
 class GitAuthFormTests(TestCase):
     """Unit tests for GitTool's authentication form."""
 
@@ -255,6 +255,112 @@ class RepositoryTests(kgb.SpyAgency, TestCase):
             context=context,
             data=b'Hello\n')
 
+    def test_prefetch_files(self):
+        """Testing Repository.prefetch_files with batch fetching"""
+        repository = self.repository
+        scmtool_cls = repository.scmtool_class
+
+        self.spy_on(scmtool_cls.get_files, owner=scmtool_cls)
+
+        num_fetched = repository.prefetch_files([
+            ('readme', 'e965047', None),
+            ('readme', 'd6613f5', FileLookupContext()),
+            ('readme', 'd6613f5', None),
+            ('missing', '0000000', None),
+        ])
+
+        self.assertEqual(num_fetched, 2)
+        self.assertSpyCallCount(scmtool_cls.get_files, 1)
+        self.assertEqual(len(scmtool_cls.get_files.last_call.args[0]), 3)
+
+        # The files should now come from the cache.
+        self.spy_on(scmtool_cls.get_file, owner=scmtool_cls)
+
+        self.assertEqual(repository.get_file('readme', 'e965047'),
+                         b'Hello\n')
+        self.assertEqual(repository.get_file('readme', 'd6613f5'),
+                         b'Hello there\n')
+        self.assertSpyNotCalled(scmtool_cls.get_file)
+
+        # Fetching again should only fetch the missing file.
+        self.assertEqual(
+            repository.prefetch_files([
+                ('readme', 'e965047', None),
+                ('missing', '0000000', None),
+            ]),
+            0)
+        self.assertSpyCallCount(scmtool_cls.get_files, 2)
+        self.assertEqual(scmtool_cls.get_files.last_call.args[0][0][0],
+                         'missing')
+
+    def test_prefetch_files_without_batch(self):
+        """Testing Repository.prefetch_files without batch fetching"""
+        repository = Repository.objects.create(
+            name='Remote Git test repo',
+            path='git@github.com:reviewboard/reviewboard.git',
+            raw_file_url='http://example.com/<revision>',
+            tool=Tool.objects.get(name='Git'))
+        scmtool_cls = repository.scmtool_class
+
+        @self.spy_for(scmtool_cls.get_file, owner=scmtool_cls)
+        def _get_file(_self, path, revision=None, **kwargs):
+            return path.encode('utf-8')
+
+        self.spy_on(scmtool_cls.get_files, owner=scmtool_cls)
+
+        num_fetched = repository.prefetch_files(
+            [
+                ('file%d' % i, 'abc123', None)
+                for i in range(10)
+            ],
+            max_workers=3)
+
+        self.assertEqual(num_fetched, 10)
+        self.assertSpyNotCalled(scmtool_cls.get_files)
+        self.assertSpyCallCount(scmtool_cls.get_file, 10)
+
+        self.assertEqual(repository.get_file('file7', 'abc123'), b'file7')
+        self.assertSpyCallCount(scmtool_cls.get_file, 10)
+
+    def test_prefetch_files_signals(self):
+        """Testing Repository.prefetch_files emits signals"""
+        def on_fetching_file(**kwargs):
+            pass
+
+        def on_fetched_file(**kwargs):
+            pass
+
+        repository = self.repository
+
+        fetching_file.connect(on_fetching_file, sender=repository)
+        fetched_file.connect(on_fetched_file, sender=repository)
+
+        self.spy_on(on_fetching_file)
+        self.spy_on(on_fetched_file)
+
+        context = FileLookupContext(base_commit_id='def456')
+
+        repository.prefetch_files([('readme', 'e965047', context)])
+
+        self.assertSpyCalledWith(
+            on_fetching_file,
+            sender=repository,
+            path='readme',
+            revision='e965047',
+            base_commit_id='def456',
+            request=None,
+            context=context)
+
+        self.assertSpyCalledWith(
+            on_fetched_file,
+            sender=repository,
+            path='readme',
+            revision='e965047',
+            base_commit_id='def456',
+            request=None,
+            context=context,
+            data=b'Hello\n')
+
     def test_get_file_exists_caching_when_exists(self):
         """Testing Repository.get_file_exists caches result when exists"""
         path = 'readme'
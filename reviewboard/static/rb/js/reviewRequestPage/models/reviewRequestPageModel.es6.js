@@ -6,6 +6,7 @@
  */
 RB.ReviewRequestPage.ReviewRequestPage = RB.ReviewablePage.extend({
     defaults: _.defaults({
+        updatesStreamURL: null,
         updatesURL: null,
     }, RB.ReviewablePage.prototype.defaults),
 
@@ -19,6 +20,9 @@ RB.ReviewRequestPage.ReviewRequestPage = RB.ReviewablePage.extend({
         this._watchedUpdatesPeriodMS = null;
         this._watchedUpdatesTimeout = null;
         this._watchedUpdatesLastScheduleTime = null;
+        this._updatesEventSource = null;
+        this._updatesEventSourceURL = null;
+        this._updatesStreamFailed = false;
 
         this.entries = new Backbone.Collection([], {
             model: RB.ReviewRequestPage.Entry,
@@ -41,6 +45,7 @@ RB.ReviewRequestPage.ReviewRequestPage = RB.ReviewablePage.extend({
      */
     parse(rsp) {
         return _.extend({
+            updatesStreamURL: rsp.updatesStreamURL,
             updatesURL: rsp.updatesURL,
         }, RB.ReviewablePage.prototype.parse.call(this, rsp));
     },
@@ -132,6 +137,8 @@ RB.ReviewRequestPage.ReviewRequestPage = RB.ReviewablePage.extend({
              * There's nothing left to watch, so cancel the timeout (if set)
              * and clear state.
              */
+            this._closeUpdatesStream();
+
             if (this._watchedUpdatesTimeout !== null) {
                 clearTimeout(this._watchedUpdatesTimeout);
                 this._watchedUpdatesTimeout = null;
@@ -155,6 +162,11 @@ RB.ReviewRequestPage.ReviewRequestPage = RB.ReviewablePage.extend({
                          : Math.min(this._watchedUpdatesPeriodMS, periodMS));
                 }
             }
+
+            if (this._updatesEventSource !== null) {
+                /* Stream updates for only the remaining entries. */
+                this._openUpdatesStream();
+            }
         }
     },
 
@@ -166,6 +178,12 @@ RB.ReviewRequestPage.ReviewRequestPage = RB.ReviewablePage.extend({
      * of parts of the page.
      */
     _scheduleCheckUpdates() {
+        if (this._canStreamUpdates()) {
+            this._openUpdatesStream();
+
+            return;
+        }
+
         if (this._watchedUpdatesTimeout !== null ||
             this._watchedUpdatesPeriodMS === null) {
             return;
@@ -184,25 +202,97 @@ RB.ReviewRequestPage.ReviewRequestPage = RB.ReviewablePage.extend({
     },
 
     /**
-     * Load updates from the server.
+     * Return whether updates can be streamed from the server.
      *
-     * Args:
-     *     options (object, optional):
-     *         Options that control the types of updates loaded from the
-     *         server.
+     * Returns:
+     *     boolean:
+     *     ``true`` if the browser and server support streaming updates, and
+     *     the stream hasn't failed.
+     */
+    _canStreamUpdates() {
+        return (!!this.get('updatesStreamURL') &&
+                window.EventSource !== undefined &&
+                !this._updatesStreamFailed);
+    },
+
+    /**
+     * Open a stream of updates from the server for the watched entries.
      *
-     * Option Args:
+     * The server will push updates as they happen, rather than the page
+     * polling for them. If a stream for the same entries is already open,
+     * it will be kept.
+     *
+     * If the stream can't be opened, this will fall back on polling.
+     */
+    _openUpdatesStream() {
+        const url = this.get('updatesStreamURL') +
+                    this._buildUpdatesQueryString(
+                        _.pluck(this._watchedEntries, 'entry'));
+
+        if (this._updatesEventSource !== null) {
+            if (this._updatesEventSourceURL === url) {
+                return;
+            }
+
+            this._closeUpdatesStream();
+        }
+
+        const eventSource = new EventSource(url);
+
+        eventSource.addEventListener('updates', evt => {
+            const data = atob(evt.data);
+            const bytes = new Uint8Array(data.length);
+
+            for (let i = 0; i < data.length; i++) {
+                bytes[i] = data.charCodeAt(i);
+            }
+
+            this._processUpdatesFromPayload(bytes.buffer);
+        });
+
+        eventSource.addEventListener('error', () => {
+            /*
+             * The browser will reconnect on its own after most errors.
+             * If it's given up (including when the server responds with
+             * HTTP 204 because streaming is disabled), switch to polling.
+             */
+            if (eventSource.readyState === EventSource.CLOSED &&
+                this._updatesEventSource === eventSource) {
+                this._closeUpdatesStream();
+                this._updatesStreamFailed = true;
+                this._scheduleCheckUpdates();
+            }
+        });
+
+        this._updatesEventSource = eventSource;
+        this._updatesEventSourceURL = url;
+    },
+
+    /**
+     * Close the stream of updates from the server, if open.
+     */
+    _closeUpdatesStream() {
+        if (this._updatesEventSource !== null) {
+            this._updatesEventSource.close();
+            this._updatesEventSource = null;
+            this._updatesEventSourceURL = null;
+        }
+    },
+
+    /**
+     * Return the query string for loading updates to entries.
+     *
+     * Args:
      *     entries (Array):
      *         A list of entry models that need to be checked for updates.
      *
-     *     onDone (function, optional):
-     *         Optional function to call after everything is loaded.
+     * Returns:
+     *     string:
+     *     The query string, including the leading ``?``, or an empty string
+     *     if there are no entries.
      */
-    _loadUpdates(options={}) {
-        const updatesURL = this.get('updatesURL');
+    _buildUpdatesQueryString(entries) {
         const allEntryIDs = {};
-        const entries = options.entries || [];
-
         const urlQuery = [];
 
         if (entries.length > 0) {
@@ -241,9 +331,30 @@ RB.ReviewRequestPage.ReviewRequestPage = RB.ReviewablePage.extend({
          */
         urlQuery.sort();
 
-        const urlQueryStr = (urlQuery.length > 0
-                             ? `?${urlQuery.join('&')}`
-                             : '');
+        return (urlQuery.length > 0
+                ? `?${urlQuery.join('&')}`
+                : '');
+    },
+
+    /**
+     * Load updates from the server.
+     *
+     * Args:
+     *     options (object, optional):
+     *         Options that control the types of updates loaded from the
+     *         server.
+     *
+     * Option Args:
+     *     entries (Array):
+     *         A list of entry models that need to be checked for updates.
+     *
+     *     onDone (function, optional):
+     *         Optional function to call after everything is loaded.
+     */
+    _loadUpdates(options={}) {
+        const updatesURL = this.get('updatesURL');
+        const urlQueryStr = this._buildUpdatesQueryString(
+            options.entries || []);
 
         Backbone.sync(
             'read',
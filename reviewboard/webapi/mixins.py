@@ -1,8 +1,18 @@
 from __future__ import unicode_literals
 
+import base64
+import datetime
+import json
+
+from django.core.exceptions import ObjectDoesNotExist, ValidationError
+from django.db import connection
+from django.db.models import Q
 from django.utils import six
 from django.utils.html import escape
 from djblets.markdown import markdown_escape, markdown_unescape
+from djblets.util.http import get_url_params_except
+from djblets.webapi.errors import DOES_NOT_EXIST, INVALID_FORM_DATA
+from djblets.webapi.responses import WebAPIResponsePaginated
 from djblets.webapi.resources.mixins.forms import (
     UpdateFormMixin as DjbletsUpdateFormMixin)
 
@@ -531,3 +541,413 @@ class UpdateFormMixin(DjbletsUpdateFormMixin):
         form.save_m2m()
 
         return instance
+
+
+class CursorResponsePaginated(WebAPIResponsePaginated):
+    """A paginated response that pages through results using a cursor.
+
+    Rather than skipping over a number of results (which requires the
+    database to scan and discard every earlier result), each page is
+    fetched by filtering for results that sort after the last result of the
+    previous page. This keeps the cost of each page constant, no matter how
+    deep into the results it is.
+
+    The cursor is an opaque token encoding the values of the ordering fields
+    for the last result on a page. Only a ``next`` link is provided, and the
+    total number of results is not computed.
+
+    Version Added:
+        4.0.6
+    """
+
+    def __init__(self, request, queryset, cursor_fields, cursor_values=None,
+                 cursor_param='cursor', *args, **kwargs):
+        """Initialize the response.
+
+        Args:
+            request (django.http.HttpRequest):
+                The HTTP request from the client.
+
+            queryset (django.db.models.query.QuerySet):
+                The queryset to paginate.
+
+            cursor_fields (tuple of unicode):
+                The fields to order results by, in
+                :py:meth:`~django.db.models.query.QuerySet.order_by` form.
+                These must uniquely identify each result.
+
+            cursor_values (list, optional):
+                The values of the ordering fields for the last result of the
+                previous page. If not provided, the first page will be
+                returned.
+
+            cursor_param (unicode, optional):
+                The name of the query parameter containing the cursor.
+
+            *args (tuple):
+                Positional arguments to pass to the parent class.
+
+            **kwargs (dict):
+                Keyword arguments to pass to the parent class.
+        """
+        self.cursor_fields = cursor_fields
+        self.cursor_values = cursor_values
+        self.cursor_param = cursor_param
+        self.next_cursor = None
+
+        super(CursorResponsePaginated, self).__init__(
+            request, queryset=queryset, *args, **kwargs)
+
+    def has_prev(self):
+        """Return whether there's a previous set of results.
+
+        Returns:
+            bool:
+            Always ``False``. Cursors only page forward.
+        """
+        return False
+
+    def has_next(self):
+        """Return whether there's a next set of results.
+
+        Returns:
+            bool:
+            Whether there's a next set of results.
+        """
+        return self.next_cursor is not None
+
+    def get_results(self):
+        """Return the results for this page.
+
+        Returns:
+            list of django.db.models.Model:
+            The results for this page.
+        """
+        max_results = max(self.max_results, 1)
+        queryset = self.queryset.order_by(*self.cursor_fields)
+
+        if self.cursor_values is not None:
+            queryset = queryset.filter(build_cursor_query(self.cursor_fields,
+                                                          self.cursor_values))
+
+        # Fetch one extra result to find out if there's another page.
+        results = list(queryset[:max_results + 1])
+
+        if len(results) > max_results:
+            results = results[:max_results]
+            self.next_cursor = encode_cursor(results[-1], self.cursor_fields)
+
+        return results
+
+    def get_total_results(self):
+        """Return the total number of results across all pages.
+
+        Returns:
+            None:
+            The total is not computed, as counting is as slow as an offset.
+        """
+        return None
+
+    def get_links(self):
+        """Return the pagination links for the payload.
+
+        Returns:
+            dict:
+            The links, containing a ``next`` link if there are more results.
+        """
+        links = {}
+
+        if self.has_next():
+            query_parameters = get_url_params_except(
+                self.request.GET, self.start_param, self.max_results_param,
+                self.cursor_param)
+
+            if query_parameters:
+                query_parameters = '&' + query_parameters
+
+            links[self.next_key] = {
+                'method': 'GET',
+                'href': '%s?%s=%s&%s=%s%s' % (
+                    self.request.build_absolute_uri(self.request.path),
+                    self.cursor_param, self.next_cursor,
+                    self.max_results_param, self.max_results,
+                    query_parameters),
+            }
+
+        return links
+
+
+def _get_cursor_field(model, field_name):
+    """Return the model field for a cursor ordering field.
+
+    Args:
+        model (type):
+            The model being paginated.
+
+        field_name (unicode):
+            The field name, in ordering form (optionally starting with
+            ``-``).
+
+    Returns:
+        tuple:
+        A 3-tuple of the attribute name, the model field, and whether the
+        ordering is descending.
+    """
+    descending = field_name.startswith('-')
+    name = field_name.lstrip('-')
+
+    if name == 'pk':
+        field = model._meta.pk
+    else:
+        field = model._meta.get_field(name)
+
+    return field.attname, field, descending
+
+
+def encode_cursor(obj, cursor_fields):
+    """Return an opaque cursor pointing after an object.
+
+    Version Added:
+        4.0.6
+
+    Args:
+        obj (django.db.models.Model):
+            The last object on a page of results.
+
+        cursor_fields (tuple of unicode):
+            The fields the results are ordered by.
+
+    Returns:
+        unicode:
+        The cursor.
+    """
+    values = []
+
+    for field_name in cursor_fields:
+        attname = _get_cursor_field(type(obj), field_name)[0]
+        value = getattr(obj, attname)
+
+        if isinstance(value, datetime.datetime):
+            # This keeps the full precision of the timestamp.
+            value = value.isoformat()
+
+        values.append(value)
+
+    return (
+        base64.urlsafe_b64encode(json.dumps(values).encode('utf-8'))
+        .decode('ascii')
+        .rstrip('=')
+    )
+
+
+def decode_cursor(cursor, model, cursor_fields):
+    """Return the ordering field values encoded in a cursor.
+
+    Version Added:
+        4.0.6
+
+    Args:
+        cursor (unicode):
+            The cursor provided by the client.
+
+        model (type):
+            The model being paginated.
+
+        cursor_fields (tuple of unicode):
+            The fields the results are ordered by.
+
+    Returns:
+        list:
+        The values of the ordering fields.
+
+    Raises:
+        ValueError:
+            The cursor was not valid, or contained values that can't be
+            stored in the ordering fields.
+    """
+    try:
+        values = json.loads(
+            base64.urlsafe_b64decode(
+                str(cursor + '=' * (-len(cursor) % 4))
+            ).decode('utf-8'))
+    except (TypeError, ValueError):
+        raise ValueError('The cursor could not be decoded.')
+
+    if not isinstance(values, list) or len(values) != len(cursor_fields):
+        raise ValueError('The cursor does not match the ordering.')
+
+    result = []
+
+    for field_name, value in zip(cursor_fields, values):
+        field = _get_cursor_field(model, field_name)[1]
+
+        try:
+            value = field.to_python(value)
+        except (OverflowError, TypeError, ValidationError):
+            # Values of the wrong type (such as a dictionary for a date) may
+            # raise a TypeError when parsed, rather than a ValidationError,
+            # and infinite numbers raise an OverflowError for integers.
+            raise ValueError('The cursor contains invalid values.')
+
+        if isinstance(value, six.integer_types):
+            internal_type = field.get_internal_type()
+
+            if internal_type in connection.ops.integer_field_ranges:
+                min_value, max_value = connection.ops.integer_field_range(
+                    internal_type)
+            else:
+                min_value, max_value = None, None
+
+            # Some databases (such as SQLite) don't report a range, but
+            # none of them can store integers larger than 64 bits.
+            if min_value is None:
+                min_value = -2 ** 63
+
+            if max_value is None:
+                max_value = 2 ** 63 - 1
+
+            if not (min_value <= value <= max_value):
+                raise ValueError('The cursor contains invalid values.')
+
+        result.append(value)
+
+    return result
+
+
+def build_cursor_query(cursor_fields, cursor_values):
+    """Return a query for results that sort after a cursor.
+
+    For an ordering of ``(a, b)``, this matches results where ``a`` is
+    after the cursor's value, or ``a`` is equal and ``b`` is after it.
+
+    Version Added:
+        4.0.6
+
+    Args:
+        cursor_fields (tuple of unicode):
+            The fields the results are ordered by.
+
+        cursor_values (list):
+            The values of the ordering fields from the cursor.
+
+    Returns:
+        django.db.models.Q:
+        The query.
+    """
+    q = Q()
+    equal_query = {}
+
+    for field_name, value in zip(cursor_fields, cursor_values):
+        name = field_name.lstrip('-')
+
+        if field_name.startswith('-'):
+            lookup = '%s__lt' % name
+        else:
+            lookup = '%s__gt' % name
+
+        q |= Q(**dict(equal_query, **{lookup: value}))
+        equal_query[name] = value
+
+    return q
+
+
+class CursorPaginationMixin(object):
+    """Mixes in opt-in cursor pagination for list resources.
+
+    Clients can pass ``?cursor=`` (with an empty value for the first page) to
+    page through the list using
+    :py:class:`CursorResponsePaginated`. Each page will contain a ``next``
+    link with the cursor for the following page. The existing filters work
+    as before.
+
+    Resources using this must set :py:attr:`cursor_fields`.
+
+    Version Added:
+        4.0.6
+    """
+
+    #: The fields to order results by when paginating with a cursor.
+    #:
+    #: These must uniquely identify each result, so the last field should be
+    #: the primary key.
+    #:
+    #: Type:
+    #:     tuple of unicode
+    cursor_fields = None
+
+    #: The description of the ``cursor`` field for list requests.
+    CURSOR_FIELD = {
+        'cursor': {
+            'type': six.text_type,
+            'description': 'If provided, results will be paginated using '
+                           'the ``next`` link\'s cursor rather than '
+                           '``start``, which is faster for deep pages. '
+                           'Pass an empty value for the first page. The '
+                           'total number of results is not returned.',
+            'added_in': '4.0.6',
+        },
+    }
+
+    def _get_list_impl(self, request, *args, **kwargs):
+        """Return the list of results.
+
+        If a cursor was provided, this will paginate using it. Otherwise,
+        this uses the default pagination.
+
+        Args:
+            request (django.http.HttpRequest):
+                The HTTP request from the client.
+
+            *args (tuple):
+                Positional arguments passed to the view.
+
+            **kwargs (dict):
+                Keyword arguments passed to the view.
+
+        Returns:
+            tuple or django.http.HttpResponse:
+            The response to send back to the client.
+        """
+        if 'cursor' not in request.GET:
+            return super(CursorPaginationMixin, self)._get_list_impl(
+                request, *args, **kwargs)
+
+        if not self.has_list_access_permissions(request, *args, **kwargs):
+            return self.get_no_access_error(request, *args, **kwargs)
+
+        cursor = request.GET['cursor']
+        cursor_values = None
+
+        if cursor:
+            try:
+                cursor_values = decode_cursor(cursor, self.model,
+                                              self.cursor_fields)
+            except ValueError as e:
+                return INVALID_FORM_DATA, {
+                    'fields': {
+                        'cursor': [six.text_type(e)],
+                    },
+                }
+
+        try:
+            queryset = self._get_queryset(request, is_list=True,
+                                          *args, **kwargs)
+        except ObjectDoesNotExist:
+            return DOES_NOT_EXIST
+
+        def _serialize_object(obj):
+            return self.get_serializer_for_object(obj).serialize_object(
+                obj, request=request, *args, **kwargs)
+
+        return CursorResponsePaginated(
+            request,
+            queryset=queryset,
+            cursor_fields=self.cursor_fields,
+            cursor_values=cursor_values,
+            results_key=self.list_result_key,
+            serialize_object_func=_serialize_object,
+            extra_data={
+                'links': self.get_links(self.list_child_resources,
+                                        request=request, *args, **kwargs),
+            },
+            **self.build_response_args(request))
@@ -2,17 +2,19 @@ from __future__ import unicode_literals
 
 from django.utils import six
 from djblets.util.decorators import augment_method_from
-from djblets.webapi.decorators import webapi_response_errors
+from djblets.webapi.decorators import (webapi_request_fields,
+                                       webapi_response_errors)
 from djblets.webapi.errors import INVALID_FORM_DATA
 
 from reviewboard.reviews.errors import RevokeShipItError
 from reviewboard.webapi.decorators import webapi_check_local_site
 from reviewboard.webapi.errors import REVOKE_SHIP_IT_ERROR
+from reviewboard.webapi.mixins import CursorPaginationMixin
 from reviewboard.webapi.resources import resources
 from reviewboard.webapi.resources.base_review import BaseReviewResource
 
 
-class ReviewResource(BaseReviewResource):
+class ReviewResource(CursorPaginationMixin, BaseReviewResource):
     """Provides information on reviews made on a review request.
 
     Each review can contain zero or more comments on diffs, screenshots,
@@ -31,6 +33,8 @@ class ReviewResource(BaseReviewResource):
     uri_object_key = 'review_id'
     model_parent_key = 'review_request'
 
+    cursor_fields = ('timestamp', 'pk')
+
     item_child_resources = [
         resources.review_diff_comment,
         resources.review_untouched_comment,
@@ -46,9 +50,17 @@ class ReviewResource(BaseReviewResource):
     ]
 
     @webapi_check_local_site
+    @webapi_request_fields(
+        optional=CursorPaginationMixin.CURSOR_FIELD,
+        allow_unknown=True
+    )
     @augment_method_from(BaseReviewResource)
     def get_list(self, *args, **kwargs):
-        """Returns the list of all public reviews on a review request."""
+        """Returns the list of all public reviews on a review request.
+
+        Large lists of reviews can be paged through efficiently by passing
+        ``?cursor=`` and following the ``next`` links.
+        """
         pass
 
     @webapi_response_errors(INVALID_FORM_DATA, REVOKE_SHIP_IT_ERROR)
@@ -66,7 +66,8 @@ from reviewboard.webapi.errors import (CHANGE_NUMBER_IN_USE,
                                        REOPEN_ERROR,
                                        REPO_AUTHENTICATION_ERROR,
                                        REPO_INFO_ERROR)
-from reviewboard.webapi.mixins import MarkdownFieldsMixin
+from reviewboard.webapi.mixins import (CursorPaginationMixin,
+                                       MarkdownFieldsMixin)
 from reviewboard.webapi.resources import resources
 from reviewboard.webapi.resources.repository import RepositoryResource
 from reviewboard.webapi.resources.review_group import ReviewGroupResource
@@ -78,7 +79,8 @@ from reviewboard.webapi.resources.user import UserResource
 logger = logging.getLogger(__name__)
 
 
-class ReviewRequestResource(MarkdownFieldsMixin, WebAPIResource):
+class ReviewRequestResource(CursorPaginationMixin, MarkdownFieldsMixin,
+                            WebAPIResource):
     """Provides information on review requests.
 
     Review requests are one of the central concepts in Review Board. They
@@ -92,10 +94,15 @@ class ReviewRequestResource(MarkdownFieldsMixin, WebAPIResource):
     When a review request is published, it can be reviewed by users. It can
     then be updated, again through the Review Request Draft resource, or closed
     as submitted or discarded.
+
+    Large lists of review requests can be paged through efficiently by
+    passing ``?cursor=`` and following the ``next`` links.
     """
     model = ReviewRequest
     name = 'review_request'
 
+    cursor_fields = ('-last_updated', '-pk')
+
     fields = {
         'id': {
             'type': IntFieldType,
@@ -1115,7 +1122,7 @@ class ReviewRequestResource(MarkdownFieldsMixin, WebAPIResource):
     @webapi_check_login_required
     @webapi_check_local_site
     @webapi_request_fields(
-        optional={
+        optional=dict({
             'branch': {
                 'type': six.text_type,
                 'description': 'The branch field on a review request to '
@@ -1347,7 +1354,7 @@ class ReviewRequestResource(MarkdownFieldsMixin, WebAPIResource):
                                'review requests must have in the reviewer '
                                'list specifically.',
             }
-        },
+        }, **CursorPaginationMixin.CURSOR_FIELD),
         allow_unknown=True
     )
     @augment_method_from(WebAPIResource)
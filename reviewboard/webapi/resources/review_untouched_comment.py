@@ -76,14 +76,9 @@ class ReviewUntouchedCommentResource(BaseUntouchedCommentResource):
         :ref:`webapi2.0-extra-data` for more information.
         """
 
-        file_untouched_comment = FileUntouchedComment.objects.filter(untouched_file_path=kwargs['file_path'],untouched_file_hashcode=kwargs['source_file_hashcode'])
-        if not file_untouched_comment:
-            file_untouched_comment = FileUntouchedComment()
-            file_untouched_comment.untouched_file_path=kwargs['file_path']
-            file_untouched_comment.untouched_file_hashcode=kwargs['source_file_hashcode']
-            file_untouched_comment.save()
-        else:
-            file_untouched_comment=file_untouched_comment[0]
+        file_untouched_comment = \
+            FileUntouchedComment.objects.get_or_create_for_file(
+                kwargs['file_path'], kwargs['source_file_hashcode'])
         
         try:
             review = resources.review.get_object(request, *args, **kwargs)
@@ -90,6 +90,61 @@ class ResourceListTests(ReviewListMixin, ReviewRequestChildListMixin,
         self.assertEqual(rsp['stat'], 'ok')
         self.assertEqual(rsp['count'], 2)
 
+    def test_get_with_cursor(self):
+        """Testing the GET review-requests/<id>/reviews/?cursor= API matches
+        offset pagination
+        """
+        review_request = self.create_review_request(publish=True)
+        timestamp = get_tz_aware_utcnow()
+
+        for i in range(7):
+            # Some reviews share a timestamp, to check that ties are broken
+            # consistently.
+            self.create_review(review_request,
+                               publish=True,
+                               timestamp=timestamp + timedelta(seconds=i // 2))
+
+        url = get_review_list_url(review_request)
+        offset_ids = []
+
+        for start in range(0, 7, 3):
+            rsp = self.api_get(url, {
+                'start': start,
+                'max-results': 3,
+            }, expected_mimetype=review_list_mimetype)
+            self.assertEqual(rsp['stat'], 'ok')
+
+            offset_ids += [item['id'] for item in rsp['reviews']]
+
+        rsp = self.api_get(url, {
+            'cursor': '',
+            'max-results': 3,
+        }, expected_mimetype=review_list_mimetype)
+        cursor_ids = []
+
+        while True:
+            self.assertEqual(rsp['stat'], 'ok')
+            self.assertLessEqual(len(rsp['reviews']), 3)
+
+            cursor_ids += [item['id'] for item in rsp['reviews']]
+
+            if 'next' not in rsp['links']:
+                break
+
+            rsp = self.api_get(rsp['links']['next']['href'],
+                               expected_mimetype=review_list_mimetype)
+
+        self.assertEqual(len(cursor_ids), 7)
+        self.assertEqual(sorted(cursor_ids), sorted(offset_ids))
+        self.assertEqual(
+            cursor_ids,
+            list(
+                Review.objects
+                .filter(review_request=review_request)
+                .order_by('timestamp', 'pk')
+                .values_list('pk', flat=True)
+            ))
+
     def test_get_with_invite_only_group_and_permission_denied_error(self):
         """Testing the GET review-requests/<id>/reviews/ API
         with invite-only group and Permission Denied error
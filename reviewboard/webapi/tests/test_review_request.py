@@ -1,5 +1,7 @@
 from __future__ import unicode_literals
 
+import base64
+
 import django
 from django.contrib import auth
 from django.contrib.auth.models import User, Permission
@@ -149,6 +151,161 @@ class ResourceListTests(SpyAgency, ExtraDataListMixin, BaseWebAPITestCase):
         self.assertEqual(rsp['stat'], 'ok')
         self.assertEqual(len(rsp['review_requests']), 2)
 
+    def test_get_with_cursor(self):
+        """Testing the GET review-requests/?cursor= API matches offset
+        pagination
+        """
+        for i in range(8):
+            self.create_review_request(publish=True,
+                                       summary='Review request %s' % i)
+
+        url = get_review_request_list_url()
+        offset_ids = []
+
+        for start in range(0, 8, 3):
+            rsp = self.api_get(url, {
+                'start': start,
+                'max-results': 3,
+            }, expected_mimetype=review_request_list_mimetype)
+            self.assertEqual(rsp['stat'], 'ok')
+
+            offset_ids += [item['id'] for item in rsp['review_requests']]
+
+        pages = self._get_cursor_pages(url, {'max-results': 3})
+
+        self.assertEqual([len(page) for page in pages], [3, 3, 2])
+        self.assertEqual(sum(pages, []), offset_ids)
+
+    def test_get_with_cursor_and_same_timestamps(self):
+        """Testing the GET review-requests/?cursor= API with review requests
+        updated at the same time
+        """
+        review_requests = [
+            self.create_review_request(publish=True)
+            for i in range(5)
+        ]
+        ReviewRequest.objects.update(
+            last_updated=review_requests[0].last_updated)
+
+        pages = self._get_cursor_pages(get_review_request_list_url(),
+                                       {'max-results': 2})
+
+        self.assertEqual([len(page) for page in pages], [2, 2, 1])
+        self.assertEqual(
+            sum(pages, []),
+            [
+                review_request.display_id
+                for review_request in reversed(review_requests)
+            ])
+
+    def test_get_with_cursor_and_status(self):
+        """Testing the GET review-requests/?cursor=&status= API"""
+        self.create_review_request(publish=True, status='S')
+        self.create_review_request(publish=True, status='P')
+        self.create_review_request(publish=True, status='S')
+        self.create_review_request(publish=True, status='D')
+        self.create_review_request(publish=True, status='S')
+
+        pages = self._get_cursor_pages(get_review_request_list_url(), {
+            'status': 'submitted',
+            'max-results': 2,
+        })
+
+        self.assertEqual(
+            sum(pages, []),
+            list(
+                ReviewRequest.objects
+                .filter(status='S')
+                .order_by('-last_updated', '-pk')
+                .values_list('pk', flat=True)
+            ))
+
+    def test_get_with_invalid_cursor(self):
+        """Testing the GET review-requests/?cursor= API with an invalid
+        cursor
+        """
+        rsp = self.api_get(get_review_request_list_url(), {
+            'cursor': 'abc',
+        }, expected_status=400)
+        self.assertEqual(rsp['stat'], 'fail')
+        self.assertEqual(rsp['err']['code'], INVALID_FORM_DATA.code)
+        self.assertIn('cursor', rsp['fields'])
+
+    def test_get_with_cursor_with_invalid_value_type(self):
+        """Testing the GET review-requests/?cursor= API with a cursor
+        containing values of the wrong type
+        """
+        cursor = base64.urlsafe_b64encode(b'[{}, 1]').decode('ascii')
+
+        rsp = self.api_get(get_review_request_list_url(), {
+            'cursor': cursor.rstrip('='),
+        }, expected_status=400)
+        self.assertEqual(rsp['stat'], 'fail')
+        self.assertEqual(rsp['err']['code'], INVALID_FORM_DATA.code)
+        self.assertIn('cursor', rsp['fields'])
+
+    def test_get_with_cursor_with_infinite_value(self):
+        """Testing the GET review-requests/?cursor= API with a cursor
+        containing an infinite number for an ID
+        """
+        cursor = base64.urlsafe_b64encode(
+            b'["2020-01-01T00:00:00+00:00", 1e999]').decode('ascii')
+
+        rsp = self.api_get(get_review_request_list_url(), {
+            'cursor': cursor.rstrip('='),
+        }, expected_status=400)
+        self.assertEqual(rsp['stat'], 'fail')
+        self.assertEqual(rsp['err']['code'], INVALID_FORM_DATA.code)
+        self.assertIn('cursor', rsp['fields'])
+
+    def test_get_with_cursor_with_out_of_range_value(self):
+        """Testing the GET review-requests/?cursor= API with a cursor
+        containing an ID too large for the database
+        """
+        cursor = base64.urlsafe_b64encode(
+            ('["2020-01-01T00:00:00+00:00", %d]' % 10 ** 30).encode('ascii')
+        ).decode('ascii')
+
+        rsp = self.api_get(get_review_request_list_url(), {
+            'cursor': cursor.rstrip('='),
+        }, expected_status=400)
+        self.assertEqual(rsp['stat'], 'fail')
+        self.assertEqual(rsp['err']['code'], INVALID_FORM_DATA.code)
+        self.assertIn('cursor', rsp['fields'])
+
+    def _get_cursor_pages(self, url, query):
+        """Return the IDs on each page when paginating with a cursor.
+
+        Args:
+            url (unicode):
+                The URL of the list resource.
+
+            query (dict):
+                The query arguments for the first page.
+
+        Returns:
+            list of list of int:
+            The review request IDs on each page.
+        """
+        rsp = self.api_get(url, dict(query, cursor=''),
+                           expected_mimetype=review_request_list_mimetype)
+        pages = []
+
+        while True:
+            self.assertEqual(rsp['stat'], 'ok')
+            self.assertNotIn('total_results', rsp)
+            self.assertNotIn('prev', rsp['links'])
+
+            pages.append([item['id'] for item in rsp['review_requests']])
+
+            if 'next' not in rsp['links']:
+                break
+
+            rsp = self.api_get(rsp['links']['next']['href'],
+                               expected_mimetype=review_request_list_mimetype)
+
+        return pages
+
     def test_get_with_counts_only(self):
         """Testing the GET review-requests/?counts-only=1 API"""
         self.create_review_request(publish=True)